@@ -1,16 +1,70 @@
 """
 This script sets up an AWS Lambda function to handle Slack events.
-It uses the `slack_bolt` library's AWS Lambda adapter to interface with Slack API.
+It uses the Lambda adapter from the `slack_app` module, a lean equivalent of the
+`slack_bolt` library's AWS Lambda adapter, to interface with Slack API.
 The main functionality is provided by a Slack app defined in `slack_app` module,
 which is expected to contain the necessary logic and handlers for processing
 Slack events. The lambda_handler function is the entry point for AWS Lambda
 to process incoming Slack events, and it delegates the event processing
-to the SlackRequestHandler from the `slack_bolt` library.
+to the LambdaRequestHandler, or to the AsyncLambdaRequestHandler of the asynchronous execution mode. Scheduled warm-up pings are short-circuited
+before Bolt and handled by the `warmup` module instead. Batches of the SQS queue of the JIRA outbox are
+handed to the outbox flusher, the install and redirect routes of the OAuth flow to the `installations`
+module, the invocations running the broadcasts of questionnaires to the `broadcast` module, and the scheduled
+reminder sweeps to the `reminders` module.
+Slack requests go through the `router` module first, which answers or rejects the ones needing no listener
+before the Slack app is built, and hands the others to a request handler reused across invocations.
+The timing metrics of every invocation are flushed by the `metrics` module as a single log line when it ends.
 """
 
-from slack_bolt.adapter import aws_lambda
+import functools
+import json
+import logging
 
-from slack_app import bot
+import warmup
+from common import metrics
+from jira_app import outbox
+from slack_app import bot, broadcast, installations, reminders, router, throttle
+from slack_app.modal import handlers
+
+
+# Logger of the reports of the scheduled invocations, at INFO as the root logger of Lambda only logs warnings
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+def get_event_type(event) -> str:
+    """
+    Classifies an event for the metrics dimensions.
+
+    Args:
+        event: AWS Lambda event object.
+
+    Returns:
+        str: 'warm_up' for scheduled pings, 'outbox' for batches of the JIRA outbox queue, 'broadcast' for the
+        invocations running a broadcast, 'reminders' for the scheduled reminder sweeps, 'oauth' for the routes of
+        the OAuth flow, 'lazy' for lazy listener invocations and 'request' otherwise.
+    """
+
+    if warmup.is_warm_up_event(event):
+        return "warm_up"
+
+    if broadcast.is_broadcast_event(event):
+        return "broadcast"
+
+    if reminders.is_sweep_event(event):
+        return "reminders"
+
+    if outbox.is_sqs_event(event):
+        return "outbox"
+
+    if installations.get_route(event) is not None:
+        return "oauth"
+
+    # Lazy listener invocations carry the marker header set by the lazy listener runner
+    if (event.get("headers") or {}).get("x-slack-bolt-lazy-only") == "1":
+        return "lazy"
+
+    return "request"
 
 
 def lambda_handler(event, context):
@@ -22,12 +76,55 @@ def lambda_handler(event, context):
         context: AWS Lambda context object.
 
     Returns:
-        The response from the SlackRequestHandler.
+        The response from the LambdaRequestHandler, the warm-up report for scheduled pings,
+        the partial batch response for batches of the JIRA outbox queue, the progress of a broadcast, the reports
+        of a reminder sweep, or the response of the OAuth flow.
     """
 
-    app = bot.get_slack_app()
+    event_type = get_event_type(event)
+    metrics.start_invocation(event_type, getattr(context, "function_name", None), bot.get_execution_mode())
+
+    # Stop the waits of the Slack calls under the rate limits before the function times out
+    throttle.set_deadline(context)
+
+    try:
+        with metrics.timer("Invocation"):
+            # Prime all resources for scheduled warm-up pings without going through Bolt
+            if event_type == "warm_up":
+                report = warmup.warm_up(event)
+                LOGGER.info("Warm-up report: %s", json.dumps(report))
+                return report
+
+            # Create the JIRA tasks of the outbox and update the messages of their users
+            if event_type == "outbox":
+                flusher = outbox.create_flusher(
+                    functools.partial(handlers.update_task_message, bot.get_slack_app().client)
+                )
+                return outbox.handle_sqs_event(event, flusher)
+
+            # Message the members of a channel from the last checkpoint of the broadcast
+            if event_type == "broadcast":
+                return broadcast.handle_broadcast_event(event, context)
+
+            # Remind the members messaged by the broadcasts who did not submit their questionnaire
+            if event_type == "reminders":
+                report = reminders.handle_sweep_event(event, context)
+                LOGGER.info("Reminder sweep report: %s", json.dumps(report))
+                return report
+
+            # Install the app into a workspace
+            if event_type == "oauth":
+                return installations.handle_oauth_event(event)
+
+            # Answer the requests which need no listener, and reject the unsigned ones, without building the app
+            if event_type == "request":
+                response = router.route(event)
+
+                if response is not None:
+                    return response
 
-    # Create a request handler for AWS Lambda
-    request_handler = aws_lambda.SlackRequestHandler(app=app)
-    # Handle the incoming event and return the response
-    return request_handler.handle(event, context)
+            # Handle the incoming event with the request handler reused by the requests, and return the response
+            return router.get_request_handler().handle(event, context)
+    finally:
+        # Emit the metrics of the invocation as a single EMF log line
+        metrics.flush()
@@ -0,0 +1,306 @@
+"""
+This script keeps precomputed analytics of the questionnaire submissions. Every submission is added to a few
+aggregates, one per time bucket (all time, its quarter and its month), which hold the number of submissions,
+the number of 'yes' answers of every question and the number of submissions of every result level. Aggregates
+are only ever incremented, so they are maintained in place without reading them first, and reading the stats of
+a bucket is a single lookup, whatever the number of submissions. JIRA is never searched for the stats.
+The buckets of a questionnaire other than the default one are prefixed with its ID, like 'privacy/2026-Q4'.
+
+The store is selected with the `BOT_ANALYTICS_STORE` environment variable:
+
+- `memory` (default) keeps the aggregates in the memory of the warm container, for local runs.
+- `dynamodb` keeps one item per bucket in a DynamoDB table (`BOT_ANALYTICS_TABLE`), incremented with atomic
+  `ADD` updates, shared by all containers. `BOT_ANALYTICS_ENDPOINT` points it to a local stand-in like DynamoDB Local.
+"""
+
+import datetime
+import os
+import re
+import threading
+import time
+import typing
+from collections import namedtuple
+
+
+# Bucket of the all-time aggregate
+ALL_TIME = "all"
+
+# Patterns of the quarter and month buckets, like '2026-Q4' and '2026-10'
+QUARTER_PATTERN = re.compile(r"^\d{4}-Q[1-4]$")
+MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# Namedtuple 'Aggregate' for the analytics of a time bucket
+Aggregate = namedtuple(
+    "Aggregate",
+    [
+        "count",  # Number of submissions
+        "question_hits",  # Dictionary of question index to the number of 'yes' answers
+        "level_counts",  # Dictionary of result level index to the number of submissions
+    ]
+)
+
+# Aggregate of a bucket without any submission
+EMPTY_AGGREGATE = Aggregate(0, dict(), dict())
+
+# Global variable to store the analytics store
+STORE: typing.Union["AnalyticsStore", None] = None
+
+
+class AnalyticsStore:
+    """
+    Base class of the analytics stores.
+    """
+
+    def add(self, buckets: typing.Sequence[str], mask: int, level: int):
+        """
+        Adds a submission to the aggregates of its time buckets.
+
+        Args:
+            buckets (Sequence[str]): The time buckets of the submission.
+            mask (int): The bitmask of the selected questions, bit N set when question N was selected.
+            level (int): Index of the result level of the submission.
+        """
+
+        raise NotImplementedError
+
+    def get(self, bucket: str) -> Aggregate:
+        """
+        Retrieves the aggregate of a time bucket.
+
+        Args:
+            bucket (str): The time bucket.
+
+        Returns:
+            Aggregate: The aggregate, empty if the bucket has no submission.
+        """
+
+        raise NotImplementedError
+
+
+class MemoryStore(AnalyticsStore):
+    """
+    An analytics store in the memory of the warm container.
+    """
+
+    def __init__(self):
+        self.aggregates: typing.Dict[str, Aggregate] = dict()
+        self._lock = threading.Lock()
+
+    def add(self, buckets: typing.Sequence[str], mask: int, level: int):
+        with self._lock:
+            for bucket in buckets:
+                count, question_hits, level_counts = self.aggregates.setdefault(bucket, Aggregate(0, dict(), dict()))
+
+                for idx in get_indices(mask):
+                    question_hits[idx] = question_hits.get(idx, 0) + 1
+
+                level_counts[level] = level_counts.get(level, 0) + 1
+                self.aggregates[bucket] = Aggregate(count + 1, question_hits, level_counts)
+
+    def get(self, bucket: str) -> Aggregate:
+        with self._lock:
+            count, question_hits, level_counts = self.aggregates.get(bucket, EMPTY_AGGREGATE)
+
+            # Copies, so the caller never sees later increments
+            return Aggregate(count, dict(question_hits), dict(level_counts))
+
+
+class DynamoDBStore(AnalyticsStore):
+    """
+    An analytics store in a DynamoDB table with the string partition key 'pk', one item per time bucket with the
+    number attributes 'n' (submissions), 'qN' ('yes' answers of question N) and 'lN' (submissions of level N).
+    """
+
+    def __init__(
+            self,
+            table_name: str,
+            endpoint_url: typing.Union[str, None] = None,
+            region_name: typing.Union[str, None] = None,
+            client: typing.Any = None
+    ):
+        self.table_name = table_name
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.client = client
+
+    def get_client(self) -> typing.Any:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client("dynamodb", endpoint_url=self.endpoint_url, region_name=self.region_name)
+
+        return self.client
+
+    def add(self, buckets: typing.Sequence[str], mask: int, level: int):
+        # The same atomic increments for every bucket, created on the first submission of the bucket
+        attributes = ["n", f"l{level}"] + [f"q{idx}" for idx in get_indices(mask)]
+        update = "ADD " + ", ".join(f"#{attribute} :one" for attribute in attributes)
+
+        for bucket in buckets:
+            self.get_client().update_item(
+                TableName=self.table_name,
+                Key={"pk": {"S": f"stats:{bucket}"}},
+                UpdateExpression=update,
+                ExpressionAttributeNames={f"#{attribute}": attribute for attribute in attributes},
+                ExpressionAttributeValues={":one": {"N": "1"}},
+            )
+
+    def get(self, bucket: str) -> Aggregate:
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"stats:{bucket}"}},
+        ).get("Item") or dict()
+
+        counters = {name: int(value["N"]) for name, value in item.items() if "N" in value}
+
+        return Aggregate(
+            counters.get("n", 0),
+            {int(name[1:]): value for name, value in counters.items() if name.startswith("q")},
+            {int(name[1:]): value for name, value in counters.items() if name.startswith("l")}
+        )
+
+
+def get_indices(mask: int) -> typing.List[int]:
+    """
+    Lists the indices of the bits set in a bitmask.
+    """
+
+    indices = list()
+
+    while mask:
+        lowest = mask & -mask
+        indices.append(lowest.bit_length() - 1)
+        mask ^= lowest
+
+    return indices
+
+
+def get_quarter(moment: datetime.datetime) -> str:
+    return f"{moment.year}-Q{(moment.month - 1) // 3 + 1}"
+
+
+def get_month(moment: datetime.datetime) -> str:
+    return f"{moment.year}-{moment.month:02d}"
+
+
+def get_bucket(bucket: str, namespace: typing.Union[str, None] = None) -> str:
+    """
+    Prefixes a time bucket with the namespace of its questionnaire, if any.
+    """
+
+    return f"{namespace}/{bucket}" if namespace else bucket
+
+
+def get_buckets(timestamp: float, namespace: typing.Union[str, None] = None) -> typing.Tuple[str, str, str]:
+    """
+    Lists the time buckets of a submission.
+
+    Args:
+        timestamp (float): Time of the submission in seconds since the epoch.
+        namespace (str): The namespace of the questionnaire. None for the default questionnaire.
+
+    Returns:
+        Tuple[str, str, str]: The all-time, quarter and month buckets, in UTC.
+    """
+
+    moment = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+    return tuple(get_bucket(bucket, namespace) for bucket in (ALL_TIME, get_quarter(moment), get_month(moment)))
+
+
+def parse_period(period: typing.Union[str, None], timestamp: typing.Union[float, None] = None) -> str:
+    """
+    Parses the period asked for into its time bucket.
+
+    Args:
+        period (str): 'all', 'quarter' or 'month' for the current quarter or month, a quarter like '2026-Q4' or
+            a month like '2026-10'. The current quarter if None.
+        timestamp (float): The current time in seconds since the epoch. Now if None.
+
+    Returns:
+        str: The time bucket.
+
+    Raises:
+        ValueError: If the period is not recognized.
+    """
+
+    period = (period or "quarter").strip().upper()
+    moment = datetime.datetime.fromtimestamp(time.time() if timestamp is None else timestamp, tz=datetime.timezone.utc)
+
+    if period == "ALL":
+        return ALL_TIME
+
+    if period == "QUARTER":
+        return get_quarter(moment)
+
+    if period == "MONTH":
+        return get_month(moment)
+
+    if QUARTER_PATTERN.match(period) or MONTH_PATTERN.match(period):
+        return period
+
+    raise ValueError(
+        f"Unknown period '{period.lower()}', expected all, quarter, month, a quarter like 2026-Q4 or a month like 2026-10."
+    )
+
+
+def create_store(name: str) -> AnalyticsStore:
+    """
+    Creates an analytics store by name.
+
+    Args:
+        name (str): One of 'memory' or 'dynamodb'.
+
+    Returns:
+        AnalyticsStore: The analytics store.
+
+    Raises:
+        Exception: If the store name is unknown or the DynamoDB table is not configured.
+    """
+
+    if name == "memory":
+        return MemoryStore()
+
+    if name == "dynamodb":
+        table_name = os.environ.get("BOT_ANALYTICS_TABLE")
+        if not table_name:
+            raise Exception("BOT_ANALYTICS_TABLE must be set for the 'dynamodb' analytics store.")
+
+        return DynamoDBStore(table_name, endpoint_url=os.environ.get("BOT_ANALYTICS_ENDPOINT") or None)
+
+    raise Exception(f"Unknown analytics store '{name}'.")
+
+
+def get_store() -> AnalyticsStore:
+    """
+    Retrieves or initializes the global analytics store selected with `BOT_ANALYTICS_STORE`.
+
+    Returns:
+        AnalyticsStore: The analytics store.
+    """
+
+    global STORE
+
+    if STORE is None:
+        STORE = create_store(os.environ.get("BOT_ANALYTICS_STORE") or "memory")
+
+    return STORE
+
+
+def record(
+        mask: int,
+        level: int,
+        timestamp: typing.Union[float, None] = None,
+        namespace: typing.Union[str, None] = None
+):
+    """
+    Adds a submission to the aggregates of its time buckets.
+
+    Args:
+        mask (int): The bitmask of the selected questions.
+        level (int): Index of the result level of the submission.
+        timestamp (float): Time of the submission in seconds since the epoch. Now if None.
+        namespace (str): The namespace of the questionnaire. None for the default questionnaire.
+    """
+
+    get_store().add(get_buckets(time.time() if timestamp is None else timestamp, namespace), mask, level)
@@ -0,0 +1,145 @@
+"""
+This script provides a small in-memory cache used to keep data across warm invocations of the Lambda function.
+The cache is bounded in size with least-recently-used eviction, optionally expires entries after a time-to-live,
+and counts hits, misses and evictions so the effectiveness of each cache can be observed.
+"""
+
+import threading
+import time
+import typing
+from collections import OrderedDict, namedtuple
+
+
+# Namedtuple 'CacheStats' with the counters of a cache
+CacheStats = namedtuple("CacheStats", ["hits", "misses", "evictions", "size"])
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache with an optional time-to-live for its entries.
+    """
+
+    def __init__(
+            self,
+            maxsize: int,
+            ttl: typing.Union[float, None] = None,
+            clock: typing.Callable[[], float] = time.monotonic
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of entries kept in the cache.
+            ttl (float): Number of seconds an entry stays valid. Entries never expire if None.
+            clock (Callable): Function returning the current time in seconds.
+        """
+
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive.")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Mapping of key to a tuple of (Expiry Time, Value), ordered from least to most recently used
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        """
+        Retrieves a value from the cache and marks it as recently used.
+
+        Args:
+            key (Hashable): Key of the entry.
+            default (Any): Value returned if the key is missing or expired.
+
+        Returns:
+            Any: The cached value or the default value.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            # Drop the entry if it has expired
+            if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: typing.Hashable, value: typing.Any):
+        """
+        Stores a value in the cache, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (Hashable): Key of the entry.
+            value (Any): Value to store.
+        """
+
+        with self._lock:
+            expires = None if self.ttl is None else self.clock() + self.ttl
+
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used entries above the size limit
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        """
+        Removes an entry from the cache.
+
+        Args:
+            key (Hashable): Key of the entry.
+            default (Any): Value returned if the key is missing.
+
+        Returns:
+            Any: The removed value or the default value.
+        """
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        """
+        Removes all entries from the cache and resets its counters.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> CacheStats:
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            CacheStats: A namedtuple with hits, misses, evictions and the current size.
+        """
+
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._entries))
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > self.clock())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
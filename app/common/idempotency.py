@@ -0,0 +1,412 @@
+"""
+This script makes the processing of modal submissions idempotent. Slack retries a request it did not get a
+timely response for (with the `X-Slack-Retry-Num` header), and Lambda retries failed asynchronous invocations,
+so the same submission can reach the bot several times. Every submission is keyed on its team, user, view ID and
+view hash, and goes through the states below in a pluggable store:
+
+- `received`: the acknowledgement claimed the submission; later deliveries of it are acknowledged without any work.
+- `processing`: a worker is processing it, under a lease so a crashed worker does not block it forever.
+- `done`: it was processed; it is never processed again. The outcome of the processing, like the link of a created
+  JIRA task, may be kept with the record and read back with `get_result`.
+
+A claim whose work never started, like a lazy listener that could not be dispatched, is forgotten again, so the
+next delivery of the submission claims it.
+
+The store is selected with the `BOT_IDEMPOTENCY_STORE` environment variable:
+
+- `memory` (default) keeps the records in an LRU cache of the warm container.
+- `dynamodb` keeps them in a DynamoDB table (`BOT_IDEMPOTENCY_TABLE`) with conditional writes, shared by all
+  containers. `BOT_IDEMPOTENCY_ENDPOINT` points it to a local stand-in like DynamoDB Local.
+"""
+
+import os
+import threading
+import time
+import typing
+from collections import namedtuple
+
+from common import cache
+
+
+# States of a submission
+RECEIVED = "received"
+PROCESSING = "processing"
+DONE = "done"
+
+# Default number of seconds a record is kept, covering the retries of Slack and of asynchronous Lambda invocations
+DEFAULT_IDEMPOTENCY_TTL = 6 * 60 * 60
+
+# Default number of seconds a worker may process a submission before another worker may take it over
+DEFAULT_LEASE_TIMEOUT = 30
+
+# Maximum number of records kept by the in-memory store
+MEMORY_STORE_SIZE = 10000
+
+# Namedtuple 'Record' for the idempotency record of a submission
+Record = namedtuple("Record", ["state", "lease_until", "result"], defaults=[None])
+
+# Global variable to store the idempotency store
+STORE: typing.Union["IdempotencyStore", None] = None
+
+
+class IdempotencyStore:
+    """
+    Base class of the idempotency stores.
+    """
+
+    def claim(self, key: str) -> bool:
+        """
+        Claims a new submission when it is acknowledged.
+
+        Args:
+            key (str): The idempotency key of the submission.
+
+        Returns:
+            bool: True if the submission was not seen before, False for a duplicate delivery.
+        """
+
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """
+        Checks if a submission was claimed, without claiming it.
+
+        Args:
+            key (str): The idempotency key of the submission.
+
+        Returns:
+            bool: True if the submission was seen before, in any state.
+        """
+
+        raise NotImplementedError
+
+    def begin(self, key: str) -> bool:
+        """
+        Starts processing a submission.
+
+        Args:
+            key (str): The idempotency key of the submission.
+
+        Returns:
+            bool: True if the caller must process the submission, False if it is done or being processed.
+        """
+
+        raise NotImplementedError
+
+    def complete(self, key: str, result: typing.Union[str, None] = None):
+        """
+        Marks a submission as processed.
+
+        Args:
+            key (str): The idempotency key of the submission.
+            result (str): Outcome of the processing, returned by `get_result`.
+        """
+
+        raise NotImplementedError
+
+    def get_result(self, key: str) -> typing.Union[str, None]:
+        """
+        Retrieves the outcome of a processed submission.
+
+        Args:
+            key (str): The idempotency key of the submission.
+
+        Returns:
+            str: The result given to `complete`, or None if the submission is not done or has no result.
+        """
+
+        raise NotImplementedError
+
+    def release(self, key: str):
+        """
+        Hands a submission whose processing failed back, so that a retried invocation can process it.
+        """
+
+        raise NotImplementedError
+
+    def forget(self, key: str):
+        """
+        Drops the claim of a submission that was never processed, so that its next delivery claims it again.
+        A submission already being processed, or processed, is kept.
+        """
+
+        raise NotImplementedError
+
+
+class MemoryStore(IdempotencyStore):
+    """
+    An idempotency store in the memory of the warm container.
+    """
+
+    def __init__(
+            self,
+            maxsize: int = MEMORY_STORE_SIZE,
+            ttl: float = DEFAULT_IDEMPOTENCY_TTL,
+            lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+            clock: typing.Callable[[], float] = time.monotonic
+    ):
+        self.records = cache.TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+        self.lease_timeout = lease_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def claim(self, key: str) -> bool:
+        with self._lock:
+            if key in self.records:
+                return False
+
+            self.records.set(key, Record(RECEIVED, None))
+            return True
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return key in self.records
+
+    def begin(self, key: str) -> bool:
+        now = self.clock()
+
+        with self._lock:
+            record = self.records.get(key)
+
+            # A missing record is processed too, the acknowledgement may have run in another container
+            if record is not None and record.state == DONE:
+                return False
+
+            if record is not None and record.state == PROCESSING and record.lease_until > now:
+                return False
+
+            self.records.set(key, Record(PROCESSING, now + self.lease_timeout))
+            return True
+
+    def complete(self, key: str, result: typing.Union[str, None] = None):
+        with self._lock:
+            self.records.set(key, Record(DONE, None, result))
+
+    def get_result(self, key: str) -> typing.Union[str, None]:
+        with self._lock:
+            record = self.records.get(key)
+
+        return record.result if record is not None and record.state == DONE else None
+
+    def release(self, key: str):
+        with self._lock:
+            self.records.set(key, Record(RECEIVED, None))
+
+    def forget(self, key: str):
+        with self._lock:
+            record = self.records.get(key)
+
+            if record is not None and record.state == RECEIVED:
+                self.records.pop(key)
+
+
+class DynamoDBStore(IdempotencyStore):
+    """
+    An idempotency store in a DynamoDB table with the string partition key 'pk', shared by all containers.
+    Expired records are ignored by the conditions and removed by the TTL of the table on the 'expires_at' attribute.
+    """
+
+    def __init__(
+            self,
+            table_name: str,
+            endpoint_url: typing.Union[str, None] = None,
+            region_name: typing.Union[str, None] = None,
+            ttl: float = DEFAULT_IDEMPOTENCY_TTL,
+            lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+            client: typing.Any = None,
+            clock: typing.Callable[[], float] = time.time
+    ):
+        self.table_name = table_name
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.ttl = ttl
+        self.lease_timeout = lease_timeout
+        self.client = client
+        self.clock = clock
+
+    def get_client(self) -> typing.Any:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client("dynamodb", endpoint_url=self.endpoint_url, region_name=self.region_name)
+
+        return self.client
+
+    def conditional_write(self, method: str, **kwargs) -> bool:
+        """
+        Sends a conditional write, telling whether its condition held.
+        """
+
+        try:
+            getattr(self.get_client(), method)(TableName=self.table_name, **kwargs)
+        except Exception as e:
+            error = getattr(e, "response", None) or dict()
+            if error.get("Error", dict()).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+
+        return True
+
+    def claim(self, key: str) -> bool:
+        now = int(self.clock())
+
+        return self.conditional_write(
+            "put_item",
+            Item={"pk": {"S": key}, "state": {"S": RECEIVED}, "expires_at": {"N": str(now + int(self.ttl))}},
+            ConditionExpression="attribute_not_exists(pk) OR expires_at < :now",
+            ExpressionAttributeValues={":now": {"N": str(now)}},
+        )
+
+    def exists(self, key: str) -> bool:
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": key}},
+            ConsistentRead=True,
+            ProjectionExpression="expires_at",
+        ).get("Item")
+
+        # Expired records are ignored like by the conditions of the writes
+        return item is not None and int(item.get("expires_at", dict()).get("N", "0")) >= int(self.clock())
+
+    def begin(self, key: str) -> bool:
+        now = int(self.clock())
+
+        # The update creates the record if the acknowledgement did not, e.g. on a lost claim
+        return self.conditional_write(
+            "update_item",
+            Key={"pk": {"S": key}},
+            UpdateExpression="SET #state = :processing, lease_until = :lease_until, expires_at = :expires_at",
+            ConditionExpression="attribute_not_exists(pk) OR expires_at < :now OR #state = :received "
+                                "OR (#state = :processing AND lease_until < :now)",
+            ExpressionAttributeNames={"#state": "state"},
+            ExpressionAttributeValues={
+                ":processing": {"S": PROCESSING},
+                ":received": {"S": RECEIVED},
+                ":now": {"N": str(now)},
+                ":lease_until": {"N": str(now + int(self.lease_timeout))},
+                ":expires_at": {"N": str(now + int(self.ttl))},
+            },
+        )
+
+    def complete(self, key: str, result: typing.Union[str, None] = None):
+        self.set_state(key, DONE, result)
+
+    def get_result(self, key: str) -> typing.Union[str, None]:
+        # A consistent read, the result may have been written by another container a moment ago
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": key}},
+            ConsistentRead=True,
+        ).get("Item") or dict()
+
+        if item.get("state", dict()).get("S") != DONE:
+            return None
+
+        return item.get("result", dict()).get("S")
+
+    def release(self, key: str):
+        self.set_state(key, RECEIVED)
+
+    def forget(self, key: str):
+        # A record another worker took over in the meantime is kept
+        self.conditional_write(
+            "delete_item",
+            Key={"pk": {"S": key}},
+            ConditionExpression="#state = :received",
+            ExpressionAttributeNames={"#state": "state"},
+            ExpressionAttributeValues={":received": {"S": RECEIVED}},
+        )
+
+    def set_state(self, key: str, state: str, result: typing.Union[str, None] = None):
+        update = "SET #state = :state REMOVE lease_until"
+        names = {"#state": "state"}
+        values = {":state": {"S": state}}
+
+        # Keep the outcome of the processing with the record
+        if result is not None:
+            update = "SET #state = :state, #result = :result REMOVE lease_until"
+            names["#result"] = "result"
+            values[":result"] = {"S": result}
+
+        self.get_client().update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": key}},
+            UpdateExpression=update,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+
+
+def get_idempotency_ttl() -> float:
+    return float(os.environ.get("BOT_IDEMPOTENCY_TTL") or DEFAULT_IDEMPOTENCY_TTL)
+
+
+def create_store(name: str) -> IdempotencyStore:
+    """
+    Creates an idempotency store by name.
+
+    Args:
+        name (str): One of 'memory' or 'dynamodb'.
+
+    Returns:
+        IdempotencyStore: The idempotency store.
+
+    Raises:
+        Exception: If the store name is unknown or the DynamoDB table is not configured.
+    """
+
+    if name == "memory":
+        return MemoryStore(ttl=get_idempotency_ttl())
+
+    if name == "dynamodb":
+        table_name = os.environ.get("BOT_IDEMPOTENCY_TABLE")
+        if not table_name:
+            raise Exception("BOT_IDEMPOTENCY_TABLE must be set for the 'dynamodb' idempotency store.")
+
+        return DynamoDBStore(
+            table_name,
+            endpoint_url=os.environ.get("BOT_IDEMPOTENCY_ENDPOINT") or None,
+            ttl=get_idempotency_ttl()
+        )
+
+    raise Exception(f"Unknown idempotency store '{name}'.")
+
+
+def get_store() -> IdempotencyStore:
+    """
+    Retrieves or initializes the global idempotency store selected with `BOT_IDEMPOTENCY_STORE`.
+
+    Returns:
+        IdempotencyStore: The idempotency store.
+    """
+
+    global STORE
+
+    if STORE is None:
+        STORE = create_store(os.environ.get("BOT_IDEMPOTENCY_STORE") or "memory")
+
+    return STORE
+
+
+def submission_key(body: typing.Dict) -> typing.Union[str, None]:
+    """
+    Builds the idempotency key of a modal submission, identical for every delivery of the submission.
+
+    Args:
+        body (dict): The body of the request from Slack.
+
+    Returns:
+        str: The key, or None if the body does not identify the submission.
+    """
+
+    view = body.get("view") or dict()
+    view_id = view.get("id")
+
+    if not view_id:
+        return None
+
+    team_id = (body.get("team") or dict()).get("id") or view.get("team_id") or ""
+    user_id = (body.get("user") or dict()).get("id") or ""
+
+    return f"submission:{team_id}:{user_id}:{view_id}:{view.get('hash') or ''}"
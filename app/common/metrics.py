@@ -0,0 +1,238 @@
+"""
+This script records per-invocation timing metrics and counters of the bot, like the duration of every external call
+(secrets provider, Slack Web API, JIRA REST API), cache hits and errors, and whether the invocation was a cold start.
+The metrics of an invocation are flushed once, at its end, as a single log line in the CloudWatch Embedded Metric
+Format (EMF), which CloudWatch turns into metrics without any extra network call from the function.
+
+Metrics are enabled with the `BOT_METRICS_ENABLED` environment variable. When disabled, `timer` returns a shared
+no-op context manager and `increment` returns immediately, so the instrumentation costs next to nothing.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import typing
+
+
+# Default CloudWatch namespace of the metrics, overridden with `BOT_METRICS_NAMESPACE`
+DEFAULT_NAMESPACE = "SlackBot"
+
+# Values of `BOT_METRICS_ENABLED` enabling the metrics
+ENABLED_VALUES = ("1", "true", "yes", "on")
+
+# Shared no-op context manager returned by `timer` when metrics are disabled
+NULL_TIMER = contextlib.nullcontext()
+
+# Global variable to store the recorder of the current invocation, None when metrics are disabled
+RECORDER: typing.Union["MetricsRecorder", None] = None
+
+# Global variable telling whether the next invocation is the first one of this container
+COLD_START = True
+
+
+class MetricsRecorder:
+    """
+    Collects the metrics of one invocation and renders them as an EMF log line.
+    """
+
+    def __init__(self, namespace: str = DEFAULT_NAMESPACE, clock: typing.Callable[[], float] = time.perf_counter):
+        """
+        Initializes an empty recorder.
+
+        Args:
+            namespace (str): CloudWatch namespace of the metrics.
+            clock (Callable): Monotonic clock in seconds, used to time the calls.
+        """
+
+        self.namespace = namespace
+        self.clock = clock
+        self.timers: typing.Dict[str, typing.List[float]] = dict()
+        self.counters: typing.Dict[str, int] = dict()
+        self.dimensions: typing.Dict[str, str] = dict()
+        self.properties: typing.Dict[str, typing.Any] = dict()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration_ms: float):
+        with self._lock:
+            self.timers.setdefault(name, list()).append(round(duration_ms, 3))
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        """
+        Times a block of code. An exception raised by the block also increments the `<name>Errors` counter.
+
+        Args:
+            name (str): Name of the timer metric.
+        """
+
+        started = self.clock()
+
+        try:
+            yield
+        except BaseException:
+            self.increment(f"{name}Errors")
+            raise
+        finally:
+            self.record(name, (self.clock() - started) * 1000)
+
+    def reset(self):
+        with self._lock:
+            self.timers, self.counters, self.dimensions, self.properties = dict(), dict(), dict(), dict()
+
+    def render(self, timestamp_ms: typing.Union[int, None] = None) -> typing.Dict:
+        """
+        Renders the recorded metrics as an EMF document.
+
+        Args:
+            timestamp_ms (int): Timestamp of the metrics in milliseconds since the epoch. Now if None.
+
+        Returns:
+            dict: The EMF document, with one member per metric, dimension and property.
+        """
+
+        with self._lock:
+            metrics = [{"Name": name, "Unit": "Milliseconds"} for name in self.timers]
+            metrics += [{"Name": name, "Unit": "Count"} for name in self.counters]
+
+            document = {
+                "_aws": {
+                    "Timestamp": timestamp_ms if timestamp_ms is not None else int(time.time() * 1000),
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [sorted(self.dimensions)],
+                        "Metrics": metrics,
+                    }],
+                },
+            }
+            document.update(self.properties)
+            document.update(self.dimensions)
+            document.update(self.timers)
+            document.update(self.counters)
+
+        return document
+
+    def flush(self) -> typing.Union[str, None]:
+        """
+        Prints the recorded metrics as a single EMF log line and resets the recorder.
+
+        Returns:
+            str: The printed log line, or None if nothing was recorded.
+        """
+
+        if not self.timers and not self.counters:
+            self.reset()
+            return None
+
+        line = json.dumps(self.render(), separators=(",", ":"))
+        print(line)
+
+        self.reset()
+        return line
+
+
+def is_enabled_by_environment() -> bool:
+    return os.environ.get("BOT_METRICS_ENABLED", "").strip().lower() in ENABLED_VALUES
+
+
+def configure(enabled: typing.Union[bool, None] = None, namespace: typing.Union[str, None] = None):
+    """
+    Enables or disables the metrics.
+
+    Args:
+        enabled (bool): Whether metrics are recorded. Read from `BOT_METRICS_ENABLED` if None.
+        namespace (str): CloudWatch namespace of the metrics. Read from `BOT_METRICS_NAMESPACE` if None.
+    """
+
+    global RECORDER
+
+    if enabled is None:
+        enabled = is_enabled_by_environment()
+
+    RECORDER = MetricsRecorder(namespace or os.environ.get("BOT_METRICS_NAMESPACE") or DEFAULT_NAMESPACE) if enabled else None
+
+
+def timer(name: str) -> typing.ContextManager:
+    """
+    Times a block of code, counting `<name>Errors` when it raises.
+
+    Args:
+        name (str): Name of the timer metric.
+
+    Returns:
+        A context manager, a shared no-op one when metrics are disabled.
+    """
+
+    if RECORDER is None:
+        return NULL_TIMER
+
+    return RECORDER.timer(name)
+
+
+def increment(name: str, value: int = 1):
+    """
+    Increments a counter of the current invocation.
+
+    Args:
+        name (str): Name of the counter metric.
+        value (int): Value added to the counter.
+    """
+
+    if RECORDER is not None:
+        RECORDER.increment(name, value)
+
+
+def start_invocation(
+        event_type: str,
+        function_name: typing.Union[str, None] = None,
+        execution_mode: typing.Union[str, None] = None
+):
+    """
+    Starts recording the metrics of an invocation, dimensioned by its event type, and flags cold starts.
+
+    Args:
+        event_type (str): Type of the invocation, like 'request', 'lazy' or 'warm_up'.
+        function_name (str): Name of the Lambda function.
+        execution_mode (str): Execution mode of the bot, added as a dimension to compare the modes.
+    """
+
+    global COLD_START
+
+    cold_start, COLD_START = COLD_START, False
+
+    if RECORDER is None:
+        return
+
+    RECORDER.reset()
+    RECORDER.dimensions["EventType"] = event_type
+
+    if execution_mode:
+        RECORDER.dimensions["ExecutionMode"] = execution_mode
+
+    RECORDER.increment("ColdStart", int(cold_start))
+
+    if function_name:
+        RECORDER.properties["FunctionName"] = function_name
+
+
+def flush() -> typing.Union[str, None]:
+    """
+    Flushes the metrics of the current invocation as a single EMF log line.
+
+    Returns:
+        str: The printed log line, or None if metrics are disabled or nothing was recorded.
+    """
+
+    if RECORDER is None:
+        return None
+
+    return RECORDER.flush()
+
+
+# Enable the metrics from the environment of the function
+configure()
@@ -0,0 +1,671 @@
+"""
+This script keeps the rosters of the reminder campaigns: who was asked to answer a questionnaire, and who did.
+Both sides are append-only logs of user keys ('<team ID>:<user ID>') numbered by a sequence:
+
+- `targeted:<campaign ID>`: the members messaged by a broadcast, one entry per chunk of messages.
+- `submitted:<questionnaire ID>`: the users who submitted a questionnaire, appended by `task.save_answers` and by
+  the outbox next to the submissions index, so the submitted set never comes from a JIRA search.
+
+A campaign interns its users to consecutive compact IDs, in the order they are first seen, and keeps the targeted,
+submitted and reminded users as bitmaps (Python integers) over these IDs. A sweep only reads the log entries
+appended since the cursors of the previous sweep, and the users still to remind are a single bitwise expression,
+`targeted & ~submitted & ~reminded`, which stays a few microseconds at 50k users. A campaign is saved as one item
+with its compressed bitmaps and cursors, and its users in compressed chunks of `USERS_CHUNK_SIZE`, only the last
+chunk being written again as users are added.
+
+The store is selected with the `BOT_ROSTER_STORE` environment variable:
+
+- `none` (default): no roster is kept and no reminder is sent.
+- `memory`: the logs and campaigns kept in the memory of the container, for local runs and tests.
+- `dynamodb`: a DynamoDB table (`BOT_ROSTER_TABLE`) shared by all containers, whose log entries and campaigns
+  expire with the TTL of the table. `BOT_ROSTER_ENDPOINT` points it to a local stand-in like DynamoDB Local.
+"""
+
+import copy
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import typing
+import zlib
+
+from common import metrics
+
+
+# Roster stores, selected with `BOT_ROSTER_STORE`
+ROSTER_STORES = ("none", "memory", "dynamodb")
+
+# Kinds of the logs of a campaign
+TARGETED = "targeted"
+SUBMITTED = "submitted"
+
+# Maximum number of log entries read at once
+MAX_READ = 1000
+
+# Number of users per saved chunk of the users of a campaign
+USERS_CHUNK_SIZE = 5000
+
+# Maximum number of keys of a DynamoDB BatchGetItem request
+BATCH_GET_SIZE = 100
+
+# Number of seconds the log entries and the campaigns are kept in DynamoDB
+RETENTION = 30 * 24 * 60 * 60
+
+# Logger of the failures to record a roster entry, which never fail the request recording it
+LOGGER = logging.getLogger(__name__)
+
+# Global variable to store the roster store, initialized as None and set by `get_store`
+STORE: typing.Union["RosterStore", None] = None
+
+
+def pack_bitmap(bitmap: int) -> bytes:
+    return zlib.compress(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"))
+
+
+def unpack_bitmap(data: bytes) -> int:
+    return int.from_bytes(zlib.decompress(data), "little")
+
+
+def pack_users(users: typing.Sequence[str]) -> bytes:
+    return zlib.compress("\n".join(users).encode("utf-8"))
+
+
+def unpack_users(data: bytes) -> typing.List[str]:
+    text = zlib.decompress(data).decode("utf-8")
+
+    return text.split("\n") if text else list()
+
+
+def iter_bits(bitmap: int) -> typing.Iterator[int]:
+    """
+    Lists the indexes of the set bits of a bitmap, lowest first, without visiting the unset ones.
+    """
+
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+def get_user_key(team_id: typing.Union[str, None], user_id: str) -> str:
+    return f"{team_id or '-'}:{user_id}"
+
+
+def get_log(kind: str, name: str) -> str:
+    return f"{kind}:{name}"
+
+
+class Campaign:
+    """
+    The roster of a reminder campaign: its users interned to compact IDs, and bitmaps over these IDs.
+    """
+
+    def __init__(
+            self,
+            campaign_id: str,
+            questionnaire_id: str,
+            meta: typing.Dict,
+            users: typing.Iterable[str] = (),
+            targeted: int = 0,
+            submitted: int = 0,
+            reminded: int = 0,
+            cursors: typing.Union[typing.Dict[str, int], None] = None,
+            rounds: int = 0,
+            round_started: float = 0.0,
+            broadcast_done: bool = False
+    ):
+        """
+        Initializes a campaign.
+
+        Args:
+            campaign_id (str): The ID of the campaign, the ID of its broadcast.
+            questionnaire_id (str): The ID of the questionnaire the users are asked to answer.
+            meta (dict): The fields of the broadcast, for the reminders.
+            users (Iterable): The user keys, the position of a key being its compact ID.
+            targeted (int): Bitmap of the users asked to answer.
+            submitted (int): Bitmap of the users who submitted the questionnaire.
+            reminded (int): Bitmap of the users reminded in the current round.
+            cursors (dict): Sequence of the last entry read from the log of every kind, and of the entry missing
+                at the last read ('<kind>_missing').
+            rounds (int): Number of reminder rounds started, 0 until the first one.
+            round_started (float): Time the current round, or the broadcast, started in seconds since the epoch.
+            broadcast_done (bool): Whether the broadcast messaged every member of its channel.
+        """
+
+        self.campaign_id = campaign_id
+        self.questionnaire_id = questionnaire_id
+        self.meta = meta
+        self.users = list(users)
+        self.ids = {user: idx for idx, user in enumerate(self.users)}
+        self.targeted = targeted
+        self.submitted = submitted
+        self.reminded = reminded
+        self.cursors = dict(cursors or dict())
+        self.rounds = rounds
+        self.round_started = round_started
+        self.broadcast_done = broadcast_done
+        # Number of users already saved, whose chunks are not written again
+        self.saved_users = len(self.users)
+
+    def intern(self, user_key: str) -> int:
+        """
+        Gets the compact ID of a user, adding the user to the campaign if they are new.
+        """
+
+        idx = self.ids.get(user_key)
+
+        if idx is None:
+            idx = len(self.users)
+            self.ids[user_key] = idx
+            self.users.append(user_key)
+
+        return idx
+
+    def to_bitmap(self, user_keys: typing.Iterable[str]) -> int:
+        """
+        Gets the bitmap of users, interning the new ones.
+        """
+
+        ids = [self.intern(user_key) for user_key in user_keys]
+
+        if not ids:
+            return 0
+
+        # Bits are set in a byte array and converted once, shifting a growing integer per user is quadratic
+        bits = bytearray(max(ids) // 8 + 1)
+
+        for idx in ids:
+            bits[idx >> 3] |= 1 << (idx & 7)
+
+        return int.from_bytes(bits, "little")
+
+    def pending(self) -> int:
+        """
+        Gets the bitmap of the users to remind in the current round.
+        """
+
+        return self.targeted & ~self.submitted & ~self.reminded
+
+    def get_users(self, bitmap: int, limit: typing.Union[int, None] = None) -> typing.List[str]:
+        return [self.users[idx] for idx in itertools.islice(iter_bits(bitmap), limit)]
+
+
+class RosterStore:
+    """
+    Base class of the roster stores.
+    """
+
+    def append(self, log: str, user_keys: typing.Sequence[str]) -> int:
+        """
+        Appends an entry of user keys to a log.
+
+        Args:
+            log (str): The name of the log, see `get_log`.
+            user_keys (Sequence): The keys of the users.
+
+        Returns:
+            int: The sequence of the entry, from 1.
+        """
+
+        raise NotImplementedError
+
+    def head(self, log: str) -> int:
+        """
+        Gets the sequence of the last entry of a log, 0 for an empty log.
+        """
+
+        raise NotImplementedError
+
+    def read(self, log: str, since: int, skip: int = 0) -> typing.Tuple[typing.List[str], int, int]:
+        """
+        Reads the entries of a log appended after a cursor, up to `MAX_READ` entries.
+
+        Args:
+            log (str): The name of the log.
+            since (int): The cursor, the sequence of the last entry already read.
+            skip (int): Sequence of the entry missing at the previous read, skipped if it is still missing.
+
+        Returns:
+            Tuple[List[str], int, int]: The user keys of the entries, the new cursor, and the sequence of the missing
+            entry the read stopped at, 0 if none.
+        """
+
+        raise NotImplementedError
+
+    def load(self, campaign_id: str) -> typing.Union[Campaign, None]:
+        """
+        Loads a campaign, None if it does not exist.
+        """
+
+        raise NotImplementedError
+
+    def save(self, campaign: Campaign):
+        """
+        Saves a campaign, writing the chunks of its new users.
+        """
+
+        raise NotImplementedError
+
+    def list_campaigns(self) -> typing.List[str]:
+        """
+        Lists the IDs of the open campaigns.
+        """
+
+        raise NotImplementedError
+
+    def set_broadcast_done(self, campaign_id: str):
+        """
+        Flags the broadcast of a campaign as done, never cleared by the saves of the campaign.
+        """
+
+        raise NotImplementedError
+
+    def set_open(self, campaign_id: str, is_open: bool):
+        """
+        Adds a campaign to the open campaigns, or removes it.
+        """
+
+        raise NotImplementedError
+
+
+class MemoryStore(RosterStore):
+    """
+    A roster store in the memory of the container.
+    """
+
+    def __init__(self):
+        self.logs: typing.Dict[str, typing.List[typing.List[str]]] = dict()
+        self.campaigns: typing.Dict[str, Campaign] = dict()
+        self.open_campaigns: typing.Dict[str, None] = dict()
+        self._lock = threading.Lock()
+
+    def append(self, log: str, user_keys: typing.Sequence[str]) -> int:
+        with self._lock:
+            entries = self.logs.setdefault(log, list())
+            entries.append(list(user_keys))
+            return len(entries)
+
+    def head(self, log: str) -> int:
+        with self._lock:
+            return len(self.logs.get(log, ()))
+
+    def read(self, log: str, since: int, skip: int = 0) -> typing.Tuple[typing.List[str], int, int]:
+        with self._lock:
+            entries = self.logs.get(log, ())[since:since + MAX_READ]
+
+        return [user_key for entry in entries for user_key in entry], since + len(entries), 0
+
+    def load(self, campaign_id: str) -> typing.Union[Campaign, None]:
+        with self._lock:
+            campaign = self.campaigns.get(campaign_id)
+
+        return copy.deepcopy(campaign) if campaign is not None else None
+
+    def save(self, campaign: Campaign):
+        campaign.saved_users = len(campaign.users)
+
+        with self._lock:
+            saved = self.campaigns.get(campaign.campaign_id)
+            campaign.broadcast_done = campaign.broadcast_done or (saved is not None and saved.broadcast_done)
+            self.campaigns[campaign.campaign_id] = copy.deepcopy(campaign)
+
+    def set_broadcast_done(self, campaign_id: str):
+        with self._lock:
+            if campaign_id in self.campaigns:
+                self.campaigns[campaign_id].broadcast_done = True
+
+    def list_campaigns(self) -> typing.List[str]:
+        with self._lock:
+            return list(self.open_campaigns)
+
+    def set_open(self, campaign_id: str, is_open: bool):
+        with self._lock:
+            if is_open:
+                self.open_campaigns[campaign_id] = None
+            else:
+                self.open_campaigns.pop(campaign_id, None)
+
+
+class DynamoDBStore(RosterStore):
+    """
+    A roster store in a DynamoDB table with the string partition key 'pk', shared by all containers.
+
+    A log is a counter item 'log:<name>' and one item 'log:<name>:<sequence>' per entry. An append takes the next
+    sequence from the counter, then writes its entry: an entry is missing for the moment in between, or for good if
+    its writer died in between, so a read stops before a missing entry and skips it when it is still missing at the
+    next read. The open campaigns are a string set in the item 'campaigns'.
+    """
+
+    def __init__(
+            self,
+            table_name: str,
+            endpoint_url: typing.Union[str, None] = None,
+            region_name: typing.Union[str, None] = None,
+            client: typing.Any = None,
+            clock: typing.Callable[[], float] = time.time
+    ):
+        self.table_name = table_name
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.client = client
+        self.clock = clock
+
+    def get_client(self) -> typing.Any:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client("dynamodb", endpoint_url=self.endpoint_url, region_name=self.region_name)
+
+        return self.client
+
+    def get_expires_at(self) -> typing.Dict:
+        return {"N": str(int(self.clock()) + RETENTION)}
+
+    def batch_get(self, keys: typing.List[str]) -> typing.Dict[str, typing.Dict]:
+        """
+        Reads items by partition key with consistent reads, following the unprocessed keys.
+
+        Returns:
+            dict: The items found, by partition key.
+        """
+
+        items = dict()
+
+        for start in range(0, len(keys), BATCH_GET_SIZE):
+            request = {
+                self.table_name: {
+                    "Keys": [{"pk": {"S": key}} for key in keys[start:start + BATCH_GET_SIZE]],
+                    "ConsistentRead": True,
+                }
+            }
+
+            while request:
+                response = self.get_client().batch_get_item(RequestItems=request)
+
+                for item in response.get("Responses", dict()).get(self.table_name, ()):
+                    items[item["pk"]["S"]] = item
+
+                request = response.get("UnprocessedKeys") or None
+
+        return items
+
+    def append(self, log: str, user_keys: typing.Sequence[str]) -> int:
+        response = self.get_client().update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"log:{log}"}},
+            UpdateExpression="ADD #seq :one SET expires_at = :expires_at",
+            ExpressionAttributeNames={"#seq": "seq"},
+            ExpressionAttributeValues={":one": {"N": "1"}, ":expires_at": self.get_expires_at()},
+            ReturnValues="UPDATED_NEW",
+        )
+        seq = int(response["Attributes"]["seq"]["N"])
+
+        self.get_client().put_item(
+            TableName=self.table_name,
+            Item={
+                "pk": {"S": f"log:{log}:{seq}"},
+                "users": {"B": pack_users(user_keys)},
+                "expires_at": self.get_expires_at(),
+            },
+        )
+
+        return seq
+
+    def head(self, log: str) -> int:
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"log:{log}"}},
+            ConsistentRead=True,
+        ).get("Item") or dict()
+
+        return int(item.get("seq", dict()).get("N", "0"))
+
+    def read(self, log: str, since: int, skip: int = 0) -> typing.Tuple[typing.List[str], int, int]:
+        end = min(self.head(log), since + MAX_READ)
+        items = self.batch_get([f"log:{log}:{seq}" for seq in range(since + 1, end + 1)])
+        user_keys: typing.List[str] = list()
+
+        for seq in range(since + 1, end + 1):
+            item = items.get(f"log:{log}:{seq}")
+
+            if item is None and seq != skip:
+                return user_keys, seq - 1, seq
+
+            if item is not None:
+                user_keys.extend(unpack_users(item["users"]["B"]))
+
+        return user_keys, end, 0
+
+    def load(self, campaign_id: str) -> typing.Union[Campaign, None]:
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"campaign:{campaign_id}"}},
+            ConsistentRead=True,
+        ).get("Item")
+
+        if item is None:
+            return None
+
+        # The users are read back chunk by chunk, in the order of their compact IDs
+        count = int(item["users"]["N"])
+        keys = [f"campaign:{campaign_id}:users:{n}" for n in range((count + USERS_CHUNK_SIZE - 1) // USERS_CHUNK_SIZE)]
+        chunks = self.batch_get(keys)
+        users = [user_key for key in keys for user_key in unpack_users(chunks[key]["users"]["B"])]
+        state = json.loads(item["state"]["S"])
+
+        return Campaign(
+            campaign_id,
+            state["questionnaire_id"],
+            state["meta"],
+            users[:count],
+            targeted=unpack_bitmap(item["targeted"]["B"]),
+            submitted=unpack_bitmap(item["submitted"]["B"]),
+            reminded=unpack_bitmap(item["reminded"]["B"]),
+            cursors=state["cursors"],
+            rounds=state["rounds"],
+            round_started=state["round_started"],
+            broadcast_done=item.get("broadcast_done", dict()).get("BOOL", False),
+        )
+
+    def save(self, campaign: Campaign):
+        # The chunks go first, so the campaign item never counts users whose chunk is not written
+        for n in range(campaign.saved_users // USERS_CHUNK_SIZE, (len(campaign.users) - 1) // USERS_CHUNK_SIZE + 1):
+            self.get_client().put_item(
+                TableName=self.table_name,
+                Item={
+                    "pk": {"S": f"campaign:{campaign.campaign_id}:users:{n}"},
+                    "users": {"B": pack_users(campaign.users[n * USERS_CHUNK_SIZE:(n + 1) * USERS_CHUNK_SIZE])},
+                    "expires_at": self.get_expires_at(),
+                },
+            )
+
+        state = {
+            "questionnaire_id": campaign.questionnaire_id,
+            "meta": campaign.meta,
+            "cursors": campaign.cursors,
+            "rounds": campaign.rounds,
+            "round_started": campaign.round_started,
+        }
+
+        # An update rather than a put, so the flag of the broadcast set meanwhile by `set_broadcast_done` is kept
+        attributes = {
+            "state": {"S": json.dumps(state)},
+            "users": {"N": str(len(campaign.users))},
+            "targeted": {"B": pack_bitmap(campaign.targeted)},
+            "submitted": {"B": pack_bitmap(campaign.submitted)},
+            "reminded": {"B": pack_bitmap(campaign.reminded)},
+            "expires_at": self.get_expires_at(),
+        }
+
+        self.get_client().update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"campaign:{campaign.campaign_id}"}},
+            UpdateExpression="SET " + ", ".join(f"#{name} = :{name}" for name in attributes),
+            ExpressionAttributeNames={f"#{name}": name for name in attributes},
+            ExpressionAttributeValues={f":{name}": value for name, value in attributes.items()},
+        )
+
+        campaign.saved_users = len(campaign.users)
+
+    def list_campaigns(self) -> typing.List[str]:
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": "campaigns"}},
+            ConsistentRead=True,
+        ).get("Item") or dict()
+
+        return sorted(item.get("ids", dict()).get("SS", ()))
+
+    def set_broadcast_done(self, campaign_id: str):
+        self.get_client().update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"campaign:{campaign_id}"}},
+            UpdateExpression="SET broadcast_done = :done",
+            ExpressionAttributeValues={":done": {"BOOL": True}},
+        )
+
+    def set_open(self, campaign_id: str, is_open: bool):
+        self.get_client().update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": "campaigns"}},
+            UpdateExpression=f"{'ADD' if is_open else 'DELETE'} ids :ids",
+            ExpressionAttributeValues={":ids": {"SS": [campaign_id]}},
+        )
+
+
+def get_store_name() -> str:
+    name = os.environ.get("BOT_ROSTER_STORE") or "none"
+
+    if name not in ROSTER_STORES:
+        raise Exception(f"Unknown roster store '{name}'.")
+
+    return name
+
+
+def is_enabled() -> bool:
+    """
+    Checks if the rosters of the reminder campaigns are kept.
+    """
+
+    return get_store_name() != "none"
+
+
+def create_store(name: str) -> RosterStore:
+    """
+    Creates a roster store by name.
+
+    Args:
+        name (str): One of 'memory' or 'dynamodb'.
+
+    Returns:
+        RosterStore: The roster store.
+
+    Raises:
+        Exception: If the store name is unknown or the DynamoDB table is not configured.
+    """
+
+    if name == "memory":
+        return MemoryStore()
+
+    if name == "dynamodb":
+        table_name = os.environ.get("BOT_ROSTER_TABLE")
+        if not table_name:
+            raise Exception("BOT_ROSTER_TABLE must be set for the 'dynamodb' roster store.")
+
+        return DynamoDBStore(table_name, endpoint_url=os.environ.get("BOT_ROSTER_ENDPOINT") or None)
+
+    raise Exception(f"Unknown roster store '{name}'.")
+
+
+def get_store() -> RosterStore:
+    """
+    Retrieves or initializes the global roster store selected with `BOT_ROSTER_STORE`.
+
+    Returns:
+        RosterStore: The roster store.
+    """
+
+    global STORE
+
+    if STORE is None:
+        STORE = create_store(get_store_name())
+
+    return STORE
+
+
+def open_campaign(campaign_id: str, questionnaire_id: str, meta: typing.Dict, now: typing.Union[float, None] = None):
+    """
+    Opens the reminder campaign of a broadcast. Only the submissions from now on count as answers.
+
+    Args:
+        campaign_id (str): The ID of the broadcast.
+        questionnaire_id (str): The ID of the questionnaire of the broadcast.
+        meta (dict): The fields of the broadcast.
+        now (float): Time the broadcast started in seconds since the epoch. Now if None.
+    """
+
+    store = get_store()
+    cursors = {TARGETED: 0, SUBMITTED: store.head(get_log(SUBMITTED, questionnaire_id))}
+
+    store.save(Campaign(campaign_id, questionnaire_id, meta, cursors=cursors,
+                        round_started=time.time() if now is None else now))
+    store.set_open(campaign_id, True)
+
+
+def record_targets(campaign_id: str, team_id: typing.Union[str, None], user_ids: typing.Sequence[str]):
+    """
+    Records the users asked to answer by a campaign. A failure is logged, never raised.
+
+    Args:
+        campaign_id (str): The ID of the broadcast.
+        team_id (str): The ID of the workspace of the users.
+        user_ids (Sequence): The IDs of the users.
+    """
+
+    if not user_ids or not is_enabled():
+        return
+
+    try:
+        with metrics.timer("RosterAppend"):
+            get_store().append(get_log(TARGETED, campaign_id), [get_user_key(team_id, user_id) for user_id in user_ids])
+    except Exception:
+        LOGGER.exception("Failed to record the targets of campaign %s.", campaign_id)
+
+
+def record_broadcast_done(campaign_id: str):
+    """
+    Records that the broadcast of a campaign messaged every member of its channel. A failure is logged, never raised.
+
+    Args:
+        campaign_id (str): The ID of the broadcast.
+    """
+
+    if not is_enabled():
+        return
+
+    try:
+        get_store().set_broadcast_done(campaign_id)
+    except Exception:
+        LOGGER.exception("Failed to record the end of the broadcast of campaign %s.", campaign_id)
+
+
+def record_submission(questionnaire_id: typing.Union[str, None], user: typing.Dict):
+    """
+    Records a user who submitted a questionnaire. A failure is logged, never raised.
+
+    Args:
+        questionnaire_id (str): The ID of the questionnaire. Not recorded if None.
+        user (dict): The Slack user, with their 'id' and 'team_id'.
+    """
+
+    if questionnaire_id is None or not user.get("id") or not is_enabled():
+        return
+
+    try:
+        with metrics.timer("RosterAppend"):
+            get_store().append(get_log(SUBMITTED, questionnaire_id), [get_user_key(user.get("team_id"), user["id"])])
+    except Exception:
+        LOGGER.exception("Failed to record the submission of questionnaire %s.", questionnaire_id)
@@ -1,27 +1,66 @@
 """
 This script is designed to manage and retrieve secrets for a bot application, specifically handling
-the secure storage and access of sensitive data like API tokens and credentials. It uses AWS Secrets
-Manager to store and retrieve these secrets. The script defines a BotSecrets enum for easy reference
-to specific secrets and a function to retrieve these secrets as needed.
+the secure storage and access of sensitive data like API tokens and credentials. The secrets are loaded
+through a pluggable provider selected with the `BOT_SECRETS_PROVIDER` environment variable:
+
+- `secretsmanager` (default) fetches the secret from AWS Secrets Manager.
+- `extension` fetches the secret from the local HTTP cache of the AWS Parameters and Secrets Lambda Extension.
+- `local` reads the secrets from a JSON file (`BOT_SECRETS_FILE`) or from environment variables, for local runs and tests.
+
+The retrieved secrets are cached for `BOT_SECRETS_TTL` seconds and refreshed afterwards, so rotated tokens
+are picked up by warm containers. boto3 is only imported when a Secrets Manager fetch actually happens, to keep
+it off the cold start of the other providers. Modules holding clients built from the secrets register rotation listeners
+to rebuild them when the values change. Each provider records timing metrics of its fetches. The script
+defines a BotSecrets enum for easy reference to specific secrets and a function to retrieve these secrets as needed.
 """
 
 import enum
 import json
+import os
+import time
 import typing
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+from common import metrics
+
+
+# Name of the secret used when `BOT_SECRET_ID` is not set
+DEFAULT_SECRET_NAME = "dev/slack/bot"
 
-import boto3
-from botocore.exceptions import ClientError
+# Region of the secret used when it can not be derived from `BOT_SECRET_ID`
+DEFAULT_REGION_NAME = "eu-west-2"
 
+# Number of seconds the retrieved secrets stay valid when `BOT_SECRETS_TTL` is not set
+DEFAULT_SECRETS_TTL = 15 * 60
+
+# Default port of the AWS Parameters and Secrets Lambda Extension
+DEFAULT_EXTENSION_PORT = "2773"
 
 # Global variable to store the retrieved secrets
 SECRET: typing.Union[typing.Dict, None] = None
 
+# Time when the secrets stored in `SECRET` were retrieved
+SECRET_FETCHED_AT: typing.Union[float, None] = None
+
+# Global variable to store the secrets provider
+PROVIDER: typing.Union["SecretsProvider", None] = None
+
+# Functions called without arguments when rotated secret values are loaded
+ROTATION_LISTENERS: typing.List[typing.Callable[[], None]] = list()
+
+# Namedtuple 'ProviderStats' with the timing metrics of a secrets provider
+ProviderStats = namedtuple("ProviderStats", ["provider", "fetches", "errors", "last_ms", "total_ms"])
+
 
 class BotSecrets(enum.Enum):
     # Enumerations for different secret keys
     SLACK_BOT_TOKEN = enum.auto()
     SLACK_SIGNING_SECRET = enum.auto()
     SLACK_SLASH_COMMAND = enum.auto()
+    SLACK_CLIENT_ID = enum.auto()
+    SLACK_CLIENT_SECRET = enum.auto()
 
     JIRA_API_TOKEN = enum.auto()
     JIRA_URL = enum.auto()
@@ -51,43 +90,298 @@ class BotSecrets(enum.Enum):
 
         return secret_str
 
-def get_secrets() -> typing.Dict:
+
+def get_secret_id() -> str:
     """
-    Retrieves all secrets from AWS Secrets Manager.
+    Returns the name or ARN of the secret holding the bot secrets.
 
     Returns:
-        dict: A dictionary of all secrets.
+        str: The value of `BOT_SECRET_ID` or the default secret name.
+    """
 
-    Raises:
-        Exception: If there is a failure in retrieving secrets.
+    return os.environ.get("BOT_SECRET_ID") or DEFAULT_SECRET_NAME
+
+
+def get_region_name(secret_id: str) -> str:
     """
-    global SECRET
+    Returns the region of the secret, derived from the secret ARN when possible.
 
-    # Check if the secrets have already been retrieved and stored globally
-    if SECRET is None:
-        secret_name = "dev/slack/bot"
-        region_name = "eu-west-2"
+    Args:
+        secret_id (str): The name or ARN of the secret.
 
-        # Create a Secrets Manager client
-        session = boto3.session.Session()
-        client = session.client(
-            service_name='secretsmanager',
-            region_name=region_name
-        )
+    Returns:
+        str: The region of the secret.
+    """
+
+    # ARNs have the format arn:aws:secretsmanager:<region>:<account>:secret:<name>
+    if secret_id.startswith("arn:"):
+        return secret_id.split(":")[3]
+
+    return os.environ.get("BOT_SECRET_REGION") or DEFAULT_REGION_NAME
+
+
+class SecretsProvider:
+    """
+    Base class of the secrets providers, timing every fetch of the secrets.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.fetches = 0
+        self.errors = 0
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+
+    def fetch(self) -> typing.Dict:
+        """
+        Fetches all secrets and records the duration of the fetch.
+
+        Returns:
+            dict: A dictionary of all secrets.
+        """
+
+        started = time.perf_counter()
+
+        try:
+            return self._fetch()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.fetches += 1
+            self.last_ms = (time.perf_counter() - started) * 1000
+            self.total_ms += self.last_ms
+
+    def _fetch(self) -> typing.Dict:
+        raise NotImplementedError
+
+    def stats(self) -> ProviderStats:
+        """
+        Returns the timing metrics of the provider.
+
+        Returns:
+            ProviderStats: A namedtuple with the number of fetches and errors and their durations in milliseconds.
+        """
+
+        return ProviderStats(self.name, self.fetches, self.errors, round(self.last_ms, 3), round(self.total_ms, 3))
+
+
+class SecretsManagerProvider(SecretsProvider):
+    """
+    Fetches the secrets from AWS Secrets Manager, reusing one client across refreshes.
+    """
+
+    name = "secretsmanager"
+
+    def __init__(self, secret_id: str, region_name: str):
+        super().__init__()
+        self.secret_id = secret_id
+        self.region_name = region_name
+        self.client = None
+
+    def _fetch(self) -> typing.Dict:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        import boto3
+        from botocore.exceptions import ClientError
+
+        # Create a Secrets Manager client on the first fetch
+        if self.client is None:
+            session = boto3.session.Session()
+            self.client = session.client(
+                service_name='secretsmanager',
+                region_name=self.region_name
+            )
 
         try:
             # Fetch the secret value from AWS Secrets Manager
-            get_secret_value_response = client.get_secret_value(
-                SecretId=secret_name
+            get_secret_value_response = self.client.get_secret_value(
+                SecretId=self.secret_id
             )
         except ClientError:
             raise Exception(f"Fail to get secrets")
 
-        # Parse and store the secret values in the global variable
-        SECRET = json.loads(get_secret_value_response['SecretString'])
+        return json.loads(get_secret_value_response['SecretString'])
+
+
+class ExtensionProvider(SecretsProvider):
+    """
+    Fetches the secrets from the localhost cache of the AWS Parameters and Secrets Lambda Extension.
+    """
+
+    name = "extension"
+
+    def __init__(self, secret_id: str, port: str = DEFAULT_EXTENSION_PORT, timeout: float = 2.0):
+        super().__init__()
+        self.secret_id = secret_id
+        self.url = f"http://localhost:{port}/secretsmanager/get?secretId={urllib.parse.quote(secret_id, safe='')}"
+        self.timeout = timeout
+
+    def _fetch(self) -> typing.Dict:
+        # The extension authenticates requests with the session token of the function
+        request = urllib.request.Request(
+            self.url,
+            headers={"X-Aws-Parameters-Secrets-Token": os.environ.get("AWS_SESSION_TOKEN", str())}
+        )
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except Exception:
+            raise Exception(f"Fail to get secrets")
+
+        return json.loads(payload["SecretString"])
+
+
+class LocalProvider(SecretsProvider):
+    """
+    Reads the secrets from a JSON file, or from environment variables named after the BotSecrets keys.
+    """
+
+    name = "local"
+
+    def __init__(self, path: typing.Union[str, None] = None):
+        super().__init__()
+        self.path = path
+
+    def _fetch(self) -> typing.Dict:
+        # Prefer the JSON file when one is configured
+        if self.path:
+            with open(self.path, encoding="utf-8") as secrets_file:
+                return json.load(secrets_file)
+
+        return {secret.name: os.environ[secret.name] for secret in BotSecrets if os.environ.get(secret.name)}
+
+
+def create_provider(name: str) -> SecretsProvider:
+    """
+    Creates the secrets provider with the given name, configured from the environment.
+
+    Args:
+        name (str): Name of the provider: 'secretsmanager', 'extension' or 'local'.
+
+    Returns:
+        SecretsProvider: The configured secrets provider.
+
+    Raises:
+        Exception: If the provider name is unknown.
+    """
+
+    secret_id = get_secret_id()
+
+    if name == SecretsManagerProvider.name:
+        return SecretsManagerProvider(secret_id, get_region_name(secret_id))
+
+    if name == ExtensionProvider.name:
+        return ExtensionProvider(
+            secret_id,
+            port=os.environ.get("PARAMETERS_SECRETS_EXTENSION_HTTP_PORT") or DEFAULT_EXTENSION_PORT
+        )
+
+    if name == LocalProvider.name:
+        return LocalProvider(os.environ.get("BOT_SECRETS_FILE"))
+
+    raise Exception(f"Unknown secrets provider '{name}'")
+
+
+def get_provider() -> SecretsProvider:
+    """
+    Retrieves or initializes the global secrets provider selected by `BOT_SECRETS_PROVIDER`.
+
+    Returns:
+        SecretsProvider: The secrets provider.
+    """
+
+    global PROVIDER
+
+    if PROVIDER is None:
+        PROVIDER = create_provider(os.environ.get("BOT_SECRETS_PROVIDER") or SecretsManagerProvider.name)
+
+    return PROVIDER
+
+
+def get_secrets_ttl() -> float:
+    """
+    Returns the number of seconds the retrieved secrets stay valid.
+
+    Returns:
+        float: The value of `BOT_SECRETS_TTL` or the default TTL. Zero disables the refresh.
+    """
+
+    return float(os.environ.get("BOT_SECRETS_TTL") or DEFAULT_SECRETS_TTL)
+
+
+def add_rotation_listener(listener: typing.Callable[[], None]):
+    """
+    Registers a function called when rotated secret values are loaded.
+
+    Args:
+        listener (Callable): Function without arguments, typically resetting a cached client.
+    """
+
+    if listener not in ROTATION_LISTENERS:
+        ROTATION_LISTENERS.append(listener)
+
+
+def get_secrets(force_refresh: bool = False) -> typing.Dict:
+    """
+    Retrieves all secrets from the secrets provider, refreshing them once their TTL has passed.
+
+    If a refresh fails while previously retrieved secrets are available, the previous secrets are
+    served until the next refresh attempt, so a provider brownout does not break a warm container.
+
+    Args:
+        force_refresh (bool): Fetch the secrets even if the cached ones are still valid.
+
+    Returns:
+        dict: A dictionary of all secrets.
+
+    Raises:
+        Exception: If there is a failure in retrieving secrets.
+    """
+    global SECRET, SECRET_FETCHED_AT
+
+    ttl = get_secrets_ttl()
+    expired = SECRET_FETCHED_AT is not None and ttl > 0 and time.monotonic() - SECRET_FETCHED_AT >= ttl
+
+    # Check if the secrets have already been retrieved and are still valid
+    if SECRET is None or expired or force_refresh:
+        try:
+            with metrics.timer("SecretsFetch"):
+                secret = get_provider().fetch()
+        except Exception:
+            if SECRET is None or force_refresh:
+                raise
+
+            # Keep serving the previous secrets and retry after another TTL
+            metrics.increment("SecretsStaleServed")
+            SECRET_FETCHED_AT = time.monotonic()
+            return SECRET
 
         # Raise an exception if the retrieved secret is empty
-        if not SECRET:
+        if not secret:
             raise Exception(f"Secret is empty")
 
+        rotated = SECRET is not None and secret != SECRET
+
+        # Store the secret values in the global variable
+        SECRET = secret
+        SECRET_FETCHED_AT = time.monotonic()
+
+        # Let the modules holding clients built from the old values rebuild them
+        if rotated:
+            for listener in ROTATION_LISTENERS:
+                listener()
+
     return SECRET
+
+
+def refresh_secrets() -> typing.Dict:
+    """
+    Fetches the secrets again, typically after an authentication failure caused by a rotated token.
+
+    Returns:
+        dict: A dictionary of all secrets.
+    """
+
+    return get_secrets(force_refresh=True)
@@ -0,0 +1,117 @@
+"""
+This script caches Slack user profiles across warm invocations of the Lambda function. Profiles are fetched
+with `users_info` on a cache miss and kept in a bounded cache with TTL and LRU eviction, so repeat submitters
+do not pay a Slack API round trip. The cache can also be filled in one pass with a paginated `users_list`
+bulk prefetch, which the warm-up mode uses to take `users_info` off the hot path entirely. Profiles are looked up
+with the sync or the async Slack WebClient, depending on the execution mode, through the same cache.
+"""
+
+import typing
+
+from common import cache, metrics
+
+
+# Maximum number of user profiles kept in the cache
+USER_CACHE_SIZE = 5000
+
+# Number of seconds a cached user profile stays valid
+USER_CACHE_TTL = 15 * 60
+
+# Number of users requested per `users_list` page
+USERS_LIST_PAGE_SIZE = 200
+
+# Global cache of Slack user profiles keyed by user ID
+USER_CACHE = cache.TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def get_user(client, user_id: str) -> typing.Dict:
+    """
+    Retrieves a Slack user profile, using the cache when possible.
+
+    Args:
+        client: Slack WebClient instance to communicate with Slack API.
+        user_id (str): ID of the Slack user.
+
+    Returns:
+        dict: A dictionary containing Slack user information.
+    """
+
+    user = USER_CACHE.get(user_id)
+
+    # Fetch the profile from Slack on a cache miss
+    if user is None:
+        metrics.increment("UserCacheMiss")
+
+        with metrics.timer("SlackUsersInfo"):
+            user = client.users_info(user=user_id).get("user", {})
+
+        # Only cache complete profiles so a failed lookup is retried next time
+        if user:
+            USER_CACHE.set(user_id, user)
+    else:
+        metrics.increment("UserCacheHit")
+
+    return user
+
+
+async def get_user_async(client, user_id: str) -> typing.Dict:
+    """
+    Retrieves a Slack user profile with an async Slack WebClient, using the cache when possible.
+
+    Args:
+        client: AsyncWebClient instance to communicate with Slack API.
+        user_id (str): ID of the Slack user.
+
+    Returns:
+        dict: A dictionary containing Slack user information.
+    """
+
+    user = USER_CACHE.get(user_id)
+
+    # Fetch the profile from Slack on a cache miss
+    if user is None:
+        metrics.increment("UserCacheMiss")
+
+        with metrics.timer("SlackUsersInfo"):
+            user = (await client.users_info(user=user_id)).get("user", {})
+
+        # Only cache complete profiles so a failed lookup is retried next time
+        if user:
+            USER_CACHE.set(user_id, user)
+    else:
+        metrics.increment("UserCacheHit")
+
+    return user
+
+
+def prefetch_users(client, page_size: int = USERS_LIST_PAGE_SIZE) -> int:
+    """
+    Fills the cache with all workspace members using the paginated `users_list` method.
+
+    Args:
+        client: Slack WebClient instance to communicate with Slack API.
+        page_size (int): Number of users requested per page.
+
+    Returns:
+        int: The number of cached user profiles.
+    """
+
+    cached = 0
+    cursor = None
+
+    while True:
+        response = client.users_list(limit=page_size, cursor=cursor)
+
+        for member in response.get("members", []):
+            if member.get("deleted"):
+                continue
+
+            USER_CACHE.set(member["id"], member)
+            cached += 1
+
+        # Stop once Slack does not return a cursor to the next page
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+
+    return cached
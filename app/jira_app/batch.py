@@ -0,0 +1,135 @@
+"""
+This script provides a batching stage for the creation of JIRA tasks. Pending issue dictionaries are
+collected in a buffer together with a reference to their submitter and flushed through the JIRA bulk
+create endpoint (`/issue/bulk`) once the buffer reaches its maximum size or its oldest item has waited
+longer than the maximum linger time. Every result is mapped back to the reference of its submitter, so
+replies still get the right task link, and failures are reported per item instead of failing the batch.
+"""
+
+import threading
+import time
+import typing
+from collections import namedtuple
+
+from jira_app import task
+
+
+# Maximum number of issues JIRA accepts in one bulk create request
+MAX_BATCH_SIZE = 50
+
+# Number of seconds a pending issue may wait in the buffer before the batch is flushed
+DEFAULT_MAX_LINGER = 2.0
+
+# Namedtuple 'BatchResult' with the outcome of one issue of a batch
+BatchResult = namedtuple("BatchResult", ["ref", "task_link", "error"])
+
+
+class IssueBatcher:
+    """
+    A thread-safe buffer of pending JIRA issues flushed in bulk.
+    """
+
+    def __init__(
+            self,
+            max_size: int = MAX_BATCH_SIZE,
+            max_linger: float = DEFAULT_MAX_LINGER,
+            on_result: typing.Union[typing.Callable[[BatchResult], None], None] = None,
+            clock: typing.Callable[[], float] = time.monotonic
+    ):
+        """
+        Initializes an empty batcher.
+
+        Args:
+            max_size (int): Number of pending issues triggering a flush, at most `MAX_BATCH_SIZE`.
+            max_linger (float): Number of seconds the oldest pending issue may wait before a flush.
+            on_result (Callable): Function called with the BatchResult of every flushed issue.
+            clock (Callable): Function returning the current time in seconds.
+        """
+
+        if not 0 < max_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"Batch size must be between 1 and {MAX_BATCH_SIZE}.")
+
+        self.max_size = max_size
+        self.max_linger = max_linger
+        self.on_result = on_result
+        self.clock = clock
+
+        # Pending items as tuples of (Issue Dictionary, Submitter Reference)
+        self._pending: typing.List[typing.Tuple[typing.Dict, typing.Any]] = list()
+        self._oldest: typing.Union[float, None] = None
+        self._lock = threading.Lock()
+
+    def add(self, issue_dict: typing.Dict, ref: typing.Any) -> typing.List[BatchResult]:
+        """
+        Adds an issue to the buffer and flushes the batch if it is full or has lingered too long.
+
+        Args:
+            issue_dict (dict): The issue dictionary, as built by `task.build_issue`.
+            ref (Any): Reference to the submitter, returned with the result of the issue.
+
+        Returns:
+            List[BatchResult]: The results of the flushed batch, or an empty list if nothing was flushed.
+        """
+
+        with self._lock:
+            if not self._pending:
+                self._oldest = self.clock()
+
+            self._pending.append((issue_dict, ref))
+
+        return self.flush_if_due()
+
+    def is_due(self) -> bool:
+        """
+        Checks whether the buffer is full or its oldest issue has waited longer than the linger time.
+
+        Returns:
+            bool: True if the batch should be flushed.
+        """
+
+        with self._lock:
+            return bool(self._pending) and (
+                len(self._pending) >= self.max_size or self.clock() - self._oldest >= self.max_linger
+            )
+
+    def flush_if_due(self) -> typing.List[BatchResult]:
+        """
+        Flushes the batch if it is due.
+
+        Returns:
+            List[BatchResult]: The results of the flushed batch, or an empty list if nothing was flushed.
+        """
+
+        return self.flush() if self.is_due() else list()
+
+    def flush(self) -> typing.List[BatchResult]:
+        """
+        Creates all pending issues in JIRA, at most `max_size` per bulk request.
+
+        Returns:
+            List[BatchResult]: The result of every pending issue, in the order they were added.
+        """
+
+        # Take the pending items out of the buffer so new items can be added during the requests
+        with self._lock:
+            pending, self._pending, self._oldest = self._pending, list(), None
+
+        results: typing.List[BatchResult] = list()
+
+        for start in range(0, len(pending), self.max_size):
+            chunk = pending[start:start + self.max_size]
+            created = task.create_many([issue_dict for issue_dict, _ in chunk])
+
+            # Map every outcome back to the submitter of the issue
+            for (_, ref), (task_link, error) in zip(chunk, created):
+                result = BatchResult(ref, task_link, error)
+                results.append(result)
+
+                if self.on_result is not None:
+                    self.on_result(result)
+
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
@@ -2,19 +2,25 @@
 This script provides a function to create and manage a global JIRA client instance. It uses configuration
 settings defined in the secrets module to set up the JIRA client with the server URL, username, and API token.
 This setup ensures that a single instance of the JIRA client is used throughout the application, promoting
-efficient resource usage and consistent JIRA interactions.
+efficient resource usage and consistent JIRA interactions. The instance is rebuilt when the secrets are rotated.
+The client is configured by the transport module with explicit timeouts and a tuned connection pool, and its
+built-in retries are disabled because retries are handled by `transport.call`. The `jira` package and its
+dependency tree are imported lazily on first use, so invocations that never talk to JIRA do not pay for them.
 """
 
 import typing
 
-from jira import JIRA
 from common import secrets
+from jira_app import transport
+
+if typing.TYPE_CHECKING:
+    from jira import JIRA
 
 # Global variable to store the JIRA client instance
-JIRA_GLOBAL: typing.Union[JIRA, None] = None
+JIRA_GLOBAL: typing.Union["JIRA", None] = None
 
 
-def get_jira():
+def get_jira() -> "JIRA":
     """
     Retrieves or initializes the global JIRA client instance.
 
@@ -25,8 +31,11 @@ def get_jira():
 
     # Initialize the JIRA client if it hasn't been already
     if JIRA_GLOBAL is None:
+        from jira import JIRA
+
         # Configuration options for the JIRA client, including the server URL
         options = {"server": secrets.BotSecrets.get(secrets.BotSecrets.JIRA_URL)}
+        config = transport.get_config()
 
         # Creating the JIRA client instance with the specified options and authentication details
         JIRA_GLOBAL = JIRA(
@@ -34,8 +43,26 @@ def get_jira():
             basic_auth=(
                 secrets.BotSecrets.get(secrets.BotSecrets.JIRA_USER),
                 secrets.BotSecrets.get(secrets.BotSecrets.JIRA_API_TOKEN)
-            )
+            ),
+            timeout=(config.connect_timeout, config.read_timeout),
+            max_retries=0
         )
 
+        # Replace the default connection pool with one sized for the function
+        transport.configure_session(JIRA_GLOBAL._session, config)
+
     # Return the initialized JIRA client
     return JIRA_GLOBAL
+
+
+def reset_jira():
+    """
+    Drops the global JIRA client so that it is rebuilt with the current secrets on next use.
+    """
+
+    global JIRA_GLOBAL
+    JIRA_GLOBAL = None
+
+
+# Rebuild the JIRA client when rotated credentials are loaded
+secrets.add_rotation_listener(reset_jira)
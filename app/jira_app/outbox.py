@@ -0,0 +1,625 @@
+"""
+This script provides a write-behind outbox for the JIRA tasks of the questionnaire. The interactive path only
+appends the issue of a submission, together with the reference of the message sent to the user, to a durable
+queue. A flusher drains the queue in batches through the JIRA bulk create endpoint, with a bounded number of
+concurrent requests, and reports every created task so the message of the user can be updated with its link.
+JIRA failures and slowdowns are absorbed by the queue: a failed task is retried later instead of being lost.
+
+A redelivered entry, e.g. by SQS, does not create a second task: the flusher records every entry in the
+idempotency store before creating its task, and keeps the task link with the record once it exists, so the entry
+gets the recorded link back. The only exception is a bulk request timing out after JIRA created the tasks: its
+entries are retried like any failed entry, which creates their tasks a second time. The messages of the users are
+only updated once every created task was recorded. An entry whose message could not be updated, e.g. under the rate
+limit of `chat.update`, is delivered again until its last attempt, which only updates the message with the recorded
+link.
+
+The outbox is selected with the `BOT_JIRA_OUTBOX` environment variable:
+
+- `none` (default) disables the outbox, tasks are created while the submission is processed.
+- `sqlite` keeps the entries in a SQLite database (`BOT_OUTBOX_PATH`) with a write-ahead journal, for local runs.
+  It is drained by `tools/outbox_flusher.py`.
+- `sqs` sends the entries to an SQS queue (`BOT_OUTBOX_QUEUE_URL`), which triggers the function with batches of
+  entries. `BOT_OUTBOX_ENDPOINT` points it to a local SQS-compatible stand-in like ElasticMQ.
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+import typing
+from collections import namedtuple
+
+from common import idempotency, metrics, roster
+from jira_app import batch, submissions
+
+
+# Values of `BOT_JIRA_OUTBOX` selecting an outbox
+OUTBOX_BACKENDS = ("none", "sqlite", "sqs")
+
+# Default path of the SQLite outbox
+DEFAULT_OUTBOX_PATH = "outbox.sqlite3"
+
+# Default number of concurrent bulk create requests of the flusher
+DEFAULT_CONCURRENCY = 4
+
+# Default number of deliveries of an entry before its task is given up
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Number of seconds an entry received by a flusher is hidden from other flushers
+DEFAULT_LEASE_TIMEOUT = 60
+
+# Number of seconds before a failed entry is delivered again, doubled on every attempt
+RETRY_BACKOFF = 5
+
+# Maximum number of messages SQS returns in one receive request
+SQS_MAX_RECEIVE = 10
+
+# Namedtuple 'OutboxEntry' for an entry received from the outbox
+OutboxEntry = namedtuple(
+    "OutboxEntry",
+    [
+        "entry_id",  # Unique ID of the entry, the idempotency key of its submission
+        "payload",  # Dictionary with the 'issue' dictionary and the 'reply' reference of the message to update
+        "attempts",  # Number of deliveries of the entry, this one included
+        "handle",  # Reference of the delivery in the backend, like the SQS receipt handle
+    ]
+)
+
+# Namedtuple 'FlushReport' with the outcome of the entries of a flush
+FlushReport = namedtuple(
+    "FlushReport",
+    [
+        "created",  # Entries whose task exists, created now or by an earlier delivery
+        "retried",  # Entries to deliver again later
+        "failed",  # Entries given up after their last attempt
+    ]
+)
+
+# Global variable to store the outbox, None when the outbox is disabled
+OUTBOX: typing.Union["Outbox", None] = None
+
+# Logger of the failed message updates, which never fail their entry
+LOGGER = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Base class of the outboxes.
+    """
+
+    def append(self, entry_id: str, payload: typing.Dict) -> bool:
+        """
+        Appends an entry to the outbox.
+
+        Args:
+            entry_id (str): Unique ID of the entry.
+            payload (dict): The 'issue' dictionary and the 'reply' reference of the entry.
+
+        Returns:
+            bool: True if the entry was appended, False if the outbox already holds it.
+        """
+
+        raise NotImplementedError
+
+    def receive(self, max_count: int) -> typing.List[OutboxEntry]:
+        """
+        Receives pending entries, hiding them from other flushers for the lease timeout.
+
+        Args:
+            max_count (int): Maximum number of entries to receive.
+
+        Returns:
+            List[OutboxEntry]: The received entries, in the order they were appended when the backend keeps it.
+        """
+
+        raise NotImplementedError
+
+    def complete(self, entry: OutboxEntry):
+        """
+        Removes an entry whose task exists from the outbox.
+        """
+
+        raise NotImplementedError
+
+    def retry(self, entry: OutboxEntry):
+        """
+        Hands an entry back to be delivered again after a backoff.
+        """
+
+        raise NotImplementedError
+
+    def fail(self, entry: OutboxEntry):
+        """
+        Gives an entry up after its last attempt.
+        """
+
+        raise NotImplementedError
+
+
+class SQLiteOutbox(Outbox):
+    """
+    An outbox in a SQLite database, journaled with a write-ahead log so every append is durable once it returns.
+    """
+
+    def __init__(
+            self,
+            path: str = DEFAULT_OUTBOX_PATH,
+            lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+            clock: typing.Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        # Imported lazily as the SQLite outbox is only used for local runs
+        import sqlite3
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "entry_id TEXT UNIQUE NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "state TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "visible_at REAL NOT NULL DEFAULT 0)"
+        )
+
+    def append(self, entry_id: str, payload: typing.Dict) -> bool:
+        with self._lock:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO outbox (entry_id, payload) VALUES (?, ?)",
+                (entry_id, json.dumps(payload, separators=(",", ":")))
+            )
+
+        return cursor.rowcount == 1
+
+    def receive(self, max_count: int) -> typing.List[OutboxEntry]:
+        now = self.clock()
+
+        with self._lock:
+            # Select and lease the entries in one transaction, so two flushers never receive the same entry
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.connection.execute(
+                    "SELECT seq, entry_id, payload, attempts FROM outbox "
+                    "WHERE state = 'pending' AND visible_at <= ? ORDER BY seq LIMIT ?",
+                    (now, max_count)
+                ).fetchall()
+
+                self.connection.executemany(
+                    "UPDATE outbox SET attempts = attempts + 1, visible_at = ? WHERE seq = ?",
+                    [(now + self.lease_timeout, seq) for seq, _, _, _ in rows]
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+        return [
+            OutboxEntry(entry_id, json.loads(payload), attempts + 1, seq)
+            for seq, entry_id, payload, attempts in rows
+        ]
+
+    def complete(self, entry: OutboxEntry):
+        with self._lock:
+            self.connection.execute("DELETE FROM outbox WHERE seq = ?", (entry.handle,))
+
+    def retry(self, entry: OutboxEntry):
+        with self._lock:
+            self.connection.execute(
+                "UPDATE outbox SET visible_at = ? WHERE seq = ?",
+                (self.clock() + get_backoff(entry.attempts), entry.handle)
+            )
+
+    def fail(self, entry: OutboxEntry):
+        # Failed entries are kept for inspection, like a dead-letter queue
+        with self._lock:
+            self.connection.execute("UPDATE outbox SET state = 'failed' WHERE seq = ?", (entry.handle,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM outbox WHERE state = 'pending'").fetchone()[0]
+
+
+class SQSOutbox(Outbox):
+    """
+    An outbox in an SQS queue. Entries given up are left to the redrive policy of the queue, which moves them
+    to its dead-letter queue.
+    """
+
+    def __init__(
+            self,
+            queue_url: str,
+            endpoint_url: typing.Union[str, None] = None,
+            region_name: typing.Union[str, None] = None,
+            lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+            client: typing.Any = None
+    ):
+        self.queue_url = queue_url
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.lease_timeout = lease_timeout
+        self.client = client
+
+    def get_client(self) -> typing.Any:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client("sqs", endpoint_url=self.endpoint_url, region_name=self.region_name)
+
+        return self.client
+
+    def append(self, entry_id: str, payload: typing.Dict) -> bool:
+        # Standard queues may deliver an entry twice, which the flusher detects with the idempotency store
+        self.get_client().send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps({"entry_id": entry_id, "payload": payload}, separators=(",", ":")),
+        )
+
+        return True
+
+    def receive(self, max_count: int) -> typing.List[OutboxEntry]:
+        response = self.get_client().receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_count, SQS_MAX_RECEIVE),
+            VisibilityTimeout=int(self.lease_timeout),
+            AttributeNames=["ApproximateReceiveCount"],
+        )
+
+        return [
+            parse_message(message["Body"], message["ReceiptHandle"], message["Attributes"]["ApproximateReceiveCount"])
+            for message in response.get("Messages", list())
+        ]
+
+    def complete(self, entry: OutboxEntry):
+        self.get_client().delete_message(QueueUrl=self.queue_url, ReceiptHandle=entry.handle)
+
+    def retry(self, entry: OutboxEntry):
+        self.get_client().change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=entry.handle,
+            VisibilityTimeout=int(get_backoff(entry.attempts)),
+        )
+
+    def fail(self, entry: OutboxEntry):
+        # The message becomes visible again and is moved to the dead-letter queue by the redrive policy
+        pass
+
+
+class OutboxFlusher:
+    """
+    Creates the tasks of outbox entries in JIRA, in bulk and with bounded concurrency.
+    """
+
+    def __init__(
+            self,
+            on_result: typing.Callable[[typing.Dict, typing.Union[str, None], bool], None],
+            ledger: typing.Union[idempotency.IdempotencyStore, None] = None,
+            batch_size: int = batch.MAX_BATCH_SIZE,
+            concurrency: int = DEFAULT_CONCURRENCY,
+            max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ):
+        """
+        Initializes a flusher.
+
+        Args:
+            on_result (Callable): Function called with the 'reply' reference, the task link and whether the task
+                failed for good, once for every entry whose task exists or was given up.
+            ledger (IdempotencyStore): Store recording the created tasks. The global idempotency store if None.
+            batch_size (int): Number of tasks created per bulk request, at most `batch.MAX_BATCH_SIZE`.
+            concurrency (int): Maximum number of concurrent bulk requests.
+            max_attempts (int): Number of deliveries of an entry before its task is given up.
+        """
+
+        if not 0 < batch_size <= batch.MAX_BATCH_SIZE:
+            raise ValueError(f"Batch size must be between 1 and {batch.MAX_BATCH_SIZE}.")
+
+        self.on_result = on_result
+        self.ledger = ledger
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+
+    def get_ledger(self) -> idempotency.IdempotencyStore:
+        return self.ledger if self.ledger is not None else idempotency.get_store()
+
+    def process(self, entries: typing.List[OutboxEntry]) -> FlushReport:
+        """
+        Creates the tasks of the given entries and reports them to their users.
+
+        Args:
+            entries (List[OutboxEntry]): The received entries.
+
+        Returns:
+            FlushReport: The entries whose task exists, the entries to retry and the entries given up.
+        """
+
+        ledger = self.get_ledger()
+        report = FlushReport(list(), list(), list())
+        pending: typing.List[OutboxEntry] = list()
+        # Entries to report with their task link and whether their task failed, once every entry was recorded
+        notifications: typing.List[typing.Tuple[OutboxEntry, typing.Union[str, None], bool]] = list()
+
+        # Skip the entries whose task was created by an earlier delivery, reporting the recorded link again
+        for entry in entries:
+            key = get_ledger_key(entry.entry_id)
+
+            if ledger.begin(key):
+                pending.append(entry)
+                continue
+
+            task_link = ledger.get_result(key)
+            if task_link is None:
+                # Another flusher is creating the task, look again once its lease expired
+                report.retried.append(entry)
+                continue
+
+            metrics.increment("OutboxDuplicate")
+            notifications.append((entry, task_link, False))
+            report.created.append(entry)
+
+        chunks = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+
+        # Create the chunks in bulk, at most `concurrency` requests at a time
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(chunks)))) as executor:
+            for results in executor.map(self.create_chunk, chunks):
+                for result in results:
+                    self.handle_result(ledger, result, report, notifications)
+
+        # Update the messages of the users last, a failed update must not leave a created task unrecorded
+        for entry, task_link, task_failed in notifications:
+            if self.notify(entry.payload["reply"], task_link, task_failed) or task_failed:
+                continue
+
+            # Deliver the entry again to update its message, its recorded task is not created a second time
+            if entry.attempts < self.max_attempts:
+                report.created.remove(entry)
+                report.retried.append(entry)
+
+        metrics.increment("OutboxCreated", len(report.created))
+        metrics.increment("OutboxRetried", len(report.retried))
+        metrics.increment("OutboxFailed", len(report.failed))
+
+        return report
+
+    def create_chunk(self, chunk: typing.List[OutboxEntry]) -> typing.List[batch.BatchResult]:
+        batcher = batch.IssueBatcher(max_size=self.batch_size)
+        results: typing.List[batch.BatchResult] = list()
+
+        # The batcher flushes by itself once the chunk is complete
+        for entry in chunk:
+            results.extend(batcher.add(entry.payload["issue"], entry))
+
+        return results + batcher.flush()
+
+    def handle_result(
+            self,
+            ledger: idempotency.IdempotencyStore,
+            result: batch.BatchResult,
+            report: FlushReport,
+            notifications: typing.List[typing.Tuple[OutboxEntry, typing.Union[str, None], bool]]
+    ):
+        entry = result.ref
+        key = get_ledger_key(entry.entry_id)
+
+        if result.task_link is not None:
+            # Record the task before reporting it, so a redelivered entry never creates a second one
+            ledger.complete(key, result.task_link)
+            submissions.record(entry.payload["issue"], result.task_link)
+            reply = entry.payload["reply"]
+            roster.record_submission(reply.get("questionnaire"), reply.get("user") or dict())
+            notifications.append((entry, result.task_link, False))
+            report.created.append(entry)
+            return
+
+        ledger.release(key)
+
+        if entry.attempts < self.max_attempts:
+            report.retried.append(entry)
+            return
+
+        # Tell the user to submit again instead of leaving the placeholder forever
+        notifications.append((entry, None, True))
+        report.failed.append(entry)
+
+    def notify(self, reply: typing.Dict, task_link: typing.Union[str, None], task_failed: bool) -> bool:
+        """
+        Calls `on_result` for an entry. A failure, e.g. a deleted channel, is logged, never raised.
+
+        Returns:
+            bool: Whether the message of the entry was updated.
+        """
+
+        try:
+            self.on_result(reply, task_link, task_failed)
+        except Exception:
+            metrics.increment("OutboxNotifyErrors")
+            LOGGER.exception("Failed to update the message of an outbox entry.")
+            return False
+
+        return True
+
+    def drain(self, outbox: Outbox, max_entries: typing.Union[int, None] = None) -> FlushReport:
+        """
+        Receives and processes entries until the outbox has no visible entry left.
+
+        Args:
+            outbox (Outbox): The outbox to drain.
+            max_entries (int): Maximum number of entries to process. No limit if None.
+
+        Returns:
+            FlushReport: The outcome of all processed entries.
+        """
+
+        report = FlushReport(list(), list(), list())
+        remaining = max_entries
+
+        while remaining is None or remaining > 0:
+            count = self.batch_size * self.concurrency
+            entries = outbox.receive(count if remaining is None else min(count, remaining))
+            if not entries:
+                break
+
+            processed = self.process(entries)
+
+            # Acknowledge every entry to the outbox
+            for entry in processed.created:
+                outbox.complete(entry)
+            for entry in processed.retried:
+                outbox.retry(entry)
+            for entry in processed.failed:
+                outbox.fail(entry)
+
+            for outcome, outcome_entries in zip(report, processed):
+                outcome.extend(outcome_entries)
+
+            if remaining is not None:
+                remaining -= len(entries)
+
+        return report
+
+
+def get_backoff(attempts: int) -> float:
+    return RETRY_BACKOFF * 2 ** max(attempts - 1, 0)
+
+
+def get_ledger_key(entry_id: str) -> str:
+    return f"outbox:{entry_id}"
+
+
+def parse_message(body: str, handle: str, attempts: typing.Union[str, int]) -> OutboxEntry:
+    """
+    Parses an SQS message of the outbox into an entry.
+
+    Args:
+        body (str): The body of the message.
+        handle (str): Reference of the delivery, the receipt handle or the message ID of the message.
+        attempts (str): The approximate receive count of the message.
+
+    Returns:
+        OutboxEntry: The entry.
+    """
+
+    message = json.loads(body)
+    return OutboxEntry(message["entry_id"], message["payload"], int(attempts), handle)
+
+
+def is_sqs_event(event: typing.Dict) -> bool:
+    """
+    Checks whether an event is a batch of SQS messages of the event source mapping.
+    """
+
+    records = event.get("Records") if isinstance(event, dict) else None
+    return bool(records) and records[0].get("eventSource") == "aws:sqs"
+
+
+def handle_sqs_event(event: typing.Dict, flusher: OutboxFlusher) -> typing.Dict:
+    """
+    Processes a batch of SQS messages of the outbox, reporting the messages to deliver again.
+
+    Successful messages are deleted by the event source mapping. Failed messages are reported as batch item
+    failures, so SQS delivers them again after their visibility timeout, or moves them to the dead-letter queue.
+
+    Args:
+        event (dict): The SQS event.
+        flusher (OutboxFlusher): The flusher creating the tasks.
+
+    Returns:
+        dict: The partial batch response of the event source mapping.
+    """
+
+    entries = [
+        parse_message(record["body"], record["messageId"], record["attributes"]["ApproximateReceiveCount"])
+        for record in event["Records"]
+    ]
+
+    report = flusher.process(entries)
+
+    return {"batchItemFailures": [{"itemIdentifier": entry.handle} for entry in report.retried + report.failed]}
+
+
+def get_backend() -> str:
+    """
+    Retrieves the outbox backend selected with `BOT_JIRA_OUTBOX`.
+
+    Raises:
+        Exception: If the backend is unknown.
+    """
+
+    backend = (os.environ.get("BOT_JIRA_OUTBOX") or "none").strip().lower()
+
+    if backend not in OUTBOX_BACKENDS:
+        raise Exception(f"Unknown JIRA outbox '{backend}', expected one of {', '.join(OUTBOX_BACKENDS)}.")
+
+    return backend
+
+
+def is_enabled() -> bool:
+    return get_backend() != "none"
+
+
+def create_outbox(name: str) -> Outbox:
+    """
+    Creates an outbox by name.
+
+    Args:
+        name (str): One of 'sqlite' or 'sqs'.
+
+    Returns:
+        Outbox: The outbox.
+
+    Raises:
+        Exception: If the outbox name is unknown or the SQS queue is not configured.
+    """
+
+    if name == "sqlite":
+        return SQLiteOutbox(os.environ.get("BOT_OUTBOX_PATH") or DEFAULT_OUTBOX_PATH)
+
+    if name == "sqs":
+        queue_url = os.environ.get("BOT_OUTBOX_QUEUE_URL")
+        if not queue_url:
+            raise Exception("BOT_OUTBOX_QUEUE_URL must be set for the 'sqs' JIRA outbox.")
+
+        return SQSOutbox(queue_url, endpoint_url=os.environ.get("BOT_OUTBOX_ENDPOINT") or None)
+
+    raise Exception(f"Unknown JIRA outbox '{name}'.")
+
+
+def get_outbox() -> Outbox:
+    """
+    Retrieves or initializes the global outbox selected with `BOT_JIRA_OUTBOX`.
+
+    Returns:
+        Outbox: The outbox.
+    """
+
+    global OUTBOX
+
+    if OUTBOX is None:
+        OUTBOX = create_outbox(get_backend())
+
+    return OUTBOX
+
+
+def create_flusher(on_result: typing.Callable[[typing.Dict, typing.Union[str, None], bool], None]) -> OutboxFlusher:
+    """
+    Creates a flusher configured with `BOT_OUTBOX_CONCURRENCY` and `BOT_OUTBOX_MAX_ATTEMPTS`.
+
+    Args:
+        on_result (Callable): Function called with the 'reply' reference, the task link and whether the task failed.
+
+    Returns:
+        OutboxFlusher: The flusher.
+    """
+
+    return OutboxFlusher(
+        on_result,
+        concurrency=int(os.environ.get("BOT_OUTBOX_CONCURRENCY") or DEFAULT_CONCURRENCY),
+        max_attempts=int(os.environ.get("BOT_OUTBOX_MAX_ATTEMPTS") or DEFAULT_MAX_ATTEMPTS),
+    )
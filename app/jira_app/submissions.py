@@ -0,0 +1,432 @@
+"""
+This script keeps a per-user index of the questionnaire tasks created in JIRA, so a user can list their previous
+submissions without searching JIRA every time. The index maps the email of a user to their tasks (link, level and
+creation date), newest first, in a bounded cache whose entries expire after a time-to-live.
+
+The index of a user is filled in two ways:
+
+- Every task created for a submission is recorded right away, whether by `task.save_answers` or by the outbox.
+- On a lookup of a user without a complete index, their tasks are backfilled with a paginated JQL search
+  limited to the fields the index needs, and the complete index is kept until it expires. Repeat lookups are
+  served from the index and never reach the JIRA search endpoint, one of the slowest of the instance.
+
+The store of the index is selected with the `BOT_SUBMISSIONS_STORE` environment variable:
+
+- `memory` (default) keeps the index in the memory of the warm container, for local runs. A task recorded by
+  another container is not seen until the index expires.
+- `dynamodb` keeps one item per user in a DynamoDB table (`BOT_SUBMISSIONS_TABLE`) shared by all containers, so a
+  task recorded by the outbox or by another container is listed by the next lookup. A task is prepended to the
+  item with an atomic update, and a backfill only replaces the item if no task was recorded during its search.
+"""
+
+import json
+import os
+import threading
+import re
+import time
+import typing
+from collections import namedtuple
+
+from common import cache, metrics, secrets
+from jira_app import client, transport
+
+
+# Maximum number of users whose index is kept
+INDEX_SIZE = 2000
+
+# Default number of seconds the index of a user stays valid, overridden with `BOT_SUBMISSIONS_TTL`
+DEFAULT_INDEX_TTL = 60 * 60
+
+# Default number of tasks listed for a user
+DEFAULT_LIMIT = 10
+
+# Maximum number of tasks kept in the index of a user
+INDEX_DEPTH = 50
+
+# Number of issues requested per page of the JQL search
+SEARCH_PAGE_SIZE = 50
+
+# Fields of the issues requested by the JQL search, everything the index needs
+SEARCH_FIELDS = "created,description"
+
+# Phrase of the summary of the questionnaire tasks, as built by `task.build_answers_issue`
+SUMMARY_PHRASE = "answered Questionnaire"
+
+# Patterns of the result level and the user email in the description of a questionnaire task
+LEVEL_PATTERN = re.compile(r"\*Result: ([^*\n]+)\*")
+EMAIL_PATTERN = re.compile(r"\*User Email:\* (\S+)")
+
+# Namedtuple 'Submission' for a questionnaire task of a user
+Submission = namedtuple(
+    "Submission",
+    [
+        "task_link",  # Slack link to the task, as formatted by `task.format_link`
+        "level",  # Result level of the submission, None if it could not be read from the task
+        "created",  # Creation date of the task, like '2026-10-17'
+    ]
+)
+
+# Namedtuple 'UserIndex' for the cached tasks of a user
+UserIndex = namedtuple(
+    "UserIndex",
+    [
+        "submissions",  # Tuple of the submissions, newest first
+        "complete",  # Whether the submissions were backfilled from JIRA, or only recorded since the last backfill
+    ]
+)
+
+# Global variable to store the submissions store
+STORE: typing.Union["SubmissionsStore", None] = None
+
+
+def parse_description(description: typing.Optional[str]) -> typing.Tuple[typing.Optional[str], typing.Optional[str]]:
+    """
+    Reads the user email and the result level from the description of a questionnaire task.
+
+    Args:
+        description (str): The description of the task.
+
+    Returns:
+        Tuple[str, str]: The lowercase email and the level, each None if not found.
+    """
+
+    email = EMAIL_PATTERN.search(description or "")
+    level = LEVEL_PATTERN.search(description or "")
+
+    return email.group(1).lower() if email else None, level.group(1).strip() if level else None
+
+
+def merge(newer: typing.Sequence[Submission], older: typing.Sequence[Submission]) -> typing.Tuple[Submission, ...]:
+    """
+    Merges two lists of submissions, newest first, keeping the first occurrence of every task up to the index depth.
+    """
+
+    seen = set()
+    merged = list()
+
+    for submission in list(newer) + list(older):
+        if submission.task_link not in seen:
+            seen.add(submission.task_link)
+            merged.append(submission)
+
+    return tuple(merged[:INDEX_DEPTH])
+
+
+def get_ttl() -> float:
+    return float(os.environ.get("BOT_SUBMISSIONS_TTL") or DEFAULT_INDEX_TTL)
+
+
+class SubmissionsStore:
+    """
+    Base class of the stores of the submissions index.
+    """
+
+    def get(self, email: str) -> typing.Union[UserIndex, None]:
+        """
+        Gets the index of a user, None or incomplete if there is none or it expired.
+        """
+
+        raise NotImplementedError
+
+    def add(self, email: str, submission: Submission):
+        """
+        Adds a recorded task to the index of a user, keeping whether the index is complete.
+        """
+
+        raise NotImplementedError
+
+    def complete(self, email: str, found: typing.Sequence[Submission]) -> typing.Tuple[Submission, ...]:
+        """
+        Saves the backfilled index of a user, keeping the tasks recorded meanwhile as JIRA search may not return them.
+
+        Args:
+            email (str): The lowercase email of the user.
+            found (Sequence[Submission]): The tasks found by the search, newest first.
+
+        Returns:
+            Tuple[Submission, ...]: The tasks of the user, newest first.
+        """
+
+        raise NotImplementedError
+
+
+class MemoryStore(SubmissionsStore):
+    """
+    A submissions store in the memory of the container, whose indexes expire after a time-to-live.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_INDEX_TTL, clock: typing.Callable[[], float] = time.monotonic):
+        self.index = cache.TTLCache(maxsize=INDEX_SIZE, ttl=ttl, clock=clock)
+        self._lock = threading.Lock()
+
+    def get(self, email: str) -> typing.Union[UserIndex, None]:
+        return self.index.get(email)
+
+    def add(self, email: str, submission: Submission):
+        with self._lock:
+            index = self.index.get(email)
+
+            if index is None:
+                self.index.set(email, UserIndex((submission,), False))
+            else:
+                self.index.set(email, UserIndex(merge([submission], index.submissions), index.complete))
+
+    def complete(self, email: str, found: typing.Sequence[Submission]) -> typing.Tuple[Submission, ...]:
+        with self._lock:
+            index = self.index.get(email)
+            submissions = merge(index.submissions if index is not None else (), found)
+            self.index.set(email, UserIndex(submissions, True))
+
+        return submissions
+
+
+class DynamoDBStore(SubmissionsStore):
+    """
+    A submissions store in a DynamoDB table with the string partition key 'pk', one item 'submissions:<email>' per
+    user with the tasks as a list of JSON strings ('tasks'), whether they were backfilled ('complete') and the
+    time the index expires ('expires_at'), after which it is backfilled again, or removed by the TTL of the table.
+    """
+
+    def __init__(
+            self,
+            table_name: str,
+            endpoint_url: typing.Union[str, None] = None,
+            region_name: typing.Union[str, None] = None,
+            ttl: float = DEFAULT_INDEX_TTL,
+            client: typing.Any = None,
+            clock: typing.Callable[[], float] = time.time
+    ):
+        self.table_name = table_name
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.ttl = ttl
+        self.client = client
+        self.clock = clock
+
+    def get_client(self) -> typing.Any:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client("dynamodb", endpoint_url=self.endpoint_url, region_name=self.region_name)
+
+        return self.client
+
+    def read(self, email: str) -> typing.Tuple[typing.Union[UserIndex, None], int]:
+        """
+        Reads the index of a user with a consistent read.
+
+        Returns:
+            Tuple[UserIndex, int]: The index, incomplete once it expired, None if there is none, and the number of
+                stored tasks.
+        """
+
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"submissions:{email}"}},
+            ConsistentRead=True,
+        ).get("Item")
+
+        if item is None:
+            return None, 0
+
+        tasks = [Submission(*json.loads(value["S"])) for value in item.get("tasks", dict()).get("L", list())]
+
+        # An expired index is backfilled again, keeping the tasks recorded since it expired
+        complete = item.get("complete", dict()).get("BOOL", False)
+        expired = int(item.get("expires_at", dict()).get("N", "0")) < int(self.clock())
+
+        return UserIndex(merge(tasks, ()), complete and not expired), len(tasks)
+
+    def get(self, email: str) -> typing.Union[UserIndex, None]:
+        return self.read(email)[0]
+
+    def add(self, email: str, submission: Submission):
+        # Prepended atomically, the duplicates and the tasks beyond the index depth are dropped by the reads
+        self.get_client().update_item(
+            TableName=self.table_name,
+            Key={"pk": {"S": f"submissions:{email}"}},
+            UpdateExpression=(
+                "SET tasks = list_append(:task, if_not_exists(tasks, :empty)), "
+                "complete = if_not_exists(complete, :false), expires_at = if_not_exists(expires_at, :expires_at)"
+            ),
+            ExpressionAttributeValues={
+                ":task": {"L": [{"S": json.dumps(list(submission))}]},
+                ":empty": {"L": []},
+                ":false": {"BOOL": False},
+                ":expires_at": {"N": str(int(self.clock() + self.ttl))},
+            },
+        )
+
+    def complete(self, email: str, found: typing.Sequence[Submission]) -> typing.Tuple[Submission, ...]:
+        index, stored = self.read(email)
+        submissions = merge(index.submissions if index is not None else (), found)
+
+        try:
+            # Only if no task was recorded since the read, a lookup after a concurrent record backfills again
+            self.get_client().put_item(
+                TableName=self.table_name,
+                Item={
+                    "pk": {"S": f"submissions:{email}"},
+                    "tasks": {"L": [{"S": json.dumps(list(submission))} for submission in submissions]},
+                    "complete": {"BOOL": True},
+                    "expires_at": {"N": str(int(self.clock() + self.ttl))},
+                },
+                ConditionExpression="attribute_not_exists(pk) OR size(tasks) = :stored",
+                ExpressionAttributeValues={":stored": {"N": str(stored)}},
+            )
+        except Exception as e:
+            error = getattr(e, "response", None) or dict()
+            if error.get("Error", dict()).get("Code") != "ConditionalCheckFailedException":
+                raise
+
+        return submissions
+
+
+def create_store(name: str) -> SubmissionsStore:
+    """
+    Creates a submissions store by name.
+
+    Args:
+        name (str): One of 'memory' or 'dynamodb'.
+
+    Returns:
+        SubmissionsStore: The submissions store.
+
+    Raises:
+        Exception: If the store name is unknown or the DynamoDB table is not configured.
+    """
+
+    if name == "memory":
+        return MemoryStore(get_ttl())
+
+    if name == "dynamodb":
+        table_name = os.environ.get("BOT_SUBMISSIONS_TABLE")
+        if not table_name:
+            raise Exception("BOT_SUBMISSIONS_TABLE must be set for the 'dynamodb' submissions store.")
+
+        return DynamoDBStore(table_name, endpoint_url=os.environ.get("BOT_SUBMISSIONS_ENDPOINT") or None, ttl=get_ttl())
+
+    raise Exception(f"Unknown submissions store '{name}'.")
+
+
+def get_store() -> SubmissionsStore:
+    """
+    Retrieves or initializes the global submissions store selected with `BOT_SUBMISSIONS_STORE`.
+
+    Returns:
+        SubmissionsStore: The submissions store.
+    """
+
+    global STORE
+
+    if STORE is None:
+        STORE = create_store(os.environ.get("BOT_SUBMISSIONS_STORE") or "memory")
+
+    return STORE
+
+
+def record(issue_dict: typing.Dict, task_link: str, created: typing.Union[str, None] = None):
+    """
+    Records a task created for a submission in the index of its user.
+
+    Args:
+        issue_dict (dict): The issue dictionary of the task, as built by `task.build_answers_issue`.
+        task_link (str): The link to the created task.
+        created (str): Creation date of the task. Today if None.
+    """
+
+    email, level = parse_description(issue_dict.get("description"))
+
+    if email is None:
+        return
+
+    # An incomplete index is backfilled on the next lookup and keeps the recorded tasks, which JIRA search
+    # may not return yet
+    get_store().add(email, Submission(task_link, level, created or time.strftime("%Y-%m-%d", time.gmtime())))
+
+
+def build_jql(email: str, project_key: str) -> str:
+    """
+    Builds the JQL query of the questionnaire tasks of a user, newest first.
+    """
+
+    def quote(phrase: str) -> str:
+        # A phrase search, quoted for the text search inside the quoted JQL string
+        escaped = phrase.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"\\"{escaped}\\""'
+
+    return (
+        f'project = "{project_key}" AND summary ~ {quote(SUMMARY_PHRASE)} '
+        f'AND description ~ {quote(email)} ORDER BY created DESC'
+    )
+
+
+def search(email: str, limit: int) -> typing.List[Submission]:
+    """
+    Searches JIRA for the questionnaire tasks of a user, page by page.
+
+    Args:
+        email (str): The lowercase email of the user.
+        limit (int): Maximum number of tasks to return.
+
+    Returns:
+        List[Submission]: The tasks of the user, newest first.
+    """
+
+    # Local import, the task module records the tasks it creates in this index
+    from jira_app import task
+
+    jql = build_jql(email, secrets.BotSecrets.get(secrets.BotSecrets.JIRA_PROJECT_KEY))
+    found: typing.List[Submission] = list()
+    start = 0
+
+    while len(found) < limit:
+        with metrics.timer("JiraSearchIssues"):
+            page = transport.call(
+                client.get_jira().search_issues,
+                jql,
+                startAt=start,
+                maxResults=min(SEARCH_PAGE_SIZE, limit - len(found)),
+                fields=SEARCH_FIELDS,
+                validate_query=False,
+            )
+
+        for issue in page:
+            issue_email, level = parse_description(issue.fields.description)
+
+            # The text search also matches emails containing the one searched for
+            if issue_email == email:
+                found.append(Submission(task.format_link(issue), level, (issue.fields.created or "")[:10]))
+
+        start += len(page)
+
+        if not page or start >= page.total:
+            break
+
+    return found[:limit]
+
+
+def get_submissions(email: str, limit: int = DEFAULT_LIMIT) -> typing.List[Submission]:
+    """
+    Retrieves the questionnaire tasks of a user, from the index when it is complete.
+
+    Args:
+        email (str): The email of the user.
+        limit (int): Maximum number of tasks to return.
+
+    Returns:
+        List[Submission]: The tasks of the user, newest first.
+    """
+
+    email = email.lower()
+    index = get_store().get(email)
+
+    if index is not None and index.complete:
+        metrics.increment("SubmissionsIndexHit")
+        return list(index.submissions[:limit])
+
+    metrics.increment("SubmissionsIndexMiss")
+
+    # Tasks recorded meanwhile are kept, JIRA search may not return them yet
+    return list(get_store().complete(email, search(email, INDEX_DEPTH))[:limit])
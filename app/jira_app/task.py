@@ -1,19 +1,21 @@
 """
 This script contains functions to create and manage tasks in JIRA. It allows for the creation of new tasks
-in a JIRA project and includes a function specifically designed to save user responses from a Slack application
-as tasks in JIRA. The script uses a JIRA client from the jira_app module and integrates with the common parser
-and secrets modules for handling user data and configuration settings.
+in a JIRA project, one at a time or in bulk, and includes a function specifically designed to save user responses
+from a Slack application as tasks in JIRA. The script uses a JIRA client from the jira_app module and integrates
+with the common parser and secrets modules for handling user data and configuration settings.
+The tasks saved for users are recorded in the per-user index of the `submissions` module, and their users in the
+submitted log of the questionnaire kept by the `roster` module for the reminders.
 """
 
 import typing
 
-from jira_app import client
-from common import parser, secrets
+from jira_app import client, submissions, transport
+from common import metrics, parser, roster, secrets
 
 
-def create(summary, description, project_key, issue_type="Task"):
+def build_issue(summary, description, project_key, issue_type="Task") -> typing.Dict:
     """
-    Creates a task in JIRA.
+    Builds the fields of a JIRA task.
 
     Args:
         summary (str): Summary of the task.
@@ -22,34 +24,113 @@ def create(summary, description, project_key, issue_type="Task"):
         issue_type (str): Type of the issue. Defaults to 'Task'.
 
     Returns:
-        str: The issue key of the created task.
+        dict: The issue dictionary with project key, summary, description, and issue type.
     """
 
-    # Define the issue dictionary with project key, summary, description, and issue type
-    issue_dict = {
+    return {
         'project': {'key': project_key},
         'summary': summary,
         'description': description,
         'issuetype': {'name': issue_type},
     }
 
+
+def format_link(issue) -> str:
+    """
+    Formats a Slack link to a JIRA issue.
+
+    Args:
+        issue: The JIRA issue resource.
+
+    Returns:
+        str: The link and key of the issue.
+    """
+
+    return f"<{issue.self}|{issue.key}>"
+
+
+def create(summary, description, project_key, issue_type="Task"):
+    """
+    Creates a task in JIRA.
+
+    Args:
+        summary (str): Summary of the task.
+        description (str): Description of the task.
+        project_key (str): Key of the JIRA project.
+        issue_type (str): Type of the issue. Defaults to 'Task'.
+
+    Returns:
+        str: The issue key of the created task.
+    """
+
+    # Define the issue dictionary with project key, summary, description, and issue type
+    issue_dict = build_issue(summary, description, project_key, issue_type)
+
     # Create a new issue in JIRA using the JIRA client and the defined issue dictionary
-    new_issue = client.get_jira().create_issue(fields=issue_dict, prefetch=False)
+    try:
+        with metrics.timer("JiraCreateIssue"):
+            new_issue = transport.call(
+                client.get_jira().create_issue, fields=issue_dict, prefetch=False, idempotent=False
+            )
+    except Exception as e:
+        if getattr(e, "status_code", None) != 401:
+            raise
+
+        # The API token may have been rotated, reload the secrets and retry once with a rebuilt client
+        metrics.increment("JiraAuthRefresh")
+        secrets.refresh_secrets()
+        client.reset_jira()
+
+        with metrics.timer("JiraCreateIssue"):
+            new_issue = transport.call(
+                client.get_jira().create_issue, fields=issue_dict, prefetch=False, idempotent=False
+            )
 
     # Return the link and key of the newly created issue
-    return f"<{new_issue.self}|{new_issue.key}>"
+    return format_link(new_issue)
 
 
-def save_answers(result: str, user: typing.Dict) -> str:
+def create_many(issue_dicts: typing.List[typing.Dict]) -> typing.List[typing.Tuple[typing.Optional[str], typing.Optional[str]]]:
     """
-    Saves the answers from a user as a task in JIRA.
+    Creates several tasks in JIRA with a single request to the bulk create endpoint.
+
+    Args:
+        issue_dicts (List[dict]): The issue dictionaries of the tasks, as built by `build_issue`.
+
+    Returns:
+        List[Tuple[str, str]]: A tuple of (Task Link, Error) for every issue dictionary, in the same order.
+        The task link is None if the task could not be created and the error is None if it was.
+    """
+
+    if not issue_dicts:
+        return list()
+
+    # A failure of the whole request fails every task of the batch
+    try:
+        with metrics.timer("JiraCreateIssues"):
+            created = transport.call(
+                client.get_jira().create_issues, field_list=issue_dicts, prefetch=False, idempotent=False
+            )
+    except Exception as e:
+        return [(None, str(e))] * len(issue_dicts)
+
+    # JIRA reports the outcome of every task separately, in the order of the request
+    return [
+        (format_link(item["issue"]), None) if item["status"] == "Success" else (None, str(item["error"]))
+        for item in created
+    ]
+
+
+def build_answers_issue(result: str, user: typing.Dict) -> typing.Dict:
+    """
+    Builds the fields of the JIRA task saving the answers from a user.
 
     Args:
         result (str): The formatted result string to be saved in JIRA.
         user (dict): A dictionary containing user information.
 
     Returns:
-        str: The issue key of the task created in JIRA.
+        dict: The issue dictionary of the task.
     """
 
     # Extract the username and email from the user dictionary
@@ -69,5 +150,31 @@ def save_answers(result: str, user: typing.Dict) -> str:
     # Retrieve the project key from bot secrets
     project_key = secrets.BotSecrets.get(secrets.BotSecrets.JIRA_PROJECT_KEY)
 
-    # Create the task in JIRA and return the issue key
-    return create(summary, description, project_key)
+    return build_issue(summary, description, project_key)
+
+
+def save_answers(result: str, user: typing.Dict, questionnaire_id: typing.Union[str, None] = None) -> str:
+    """
+    Saves the answers from a user as a task in JIRA.
+
+    Args:
+        result (str): The formatted result string to be saved in JIRA.
+        user (dict): A dictionary containing user information.
+        questionnaire_id (str): The ID of the answered questionnaire, recorded in the roster of its submitters.
+
+    Returns:
+        str: The issue key of the task created in JIRA.
+    """
+
+    issue_dict = build_answers_issue(result, user)
+
+    # Create the task in JIRA
+    task_link = create(issue_dict["summary"], issue_dict["description"], issue_dict["project"]["key"])
+
+    # Record the task in the index of the user, so listing their submissions does not search JIRA
+    submissions.record(issue_dict, task_link)
+
+    # Record the user as a submitter of the questionnaire, so the reminders skip them
+    roster.record_submission(questionnaire_id, user)
+
+    return task_link
@@ -0,0 +1,403 @@
+"""
+This script provides the resilient transport layer of the JIRA client. It configures the HTTP session of the
+client with explicit connect/read timeouts and a tuned connection pool, and wraps JIRA calls with a jittered
+exponential retry for rate limiting (429) and server errors (5xx) that honors the Retry-After header. The calls
+creating tasks are not idempotent, so they are only retried when JIRA cannot have processed them: on a 429 or a
+503, or when the connection could not be established. A circuit breaker fails calls fast while JIRA is
+unavailable, letting a single trial call through once it recovers, so a JIRA outage degrades the bot gracefully
+instead of holding every Lambda invocation until the function timeout. The settings are read from environment variables.
+`requests` is imported lazily, together with the JIRA client it belongs to.
+"""
+
+import os
+import random
+import threading
+import time
+import typing
+from collections import namedtuple
+
+from common import metrics
+
+if typing.TYPE_CHECKING:
+    import requests
+
+
+# Namedtuple 'TransportConfig' with the settings of the JIRA transport
+TransportConfig = namedtuple(
+    "TransportConfig",
+    [
+        "connect_timeout",  # Seconds to wait for a connection to JIRA
+        "read_timeout",  # Seconds to wait for a JIRA response
+        "pool_size",  # Number of pooled connections kept to JIRA
+        "max_retries",  # Number of retries of a failed call
+        "backoff_base",  # Seconds of the first retry delay, doubled for every retry
+        "backoff_max",  # Maximum seconds of a retry delay, longer Retry-After values are not waited for
+        "failure_threshold",  # Number of consecutive failures opening the circuit
+        "reset_timeout",  # Seconds the circuit stays open before a trial call is let through
+    ],
+    defaults=[3.05, 5.0, 10, 2, 0.25, 2.0, 5, 30.0]
+)
+
+# Mapping of environment variables to the settings they override
+CONFIG_ENVIRONMENT = {
+    "JIRA_CONNECT_TIMEOUT": "connect_timeout",
+    "JIRA_READ_TIMEOUT": "read_timeout",
+    "JIRA_POOL_SIZE": "pool_size",
+    "JIRA_MAX_RETRIES": "max_retries",
+    "JIRA_BACKOFF_BASE": "backoff_base",
+    "JIRA_BACKOFF_MAX": "backoff_max",
+    "JIRA_BREAKER_FAILURE_THRESHOLD": "failure_threshold",
+    "JIRA_BREAKER_RESET_TIMEOUT": "reset_timeout",
+}
+
+# HTTP status codes of JIRA responses worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# HTTP status codes of JIRA responses worth retrying for non-idempotent calls, as JIRA rejected the request
+# without processing it, while a proxy answering 502 or 504 may have let JIRA create the task
+REJECTED_STATUS_CODES = {429, 503}
+
+# Global circuit breaker guarding all JIRA calls of the container
+BREAKER: typing.Union["CircuitBreaker", None] = None
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a JIRA call is rejected because the circuit breaker is open.
+    """
+
+
+def get_config() -> TransportConfig:
+    """
+    Reads the transport settings, overriding the defaults with the environment variables that are set.
+
+    Returns:
+        TransportConfig: The transport settings.
+    """
+
+    defaults = TransportConfig()
+    overrides = dict()
+
+    for variable, field in CONFIG_ENVIRONMENT.items():
+        value = os.environ.get(variable)
+
+        # Keep the type of the default value, e.g. integers for the pool size
+        if value:
+            overrides[field] = type(getattr(defaults, field))(value)
+
+    return defaults._replace(**overrides)
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker with closed, open and half-open states.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: typing.Callable[[], float] = time.monotonic):
+        """
+        Initializes a closed circuit breaker.
+
+        Args:
+            failure_threshold (int): Number of consecutive failures opening the circuit.
+            reset_timeout (float): Seconds the circuit stays open before a trial call is let through.
+            clock (Callable): Function returning the current time in seconds.
+        """
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.failures = 0
+        self.opened_at: typing.Union[float, None] = None
+        self.probe_started: typing.Union[float, None] = None
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Returns the current state of the circuit.
+
+        Returns:
+            str: 'closed', 'open' or 'half_open'.
+        """
+
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+
+        return self.OPEN
+
+    def before_call(self):
+        """
+        Checks whether a call may go through. In the half-open state a single trial call is let through, until its
+        outcome is recorded or it takes longer than the reset timeout.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a trial call in flight.
+        """
+
+        with self._lock:
+            state = self._state()
+
+            if state == self.HALF_OPEN:
+                now = self.clock()
+
+                if self.probe_started is None or now - self.probe_started >= self.reset_timeout:
+                    self.probe_started = now
+                    return
+
+            if state != self.CLOSED:
+                self.rejected += 1
+                raise CircuitOpenError("JIRA circuit breaker is open")
+
+    def record_success(self):
+        """
+        Closes the circuit after a successful call.
+        """
+
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+
+    def record_failure(self):
+        """
+        Counts a failed call, opening the circuit once the threshold is reached or a trial call failed.
+        """
+
+        with self._lock:
+            self.failures += 1
+
+            if self._state() == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+            self.probe_started = None
+
+    def snapshot(self) -> typing.Dict:
+        """
+        Returns the state and counters of the circuit breaker, for reports and metrics.
+
+        Returns:
+            dict: The state, the consecutive failures and the number of rejected calls.
+        """
+
+        with self._lock:
+            return {"state": self._state(), "failures": self.failures, "rejected": self.rejected}
+
+
+def get_breaker() -> CircuitBreaker:
+    """
+    Retrieves or initializes the global circuit breaker guarding the JIRA calls.
+
+    Returns:
+        CircuitBreaker: The circuit breaker.
+    """
+
+    global BREAKER
+
+    if BREAKER is None:
+        config = get_config()
+        BREAKER = CircuitBreaker(config.failure_threshold, config.reset_timeout)
+
+    return BREAKER
+
+
+def configure_session(session: "requests.Session", config: TransportConfig):
+    """
+    Mounts a connection pool sized from the transport settings on the HTTP session of the JIRA client.
+
+    Args:
+        session (requests.Session): The HTTP session of the JIRA client.
+        config (TransportConfig): The transport settings.
+    """
+
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=config.pool_size, pool_maxsize=config.pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def is_unhealthy(error: Exception) -> bool:
+    """
+    Checks whether a failed JIRA call indicates that JIRA is unavailable.
+
+    Args:
+        error (Exception): The error raised by the call.
+
+    Returns:
+        bool: True for connection errors, timeouts, rate limiting and server errors.
+    """
+
+    import requests
+
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def is_connect_error(error: Exception) -> bool:
+    """
+    Checks whether a failed JIRA call never reached JIRA, as the connection could not be established.
+
+    Args:
+        error (Exception): The error raised by the call.
+
+    Returns:
+        bool: True for connect timeouts, refused connections and failed name resolutions.
+    """
+
+    import requests
+    from urllib3 import exceptions
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+
+    # requests wraps the error of urllib3, whose reason tells the connect phase from a reset connection
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, exceptions.ConnectTimeoutError)
+
+
+def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+    """
+    Checks whether a failed JIRA call is worth retrying.
+
+    Read timeouts are never retried, because JIRA may have processed the request and a retry
+    would create a duplicate task. Non-idempotent calls, creating tasks, are only retried when
+    JIRA rejected them (429, 503) or was not reached.
+
+    Args:
+        error (Exception): The error raised by the call.
+        idempotent (bool): Whether the call can be repeated without side effects.
+
+    Returns:
+        bool: True if the call failed because JIRA is unavailable and can safely be repeated.
+    """
+
+    import requests
+
+    if not is_unhealthy(error) or isinstance(error, requests.ReadTimeout):
+        return False
+
+    if idempotent:
+        return True
+
+    return getattr(error, "status_code", None) in REJECTED_STATUS_CODES or is_connect_error(error)
+
+
+def get_retry_after(error: Exception) -> typing.Union[float, None]:
+    """
+    Reads the number of seconds to wait from the Retry-After header of a failed JIRA response.
+
+    Args:
+        error (Exception): The error raised by the call.
+
+    Returns:
+        float: The number of seconds to wait, or None if the header is missing or not a number.
+    """
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or dict()
+
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_backoff_delay(attempt: int, config: TransportConfig, retry_after: typing.Union[float, None] = None) -> float:
+    """
+    Computes the delay before a retry using exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Number of the retry, starting at zero.
+        config (TransportConfig): The transport settings.
+        retry_after (float): Seconds requested by the Retry-After header, if any.
+
+    Returns:
+        float: The number of seconds to wait before the retry.
+    """
+
+    delay = random.uniform(0, min(config.backoff_max, config.backoff_base * 2 ** attempt))
+
+    # Never retry earlier than JIRA asked for
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+
+    return delay
+
+
+def call(
+        function: typing.Callable,
+        *args,
+        config: typing.Union[TransportConfig, None] = None,
+        breaker: typing.Union[CircuitBreaker, None] = None,
+        sleep: typing.Callable[[float], None] = time.sleep,
+        idempotent: bool = True,
+        **kwargs
+) -> typing.Any:
+    """
+    Calls a JIRA client function through the circuit breaker, retrying retryable failures.
+
+    Args:
+        function (Callable): The JIRA client function to call.
+        *args: Positional arguments of the function.
+        config (TransportConfig): The transport settings. Read from the environment if None.
+        breaker (CircuitBreaker): The circuit breaker. The global circuit breaker if None.
+        sleep (Callable): Function waiting the given number of seconds.
+        idempotent (bool): Whether the call can be repeated without side effects. False for the calls creating tasks.
+        **kwargs: Keyword arguments of the function.
+
+    Returns:
+        Any: The result of the function.
+
+    Raises:
+        CircuitOpenError: If the circuit breaker is open.
+        Exception: The error of the last attempt if all attempts failed.
+    """
+
+    config = config or get_config()
+    breaker = breaker or get_breaker()
+
+    attempt = 0
+
+    while True:
+        breaker.before_call()
+
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            # Client errors, e.g. invalid fields, show that JIRA answers, which ends a trial call
+            if not is_unhealthy(e):
+                breaker.record_success()
+                raise
+
+            breaker.record_failure()
+
+            retry_after = get_retry_after(e)
+
+            # Give up when out of retries or when JIRA asks to wait longer than we can afford
+            if not is_retryable(e, idempotent) or attempt >= config.max_retries or \
+                    (retry_after is not None and retry_after > config.backoff_max):
+                raise
+
+            metrics.increment("JiraRetries")
+            sleep(get_backoff_delay(attempt, config, retry_after))
+            attempt += 1
+            continue
+
+        breaker.record_success()
+        return result
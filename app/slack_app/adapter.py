@@ -0,0 +1,222 @@
+"""
+This script adapts the Slack app to AWS Lambda. It mirrors the request handling of
+`slack_bolt.adapter.aws_lambda.SlackRequestHandler`, whose package imports boto3 at module load
+for its lazy listener runner. Here the runner imports boto3 only when a lazy listener is actually
+started, so slash commands that only open a modal do not pay for boto3 on a cold start. The Lambda client
+is created once per container and reused by every request handler. The asynchronous execution mode uses the
+request handler of the `async_adapter` module, which shares the helpers below. A modal submission whose lazy
+listener could not be started is not kept claimed, so the retry of Slack processes it instead of being skipped.
+"""
+
+import base64
+import json
+import typing
+
+from slack_bolt import App, BoltRequest, BoltResponse
+from slack_bolt.lazy_listener import LazyListenerRunner
+
+from common import idempotency
+
+if typing.TYPE_CHECKING:
+    from slack_bolt.request.async_request import AsyncBoltRequest
+
+
+# Global variable to store the Lambda client used to start lazy listeners
+LAMBDA_CLIENT: typing.Any = None
+
+
+def get_lambda_client() -> typing.Any:
+    """
+    Retrieves or initializes the global Lambda client.
+
+    Returns:
+        The boto3 Lambda client.
+    """
+
+    global LAMBDA_CLIENT
+
+    # Imported lazily as boto3 is one of the most expensive imports of the cold start
+    if LAMBDA_CLIENT is None:
+        import boto3
+
+        LAMBDA_CLIENT = boto3.client("lambda")
+
+    return LAMBDA_CLIENT
+
+
+class LambdaLazyListenerRunner(LazyListenerRunner):
+    """
+    Runs lazy listeners by asynchronously invoking the same Lambda function, like Bolt's own runner.
+    """
+
+    def __init__(self, logger, lambda_client: typing.Any = None):
+        self.logger = logger
+        self.lambda_client = lambda_client
+
+    def start(self, function: typing.Callable[..., None], request: BoltRequest) -> None:
+        invoke_lazy_listener(self.lambda_client or get_lambda_client(), self.logger, request)
+
+
+def invoke_lazy_listener(lambda_client: typing.Any, logger, request: typing.Union[BoltRequest, "AsyncBoltRequest"]):
+    """
+    Starts a lazy listener with an asynchronous invocation of the same function, marked to only run the listener.
+
+    Args:
+        lambda_client: Client used to invoke the function.
+        logger: Logger of the Slack app.
+        request: The Bolt request of the lazy listener.
+    """
+
+    # Mark the event so the next invocation only runs the lazy listener
+    event: typing.Dict = request.context["lambda_request"]
+    headers = event["headers"]
+    headers["x-slack-bolt-lazy-only"] = "1"
+    headers["x-slack-bolt-lazy-function-name"] = request.lazy_function_name
+    event["method"] = "NONE"
+
+    try:
+        invocation = lambda_client.invoke(
+            FunctionName=request.context["aws_lambda_invoked_function_arn"],
+            InvocationType="Event",
+            Payload=json.dumps(event),
+        )
+    except Exception:
+        # The submission was claimed on its acknowledgement, but nothing will process it
+        body = request.body if isinstance(request.body, dict) else dict()
+        key = idempotency.submission_key(body) if body.get("type") == "view_submission" else None
+
+        if key is not None:
+            idempotency.get_store().forget(key)
+
+        raise
+
+    logger.info(invocation)
+
+
+class LambdaRequestHandler:
+    """
+    Dispatches API Gateway events of AWS Lambda to the Slack app.
+    """
+
+    def __init__(self, app: App, lambda_client: typing.Any = None):
+        """
+        Initializes the handler and installs the Lambda lazy listener runner on the Slack app.
+
+        Args:
+            app (App): The Slack app.
+            lambda_client: Client used to invoke lazy listeners. The global Lambda client if None.
+        """
+
+        self.app = app
+        self.app.listener_runner.lazy_listener_runner = LambdaLazyListenerRunner(app.logger, lambda_client)
+
+    def handle(self, event: typing.Dict, context) -> typing.Dict:
+        """
+        Dispatches an API Gateway event to the Slack app.
+
+        Args:
+            event: AWS Lambda event object.
+            context: AWS Lambda context object.
+
+        Returns:
+            dict: The API Gateway response.
+        """
+
+        method = get_method(event)
+
+        if method == "POST":
+            bolt_request = to_bolt_request(event)
+            bolt_request.context["aws_lambda_function_name"] = context.function_name
+            bolt_request.context["aws_lambda_invoked_function_arn"] = context.invoked_function_arn
+            bolt_request.context["lambda_request"] = event
+            return to_aws_response(self.app.dispatch(bolt_request))
+
+        if method == "NONE":
+            return to_aws_response(self.app.dispatch(to_bolt_request(event)))
+
+        return {"statusCode": 404, "body": "Not Found", "headers": {}}
+
+
+def get_method(event: typing.Dict) -> typing.Union[str, None]:
+    """
+    Reads the HTTP method of an API Gateway event, in the payload format v2 or v1.
+
+    Args:
+        event (dict): AWS Lambda event object.
+
+    Returns:
+        str: The HTTP method, or None if the event has none.
+    """
+
+    method = event.get("requestContext", {}).get("http", {}).get("method")
+    if method is None:
+        method = event.get("requestContext", {}).get("httpMethod")
+
+    return method
+
+
+def to_bolt_request(event: typing.Dict) -> BoltRequest:
+    """
+    Converts an API Gateway event to a Bolt request.
+
+    Args:
+        event (dict): AWS Lambda event object.
+
+    Returns:
+        BoltRequest: The Bolt request.
+    """
+
+    return BoltRequest(**parse_event(event))
+
+
+def parse_event(event: typing.Dict) -> typing.Dict:
+    """
+    Reads the body, query and headers of an API Gateway event.
+
+    Args:
+        event (dict): AWS Lambda event object.
+
+    Returns:
+        dict: The keyword arguments of a Bolt request.
+    """
+
+    body = get_body(event)
+
+    # Cookies are a list in the payload format v2 and a multi-value header in v1
+    cookies = event.get("cookies") or event.get("multiValueHeaders", {}).get("cookie", [])
+
+    headers = event.get("headers", {})
+    headers["cookie"] = cookies
+
+    return {"body": body, "query": event.get("queryStringParameters", {}), "headers": headers}
+
+
+def get_body(event: typing.Dict) -> str:
+    """
+    Reads the raw body of an API Gateway event, decoding a base64 encoded one.
+    """
+
+    body = event.get("body") or ""
+
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode("utf-8")
+
+    return body
+
+
+def to_aws_response(response: BoltResponse) -> typing.Dict:
+    """
+    Converts a Bolt response to an API Gateway response.
+
+    Args:
+        response (BoltResponse): The Bolt response.
+
+    Returns:
+        dict: The API Gateway response.
+    """
+
+    return {
+        "statusCode": response.status,
+        "body": response.body,
+        "headers": response.first_headers(),
+    }
@@ -0,0 +1,93 @@
+"""
+This script adapts the asynchronous Slack app (`slack_bolt.async_app.AsyncApp`) to AWS Lambda. Like the
+`adapter` module of the synchronous app, it dispatches API Gateway events to the app and runs lazy listeners
+with an asynchronous invocation of the same function. Requests are dispatched on the event loop kept by the
+`async_bot` module for the lifetime of the container. It is only imported in the asynchronous execution mode,
+as the asynchronous Bolt classes import aiohttp.
+"""
+
+import typing
+
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.lazy_listener.async_internals import to_runnable_function
+from slack_bolt.lazy_listener.async_runner import AsyncLazyListenerRunner
+from slack_bolt.request.async_request import AsyncBoltRequest
+
+from slack_app import adapter, async_bot
+
+
+class AsyncLambdaLazyListenerRunner(AsyncLazyListenerRunner):
+    """
+    Runs lazy listeners of the asynchronous Slack app by asynchronously invoking the same Lambda function.
+
+    The invocation is sent before the response is returned, as the Lambda environment is frozen afterwards.
+    """
+
+    def __init__(self, logger, lambda_client: typing.Any = None):
+        self.logger = logger
+        self.lambda_client = lambda_client
+
+    def start(self, function: typing.Callable[..., typing.Awaitable[None]], request: AsyncBoltRequest) -> None:
+        adapter.invoke_lazy_listener(self.lambda_client or adapter.get_lambda_client(), self.logger, request)
+
+    async def run(self, function: typing.Callable[..., typing.Awaitable[None]], request: AsyncBoltRequest) -> None:
+        # `to_runnable_function` already runs the function, the base implementation would call its result again
+        await to_runnable_function(internal_func=function, logger=self.logger, request=request)
+
+
+class AsyncLambdaRequestHandler:
+    """
+    Dispatches API Gateway events of AWS Lambda to the asynchronous Slack app.
+    """
+
+    def __init__(self, app: AsyncApp, lambda_client: typing.Any = None):
+        """
+        Initializes the handler and installs the Lambda lazy listener runner on the Slack app.
+
+        Args:
+            app (AsyncApp): The asynchronous Slack app.
+            lambda_client: Client used to invoke lazy listeners. The global Lambda client if None.
+        """
+
+        self.app = app
+        self.app.listener_runner.lazy_listener_runner = AsyncLambdaLazyListenerRunner(app.logger, lambda_client)
+
+    def handle(self, event: typing.Dict, context) -> typing.Dict:
+        """
+        Dispatches an API Gateway event to the asynchronous Slack app on the event loop of the container.
+
+        Args:
+            event: AWS Lambda event object.
+            context: AWS Lambda context object.
+
+        Returns:
+            dict: The API Gateway response.
+        """
+
+        method = adapter.get_method(event)
+
+        if method == "POST":
+            bolt_request = to_async_bolt_request(event)
+            bolt_request.context["aws_lambda_function_name"] = context.function_name
+            bolt_request.context["aws_lambda_invoked_function_arn"] = context.invoked_function_arn
+            bolt_request.context["lambda_request"] = event
+            return adapter.to_aws_response(async_bot.run(self.app.async_dispatch(bolt_request)))
+
+        if method == "NONE":
+            return adapter.to_aws_response(async_bot.run(self.app.async_dispatch(to_async_bolt_request(event))))
+
+        return {"statusCode": 404, "body": "Not Found", "headers": {}}
+
+
+def to_async_bolt_request(event: typing.Dict) -> AsyncBoltRequest:
+    """
+    Converts an API Gateway event to an asynchronous Bolt request.
+
+    Args:
+        event (dict): AWS Lambda event object.
+
+    Returns:
+        AsyncBoltRequest: The asynchronous Bolt request.
+    """
+
+    return AsyncBoltRequest(**adapter.parse_event(event))
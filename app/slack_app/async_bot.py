@@ -0,0 +1,185 @@
+"""
+This script initializes the Slack app of the asynchronous execution mode, selected with `BOT_EXECUTION_MODE=async`.
+It is the `slack_bolt.async_app.AsyncApp` counterpart of the `bot` module, with the same listeners implemented
+as coroutines in `modal.async_handlers`, so independent calls of a submission overlap instead of running serially.
+The app is driven by a single event loop running in a background thread for the lifetime of the container,
+which keeps the aiohttp session of the async Slack WebClient, and its connections, open across invocations.
+Like the synchronous app, it is rebuilt when the secrets are rotated, and serves every installed workspace when
+an installation store is enabled, and shapes its Web API calls to the rate limits of Slack.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import typing
+
+import aiohttp
+from slack_bolt.async_app import AsyncApp
+
+from common import secrets
+from slack_app import async_throttle, broadcast, commands, installations
+from slack_app.modal import async_handlers
+from slack_app.questions import registry
+
+
+# Global variable for the asynchronous Slack app, initialized as None and set when `get_async_slack_app` is called
+ASYNC_SLACK_APP: typing.Union[AsyncApp, None] = None
+
+# Global variable for the aiohttp session shared by the Slack WebClients of the container
+SESSION: typing.Union[aiohttp.ClientSession, None] = None
+
+# Global variables for the event loop of the container and the thread running it
+LOOP: typing.Union[asyncio.AbstractEventLoop, None] = None
+LOOP_THREAD: typing.Union[threading.Thread, None] = None
+
+# Lock guarding the creation of the event loop
+LOOP_LOCK = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Retrieves or starts the event loop of the container, running in a daemon thread.
+
+    Returns:
+        AbstractEventLoop: The running event loop.
+    """
+
+    global LOOP, LOOP_THREAD
+
+    with LOOP_LOCK:
+        if LOOP is None or LOOP.is_closed():
+            LOOP = asyncio.new_event_loop()
+            LOOP_THREAD = threading.Thread(target=LOOP.run_forever, name="async-bot-loop", daemon=True)
+            LOOP_THREAD.start()
+
+    return LOOP
+
+
+def run(coroutine: typing.Awaitable) -> typing.Any:
+    """
+    Runs a coroutine on the event loop of the container and waits for its result.
+
+    Args:
+        coroutine (Awaitable): The coroutine to run.
+
+    Returns:
+        Any: The result of the coroutine.
+
+    Raises:
+        Exception: If called from the event loop itself, which would deadlock.
+    """
+
+    loop = get_event_loop()
+
+    if threading.current_thread() is LOOP_THREAD:
+        raise Exception("Cannot wait for a coroutine from the event loop it runs on.")
+
+    future: concurrent.futures.Future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    return future.result()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Retrieves or creates the aiohttp session of the container. Must be called on the event loop.
+
+    Returns:
+        ClientSession: The aiohttp session.
+    """
+
+    global SESSION
+
+    if SESSION is None or SESSION.closed:
+        SESSION = aiohttp.ClientSession()
+
+    return SESSION
+
+
+async def create_async_slack_app(token: str, signing_secret: str, slash_command: str) -> AsyncApp:
+    """
+    Creates the asynchronous Slack app on the event loop, which the aiohttp session is bound to.
+
+    Args:
+        token (str): The bot token, None to authorize every request with the installation of its workspace.
+        signing_secret (str): The signing secret of the Slack app.
+        slash_command (str): The slash command opening the modal.
+
+    Returns:
+        AsyncApp: The asynchronous Slack app.
+    """
+
+    # `SLACK_API_URL` points the Web API client to a local stand-in of Slack, e.g. for benchmarks
+    app = AsyncApp(
+        client=async_throttle.AsyncRateLimitedWebClient(
+            token=token,
+            base_url=os.environ.get("SLACK_API_URL") or async_throttle.AsyncRateLimitedWebClient.BASE_URL,
+            session=get_session()
+        ),
+        signing_secret=signing_secret,
+        authorize=installations.authorize_async if token is None else None,
+        process_before_response=True
+    )
+
+    # Shape the Web API calls of the listeners to the rate limits of Slack
+    app.middleware(async_throttle.rate_limit_client)
+    # Acknowledge duplicate deliveries of modal submissions before any listener runs
+    app.middleware(async_handlers.skip_duplicate_submission)
+
+    # Register the handler of the deferred subcommands first, acknowledging instantly and answering lazily
+    app.command(slash_command, matchers=[commands.is_deferred_async])(
+        ack=commands.ack_deferred_command_async,
+        lazy=[commands.answer_deferred_command_async]
+    )
+    # Register the slash command handler, opening the modal or answering a subcommand
+    app.command(slash_command)(commands.handle_command_async)
+    # Forget the installation of a workspace whose bot token is no longer valid
+    if token is None:
+        app.event("app_uninstalled")(installations.handle_app_uninstalled_async)
+        app.event("tokens_revoked")(installations.handle_tokens_revoked_async)
+    # Register the handler of the "Start questionnaire" button of the broadcast messages
+    app.action(broadcast.START_ACTION_ID)(async_handlers.handle_start_button)
+    # Register the modal submission handler of every questionnaire, acknowledging instantly and processing lazily
+    app.view(registry.CALLBACK_ID_PATTERN)(
+        ack=async_handlers.ack_modal_submission,
+        lazy=[async_handlers.handle_modal_submission]
+    )
+
+    return app
+
+
+def get_async_slack_app() -> AsyncApp:
+    """
+    Retrieves or initializes the asynchronous Slack app.
+
+    Returns:
+        AsyncApp: The asynchronous Slack app.
+    """
+
+    global ASYNC_SLACK_APP
+
+    if ASYNC_SLACK_APP is None:
+        ASYNC_SLACK_APP = run(create_async_slack_app(
+            token=None if installations.is_enabled() else secrets.BotSecrets.get(secrets.BotSecrets.SLACK_BOT_TOKEN),
+            signing_secret=secrets.BotSecrets.get(secrets.BotSecrets.SLACK_SIGNING_SECRET),
+            slash_command=secrets.BotSecrets.get(secrets.BotSecrets.SLACK_SLASH_COMMAND)
+        ))
+
+    return ASYNC_SLACK_APP
+
+
+def reset_async_slack_app():
+    """
+    Drops the asynchronous Slack app so that it is rebuilt with the current secrets on next use,
+    closing the aiohttp session of its client.
+    """
+
+    global ASYNC_SLACK_APP
+
+    app, ASYNC_SLACK_APP = ASYNC_SLACK_APP, None
+
+    if app is not None and app.client.session is not None and LOOP is not None and not LOOP.is_closed():
+        asyncio.run_coroutine_threadsafe(app.client.session.close(), LOOP)
+
+
+# Rebuild the Slack app when rotated tokens are loaded
+secrets.add_rotation_listener(reset_async_slack_app)
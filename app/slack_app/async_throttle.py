@@ -0,0 +1,85 @@
+"""
+This script provides the rate limited Slack WebClient of the asynchronous execution mode. It is the
+`AsyncWebClient` counterpart of the `throttle` module, taking its turns from the same buckets, and waits for them
+without blocking the event loop. It is kept apart from the `throttle` module as importing the async WebClient
+pulls aiohttp into the cold start of the synchronous execution mode.
+"""
+
+import asyncio
+
+from slack_sdk import errors
+from slack_sdk.web.async_client import AsyncWebClient
+
+from common import metrics
+from slack_app import throttle
+
+
+class AsyncRateLimitedWebClient(AsyncWebClient):
+    """
+    An async Slack WebClient waiting for the turn of every call in the buckets of the rate limiter.
+    """
+
+    def __deepcopy__(self, memo):
+        # Bolt deep-copies the request, including its client, for the lazy listeners. The aiohttp session of the
+        # client is bound to the event loop of the container and cannot be copied, so the copies share the client
+        return self
+
+    async def api_call(self, api_method: str, **kwargs):
+        limiter = throttle.get_limiter()
+        scope = throttle.get_scope(self.token, api_method, kwargs)
+        waited = 0.0
+
+        for attempt in range(throttle.MAX_RETRIES + 1):
+            # Wait for a token of the method, or for the end of the 429 of the previous attempt
+            delay = limiter.acquire(scope, api_method, waited)
+
+            if delay:
+                with metrics.timer("SlackThrottleWait"):
+                    await asyncio.sleep(delay)
+                waited += delay
+
+            try:
+                return await super().api_call(api_method, **kwargs)
+            except errors.SlackApiError as e:
+                if attempt == throttle.MAX_RETRIES or not limiter.throttle(scope, api_method, e, waited):
+                    raise
+
+
+def wrap(client: AsyncWebClient) -> AsyncRateLimitedWebClient:
+    """
+    Creates a rate limited copy of an async Slack WebClient, sharing its aiohttp session.
+    """
+
+    if isinstance(client, AsyncRateLimitedWebClient):
+        return client
+
+    return AsyncRateLimitedWebClient(
+        token=client.token,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        ssl=client.ssl,
+        proxy=client.proxy,
+        session=client.session,
+        trust_env_in_session=client.trust_env_in_session,
+        headers=client.headers,
+        logger=client.logger,
+        retry_handlers=client.retry_handlers.copy(),
+    )
+
+
+async def rate_limit_client(context, next):
+    """
+    Middleware replacing the async Slack WebClient of a request by a rate limited one.
+
+    Args:
+        context: The asynchronous Bolt context of the request.
+        next: Coroutine function running the next middleware and the listeners.
+    """
+
+    if context.client is not None:
+        context["client"] = wrap(context.client)
+        # `say` may already hold the client of the request, which the copies for the lazy listeners cannot share
+        if "say" in context:
+            context["say"].client = context["client"]
+
+    return await next()
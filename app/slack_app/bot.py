@@ -6,16 +6,29 @@ a global variable `SLACK_APP` to hold the Slack app instance and uses a
 function `get_slack_app` to initialize this instance if it's not already done.
 The initialization includes setting up a bot token, a signing secret, and
 registering handlers for Slack events like slash commands and modal submissions.
+The app is rebuilt when the secrets are rotated.
+Modal submissions and the deferred subcommands of the slash command are acknowledged instantly and processed by
+a lazy listener, which Bolt runs in a separate asynchronous invocation of the Lambda function.
+The `async_bot` module provides the same app on `AsyncApp`, used when `BOT_EXECUTION_MODE` is 'async'.
+With an installation store enabled, requests are authorized with the bot token of their workspace from the
+`installations` module instead of the single bot token. The Web API calls of every request are shaped to the
+rate limits of Slack by the client of the `throttle` module.
 """
 
+import os
 import typing
 
 import slack_bolt
 
-from common import parser, secrets
+from common import secrets
+from slack_app import broadcast, commands, installations, throttle
 from slack_app.modal import handlers
+from slack_app.questions import registry
 
 
+# Execution modes of the bot, selected with `BOT_EXECUTION_MODE`
+EXECUTION_MODES = ("sync", "async")
+
 # Global variable for the Slack app, initialized as None and set when `get_slack_app` is called
 SLACK_APP: typing.Union[slack_bolt.App, None] = None
 
@@ -36,16 +49,76 @@ def get_slack_app():
 
     # Initialize the Slack app if it hasn't been already
     if SLACK_APP is None:
-        # Creating the Slack App instance with required tokens and secrets
+        # Serve every installed workspace with its own token, or the single workspace of the bot token
+        multi_workspace = installations.is_enabled()
+
+        # Creating the Slack App instance with required tokens and secrets.
+        # `SLACK_API_URL` points the Web API client to a local stand-in of Slack, e.g. for benchmarks.
         SLACK_APP = slack_bolt.App(
-            token=secrets.BotSecrets.get(secrets.BotSecrets.SLACK_BOT_TOKEN),
+            client=throttle.RateLimitedWebClient(
+                token=None if multi_workspace else secrets.BotSecrets.get(secrets.BotSecrets.SLACK_BOT_TOKEN),
+                base_url=os.environ.get("SLACK_API_URL") or throttle.RateLimitedWebClient.BASE_URL
+            ),
             signing_secret=secrets.BotSecrets.get(secrets.BotSecrets.SLACK_SIGNING_SECRET),
+            authorize=installations.authorize if multi_workspace else None,
             process_before_response=True
         )
 
-        # Register the slash command handler
-        SLACK_APP.command(secrets.BotSecrets.get(secrets.BotSecrets.SLACK_SLASH_COMMAND))(handlers.handle_open_modal)
-        # Register the modal submission handler
-        SLACK_APP.view(parser.SLACK_MODAL_WINDOW_ID)(handlers.handle_modal_submission)
+        # Shape the Web API calls of the listeners to the rate limits of Slack
+        SLACK_APP.middleware(throttle.rate_limit_client)
+        # Acknowledge duplicate deliveries of modal submissions before any listener runs
+        SLACK_APP.middleware(handlers.skip_duplicate_submission)
+
+        slash_command = secrets.BotSecrets.get(secrets.BotSecrets.SLACK_SLASH_COMMAND)
+        # Register the handler of the deferred subcommands first, acknowledging instantly and answering lazily
+        SLACK_APP.command(slash_command, matchers=[commands.is_deferred])(
+            ack=commands.ack_deferred_command,
+            lazy=[commands.answer_deferred_command]
+        )
+        # Register the slash command handler, opening the modal or answering a subcommand
+        SLACK_APP.command(slash_command)(commands.handle_command)
+        # Forget the installation of a workspace whose bot token is no longer valid
+        if multi_workspace:
+            SLACK_APP.event("app_uninstalled")(installations.handle_app_uninstalled)
+            SLACK_APP.event("tokens_revoked")(installations.handle_tokens_revoked)
+        # Register the handler of the "Start questionnaire" button of the broadcast messages
+        SLACK_APP.action(broadcast.START_ACTION_ID)(handlers.handle_start_button)
+        # Register the modal submission handler of every questionnaire, acknowledging instantly and processing lazily
+        SLACK_APP.view(registry.CALLBACK_ID_PATTERN)(
+            ack=handlers.ack_modal_submission,
+            lazy=[handlers.handle_modal_submission]
+        )
 
     return SLACK_APP
+
+
+def get_execution_mode() -> str:
+    """
+    Returns the execution mode of the bot.
+
+    Returns:
+        str: 'sync' (default) for the `slack_bolt.App` or 'async' for the `slack_bolt.async_app.AsyncApp`.
+
+    Raises:
+        Exception: If `BOT_EXECUTION_MODE` holds an unknown mode.
+    """
+
+    mode = os.environ.get("BOT_EXECUTION_MODE") or "sync"
+
+    if mode not in EXECUTION_MODES:
+        raise Exception(f"Unknown execution mode '{mode}'.")
+
+    return mode
+
+
+def reset_slack_app():
+    """
+    Drops the global Slack app so that it is rebuilt with the current secrets on next use.
+    """
+
+    global SLACK_APP
+    SLACK_APP = None
+
+
+# Rebuild the Slack app when rotated tokens are loaded
+secrets.add_rotation_listener(reset_slack_app)
@@ -0,0 +1,466 @@
+"""
+This script broadcasts a questionnaire to every member of a channel, for reviews every member has to answer like
+the quarterly security review. The `broadcast` subcommand, `/security-test broadcast #channel [questionnaire]`,
+is allowed to the admins and owners of the workspace and starts a broadcast in the background: the members of the
+channel are listed page by page with `conversations.members`, and every member gets a direct message with a
+"Start questionnaire" button, which opens the modal of the questionnaire like the slash command does.
+
+A broadcast runs in asynchronous invocations of the function itself. The messages are posted by a bounded pool
+of threads (`BOT_BROADCAST_CONCURRENCY`), at most `BOT_BROADCAST_RATE` per minute across the workspace, on top of
+the per-channel limits of the rate limited client. The progress, the cursor of the page of members and the
+position in the page, is checkpointed in the idempotency store, and the broadcast invokes the function again to
+continue from its checkpoint before running out of time. The members are handled in chunks sized to the time left
+at the rate of the broadcast, and every member is claimed in the idempotency store right before their message is
+posted, once their turn came and if time is left, so an invocation retried after a timeout, which starts again from
+the last checkpoint, skips the members already claimed and messages the others. The delivery is at most once: nobody
+gets the questionnaire twice, but a member claimed by an invocation that died before their message was posted is
+never messaged, nor reminded. The claim of a member whose message failed is dropped, so a retried invocation
+messages them. The requester gets a summary at the end.
+
+When the `roster` module keeps the rosters, every broadcast opens a reminder campaign and records the members it
+messaged, chunk by chunk, and the `reminders` module reminds the ones who did not submit the questionnaire.
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import re
+import threading
+import time
+import typing
+import uuid
+from collections import namedtuple
+
+from slack_sdk import errors
+
+from common import idempotency, metrics, roster
+from slack_app import adapter, installations, throttle
+from slack_app.questions import registry, results
+
+
+# Action ID of the "Start questionnaire" button, whose value is the ID of the questionnaire
+START_ACTION_ID = "start-questionnaire"
+
+# Number of members requested per `conversations.members` page
+MEMBERS_PAGE_SIZE = 200
+
+# Default number of messages posted concurrently, overridden with `BOT_BROADCAST_CONCURRENCY`
+DEFAULT_CONCURRENCY = 8
+
+# Default number of messages posted per minute, overridden with `BOT_BROADCAST_RATE`
+DEFAULT_RATE = 300
+
+# Seconds left to the invocation below which the broadcast is continued by the next invocation
+TIME_MARGIN = 3.0
+
+# Errors of `chat.postMessage` for members who cannot get a message, like bots and deactivated accounts
+UNREACHABLE_ERRORS = ("cannot_dm_bot", "user_not_found", "account_inactive", "user_disabled")
+
+# Pattern of a channel of the command text, escaped by Slack as '<#C123|name>' or given by its ID
+CHANNEL_PATTERN = re.compile(r"^(?:<#([CG][A-Z0-9]+)(?:\|[^>]*)?>|([CG][A-Z0-9]+))$")
+
+# Logger of the broadcasts running in the background
+LOGGER = logging.getLogger(__name__)
+
+# Namedtuple 'Broadcast' for a broadcast of a questionnaire, the payload of the invocations running it
+Broadcast = namedtuple(
+    "Broadcast",
+    [
+        "broadcast_id",  # Unique ID of the broadcast
+        "team_id",  # ID of the workspace
+        "enterprise_id",  # ID of the Enterprise Grid organization, None for a standalone workspace
+        "channel",  # ID of the channel whose members get the questionnaire
+        "questionnaire_id",  # ID of the questionnaire, None for the default questionnaire
+        "requested_by",  # ID of the user who started the broadcast, who gets the summary
+    ]
+)
+
+# Namedtuple 'Checkpoint' for the progress of a broadcast
+Checkpoint = namedtuple(
+    "Checkpoint",
+    [
+        "cursor",  # Cursor of the current page of members, empty for the first page
+        "offset",  # Number of members of the current page already handled
+        "sent",  # Number of members messaged
+        "skipped",  # Number of members already messaged or who cannot get a message
+        "failed",  # Number of members whose message failed
+        "done",  # Whether every member was handled
+    ],
+    defaults=["", 0, 0, 0, 0, False]
+)
+
+
+def parse_channel(text: str) -> typing.Union[str, None]:
+    """
+    Reads the ID of a channel from the command text.
+
+    Args:
+        text (str): A channel mention escaped by Slack, like '<#C123|general>', or a channel ID.
+
+    Returns:
+        str: The ID of the channel, or None if the text names no channel.
+    """
+
+    match = CHANNEL_PATTERN.match(text or "")
+
+    return (match.group(1) or match.group(2)) if match else None
+
+
+def get_concurrency() -> int:
+    return max(1, int(os.environ.get("BOT_BROADCAST_CONCURRENCY") or DEFAULT_CONCURRENCY))
+
+
+def get_rate() -> float:
+    return float(os.environ.get("BOT_BROADCAST_RATE") or DEFAULT_RATE)
+
+
+def is_broadcast_event(event) -> bool:
+    return isinstance(event, dict) and "broadcast" in event
+
+
+def checkpoint_key(broadcast_id: str) -> str:
+    return f"broadcast:{broadcast_id}"
+
+
+def member_key(broadcast_id: str, user_id: str) -> str:
+    return f"broadcast:{broadcast_id}:{user_id}"
+
+
+def load_checkpoint(broadcast_id: str) -> Checkpoint:
+    """
+    Loads the progress of a broadcast, kept as the result of its record in the idempotency store.
+
+    Args:
+        broadcast_id (str): The ID of the broadcast.
+
+    Returns:
+        Checkpoint: The last saved progress, or the start of the broadcast.
+    """
+
+    saved = idempotency.get_store().get_result(checkpoint_key(broadcast_id))
+
+    return Checkpoint(**json.loads(saved)) if saved else Checkpoint()
+
+
+def save_checkpoint(broadcast_id: str, checkpoint: Checkpoint):
+    idempotency.get_store().complete(checkpoint_key(broadcast_id), json.dumps(checkpoint._asdict()))
+
+
+def build_invitation(broadcast: Broadcast, reminder: bool = False) -> results.Message:
+    """
+    Builds the direct message inviting a member to answer the questionnaire.
+
+    Args:
+        broadcast (Broadcast): The broadcast.
+        reminder (bool): Whether the message reminds a member who did not answer yet.
+
+    Returns:
+        Message: The message with the "Start questionnaire" button.
+    """
+
+    questionnaire = registry.get_questionnaire(broadcast.questionnaire_id)
+    title = questionnaire.view.view["title"]["text"]
+    text = f"<@{broadcast.requested_by}> asks you to answer the *{title}* questionnaire."
+
+    if reminder:
+        text = f"Reminder: <@{broadcast.requested_by}> still waits for your answers to the *{title}* questionnaire."
+
+    return results.Message(
+        text=text,
+        blocks=[
+            results.create_slack_block(text),
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "action_id": START_ACTION_ID,
+                        "text": {"type": "plain_text", "text": "Start questionnaire"},
+                        "style": "primary",
+                        "value": questionnaire.id,
+                    }
+                ]
+            },
+        ]
+    )
+
+
+def start_broadcast(broadcast: Broadcast, lambda_client: typing.Any = None):
+    """
+    Runs a broadcast, or its continuation, in an asynchronous invocation of the function.
+
+    Outside of AWS Lambda, e.g. in local runs, the broadcast runs in a background thread instead.
+
+    Args:
+        broadcast (Broadcast): The broadcast.
+        lambda_client: Client used to invoke the function. The global Lambda client of the adapter if None.
+    """
+
+    event = {"broadcast": broadcast._asdict()}
+    function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+
+    if not function_name:
+        threading.Thread(target=handle_broadcast_event, args=(event, None), daemon=True).start()
+        return
+
+    (lambda_client or adapter.get_lambda_client()).invoke(
+        FunctionName=function_name,
+        InvocationType="Event",
+        Payload=json.dumps(event),
+    )
+
+
+def create_broadcast(body, channel: str, questionnaire_id: typing.Union[str, None]) -> Broadcast:
+    """
+    Creates and starts the broadcast requested by a slash command.
+
+    Args:
+        body: The body of the slash command.
+        channel (str): The ID of the channel.
+        questionnaire_id (str): The ID of the questionnaire, None for the default questionnaire.
+
+    Returns:
+        Broadcast: The started broadcast.
+    """
+
+    broadcast = Broadcast(
+        broadcast_id=uuid.uuid4().hex,
+        team_id=body.get("team_id"),
+        enterprise_id=body.get("enterprise_id") or None,
+        channel=channel,
+        questionnaire_id=questionnaire_id,
+        requested_by=body["user_id"],
+    )
+
+    metrics.increment("BroadcastStarted")
+
+    # The submissions are recorded under the ID of the resolved questionnaire, the default one included
+    if roster.is_enabled():
+        roster.open_campaign(
+            broadcast.broadcast_id, registry.get_questionnaire(questionnaire_id).id, broadcast._asdict()
+        )
+
+    start_broadcast(broadcast)
+
+    return broadcast
+
+
+class BroadcastRunner:
+    """
+    Messages the members of a channel for a broadcast, from its last checkpoint until its invocation runs out of time.
+    """
+
+    def __init__(
+            self,
+            client,
+            broadcast: Broadcast,
+            remaining_time: typing.Callable[[], float],
+            concurrency: int = DEFAULT_CONCURRENCY,
+            rate: float = DEFAULT_RATE,
+            sleep: typing.Callable[[float], None] = time.sleep
+    ):
+        """
+        Initializes the runner.
+
+        Args:
+            client: Slack WebClient of the workspace of the broadcast.
+            broadcast (Broadcast): The broadcast.
+            remaining_time (Callable): Function returning the seconds left to the invocation.
+            concurrency (int): Number of messages posted concurrently.
+            rate (float): Number of messages posted per minute.
+            sleep (Callable): Function waiting for a number of seconds.
+        """
+
+        self.client = client
+        self.broadcast = broadcast
+        self.remaining_time = remaining_time
+        self.concurrency = concurrency
+        self.rate = rate
+        self.sleep = sleep
+        self.bucket = throttle.TokenBucket(rate, concurrency)
+        self.message = build_invitation(broadcast)
+
+    def send(self, user_id: str) -> str:
+        """
+        Messages a member unless they were already messaged by this broadcast.
+
+        Args:
+            user_id (str): The ID of the member.
+
+        Returns:
+            str: 'sent', 'skipped', 'failed' or 'deferred' if the invocation has no time left to message them.
+        """
+
+        key = member_key(self.broadcast.broadcast_id, user_id)
+
+        # The members already messaged, as by an invocation retried after a timeout, do not wait for a turn
+        if idempotency.get_store().exists(key):
+            return "skipped"
+
+        # Shape the messages of the broadcast to the workspace-wide limit of Slack
+        delay = self.bucket.reserve()
+
+        if delay:
+            self.sleep(delay)
+
+        # A member whose turn comes too late is left unclaimed to the next invocation
+        if self.remaining_time() < TIME_MARGIN:
+            self.bucket.cancel()
+            return "deferred"
+
+        # Claimed for good right before posting: a member is never messaged twice, even if the invocation dies now
+        if not idempotency.get_store().claim(key):
+            self.bucket.cancel()
+            return "skipped"
+
+        try:
+            # Posting to the ID of the user opens the direct message with the bot
+            with metrics.timer("SlackChatPostMessage"):
+                self.client.chat_postMessage(channel=user_id, text=self.message.text, blocks=self.message.blocks)
+        except errors.SlackApiError as e:
+            if e.response.get("error") in UNREACHABLE_ERRORS:
+                return "skipped"
+
+            # Not messaged, so an invocation retried from an older checkpoint may try again
+            idempotency.get_store().forget(key)
+            LOGGER.warning("Broadcast %s could not message %s: %s", self.broadcast.broadcast_id, user_id, e)
+            return "failed"
+
+        return "sent"
+
+    def list_members(self, cursor: str) -> typing.Tuple[typing.List[str], str]:
+        with metrics.timer("SlackConversationsMembers"):
+            response = self.client.conversations_members(
+                channel=self.broadcast.channel, limit=MEMBERS_PAGE_SIZE, cursor=cursor or None
+            )
+
+        next_cursor = (response.get("response_metadata") or dict()).get("next_cursor") or ""
+
+        return response.get("members") or list(), next_cursor
+
+    def run(self, checkpoint: Checkpoint) -> Checkpoint:
+        """
+        Messages the members from a checkpoint, saving the progress after every chunk of members.
+
+        Args:
+            checkpoint (Checkpoint): The progress to start from.
+
+        Returns:
+            Checkpoint: The progress at the end of the invocation, done if every member was handled.
+        """
+
+        counts = {"sent": checkpoint.sent, "skipped": checkpoint.skipped, "failed": checkpoint.failed}
+        cursor, offset = checkpoint.cursor, checkpoint.offset
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                members, next_cursor = self.list_members(cursor)
+
+                while offset < len(members):
+                    # Chunks of a few rounds of the pool at most, and of the messages the rate allows in the time left
+                    chunk_size = int(min(4 * self.concurrency, (self.remaining_time() - TIME_MARGIN) * self.rate / 60))
+
+                    if chunk_size < 1:
+                        checkpoint = Checkpoint(cursor, offset, **counts)
+                        save_checkpoint(self.broadcast.broadcast_id, checkpoint)
+                        return checkpoint
+
+                    chunk = members[offset:offset + chunk_size]
+                    outcomes = list(executor.map(self.send, chunk))
+
+                    # The members from the first deferred one are handled again by the next invocation
+                    if "deferred" in outcomes:
+                        chunk = chunk[:outcomes.index("deferred")]
+
+                    for outcome in outcomes[:len(chunk)]:
+                        counts[outcome] += 1
+
+                    # The members messaged are the targets of the reminders
+                    roster.record_targets(
+                        self.broadcast.broadcast_id,
+                        self.broadcast.team_id,
+                        [user_id for user_id, outcome in zip(members[offset:], outcomes) if outcome == "sent"]
+                    )
+
+                    offset += len(chunk)
+                    save_checkpoint(self.broadcast.broadcast_id, Checkpoint(cursor, offset, **counts))
+
+                if not next_cursor:
+                    checkpoint = Checkpoint(cursor, offset, **counts, done=True)
+                    save_checkpoint(self.broadcast.broadcast_id, checkpoint)
+                    return checkpoint
+
+                cursor, offset = next_cursor, 0
+
+
+def get_client(broadcast: Broadcast):
+    # Every installed workspace is messaged by its own bot
+    if installations.is_enabled():
+        return installations.get_client(broadcast.team_id, broadcast.enterprise_id)
+
+    # Imported lazily as the bot imports the commands starting the broadcasts
+    from slack_app import bot
+
+    return bot.get_slack_app().client
+
+
+def get_remaining_time(context) -> typing.Callable[[], float]:
+    # Without a Lambda context, e.g. in local runs, the broadcast runs to its end
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return lambda: float("inf")
+
+    return lambda: context.get_remaining_time_in_millis() / 1000
+
+
+def notify_requester(client, broadcast: Broadcast, checkpoint: Checkpoint):
+    text = (
+        f"Broadcast of the questionnaire to <#{broadcast.channel}> is done: {checkpoint.sent} member(s) messaged, "
+        f"{checkpoint.skipped} skipped, {checkpoint.failed} failed."
+    )
+
+    client.chat_postMessage(channel=broadcast.requested_by, text=text, blocks=[results.create_slack_block(text)])
+
+
+def handle_broadcast_event(event: typing.Dict, context) -> typing.Dict:
+    """
+    Runs a broadcast from its last checkpoint, and continues it in a new invocation if it is not done.
+
+    Args:
+        event (dict): The event started by `start_broadcast`.
+        context: AWS Lambda context object, None outside of AWS Lambda.
+
+    Returns:
+        dict: The progress of the broadcast.
+    """
+
+    broadcast = Broadcast(**event["broadcast"])
+    client = get_client(broadcast)
+    checkpoint = load_checkpoint(broadcast.broadcast_id)
+
+    # A retried invocation of a broadcast already done has nothing left to do
+    if checkpoint.done:
+        return checkpoint._asdict()
+
+    runner = BroadcastRunner(client, broadcast, get_remaining_time(context), get_concurrency(), get_rate())
+    sent = checkpoint.sent
+
+    try:
+        checkpoint = runner.run(checkpoint)
+    except errors.SlackApiError as e:
+        # The members cannot be listed, e.g. as the bot is not in the private channel
+        LOGGER.error("Broadcast %s failed: %s", broadcast.broadcast_id, e)
+        metrics.increment("BroadcastErrors")
+        text = f"The questionnaire could not be sent to the members of <#{broadcast.channel}>: {e.response['error']}"
+        client.chat_postMessage(channel=broadcast.requested_by, text=text, blocks=[results.create_slack_block(text)])
+        return checkpoint._asdict()
+
+    metrics.increment("BroadcastSent", checkpoint.sent - sent)
+
+    if checkpoint.done:
+        roster.record_broadcast_done(broadcast.broadcast_id)
+        notify_requester(client, broadcast, checkpoint)
+    else:
+        start_broadcast(broadcast)
+
+    return checkpoint._asdict()
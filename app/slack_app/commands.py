@@ -0,0 +1,346 @@
+"""
+This script dispatches the subcommands of the slash command. The first word of the command text selects a
+subcommand from the `SUBCOMMANDS` registry, like `/security-test stats`; without any text the slash command
+opens the questionnaire modal as before. A subcommand renders its answer from precomputed data and the answer
+is sent with the acknowledgement of the command, as a message only visible to the user, so it costs no
+extra call to the Slack Web API. The deferred subcommands, which call Slack, JIRA or AWS and may not answer within
+the 3 seconds Slack waits for the acknowledgement, are acknowledged right away by a listener of their own and
+answered through the `response_url` of the command by its lazy listener. Both the synchronous and the asynchronous
+Slack apps use this dispatcher.
+Subcommands about the caller get their Slack profile from the user cache. A first word naming a questionnaire of
+the registry, like `/security-test privacy`, opens that questionnaire instead. The `broadcast` subcommand starts
+sending a questionnaire to the members of a channel with the `broadcast` module.
+"""
+
+import asyncio
+import logging
+import typing
+from collections import namedtuple
+
+from common import analytics, metrics, parser, users
+from jira_app import submissions
+from slack_app import broadcast
+from slack_app.modal import async_handlers, handlers
+from slack_app.questions import registry, results
+
+
+# Namedtuple 'Subcommand' for a subcommand of the slash command
+Subcommand = namedtuple(
+    "Subcommand",
+    [
+        "render",  # Function rendering the answer from the body, the arguments and the profile of the caller
+        "needs_user",  # Whether the profile of the caller is looked up, None is passed otherwise
+        "usage",  # Arguments of the subcommand shown in the usage
+        "deferred",  # Whether the answer is sent by a lazy listener after the acknowledgement
+    ],
+    defaults=[False]
+)
+
+# Acknowledgement of the deferred subcommands, replaced by the answer of the lazy listener
+WORKING_TEXT = "_Working on it..._"
+
+# Answer of a deferred subcommand that failed
+FAILED_TEXT = "Sorry, the command failed. Please try again in a few minutes."
+
+# Logger of the failed deferred subcommands, reported to the user instead of being raised
+LOGGER = logging.getLogger(__name__)
+
+
+def parse_command(text: typing.Union[str, None]) -> typing.Tuple[typing.Union[str, None], typing.List[str]]:
+    """
+    Splits the text of the slash command into its subcommand and arguments.
+
+    Args:
+        text (str): The text typed after the slash command.
+
+    Returns:
+        Tuple[str, List[str]]: The lowercase subcommand, or None for an empty text, and its arguments.
+    """
+
+    words = (text or "").split()
+
+    if not words:
+        return None, list()
+
+    return words[0].lower(), words[1:]
+
+
+def format_count(label: str, count: int, total: int) -> str:
+    share = round(100 * count / total) if total else 0
+    return f"{label}: {count} ({share}%)"
+
+
+def message(text: str) -> results.Message:
+    return results.Message(text=text, blocks=[results.create_slack_block(text)])
+
+
+def handle_stats(body, args: typing.List[str], user: typing.Union[typing.Dict, None]) -> results.Message:
+    """
+    Renders the questionnaire stats of a period from the precomputed aggregates.
+
+    Args:
+        body: The body of the slash command.
+        args (List[str]): The optional questionnaire ID, then the optional period, see `analytics.parse_period`.
+        user (dict): Not used.
+
+    Returns:
+        Message: The stats, or the usage of the subcommand for an unknown period.
+    """
+
+    # A leading questionnaire ID selects its stats, the default questionnaire otherwise
+    questionnaire_id = args[0].lower() if args and args[0].lower() in registry.get_registry().ids() else None
+    questionnaire = registry.get_questionnaire(questionnaire_id)
+    args = args[1:] if questionnaire_id else args
+
+    try:
+        bucket = analytics.parse_period(args[0] if args else None)
+    except ValueError as e:
+        return message(str(e))
+
+    with metrics.timer("AnalyticsRead"):
+        aggregate = analytics.get_store().get(
+            analytics.get_bucket(bucket, handlers.get_analytics_namespace(questionnaire))
+        )
+
+    engine = questionnaire.engine
+    title = "all time" if bucket == analytics.ALL_TIME else bucket
+    prefix = f"{questionnaire.id} " if questionnaire_id else ""
+    heading = f"*{prefix}Questionnaire stats - {title}:* {aggregate.count} submission(s)"
+
+    levels = "\n".join(
+        format_count(band.description, aggregate.level_counts.get(idx, 0), aggregate.count)
+        for idx, band in enumerate(engine.band_index.bands)
+    )
+    questions = "\n".join(
+        format_count(f"{idx + 1}. {question_title}", aggregate.question_hits.get(idx, 0), aggregate.count)
+        for idx, (question_title, _) in enumerate(engine.questions)
+    )
+
+    return results.Message(
+        text=heading,
+        blocks=[
+            results.create_slack_block(heading),
+            results.create_slack_block(f"*Levels:*\n{levels}"),
+            results.create_slack_block(f"*Answered yes:*\n{questions}"),
+        ]
+    )
+
+
+def handle_mine(body, args: typing.List[str], user: typing.Union[typing.Dict, None]) -> results.Message:
+    """
+    Renders the previous questionnaire tasks of the caller from the per-user index of the submissions.
+
+    Args:
+        body: The body of the slash command.
+        args (List[str]): Not used.
+        user (dict): The Slack profile of the caller.
+
+    Returns:
+        Message: The tasks of the caller, newest first.
+    """
+
+    found = submissions.get_submissions(parser.get_slack_user_email(user))
+
+    if not found:
+        return message("You have not submitted the questionnaire yet.")
+
+    heading = f"*Your previous submissions:* {len(found)}"
+    lines = "\n".join(
+        f"{submission.created} {submission.task_link} {submission.level or ''}".rstrip() for submission in found
+    )
+
+    return results.Message(
+        text=heading,
+        blocks=[results.create_slack_block(heading), results.create_slack_block(lines)]
+    )
+
+
+def handle_broadcast(body, args: typing.List[str], user: typing.Union[typing.Dict, None]) -> results.Message:
+    """
+    Starts the broadcast of a questionnaire to the members of a channel.
+
+    Args:
+        body: The body of the slash command.
+        args (List[str]): The channel, then the optional questionnaire ID.
+        user (dict): The Slack profile of the caller, who must be an admin or an owner of the workspace.
+
+    Returns:
+        Message: The confirmation of the started broadcast, or why it was not started.
+    """
+
+    if not (user.get("is_admin") or user.get("is_owner")):
+        return message("Only the admins of the workspace can broadcast a questionnaire.")
+
+    channel = broadcast.parse_channel(args[0]) if args else None
+    questionnaire_id = args[1].lower() if len(args) > 1 else None
+
+    if channel is None or (questionnaire_id and questionnaire_id not in registry.get_registry().ids()):
+        return get_usage(body)
+
+    broadcast.create_broadcast(body, channel, questionnaire_id)
+
+    return message(f"Sending the questionnaire to the members of <#{channel}>, you will get a summary once done.")
+
+
+# Mapping of subcommand name to the subcommand
+SUBCOMMANDS: typing.Dict[str, Subcommand] = {
+    "stats": Subcommand(handle_stats, False, "[questionnaire] [all|quarter|month|2026-Q4|2026-10]"),
+    "mine": Subcommand(handle_mine, True, "", deferred=True),
+    "broadcast": Subcommand(handle_broadcast, True, "#channel [questionnaire]", deferred=True),
+}
+
+
+def is_questionnaire(name: str) -> bool:
+    """
+    Checks if the first word of the slash command names a questionnaire rather than a subcommand.
+    """
+
+    return name not in SUBCOMMANDS and name in registry.get_registry().ids()
+
+
+def get_usage(body) -> results.Message:
+    command = body.get("command") or "/command"
+    usages = ", ".join(
+        "`" + " ".join(filter(None, (command, name, subcommand.usage))) + "`" for name, subcommand in SUBCOMMANDS.items()
+    )
+
+    return message(f"Usage: `{command} [questionnaire]` opens a questionnaire, {usages}")
+
+
+def is_deferred(body) -> bool:
+    """
+    Checks if the slash command runs a deferred subcommand, matching the listener of the deferred subcommands.
+    """
+
+    name, _ = parse_command(body.get("text"))
+    return name in SUBCOMMANDS and SUBCOMMANDS[name].deferred
+
+
+async def is_deferred_async(body) -> bool:
+    return is_deferred(body)
+
+
+def ack_deferred_command(ack):
+    """
+    Acknowledges a deferred subcommand right away, its answer is sent by `answer_deferred_command`.
+    """
+
+    ack(text=WORKING_TEXT)
+
+
+def answer_deferred_command(body, client, respond):
+    """
+    Answers a deferred subcommand through the `response_url` of the command, as a lazy listener.
+
+    Args:
+        body: The body of the request from Slack containing details of the command.
+        client: Slack WebClient instance to communicate with Slack API.
+        respond: Function sending a message to the `response_url` of the command.
+    """
+
+    name, args = parse_command(body.get("text"))
+    subcommand = SUBCOMMANDS[name]
+
+    # The command was acknowledged already, so a failure is reported to the user rather than raised
+    try:
+        user = users.get_user(client, body["user_id"]) if subcommand.needs_user else None
+        answer = subcommand.render(body, args, user)
+    except Exception:
+        LOGGER.exception(f"Failed to answer the '{name}' subcommand.")
+        answer = message(FAILED_TEXT)
+
+    respond(text=answer.text, blocks=answer.blocks, response_type="ephemeral")
+
+
+async def ack_deferred_command_async(ack):
+    """
+    Acknowledges a deferred subcommand right away in the asynchronous execution mode.
+    """
+
+    await ack(text=WORKING_TEXT)
+
+
+async def answer_deferred_command_async(body, client, respond):
+    """
+    Answers a deferred subcommand through the `response_url` of the command in the asynchronous execution mode.
+
+    Args:
+        body: The body of the request from Slack containing details of the command.
+        client: AsyncWebClient instance to communicate with Slack API.
+        respond: Coroutine function sending a message to the `response_url` of the command.
+    """
+
+    name, args = parse_command(body.get("text"))
+    subcommand = SUBCOMMANDS[name]
+
+    try:
+        user = await users.get_user_async(client, body["user_id"]) if subcommand.needs_user else None
+        # Subcommands may read their data with blocking calls, which are kept off the event loop
+        answer = await asyncio.to_thread(subcommand.render, body, args, user)
+    except Exception:
+        LOGGER.exception(f"Failed to answer the '{name}' subcommand.")
+        answer = message(FAILED_TEXT)
+
+    await respond(text=answer.text, blocks=answer.blocks, response_type="ephemeral")
+
+
+def handle_command(ack, body, client):
+    """
+    Handles the slash command, opening the modal or answering a subcommand. The deferred subcommands are
+    matched by the listener of `ack_deferred_command` first and never reach this function.
+
+    Args:
+        ack: Function to acknowledge the incoming request from Slack.
+        body: The body of the request from Slack containing details of the command.
+        client: Slack WebClient instance to communicate with Slack API.
+    """
+
+    name, args = parse_command(body.get("text"))
+
+    # Without a subcommand, or with the ID of a questionnaire, open the questionnaire
+    if name is None or is_questionnaire(name):
+        handlers.handle_open_modal(ack, body, client, name)
+        return
+
+    subcommand = SUBCOMMANDS.get(name)
+
+    if subcommand is None:
+        answer = get_usage(body)
+    else:
+        user = users.get_user(client, body["user_id"]) if subcommand.needs_user else None
+        answer = subcommand.render(body, args, user)
+
+    # Answer with the acknowledgement, visible to the user only
+    ack(text=answer.text, blocks=answer.blocks)
+
+
+async def handle_command_async(ack, body, client):
+    """
+    Handles the slash command in the asynchronous execution mode, opening the modal or answering a subcommand.
+    The deferred subcommands are matched by the listener of `ack_deferred_command_async` first.
+
+    Args:
+        ack: Function to acknowledge the incoming request from Slack.
+        body: The body of the request from Slack containing details of the command.
+        client: AsyncWebClient instance to communicate with Slack API.
+    """
+
+    name, args = parse_command(body.get("text"))
+
+    # Without a subcommand, or with the ID of a questionnaire, open the questionnaire; the registry may revalidate
+    # its definitions, which is kept off the event loop
+    if name is None or (name not in SUBCOMMANDS and await asyncio.to_thread(is_questionnaire, name)):
+        await async_handlers.handle_open_modal(ack, body, client, name)
+        return
+
+    subcommand = SUBCOMMANDS.get(name)
+
+    if subcommand is None:
+        answer = get_usage(body)
+    else:
+        user = await users.get_user_async(client, body["user_id"]) if subcommand.needs_user else None
+        # Subcommands may read their data with blocking calls, which are kept off the event loop
+        answer = await asyncio.to_thread(subcommand.render, body, args, user)
+
+    # Answer with the acknowledgement, visible to the user only
+    await ack(text=answer.text, blocks=answer.blocks)
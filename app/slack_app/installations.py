@@ -0,0 +1,601 @@
+"""
+This script lets one deployment of the bot serve several Slack workspaces. The bot token of every workspace is
+kept in an installation store, written by the OAuth flow when the app is installed into a workspace, and every
+incoming request is authorized with the token of its team instead of the single `SLACK_BOT_TOKEN`.
+
+The store is selected with the `BOT_INSTALLATION_STORE` environment variable:
+
+- `none` (default): the single workspace of the `SLACK_BOT_TOKEN` secret, as before.
+- `memory`: the installations kept in the memory of the container, seeded from the JSON file
+  `BOT_INSTALLATIONS_FILE` (a list of installations), for local runs and tests.
+- `dynamodb`: one item per workspace in a DynamoDB table (`BOT_INSTALLATIONS_TABLE`), shared by all containers.
+  `BOT_INSTALLATIONS_ENDPOINT` points it to a local stand-in like DynamoDB Local.
+
+Resolved installations are kept with a rate limited `WebClient` of their team in a bounded LRU cache whose entries
+expire after `BOT_INSTALLATIONS_TTL` seconds, so authorizing a request of a known team is a dictionary lookup,
+without any store read nor `auth.test` call. Hits, misses and evictions of the cache are counted in the metrics.
+
+The OAuth flow has two routes: `/install` redirects to the Slack consent page with a signed state, and
+`/oauth_redirect` checks the state, exchanges the code for the bot token with `oauth.v2.access` and saves it. Both
+answer 404 while no installation store is enabled. The installation of a workspace is deleted, and dropped from the
+cache, on the `app_uninstalled` and `tokens_revoked` events of the workspace.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import typing
+import urllib.parse
+from collections import namedtuple
+
+from slack_bolt.authorization import AuthorizeResult
+from slack_sdk import WebClient
+
+from common import cache, metrics, secrets
+from slack_app import throttle
+
+
+# Installation stores, selected with `BOT_INSTALLATION_STORE`
+INSTALLATION_STORES = ("none", "memory", "dynamodb")
+
+# Default maximum number of workspaces kept in the cache, overridden with `BOT_INSTALLATIONS_CACHE_SIZE`
+DEFAULT_CACHE_SIZE = 5000
+
+# Default number of seconds a resolved installation stays cached, overridden with `BOT_INSTALLATIONS_TTL`
+DEFAULT_CACHE_TTL = 10 * 60
+
+# Default bot scopes requested when installing the app, overridden with `BOT_OAUTH_SCOPES`
+DEFAULT_SCOPES = "commands,chat:write,users:read,users:read.email"
+
+# Consent page of the Slack OAuth flow
+AUTHORIZE_URL = "https://slack.com/oauth/v2/authorize"
+
+# Paths of the routes of the OAuth flow, at the end of the path of the request
+INSTALL_PATH = "/install"
+OAUTH_REDIRECT_PATH = "/oauth_redirect"
+
+# Number of seconds the state of an OAuth flow stays valid
+STATE_TTL = 10 * 60
+
+# Namedtuple 'Installation' for the installation of the app into a workspace
+Installation = namedtuple(
+    "Installation",
+    [
+        "team_id",  # ID of the workspace
+        "enterprise_id",  # ID of the Enterprise Grid organization, None for a standalone workspace
+        "bot_token",  # Bot token of the workspace
+        "bot_id",  # ID of the bot
+        "bot_user_id",  # ID of the bot user
+        "installed_at",  # Time of the installation in seconds since the epoch
+    ]
+)
+
+# Namedtuple 'Authorization' for a cached installation with the Web API client of its team
+Authorization = namedtuple("Authorization", ["installation", "client"])
+
+# Global variable to store the installation store
+STORE: typing.Union["InstallationStore", None] = None
+
+# Global cache of the authorizations keyed by (Enterprise ID, Team ID)
+CACHE = cache.TTLCache(
+    maxsize=int(os.environ.get("BOT_INSTALLATIONS_CACHE_SIZE") or DEFAULT_CACHE_SIZE),
+    ttl=float(os.environ.get("BOT_INSTALLATIONS_TTL") or DEFAULT_CACHE_TTL)
+)
+
+
+class InstallationStore:
+    """
+    Base class of the installation stores.
+    """
+
+    def save(self, installation: Installation):
+        """
+        Saves the installation of a workspace, replacing any previous one.
+        """
+
+        raise NotImplementedError
+
+    def find(self, enterprise_id: typing.Union[str, None], team_id: str) -> typing.Union[Installation, None]:
+        """
+        Finds the installation of a workspace.
+
+        Args:
+            enterprise_id (str): ID of the Enterprise Grid organization, None for a standalone workspace.
+            team_id (str): ID of the workspace.
+
+        Returns:
+            Installation: The installation, or None if the app is not installed into the workspace.
+        """
+
+        raise NotImplementedError
+
+    def delete(self, enterprise_id: typing.Union[str, None], team_id: str):
+        """
+        Deletes the installation of a workspace, e.g. when the app was uninstalled.
+        """
+
+        raise NotImplementedError
+
+
+class MemoryStore(InstallationStore):
+    """
+    An installation store in the memory of the container.
+    """
+
+    def __init__(self, installations: typing.Iterable[Installation] = ()):
+        self.installations: typing.Dict[typing.Tuple, Installation] = {
+            (installation.enterprise_id, installation.team_id): installation for installation in installations
+        }
+        self._lock = threading.Lock()
+
+    def save(self, installation: Installation):
+        with self._lock:
+            self.installations[(installation.enterprise_id, installation.team_id)] = installation
+
+    def find(self, enterprise_id: typing.Union[str, None], team_id: str) -> typing.Union[Installation, None]:
+        with self._lock:
+            return self.installations.get((enterprise_id, team_id))
+
+    def delete(self, enterprise_id: typing.Union[str, None], team_id: str):
+        with self._lock:
+            self.installations.pop((enterprise_id, team_id), None)
+
+
+class DynamoDBStore(InstallationStore):
+    """
+    An installation store in a DynamoDB table with the string partition key 'pk', one item per workspace.
+    """
+
+    def __init__(
+            self,
+            table_name: str,
+            endpoint_url: typing.Union[str, None] = None,
+            region_name: typing.Union[str, None] = None,
+            client: typing.Any = None
+    ):
+        self.table_name = table_name
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.client = client
+
+    def get_client(self) -> typing.Any:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client("dynamodb", endpoint_url=self.endpoint_url, region_name=self.region_name)
+
+        return self.client
+
+    @staticmethod
+    def get_key(enterprise_id: typing.Union[str, None], team_id: str) -> typing.Dict:
+        return {"pk": {"S": f"installation:{enterprise_id or '-'}:{team_id or '-'}"}}
+
+    def save(self, installation: Installation):
+        item = self.get_key(installation.enterprise_id, installation.team_id)
+        item["installation"] = {"S": json.dumps(installation._asdict())}
+
+        self.get_client().put_item(TableName=self.table_name, Item=item)
+
+    def find(self, enterprise_id: typing.Union[str, None], team_id: str) -> typing.Union[Installation, None]:
+        item = self.get_client().get_item(
+            TableName=self.table_name,
+            Key=self.get_key(enterprise_id, team_id),
+        ).get("Item")
+
+        return Installation(**json.loads(item["installation"]["S"])) if item else None
+
+    def delete(self, enterprise_id: typing.Union[str, None], team_id: str):
+        self.get_client().delete_item(TableName=self.table_name, Key=self.get_key(enterprise_id, team_id))
+
+
+def load_installations(path: str) -> typing.List[Installation]:
+    """
+    Reads installations from a JSON file holding a list of objects with the fields of `Installation`.
+    """
+
+    with open(path, encoding="utf-8") as installations_file:
+        return [
+            Installation(**dict({"enterprise_id": None, "bot_id": None, "installed_at": None}, **fields))
+            for fields in json.load(installations_file)
+        ]
+
+
+def get_store_name() -> str:
+    name = os.environ.get("BOT_INSTALLATION_STORE") or "none"
+
+    if name not in INSTALLATION_STORES:
+        raise Exception(f"Unknown installation store '{name}'.")
+
+    return name
+
+
+def is_enabled() -> bool:
+    """
+    Checks if the bot serves the workspaces of an installation store rather than the single `SLACK_BOT_TOKEN`.
+    """
+
+    return get_store_name() != "none"
+
+
+def create_store(name: str) -> InstallationStore:
+    """
+    Creates an installation store by name.
+
+    Args:
+        name (str): One of 'memory' or 'dynamodb'.
+
+    Returns:
+        InstallationStore: The installation store.
+
+    Raises:
+        Exception: If the store name is unknown or the DynamoDB table is not configured.
+    """
+
+    if name == "memory":
+        path = os.environ.get("BOT_INSTALLATIONS_FILE")
+        return MemoryStore(load_installations(path) if path else ())
+
+    if name == "dynamodb":
+        table_name = os.environ.get("BOT_INSTALLATIONS_TABLE")
+        if not table_name:
+            raise Exception("BOT_INSTALLATIONS_TABLE must be set for the 'dynamodb' installation store.")
+
+        return DynamoDBStore(table_name, endpoint_url=os.environ.get("BOT_INSTALLATIONS_ENDPOINT") or None)
+
+    raise Exception(f"Unknown installation store '{name}'.")
+
+
+def get_store() -> InstallationStore:
+    """
+    Retrieves or initializes the global installation store selected with `BOT_INSTALLATION_STORE`.
+
+    Returns:
+        InstallationStore: The installation store.
+    """
+
+    global STORE
+
+    if STORE is None:
+        STORE = create_store(get_store_name())
+
+    return STORE
+
+
+def create_client(token: str) -> WebClient:
+    # `SLACK_API_URL` points the Web API client to a local stand-in of Slack, like the client of the single workspace
+    return throttle.RateLimitedWebClient(token=token, base_url=os.environ.get("SLACK_API_URL") or WebClient.BASE_URL)
+
+
+def get_authorization(
+        enterprise_id: typing.Union[str, None],
+        team_id: typing.Union[str, None]
+) -> typing.Union[Authorization, None]:
+    """
+    Resolves the installation of a workspace and the Web API client of its team, from the cache when possible.
+
+    Args:
+        enterprise_id (str): ID of the Enterprise Grid organization, None for a standalone workspace.
+        team_id (str): ID of the workspace.
+
+    Returns:
+        Authorization: The installation and its client, or None if the app is not installed into the workspace.
+    """
+
+    key = (enterprise_id, team_id)
+    authorization = CACHE.get(key)
+
+    if authorization is not None:
+        metrics.increment("InstallationCacheHit")
+        return authorization
+
+    metrics.increment("InstallationCacheMiss")
+
+    with metrics.timer("InstallationFind"):
+        installation = get_store().find(enterprise_id, team_id)
+
+    # Installations of an organization-wide install are found by the organization alone
+    if installation is None and enterprise_id is not None:
+        with metrics.timer("InstallationFind"):
+            installation = get_store().find(enterprise_id, None)
+
+    # Unknown workspaces are not cached, so a new installation is picked up right away
+    if installation is None:
+        return None
+
+    authorization = Authorization(installation, create_client(installation.bot_token))
+    evictions = CACHE.evictions
+    CACHE.set(key, authorization)
+
+    if CACHE.evictions > evictions:
+        metrics.increment("InstallationCacheEviction", CACHE.evictions - evictions)
+
+    return authorization
+
+
+def get_client(team_id: str, enterprise_id: typing.Union[str, None] = None) -> WebClient:
+    """
+    Retrieves the Web API client of a workspace.
+
+    Raises:
+        Exception: If the app is not installed into the workspace.
+    """
+
+    authorization = get_authorization(enterprise_id, team_id)
+
+    if authorization is None:
+        raise Exception(f"The app is not installed into the workspace '{team_id}'.")
+
+    return authorization.client
+
+
+def build_authorize_result(installation: Installation) -> AuthorizeResult:
+    # Built from the stored installation, without the `auth.test` call of the Bolt installation store authorizer
+    return AuthorizeResult(
+        enterprise_id=installation.enterprise_id,
+        team_id=installation.team_id,
+        bot_token=installation.bot_token,
+        bot_id=installation.bot_id,
+        bot_user_id=installation.bot_user_id,
+    )
+
+
+def authorize(enterprise_id, team_id, logger) -> typing.Union[AuthorizeResult, None]:
+    """
+    Authorizes a request of the synchronous Slack app with the installation of its workspace.
+
+    Args:
+        enterprise_id: ID of the Enterprise Grid organization of the request, None for a standalone workspace.
+        team_id: ID of the workspace of the request.
+        logger: The logger of the Slack app.
+
+    Returns:
+        AuthorizeResult: The bot token and identity of the workspace, or None if the app is not installed into it.
+    """
+
+    authorization = get_authorization(enterprise_id, team_id)
+
+    if authorization is None:
+        logger.warning(f"No installation found for the workspace '{team_id}'.")
+        return None
+
+    return build_authorize_result(authorization.installation)
+
+
+async def authorize_async(enterprise_id, team_id, logger) -> typing.Union[AuthorizeResult, None]:
+    """
+    Authorizes a request of the asynchronous Slack app, reading the store in a worker thread on a cache miss.
+    """
+
+    # Imported here as the synchronous execution mode never needs asyncio
+    import asyncio
+
+    authorization = CACHE.get((enterprise_id, team_id))
+
+    if authorization is not None:
+        metrics.increment("InstallationCacheHit")
+        return build_authorize_result(authorization.installation)
+
+    return await asyncio.to_thread(authorize, enterprise_id, team_id, logger)
+
+
+def invalidate(enterprise_id: typing.Union[str, None], team_id: str):
+    """
+    Drops the cached installation of a workspace, after it was installed again or uninstalled.
+    """
+
+    CACHE.pop((enterprise_id, team_id))
+
+
+def forget_installation(enterprise_id: typing.Union[str, None], team_id: str):
+    """
+    Deletes the installation of a workspace from the store and the cache, once its bot token is no longer valid.
+    """
+
+    get_store().delete(enterprise_id, team_id)
+    invalidate(enterprise_id, team_id)
+    metrics.increment("InstallationDeleted")
+
+
+def handle_app_uninstalled(context):
+    """
+    Handles the `app_uninstalled` event, sent once the app was removed from a workspace.
+
+    Args:
+        context: The Bolt context of the event, with the workspace of the event.
+    """
+
+    forget_installation(context.enterprise_id, context.team_id)
+
+
+def handle_tokens_revoked(event, context):
+    """
+    Handles the `tokens_revoked` event, deleting the installation when the bot token of the workspace was revoked.
+
+    Args:
+        event: The event, with the revoked 'oauth' (user) and 'bot' tokens.
+        context: The Bolt context of the event, with the workspace of the event.
+    """
+
+    # Only the bot token is saved, revoked user tokens do not concern the bot
+    if (event.get("tokens") or dict()).get("bot"):
+        forget_installation(context.enterprise_id, context.team_id)
+
+
+async def handle_app_uninstalled_async(context):
+    """
+    Handles the `app_uninstalled` event in the asynchronous execution mode, writing the store in a worker thread.
+    """
+
+    import asyncio
+
+    await asyncio.to_thread(handle_app_uninstalled, context)
+
+
+async def handle_tokens_revoked_async(event, context):
+    """
+    Handles the `tokens_revoked` event in the asynchronous execution mode, writing the store in a worker thread.
+    """
+
+    import asyncio
+
+    await asyncio.to_thread(handle_tokens_revoked, event, context)
+
+
+def get_route(event: typing.Dict) -> typing.Union[str, None]:
+    """
+    Tells if an API Gateway event is a request of the OAuth flow.
+
+    Returns:
+        str: 'install' or 'oauth_redirect', None for any other event.
+    """
+
+    http = (event.get("requestContext") or dict()).get("http") or dict()
+
+    if http.get("method") != "GET":
+        return None
+
+    path = event.get("rawPath") or ""
+
+    if path.endswith(INSTALL_PATH):
+        return "install"
+
+    if path.endswith(OAUTH_REDIRECT_PATH):
+        return "oauth_redirect"
+
+    return None
+
+
+def sign_state(issued_at: int) -> str:
+    secret = secrets.BotSecrets.get(secrets.BotSecrets.SLACK_SIGNING_SECRET).encode("utf-8")
+    return hmac.new(secret, f"oauth-state:{issued_at}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def create_state(now: typing.Union[float, None] = None) -> str:
+    """
+    Creates the state of an OAuth flow, the time it was issued signed with the signing secret of the app.
+    """
+
+    issued_at = int(time.time() if now is None else now)
+    return f"{issued_at}.{sign_state(issued_at)}"
+
+
+def verify_state(state: typing.Union[str, None], now: typing.Union[float, None] = None) -> bool:
+    """
+    Checks if the state of an OAuth flow was issued by the app in the last `STATE_TTL` seconds.
+    """
+
+    issued_at, _, signature = (state or "").partition(".")
+
+    if not issued_at.isdigit() or not hmac.compare_digest(signature, sign_state(int(issued_at))):
+        return False
+
+    return 0 <= (time.time() if now is None else now) - int(issued_at) <= STATE_TTL
+
+
+def get_redirect_uri(event: typing.Dict) -> str:
+    # The redirect route next to the install route of the same API
+    domain = (event.get("requestContext") or dict()).get("domainName") or ""
+    path = (event.get("rawPath") or "")[:-len(INSTALL_PATH)] + OAUTH_REDIRECT_PATH
+
+    return f"https://{domain}{path}"
+
+
+def build_response(status: int, body: str, headers: typing.Union[typing.Dict, None] = None) -> typing.Dict:
+    return {
+        "statusCode": status,
+        "headers": dict({"Content-Type": "text/plain; charset=utf-8"}, **(headers or dict())),
+        "body": body,
+    }
+
+
+def handle_install(event: typing.Dict) -> typing.Dict:
+    """
+    Redirects to the Slack consent page of the app.
+
+    Args:
+        event (dict): The API Gateway event of the install route.
+
+    Returns:
+        dict: The API Gateway response.
+    """
+
+    query = urllib.parse.urlencode({
+        "client_id": secrets.BotSecrets.get(secrets.BotSecrets.SLACK_CLIENT_ID),
+        "scope": os.environ.get("BOT_OAUTH_SCOPES") or DEFAULT_SCOPES,
+        "state": create_state(),
+        "redirect_uri": get_redirect_uri(event),
+    })
+
+    return build_response(302, "", {"Location": f"{AUTHORIZE_URL}?{query}"})
+
+
+def complete_installation(code: str, redirect_uri: typing.Union[str, None] = None) -> Installation:
+    """
+    Exchanges the code of an OAuth flow for the bot token of the workspace and saves the installation.
+
+    Args:
+        code (str): The temporary code given to the redirect route.
+        redirect_uri (str): The redirect URI given to the consent page.
+
+    Returns:
+        Installation: The saved installation.
+    """
+
+    with metrics.timer("SlackOAuthAccess"):
+        response = create_client(None).oauth_v2_access(
+            client_id=secrets.BotSecrets.get(secrets.BotSecrets.SLACK_CLIENT_ID),
+            client_secret=secrets.BotSecrets.get(secrets.BotSecrets.SLACK_CLIENT_SECRET),
+            code=code,
+            redirect_uri=redirect_uri,
+        )
+
+    installation = Installation(
+        team_id=(response.get("team") or dict()).get("id"),
+        enterprise_id=(response.get("enterprise") or dict()).get("id"),
+        bot_token=response["access_token"],
+        bot_id=response.get("bot_id"),
+        bot_user_id=response.get("bot_user_id"),
+        installed_at=time.time(),
+    )
+
+    get_store().save(installation)
+    invalidate(installation.enterprise_id, installation.team_id)
+
+    return installation
+
+
+def handle_oauth_event(event: typing.Dict) -> typing.Dict:
+    """
+    Handles a request of the OAuth flow.
+
+    Args:
+        event (dict): The API Gateway event.
+
+    Returns:
+        dict: The API Gateway response.
+    """
+
+    # Without an installation store there is nothing to install into, and no token would be saved
+    if not is_enabled():
+        return build_response(404, "Installing the app is not enabled.")
+
+    if get_route(event) == "install":
+        return handle_install(event)
+
+    params = event.get("queryStringParameters") or dict()
+
+    if params.get("error"):
+        return build_response(200, f"The installation was cancelled: {params['error']}.")
+
+    if not params.get("code") or not verify_state(params.get("state")):
+        return build_response(400, "The installation link expired, please start the installation again.")
+
+    path = event.get("rawPath") or ""
+    redirect_uri = get_redirect_uri(dict(event, rawPath=path[:-len(OAUTH_REDIRECT_PATH)] + INSTALL_PATH))
+    installation = complete_installation(params["code"], redirect_uri)
+
+    return build_response(200, f"The app was installed into the workspace '{installation.team_id}'.")
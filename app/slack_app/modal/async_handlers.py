@@ -0,0 +1,281 @@
+"""
+This script handles modal interactions of the asynchronous execution mode. It mirrors the `handlers` module with
+coroutines using the async Slack WebClient, so the independent steps of a submission overlap: the user profile
+is looked up while the answers are scored and rendered. JIRA is called through the synchronous JIRA client in a
+worker thread, which keeps the event loop free, and the idempotency store is accessed the same way. The result is
+sent to the user while the JIRA task is being created, and the message is updated with the task link afterwards.
+With the JIRA outbox enabled, the task is appended to the outbox after the message was sent instead.
+Every processed submission is added to the questionnaire analytics. A failed submission is reported to the user,
+as Bolt does not retry lazy listeners.
+"""
+
+import asyncio
+import logging
+import typing
+
+from slack_bolt import BoltResponse
+from slack_sdk import errors
+
+from common import idempotency, metrics, users
+from jira_app import outbox, task
+from slack_app.modal import handlers
+from slack_app.questions import registry, results, scoring
+
+
+# Logger of the failures reported to the user instead of being raised
+LOGGER = logging.getLogger(__name__)
+
+
+async def open_modal(client, trigger_id, questionnaire_id: typing.Union[str, None] = None):
+    """
+    Opens a modal in Slack using the provided trigger ID.
+
+    Args:
+        client: AsyncWebClient instance to communicate with Slack API.
+        trigger_id: Trigger ID received from the Slack event to open a modal.
+        questionnaire_id (str): ID of the questionnaire of the modal. The default questionnaire if None.
+    """
+
+    # In a worker thread, as the registry may revalidate its definitions
+    compiled_view = (await asyncio.to_thread(registry.get_questionnaire, questionnaire_id)).view
+
+    try:
+        # Attempt to open a modal using the pre-serialized view payload, sent form-encoded without re-encoding it
+        with metrics.timer("SlackViewsOpen"):
+            await client.api_call(
+                "views.open",
+                data={"trigger_id": trigger_id, "view": compiled_view.payload},
+            )
+
+    except errors.SlackApiError as e:
+        # Raise an exception if the modal fails to open
+        raise Exception(f"Error opening modal: {str(e)}")
+
+
+async def handle_open_modal(ack, body, client, questionnaire_id: typing.Union[str, None] = None):
+    """
+    Handles the slash command to open a modal in Slack.
+
+    Args:
+        ack: Function to acknowledge the incoming request from Slack.
+        body: The body of the request from Slack containing details of the command.
+        client: AsyncWebClient instance to communicate with Slack API.
+        questionnaire_id (str): ID of the questionnaire of the modal. The default questionnaire if None.
+    """
+
+    # Acknowledge the incoming request from Slack
+    await ack()
+
+    # Call function to open modal passing the trigger_id from the request
+    await open_modal(client, body["trigger_id"], questionnaire_id)
+
+
+async def handle_start_button(ack, body, client):
+    """
+    Handles the "Start questionnaire" button of a broadcast message, opening the modal of its questionnaire.
+
+    Args:
+        ack: Function to acknowledge the incoming request from Slack.
+        body: The body of the block action, with the questionnaire ID as the value of the button.
+        client: AsyncWebClient instance to communicate with Slack API.
+    """
+
+    await ack()
+
+    await open_modal(client, body["trigger_id"], body["actions"][0].get("value"))
+
+
+async def ack_modal_submission(ack):
+    """
+    Acknowledges the submitted modal form within Slack's 3-second budget.
+
+    Args:
+        ack: Function to acknowledge the modal submission event.
+    """
+
+    # Acknowledge the incoming request from Slack, closing the modal
+    await ack()
+
+
+async def skip_duplicate_submission(body, request, next):
+    """
+    Middleware acknowledging duplicate deliveries of a modal submission without running any listener.
+
+    Args:
+        body: The body of the request from Slack.
+        request: The asynchronous Bolt request.
+        next: Coroutine function running the next middleware and the listeners.
+    """
+
+    # Lazy listener invocations are deduplicated by `handle_modal_submission` itself
+    if body.get("type") != "view_submission" or request.headers.get("x-slack-bolt-lazy-only"):
+        return await next()
+
+    key = idempotency.submission_key(body)
+
+    if key is not None and not await asyncio.to_thread(idempotency.get_store().claim, key):
+        metrics.increment("DuplicateSubmission")
+        # An empty response closes the modal, like the acknowledgement of the first delivery
+        return BoltResponse(status=200, body="")
+
+    return await next()
+
+
+async def handle_modal_submission(body, view, client):
+    """
+    Processes the submitted modal form from Slack once, skipping submissions already processed or in progress.
+    A failed submission is reported to the user and marked done, as nothing retries it.
+
+    Args:
+        body: The body of the request from Slack containing user and form details.
+        view: Contains state values of the submitted modal.
+        client: AsyncWebClient instance to communicate with Slack API.
+    """
+
+    key = idempotency.submission_key(body)
+    store = idempotency.get_store() if key is not None else None
+
+    # Submissions without a view ID cannot be told apart and are always processed
+    if store is not None and not await asyncio.to_thread(store.begin, key):
+        metrics.increment("DuplicateSubmission")
+        return
+
+    try:
+        await process_modal_submission(body, view, client)
+    except Exception:
+        # The modal is closed and the invocation is not retried, so the user submits again
+        LOGGER.exception("Failed to process the submission.")
+        await report_failure(client, body["user"]["id"])
+
+    if store is not None:
+        await asyncio.to_thread(store.complete, key)
+
+
+async def report_failure(client, user_id: str):
+    """
+    Asks the user to submit the questionnaire again. A failure is logged, never raised.
+
+    Args:
+        client: AsyncWebClient instance to communicate with Slack API.
+        user_id (str): The ID of the user who submitted the modal.
+    """
+
+    try:
+        with metrics.timer("SlackChatPostMessage"):
+            await client.chat_postMessage(channel=user_id, text=results.SUBMISSION_FAILED)
+    except Exception:
+        LOGGER.exception("Failed to report the failed submission to the user.")
+
+
+def score_submission(view, questionnaire: registry.Questionnaire) -> scoring.Score:
+    """
+    Scores the options selected in the modal and renders the sections of the responses.
+
+    Args:
+        view: Contains state values of the submitted modal.
+        questionnaire (Questionnaire): The questionnaire of the modal.
+
+    Returns:
+        Score: The scored submission.
+    """
+
+    try:
+        selected_options = view["state"]["values"]["section-identifier"]["checkboxes-action"]["selected_options"]
+        score = questionnaire.engine.score_options(selected_options)
+    except Exception:
+        raise Exception(f"Failed to get 'selected_options' data.")
+
+    # Render the answer-dependent sections now, so only the per-user parts are left once the user is known
+    results.render_sections(score)
+
+    return score
+
+
+async def save_answers(score: scoring.Score, user, questionnaire_id: typing.Union[str, None] = None):
+    """
+    Saves the answers in JIRA, in a worker thread as the JIRA client is synchronous.
+
+    Returns:
+        str: The link to the created task.
+    """
+
+    with metrics.timer("JiraSaveAnswers"):
+        return await asyncio.to_thread(
+            task.save_answers,
+            result=results.generate_response_jira(score, user),
+            user=user,
+            questionnaire_id=questionnaire_id
+        )
+
+
+async def post_message(client, channel: str, message: results.Message):
+    """
+    Sends a message to the user.
+
+    Returns:
+        The response of the Slack Web API.
+    """
+
+    with metrics.timer("SlackChatPostMessage"):
+        return await client.chat_postMessage(channel=channel, text=message.text, blocks=message.blocks)
+
+
+async def process_modal_submission(body, view, client):
+    """
+    Processes the submitted modal form from Slack, sends the result to the user and updates it with the task link.
+
+    Args:
+        body: The body of the request from Slack containing user and form details.
+        view: Contains state values of the submitted modal.
+        client: AsyncWebClient instance to communicate with Slack API.
+    """
+
+    # Extract the user ID who submitted the modal
+    user_id = body["user"]["id"]
+
+    # Resolve the questionnaire of the modal in the version it was opened with, in a worker thread as the registry
+    # may revalidate its definitions
+    questionnaire = await asyncio.to_thread(registry.resolve_view, view)
+
+    # Look the user up from the user cache or Slack while the answers are scored and rendered
+    user, score = await asyncio.gather(
+        users.get_user_async(client, user_id),
+        asyncio.to_thread(score_submission, view, questionnaire)
+    )
+
+    # Hand the task over to the outbox once the result was sent, its flusher updates the message
+    if outbox.is_enabled():
+        reply = await post_message(client, user_id, results.generate_response_slack(score, user))
+        await asyncio.to_thread(handlers.enqueue_task, body, score, user, reply, questionnaire)
+        await asyncio.to_thread(handlers.record_submission, score, questionnaire)
+        return
+
+    # Send the result to the user while the answers are saved in JIRA
+    reply, task_link = await asyncio.gather(
+        post_message(client, user_id, results.generate_response_slack(score, user)),
+        save_answers(score, user, questionnaire.id),
+        return_exceptions=True
+    )
+
+    task_failed = isinstance(task_link, Exception)
+    if task_failed:
+        # The user gets the result anyway, tell them to submit again instead of retrying behind their back
+        LOGGER.error("Failed to save the answers in JIRA.", exc_info=task_link)
+        task_link = None
+
+    message = results.generate_response_slack(score, user, task_link, task_failed)
+
+    # The task may already exist, so a failed first message is sent again in full rather than retrying the submission
+    if isinstance(reply, Exception):
+        await post_message(client, user_id, message)
+    else:
+        # Replace the placeholder of the task in the message, the user already got the result if it fails
+        try:
+            with metrics.timer("SlackChatUpdate"):
+                await client.chat_update(
+                    channel=reply["channel"], ts=reply["ts"], text=message.text, blocks=message.blocks
+                )
+        except Exception:
+            LOGGER.exception("Failed to update the message with the task.")
+
+    await asyncio.to_thread(handlers.record_submission, score, questionnaire)
@@ -3,36 +3,59 @@ This script handles modal interactions within a Slack application. It includes f
 handle a slash command for modal opening, and process modal submissions. The script integrates with a JIRA application
 to store the results and communicates with the Slack API using the Slack WebClient. It utilizes the modal view and
 questionnaire results from the slack_app module to dynamically generate responses based on user input.
+Submissions are deduplicated with the `idempotency` module, so retried deliveries do no work twice. Bolt only
+logs the failures of lazy listeners and never retries them, so a failed submission is reported to the user instead,
+who is asked to submit the questionnaire again.
+The result is sent to the user right away with a placeholder for the JIRA task, and the message is updated
+with the task link, or a retry notice, once the task was created. When the JIRA outbox is enabled, the task is
+only appended to the outbox and the message is updated by the outbox flusher instead. Every processed submission
+is added to the questionnaire analytics. The questionnaire of a modal is resolved from the registry of
+questionnaires by its callback ID.
 """
 
+import logging
+import typing
+import uuid
+
+from slack_bolt import BoltResponse
 from slack_sdk import errors
 
-from jira_app import task
-from slack_app.questions import results, view as modal_view
+from common import analytics, idempotency, metrics, users
+from jira_app import outbox, task
+from slack_app import installations
+from slack_app.questions import registry, results, scoring
+
 
+# Logger of the failures reported to the user instead of being raised
+LOGGER = logging.getLogger(__name__)
 
-def open_modal(client, trigger_id):
+
+def open_modal(client, trigger_id, questionnaire_id: typing.Union[str, None] = None):
     """
     Opens a modal in Slack using the provided trigger ID.
 
     Args:
         client: Slack WebClient instance to communicate with Slack API.
         trigger_id: Trigger ID received from the Slack event to open a modal.
+        questionnaire_id (str): ID of the questionnaire of the modal. The default questionnaire if None.
     """
 
+    compiled_view = registry.get_questionnaire(questionnaire_id).view
+
     try:
-        # Attempt to open a modal using the provided view definition
-        client.views_open(
-            trigger_id=trigger_id,
-            view=modal_view.get_view(),
-        )
+        # Attempt to open a modal using the pre-serialized view payload, sent form-encoded without re-encoding it
+        with metrics.timer("SlackViewsOpen"):
+            client.api_call(
+                "views.open",
+                data={"trigger_id": trigger_id, "view": compiled_view.payload},
+            )
 
     except errors.SlackApiError as e:
         # Raise an exception if the modal fails to open
         raise Exception(f"Error opening modal: {str(e)}")
 
 
-def handle_open_modal(ack, body, client):
+def handle_open_modal(ack, body, client, questionnaire_id: typing.Union[str, None] = None):
     """
     Handles the slash command to open a modal in Slack.
 
@@ -40,51 +63,265 @@ def handle_open_modal(ack, body, client):
         ack: Function to acknowledge the incoming request from Slack.
         body: The body of the request from Slack containing details of the command.
         client: Slack WebClient instance to communicate with Slack API.
+        questionnaire_id (str): ID of the questionnaire of the modal. The default questionnaire if None.
     """
 
     # Acknowledge the incoming request from Slack
     ack()
 
     # Call function to open modal passing the trigger_id from the request
-    open_modal(client, body["trigger_id"])
+    open_modal(client, body["trigger_id"], questionnaire_id)
+
+
+def handle_start_button(ack, body, client):
+    """
+    Handles the "Start questionnaire" button of a broadcast message, opening the modal of its questionnaire.
+
+    Args:
+        ack: Function to acknowledge the incoming request from Slack.
+        body: The body of the block action, with the questionnaire ID as the value of the button.
+        client: Slack WebClient instance to communicate with Slack API.
+    """
+
+    ack()
+
+    open_modal(client, body["trigger_id"], body["actions"][0].get("value"))
 
 
-def handle_modal_submission(ack, body, view, client):
+def ack_modal_submission(ack):
     """
-    Processes the submitted modal form from Slack and sends a response message.
+    Acknowledges the submitted modal form within Slack's 3-second budget.
+
+    The submission itself is processed by `handle_modal_submission`, which is registered as a lazy
+    listener and runs in a separate asynchronous invocation, so the acknowledgement latency does
+    not depend on JIRA or Slack Web API latency.
 
     Args:
         ack: Function to acknowledge the modal submission event.
+    """
+
+    # Acknowledge the incoming request from Slack, closing the modal
+    ack()
+
+
+def skip_duplicate_submission(body, request, next):
+    """
+    Middleware acknowledging duplicate deliveries of a modal submission without running any listener.
+
+    The first delivery claims the submission in the idempotency store. Retries of Slack, e.g. while the
+    first delivery is still in flight, are answered right away, before any lazy listener is started.
+    The claim is dropped again when the lazy listener of the first delivery cannot be started.
+
+    Args:
+        body: The body of the request from Slack.
+        request: The Bolt request.
+        next: Function running the next middleware and the listeners.
+    """
+
+    # Lazy listener invocations are deduplicated by `handle_modal_submission` itself
+    if body.get("type") != "view_submission" or request.headers.get("x-slack-bolt-lazy-only"):
+        return next()
+
+    key = idempotency.submission_key(body)
+
+    if key is not None and not idempotency.get_store().claim(key):
+        metrics.increment("DuplicateSubmission")
+        # An empty response closes the modal, like the acknowledgement of the first delivery
+        return BoltResponse(status=200, body="")
+
+    return next()
+
+
+def handle_modal_submission(body, view, client):
+    """
+    Processes the submitted modal form from Slack once, skipping submissions already processed or in progress.
+    A failed submission is reported to the user and marked done, as nothing retries it.
+
+    Args:
         body: The body of the request from Slack containing user and form details.
         view: Contains state values of the submitted modal.
         client: Slack WebClient instance to communicate with Slack API.
     """
 
-    # Acknowledge the incoming request from Slack
-    ack()
+    key = idempotency.submission_key(body)
+    store = idempotency.get_store() if key is not None else None
+
+    # Submissions without a view ID cannot be told apart and are always processed
+    if store is not None and not store.begin(key):
+        metrics.increment("DuplicateSubmission")
+        return
+
+    try:
+        process_modal_submission(body, view, client)
+    except Exception:
+        # The modal is closed and the invocation is not retried, so the user submits again
+        LOGGER.exception("Failed to process the submission.")
+        report_failure(client, body["user"]["id"])
+
+    if store is not None:
+        store.complete(key)
+
+
+def report_failure(client, user_id: str):
+    """
+    Asks the user to submit the questionnaire again. A failure is logged, never raised.
+
+    Args:
+        client: Slack WebClient instance to communicate with Slack API.
+        user_id (str): The ID of the user who submitted the modal.
+    """
+
+    try:
+        with metrics.timer("SlackChatPostMessage"):
+            client.chat_postMessage(channel=user_id, text=results.SUBMISSION_FAILED)
+    except Exception:
+        LOGGER.exception("Failed to report the failed submission to the user.")
+
+
+def process_modal_submission(body, view, client):
+    """
+    Processes the submitted modal form from Slack, sends the result to the user and updates it with the task link.
+
+    Args:
+        body: The body of the request from Slack containing user and form details.
+        view: Contains state values of the submitted modal.
+        client: Slack WebClient instance to communicate with Slack API.
+    """
 
     # Extract the user ID who submitted the modal
     user_id = body["user"]["id"]
 
-    # Retrieve user information from Slack
-    user_result = client.users_info(user=user_id)
-    user = user_result.get("user", {})
+    # Retrieve user information from the user cache or Slack
+    user = users.get_user(client, user_id)
+
+    # Resolve the questionnaire of the modal, in the version it was opened with
+    questionnaire = registry.resolve_view(view)
 
-    # Extract the selected options from the modal submission
+    # Extract the selected options from the modal submission and score them once for both responses
     try:
         selected_options = view["state"]["values"]["section-identifier"]["checkboxes-action"]["selected_options"]
-        selected_answers = modal_view.get_selected_answers(selected_options)
+        score = questionnaire.engine.score_options(selected_options)
     except Exception:
         raise Exception(f"Failed to get 'selected_options' data.")
 
+    # Send a message to the user with the calculated score and description right away, the task is still pending
+    message = results.generate_response_slack(score, user)
+
+    with metrics.timer("SlackChatPostMessage"):
+        reply = client.chat_postMessage(channel=user_id, text=message.text,  blocks=message.blocks)
+
+    # Hand the task over to the outbox, its flusher updates the message once the task exists
+    if outbox.is_enabled():
+        enqueue_task(body, score, user, reply, questionnaire)
+        record_submission(score, questionnaire)
+        return
+
     # Save the answers in JIRA and get the task link
-    task_link = task.save_answers(
-        result=results.generate_response_jira(selected_answers, user),
-        user=user
-    )
+    try:
+        with metrics.timer("JiraSaveAnswers"):
+            task_link = task.save_answers(
+                result=results.generate_response_jira(score, user),
+                user=user,
+                questionnaire_id=questionnaire.id
+            )
+    except Exception:
+        # The user already got the result, tell them to submit again instead of retrying behind their back
+        LOGGER.exception("Failed to save the answers in JIRA.")
+        message = results.generate_response_slack(score, user, task_failed=True)
+    else:
+        message = results.generate_response_slack(score, user, task_link)
+
+    # Replace the placeholder of the task in the message, the user already got the result if it fails
+    try:
+        with metrics.timer("SlackChatUpdate"):
+            client.chat_update(channel=reply["channel"], ts=reply["ts"], text=message.text, blocks=message.blocks)
+    except Exception:
+        LOGGER.exception("Failed to update the message with the task.")
+
+    record_submission(score, questionnaire)
+
+
+def record_submission(score: scoring.Score, questionnaire: registry.Questionnaire):
+    """
+    Adds a processed submission to the questionnaire analytics. A failure is logged, never reported to the user.
+
+    Args:
+        score (Score): The scored answers.
+        questionnaire (Questionnaire): The questionnaire of the submission.
+    """
+
+    try:
+        with metrics.timer("AnalyticsRecord"):
+            analytics.record(
+                score.mask,
+                questionnaire.engine.band_index.bands.index(score.band),
+                namespace=get_analytics_namespace(questionnaire)
+            )
+    except Exception:
+        LOGGER.exception("Failed to record the submission in the analytics.")
+
+
+def get_analytics_namespace(questionnaire: registry.Questionnaire) -> typing.Union[str, None]:
+    """
+    Gets the analytics namespace of a version of a questionnaire, as the positions of its answers only add up within
+    a version. None for the built-in questionnaire to keep its buckets.
+    """
+
+    if questionnaire.id == registry.DEFAULT_QUESTIONNAIRE and questionnaire.version == registry.get_builtin_version():
+        return None
+
+    return f"{questionnaire.id}@{questionnaire.version}"
+
+
+def enqueue_task(body, score: scoring.Score, user: typing.Dict, reply, questionnaire: registry.Questionnaire):
+    """
+    Appends the JIRA task of a submission to the outbox, with the reference of the message to update.
+
+    Args:
+        body: The body of the request from Slack, identifying the submission.
+        score (Score): The scored answers.
+        user (dict): A dictionary containing user information.
+        reply: The response of Slack to the message sent to the user.
+        questionnaire (Questionnaire): The questionnaire of the submission.
+    """
+
+    # Entries are keyed on the submission, so a retried submission is not appended twice
+    entry_id = idempotency.submission_key(body) or f"submission:{uuid.uuid4().hex}"
+
+    payload = {
+        "issue": task.build_answers_issue(results.generate_response_jira(score, user), user),
+        "reply": {"channel": reply["channel"], "ts": reply["ts"], "user": user, "mask": score.mask,
+                  "questionnaire": questionnaire.id, "version": questionnaire.version,
+                  "team_id": (body.get("team") or dict()).get("id"),
+                  "enterprise_id": (body.get("enterprise") or dict()).get("id")},
+    }
+
+    with metrics.timer("OutboxAppend"):
+        outbox.get_outbox().append(entry_id, payload)
+
+
+def update_task_message(client, reply: typing.Dict, task_link: typing.Union[str, None], task_failed: bool):
+    """
+    Updates the message of a submission handed over to the outbox, once its task exists or was given up.
+
+    Args:
+        client: Slack WebClient instance to communicate with Slack API, replaced by the client of the workspace of
+            the submission when an installation store is enabled.
+        reply (dict): The 'reply' reference of the outbox entry, with the channel and timestamp of the message,
+            the user, the bitmask of the selected questions, the ID and version of the questionnaire and the
+            workspace.
+        task_link (str): The link of the task, or None if it was given up.
+        task_failed (bool): Whether the task was given up.
+    """
+
+    # Render the message again from the bitmask, against the version of the questionnaire it was submitted with
+    score = registry.get_questionnaire(reply.get("questionnaire"), reply.get("version")).engine.score(reply["mask"])
+
+    # The message was sent by the bot of the workspace of the submission
+    if installations.is_enabled() and reply.get("team_id"):
+        client = installations.get_client(reply["team_id"], reply.get("enterprise_id"))
 
-    # Generate a response for Slack based on the selected answers
-    message = results.generate_response_slack(selected_answers, user, task_link)
+    message = results.generate_response_slack(score, reply["user"], task_link, task_failed)
 
-    # Send a message to the user with the calculated score and description
-    client.chat_postMessage(channel=user_id, text=message.text,  blocks=message.blocks)
+    with metrics.timer("SlackChatUpdate"):
+        client.chat_update(channel=reply["channel"], ts=reply["ts"], text=message.text, blocks=message.blocks)
@@ -0,0 +1,547 @@
+"""
+This script keeps the registry of the questionnaires of the bot. Besides the built-in security testing
+questionnaire (the questions of the `view` module and the bands of the `results` module), questionnaires are
+defined in JSON or YAML, fetched from a local directory or a bucket by the `source` module:
+
+    {
+        "id": "privacy",
+        "title": "Privacy Review",
+        "header": "Privacy Impact Questionnaire:",
+        "guidance": "Contact the privacy team for any question.",
+        "questions": [{"title": "Personal Data", "description": "Do you process personal data?", "weight": 2}],
+        "bands": [{"min_score": 0, "max_score": 2, "description": "Low", "details": ["Self-assessment."]}]
+    }
+
+Definitions are validated when the registry is loaded, and every questionnaire is compiled into its prebuilt modal
+view, its option-value lookup table and its band index (a `ScoringEngine`), then cached with the registry. The
+definitions fetched from a source are compiled at once, before their registry replaces the previous one; without a
+source, the built-in questionnaire is compiled on its first use, or by the warm-up. Every definition has a
+version, given or derived from its content, which keys the rendered sections of its results. A questionnaire is
+selected by the argument of the slash command, and its submissions are told apart by the callback ID of their
+modal, which carries the version of the questionnaire in its private metadata, like the entries of the JIRA outbox
+do. The registry keeps the last `MAX_VERSIONS` compiled versions of
+every questionnaire, so the answers of a modal opened, or of an entry queued, before the definitions changed are
+scored against the questions they answered. A version the container does not know any more is refused.
+
+The registry of a warm container is revalidated at most every `BOT_QUESTIONNAIRES_TTL` seconds with a conditional
+fetch of its source, which transfers nothing while the definitions are unchanged. Changed definitions are
+validated and compiled into a new registry, which replaces the previous one at once, so a request never sees
+the view of one version with the engine of another. Invalid or unreachable definitions are logged and the
+previous registry is kept.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import typing
+from collections import namedtuple
+
+from common import metrics, parser
+from slack_app.questions import results, scoring, source, view
+
+
+# ID of the built-in questionnaire, opened by the slash command without argument
+DEFAULT_QUESTIONNAIRE = "security-testing"
+
+# Default number of seconds between two revalidations of the definitions, overridden with `BOT_QUESTIONNAIRES_TTL`
+DEFAULT_REVALIDATE_INTERVAL = 60
+
+# Pattern of valid questionnaire IDs, usable as slash command arguments
+ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_.-]*$")
+
+# Pattern of the callback IDs of all questionnaire modals, the default one or followed by ':<id>'
+CALLBACK_ID_PATTERN = re.compile(rf"^{re.escape(parser.SLACK_MODAL_WINDOW_ID)}(:[a-z0-9_.-]+)?$")
+
+# Number of compiled versions of a questionnaire kept for the modals opened before its definition changed
+MAX_VERSIONS = 4
+
+# Limits of Slack: the title of a modal and the number of options of a checkboxes element
+MAX_TITLE_LENGTH = 24
+MAX_QUESTIONS = 10
+
+# Namedtuple 'Questionnaire' for a compiled questionnaire
+Questionnaire = namedtuple(
+    "Questionnaire",
+    [
+        "id",  # ID of the questionnaire
+        "version",  # Version of the definition
+        "callback_id",  # Callback ID of its modal
+        "engine",  # ScoringEngine with the option-value lookup table and the band index
+        "view",  # CompiledView of its modal
+    ]
+)
+
+# Logger of the definitions which failed to load
+LOGGER = logging.getLogger(__name__)
+
+# Global variable to store the registry
+REGISTRY: typing.Union["QuestionnaireRegistry", None] = None
+
+# Global variable to store the source of the definitions, False until it is created from the environment
+SOURCE: typing.Union[source.DefinitionSource, None, bool] = False
+
+# Time when the source was last revalidated, on the monotonic clock
+CHECKED_AT: typing.Union[float, None] = None
+
+# Lock letting a single request revalidate the source, the others keep using the current registry
+RELOAD_LOCK = threading.Lock()
+
+# Global variable to store the version of the built-in questionnaire, set by `get_builtin_version`
+BUILTIN_VERSION: typing.Union[str, None] = None
+
+
+def get_builtin_definition() -> typing.Dict:
+    """
+    Builds the definition of the built-in questionnaire.
+
+    Returns:
+        dict: The definition.
+    """
+
+    return {
+        "id": DEFAULT_QUESTIONNAIRE,
+        "title": view.VIEW_TEMPLATE["title"]["text"],
+        "header": view.SECURITY_TESTING_QUESTIONNAIRE,
+        "questions": [
+            {"title": title, "description": description, "weight": weight}
+            for (title, description), weight in zip(view.questions, scoring.QUESTION_WEIGHTS)
+        ],
+        "bands": [
+            {"min_score": min_score, "max_score": max_score, "description": description, "details": list(details)}
+            for min_score, max_score, description, details in results.RESULTS
+        ],
+    }
+
+
+def get_builtin_version() -> str:
+    """
+    Retrieves the version of the built-in questionnaire, derived from its definition once per container.
+    """
+
+    global BUILTIN_VERSION
+
+    if BUILTIN_VERSION is None:
+        BUILTIN_VERSION = validate_definition(get_builtin_definition())["version"]
+
+    return BUILTIN_VERSION
+
+
+def validate_definition(definition: typing.Any) -> typing.Dict:
+    """
+    Validates a questionnaire definition and fills in its defaults.
+
+    Args:
+        definition (Any): The parsed definition.
+
+    Returns:
+        dict: The validated definition, with its version.
+
+    Raises:
+        ValueError: If the definition is invalid.
+    """
+
+    if not isinstance(definition, dict):
+        raise ValueError("A questionnaire definition must be an object.")
+
+    questionnaire_id = definition.get("id")
+    if not isinstance(questionnaire_id, str) or not ID_PATTERN.match(questionnaire_id):
+        raise ValueError("The 'id' must be lowercase letters, digits, '_', '.' or '-'.")
+
+    title = definition.get("title") or view.VIEW_TEMPLATE["title"]["text"]
+    if not isinstance(title, str) or len(title) > MAX_TITLE_LENGTH:
+        raise ValueError(f"The 'title' must be a text of at most {MAX_TITLE_LENGTH} characters.")
+
+    questions = definition.get("questions")
+    if not isinstance(questions, list) or not 0 < len(questions) <= MAX_QUESTIONS:
+        raise ValueError(f"The 'questions' must be a list of 1 to {MAX_QUESTIONS} questions.")
+
+    for question in questions:
+        if not isinstance(question, dict) or not question.get("title") or not question.get("description"):
+            raise ValueError("Every question needs a 'title' and a 'description'.")
+
+        # A boolean is an integer in Python, but `true` is not a weight
+        weight = question.get("weight", 1)
+        if isinstance(weight, bool) or not isinstance(weight, int) or weight < 0:
+            raise ValueError(f"The weight of question '{question['title']}' must be a non-negative integer.")
+
+    bands = definition.get("bands")
+    if not isinstance(bands, list):
+        raise ValueError("The 'bands' must be a list of result bands.")
+
+    for band in bands:
+        if not isinstance(band, dict) or not all(field in band for field in ("min_score", "max_score", "description")):
+            raise ValueError("Every band needs a 'min_score', a 'max_score' and a 'description'.")
+
+    # Checks the bands for gaps and overlaps against the highest reachable score
+    scoring.BandIndex(get_bands(definition), max_score=sum(question.get("weight", 1) for question in questions))
+
+    # Content-derived version, so a changed definition never shares the rendered sections of the previous one
+    version = definition.get("version") or hashlib.sha256(
+        json.dumps(definition, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:12]
+
+    return dict(definition, title=title, version=str(version))
+
+
+def get_bands(definition: typing.Dict) -> typing.List[scoring.Band]:
+    """
+    Builds the result bands of a validated definition.
+    """
+
+    return [
+        scoring.Band(band["min_score"], band["max_score"], band["description"], list(band.get("details") or list()))
+        for band in definition["bands"]
+    ]
+
+
+def get_callback_id(questionnaire_id: str) -> str:
+    """
+    Builds the callback ID of the modal of a questionnaire, the historical one for the default questionnaire.
+    """
+
+    if questionnaire_id == DEFAULT_QUESTIONNAIRE:
+        return parser.SLACK_MODAL_WINDOW_ID
+
+    return f"{parser.SLACK_MODAL_WINDOW_ID}:{questionnaire_id}"
+
+
+def compile_questionnaire(definition: typing.Dict) -> Questionnaire:
+    """
+    Compiles a validated definition into its modal view and scoring engine.
+
+    Args:
+        definition (dict): The validated definition.
+
+    Returns:
+        Questionnaire: The compiled questionnaire.
+    """
+
+    question_list = [(question["title"], question["description"]) for question in definition["questions"]]
+    callback_id = get_callback_id(definition["id"])
+
+    return Questionnaire(
+        id=definition["id"],
+        version=definition["version"],
+        callback_id=callback_id,
+        engine=scoring.ScoringEngine(
+            question_list,
+            get_bands(definition),
+            [question.get("weight", 1) for question in definition["questions"]],
+            key=f"{definition['id']}@{definition['version']}",
+            guidance=definition.get("guidance")
+        ),
+        view=view.compile_view(
+            question_list, definition["title"], definition.get("header"), callback_id, definition["version"]
+        )
+    )
+
+
+def validate_snapshot(snapshot: source.Snapshot) -> typing.List[typing.Dict]:
+    """
+    Validates the definitions of a source.
+
+    Args:
+        snapshot (Snapshot): The content of the source.
+
+    Returns:
+        List[dict]: The validated definitions, in the order of the source.
+
+    Raises:
+        Exception: If a definition is invalid, naming its file or object.
+    """
+
+    definitions = list()
+
+    for origin, definition in snapshot.definitions:
+        try:
+            definitions.append(validate_definition(definition))
+        except ValueError as e:
+            raise Exception(f"Invalid questionnaire definition '{origin}': {str(e)}")
+
+    return definitions
+
+
+def load_definitions(directory: typing.Union[str, None]) -> typing.List[typing.Dict]:
+    """
+    Loads and validates the definitions of a directory.
+
+    Args:
+        directory (str): The directory of the definition files. No definition if None.
+
+    Returns:
+        List[dict]: The validated definitions, in the order of their file names.
+
+    Raises:
+        Exception: If a definition is invalid.
+    """
+
+    if not directory:
+        return list()
+
+    return validate_snapshot(source.DirectorySource(directory).fetch())
+
+
+class QuestionnaireRegistry:
+    """
+    The validated questionnaire definitions, compiled on first use unless `compile` compiled them all ahead.
+    """
+
+    def __init__(
+            self,
+            definitions: typing.Sequence[typing.Dict],
+            etag: typing.Union[str, None] = None,
+            previous: typing.Union["QuestionnaireRegistry", None] = None
+    ):
+        """
+        Initializes the registry.
+
+        Args:
+            definitions (Sequence[dict]): The validated definitions. A definition with the ID of the built-in
+                questionnaire replaces it.
+            etag (str): ETag of the content of the source the definitions were loaded from, None for none.
+            previous (QuestionnaireRegistry): The registry replaced by this one, whose versions are kept.
+        """
+
+        self.etag = etag
+
+        self.definitions: typing.Dict[str, typing.Dict] = {DEFAULT_QUESTIONNAIRE: None}
+        self.definitions.update({definition["id"]: definition for definition in definitions})
+
+        self.compiled: typing.Dict[str, Questionnaire] = dict()
+        self._lock = threading.Lock()
+
+        # Compiled questionnaires by ID and version, from the oldest to the newest
+        self.versions: typing.Dict[typing.Tuple[str, str], Questionnaire] = dict()
+
+        if previous is not None:
+            self.versions.update(previous.versions)
+
+    def ids(self) -> typing.List[str]:
+        return list(self.definitions)
+
+    def get(
+            self,
+            questionnaire_id: typing.Union[str, None] = None,
+            version: typing.Union[str, None] = None
+    ) -> Questionnaire:
+        """
+        Retrieves a questionnaire, compiling it on first use.
+
+        Args:
+            questionnaire_id (str): ID of the questionnaire. The default questionnaire if None.
+            version (str): Version of the questionnaire, e.g. of a modal opened before a reload. The current one
+                if None.
+
+        Returns:
+            Questionnaire: The compiled questionnaire.
+
+        Raises:
+            Exception: If the questionnaire, or its version, is unknown.
+        """
+
+        questionnaire_id = questionnaire_id or DEFAULT_QUESTIONNAIRE
+        questionnaire = self.compiled.get(questionnaire_id)
+
+        if questionnaire is None:
+            if questionnaire_id not in self.definitions:
+                raise Exception(f"Unknown questionnaire '{questionnaire_id}'.")
+
+            with self._lock:
+                if questionnaire_id not in self.compiled:
+                    definition = self.definitions[questionnaire_id] or validate_definition(get_builtin_definition())
+                    self.remember(compile_questionnaire(definition))
+
+                questionnaire = self.compiled[questionnaire_id]
+
+        if version is None or version == questionnaire.version:
+            return questionnaire
+
+        # The answers of a previous version are only scored against the questions they answered
+        previous = self.versions.get((questionnaire_id, version))
+
+        if previous is None:
+            raise Exception(f"Unknown version '{version}' of the questionnaire '{questionnaire_id}'.")
+
+        return previous
+
+    def remember(self, questionnaire: Questionnaire):
+        """
+        Adds a compiled questionnaire as the current one of its ID, keeping its last `MAX_VERSIONS` versions.
+        """
+
+        key = (questionnaire.id, questionnaire.version)
+        self.compiled[questionnaire.id] = questionnaire
+        self.versions.pop(key, None)
+        self.versions[key] = questionnaire
+
+        for old_key in [other for other in self.versions if other[0] == questionnaire.id][:-MAX_VERSIONS]:
+            del self.versions[old_key]
+
+    def resolve_callback_id(
+            self,
+            callback_id: typing.Union[str, None],
+            version: typing.Union[str, None] = None
+    ) -> Questionnaire:
+        """
+        Retrieves the questionnaire of a modal by its callback ID.
+
+        Args:
+            callback_id (str): The callback ID of the submitted modal. The default questionnaire if None.
+            version (str): The version of the questionnaire, from the private metadata of the modal. The current
+                one if None, as for the modals opened before the versions were sent.
+
+        Returns:
+            Questionnaire: The compiled questionnaire.
+        """
+
+        prefix = f"{parser.SLACK_MODAL_WINDOW_ID}:"
+
+        if callback_id and callback_id.startswith(prefix):
+            return self.get(callback_id[len(prefix):], version)
+
+        return self.get(DEFAULT_QUESTIONNAIRE, version)
+
+    def compile(self) -> "QuestionnaireRegistry":
+        """
+        Compiles every questionnaire of the registry ahead of its first use.
+
+        Returns:
+            QuestionnaireRegistry: The registry itself.
+        """
+
+        for questionnaire_id in self.ids():
+            self.get(questionnaire_id)
+
+        return self
+
+
+def get_source() -> typing.Union[source.DefinitionSource, None]:
+    """
+    Retrieves or creates the global source of the definitions from the environment.
+
+    Returns:
+        DefinitionSource: The source, or None for the built-in questionnaire only.
+    """
+
+    global SOURCE
+
+    if SOURCE is False:
+        SOURCE = source.create_source()
+
+    return SOURCE
+
+
+def get_revalidate_interval() -> float:
+    return float(os.environ.get("BOT_QUESTIONNAIRES_TTL") or DEFAULT_REVALIDATE_INTERVAL)
+
+
+def reload_registry() -> QuestionnaireRegistry:
+    """
+    Revalidates the source of the definitions and replaces the global registry when they changed.
+
+    The new registry is compiled before it replaces the previous one. A failing fetch or invalid definitions keep
+    the previous registry, or the built-in questionnaire alone when there is none yet.
+
+    Returns:
+        QuestionnaireRegistry: The current registry.
+    """
+
+    global REGISTRY, CHECKED_AT
+
+    current = REGISTRY
+    definition_source = get_source()
+    CHECKED_AT = time.monotonic()
+
+    if definition_source is None:
+        if current is None:
+            REGISTRY = QuestionnaireRegistry([])
+        return REGISTRY
+
+    try:
+        snapshot = definition_source.fetch(current.etag if current is not None else None)
+
+        # Unchanged definitions keep the compiled questionnaires
+        if snapshot is None:
+            return current
+
+        registry = QuestionnaireRegistry(validate_snapshot(snapshot), snapshot.etag, current).compile()
+    except Exception:
+        LOGGER.exception("Failed to load the questionnaire definitions.")
+        metrics.increment("QuestionnairesReloadErrors")
+
+        if current is None:
+            REGISTRY = QuestionnaireRegistry([])
+        return REGISTRY
+
+    if current is not None:
+        metrics.increment("QuestionnairesReloaded")
+
+    # A single assignment, requests see either the previous or the new questionnaires
+    REGISTRY = registry
+    return REGISTRY
+
+
+def get_registry() -> QuestionnaireRegistry:
+    """
+    Retrieves the global registry, revalidating its definitions once the revalidation interval elapsed.
+
+    Returns:
+        QuestionnaireRegistry: The registry.
+    """
+
+    registry = REGISTRY
+
+    if registry is not None and CHECKED_AT is not None and time.monotonic() - CHECKED_AT < get_revalidate_interval():
+        return registry
+
+    # A single request revalidates, concurrent ones keep using the current registry meanwhile
+    if not RELOAD_LOCK.acquire(blocking=registry is None):
+        return registry
+
+    try:
+        # Another request may have revalidated while this one waited for the lock
+        if REGISTRY is not None and CHECKED_AT is not None and time.monotonic() - CHECKED_AT < get_revalidate_interval():
+            return REGISTRY
+
+        return reload_registry()
+    finally:
+        RELOAD_LOCK.release()
+
+
+def get_questionnaire(
+        questionnaire_id: typing.Union[str, None] = None,
+        version: typing.Union[str, None] = None
+) -> Questionnaire:
+    """
+    Retrieves a compiled questionnaire from the global registry.
+
+    Args:
+        questionnaire_id (str): ID of the questionnaire. The default questionnaire if None.
+        version (str): Version of the questionnaire. The current one if None.
+
+    Returns:
+        Questionnaire: The compiled questionnaire.
+    """
+
+    return get_registry().get(questionnaire_id, version)
+
+
+def resolve_view(view: typing.Mapping) -> Questionnaire:
+    """
+    Retrieves the questionnaire of a submitted modal from the global registry, in the version it was opened with.
+    """
+
+    return get_registry().resolve_callback_id(view.get("callback_id"), view.get("private_metadata") or None)
+
+
+def reset_registry():
+    """
+    Drops the global registry and source so that they are loaded again on next use.
+    """
+
+    global REGISTRY, SOURCE, CHECKED_AT
+    REGISTRY, SOURCE, CHECKED_AT = None, False, None
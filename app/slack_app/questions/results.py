@@ -2,14 +2,22 @@
 This script is designed to facilitate communication within a Slack application, specifically tailored
 for conducting security testing level determination. It includes a detailed framework for assessing
 security testing requirements based on a scoring system. The script defines constants and a namedtuple
-for structured message formatting, along with a series of functions to create Slack message blocks,
-calculate scores, and format messages for both Slack and JIRA integrations.
+for structured message formatting, along with a series of functions to create Slack message blocks
+and format messages for both Slack and JIRA integrations from a submission scored by the `scoring` module.
+The answer-dependent sections (score, selected answers and result) only depend on the questionnaire and the answer
+bitmask, so they are rendered once per bitmask into a bounded cache shared by all questionnaires, which can be
+pre-warmed for all answer combinations of the questionnaires that fit in it, and only the per-user greeting and task
+link are rendered for every submission. The Slack response can be rendered before the JIRA task exists, with a
+placeholder in place of the task link, and rendered again once the task was created or failed to be created.
 """
 
 import typing
 from collections import namedtuple
 
-from common import parser
+from common import cache, metrics, parser
+
+if typing.TYPE_CHECKING:
+    from slack_app.questions.scoring import Score
 
 
 # Constant header for the security testing levels
@@ -19,9 +27,31 @@ SECURITY_TESTING_LEVELS = "Security Testing Levels:"
 SECURITY_TESTING_INFO = "This structure provides a scalable approach to security testing based on the specific " \
                         "needs and risks associated with each application."
 
+# Task section of the Slack response while the JIRA task is being created
+TASK_PENDING = "*Task:* _being created in JIRA..._"
+
+# Task section of the Slack response when the JIRA task could not be created
+TASK_FAILED = "*Task:* the JIRA task could not be created. Please submit the questionnaire again in a few minutes."
+
+# Message sent to the user when a submission could not be processed before its result was sent
+SUBMISSION_FAILED = "Sorry, your answers could not be processed. Please open the questionnaire and submit it again."
+
 # Namedtuple 'Message' for structuring Slack messages with text and block elements
 Message = namedtuple("Message", ["text", "blocks"], defaults=[str(), list()])
 
+# Namedtuple 'Sections' for the rendered answer-dependent sections shared by the Slack and JIRA responses
+Sections = namedtuple(
+    "Sections",
+    ["text", "total_score", "selected_answers", "result", "total_score_block", "selected_answers_block", "result_block"]
+)
+
+# Maximum number of rendered answer sets kept in the cache, enough for every combination of 10 questions
+RENDER_CACHE_SIZE = 1024
+
+# Global cache of rendered sections keyed by the questionnaire key and the answer bitmask.
+# The cached blocks are shared and must not be mutated.
+RENDER_CACHE = cache.TTLCache(maxsize=RENDER_CACHE_SIZE)
+
 
 # Mapping of score ranges to results.
 RESULTS = [
@@ -124,138 +154,230 @@ def get_jira_heading(user: typing.Dict) -> str:
     return f"*{username}* answered questions."
 
 
-def get_selected_answers(selected_answers: typing.List[str]) -> str:
+def get_selected_answers(score: "Score") -> str:
     """
     Compiles selected answers into a formatted string.
 
     Args:
-        selected_answers (List[str]): A list of selected answers.
+        score (Score): The scored submission.
 
     Returns:
         str: A formatted string of selected answers.
     """
 
-    result_str = "*Selected answers:*"
+    return "*Selected answers:*" + "".join(f"\n{selected}" for selected in score.answers)
 
-    for selected in selected_answers:
-        result_str += f"\n{selected}"
 
-    return result_str
-
-
-def get_total_score(selected_answers: typing.List[str]) -> str:
+def get_total_score(score: "Score") -> str:
     """
-    Calculates and returns the total score based on selected answers.
+    Returns the total score of a scored submission.
 
     Args:
-        selected_answers (List[str]): A list of selected answers.
+        score (Score): The scored submission.
 
     Returns:
         str: A formatted string displaying the total score.
     """
 
-    return f"*Total score:* {len(selected_answers)}"
+    return f"*Total score:* {score.total}"
 
 
-def get_result(selected_answers: typing.List[str]) -> str:
+def get_result(score: "Score") -> str:
     """
-    Determines and formats the security testing result based on the score.
+    Formats the security testing result of the band matching the score.
 
     Args:
-        selected_answers (List[str]): A list of selected answers.
+        score (Score): The scored submission.
 
     Returns:
         str: A formatted string of the result based on the score.
     """
 
-    # Process the selected options to calculate a score
-    score = len(selected_answers)
-    result_str = "Result:"
+    details = "".join(f"\n- {detail}" for detail in score.band.details)
+    guidance = f"\n{score.guidance}" if score.guidance else ""
+    return f"*Result: {score.band.description}*{details}{guidance}"
+
+
+def get_task(task_link: typing.Union[str, None], task_failed: bool = False) -> str:
+    """
+    Generates a task creation message.
+
+    Args:
+        task_link (str): The link to the created task. None while the task is being created.
+        task_failed (bool): Whether the task could not be created.
 
-    # Loop through predefined results and append the appropriate description
-    for _, max_level, description, details in RESULTS:
-        if score <= max_level:
-            result_str = f"*{result_str} {description}*"
+    Returns:
+        str: A formatted message indicating the task creation with a link, or the pending or failed task notice.
+    """
 
-            for detail in details:
-                result_str += f"\n- {detail}"
-            break
+    if task_failed:
+        return TASK_FAILED
 
-    return result_str
+    if task_link is None:
+        return TASK_PENDING
 
+    return f"*Task created:* {task_link}"
 
-def get_task(task_link: str) -> str:
+
+def render_sections(score: "Score") -> Sections:
     """
-    Generates a task creation message.
+    Renders the answer-dependent sections of the responses, using the render cache when possible.
 
     Args:
-        task_link (str): The link to the created task.
+        score (Score): The scored submission.
 
     Returns:
-        str: A formatted message indicating the task creation with a link.
+        Sections: The rendered sections of the answer set.
     """
 
-    return f"*Task created:* {task_link}"
+    # Scores of different questionnaires, or versions of a questionnaire, never share their sections
+    cache_key = (score.key, score.mask)
+    sections = RENDER_CACHE.get(cache_key)
+
+    if sections is None:
+        metrics.increment("RenderCacheMiss")
+        sections = create_sections(score)
+        RENDER_CACHE.set(cache_key, sections)
+    else:
+        metrics.increment("RenderCacheHit")
+
+    return sections
+
+
+def create_sections(score: "Score") -> Sections:
+    """
+    Renders the answer-dependent sections of the responses, without the render cache.
+
+    Args:
+        score (Score): The scored submission.
+
+    Returns:
+        Sections: The rendered sections of the answer set.
+    """
+
+    total_score = get_total_score(score)
+    selected_answers = get_selected_answers(score)
+    result = get_result(score)
+
+    return Sections(
+        text=total_score.replace("*", ""),  # Plain text total score, stripped of markdown symbols
+        total_score=total_score,
+        selected_answers=selected_answers,
+        result=result,
+        total_score_block=create_slack_block(total_score),
+        selected_answers_block=create_slack_block(selected_answers),
+        result_block=create_slack_block(result)
+    )
+
+
+def prewarm_render_cache(engines: typing.Iterable) -> int:
+    """
+    Renders the sections of every answer combination of the given questionnaires into the render cache, without
+    counting hits or misses: the stats of the cache and the `RenderCache*` metrics only reflect the submissions.
+
+    Args:
+        engines (Iterable[ScoringEngine]): The scoring engines of the questionnaires, in order of precedence.
+
+    Returns:
+        int: The number of pre-warmed combinations. The questionnaires whose combinations do not fit in what the
+            previous ones left of the cache are skipped.
+    """
+
+    total = 0
+
+    for engine in engines:
+        combinations = 1 << len(engine.questions)
+
+        # All questionnaires share the cache, pre-warming more combinations than it holds would only evict them again
+        if total + combinations > RENDER_CACHE.maxsize:
+            continue
+
+        total += combinations
+
+        for mask in range(combinations):
+            score = engine.score(mask)
+            cache_key = (score.key, score.mask)
+
+            # The membership check is not counted as a lookup, and the sections kept warm are not rendered again
+            if cache_key not in RENDER_CACHE:
+                RENDER_CACHE.set(cache_key, create_sections(score))
+
+    return total
+
+
+def get_render_cache_stats() -> cache.CacheStats:
+    """
+    Returns the hit, miss and eviction counters of the render cache.
+
+    Returns:
+        CacheStats: The counters of the render cache.
+    """
+
+    return RENDER_CACHE.stats()
 
 
 def generate_response_slack(
-        selected_answers: typing.List[str],
+        score: "Score",
         user: typing.Dict,
-        task_link: str
+        task_link: typing.Union[str, None] = None,
+        task_failed: bool = False
 ) -> Message:
     """
     Compiles a full response for Slack based on user answers and other data.
 
     Args:
-        selected_answers (List[str]): A list of selected answers.
+        score (Score): The scored submission.
         user (dict): A dictionary containing user information.
-        task_link (str): The link to the created task.
+        task_link (str): The link to the created task. None for the placeholder shown while it is being created.
+        task_failed (bool): Whether the task could not be created, replacing the link with a retry notice.
 
     Returns:
         Message: A namedtuple containing the response text and blocks for Slack.
     """
 
-    # Retrieve and format the total score, stripping out markdown symbols for plain text
-    text = get_total_score(selected_answers)
-    text = text.replace("*", "")
+    # Retrieve the rendered sections of the answer set
+    sections = render_sections(score)
 
     # Initialize an empty list to store message blocks
     blocks: typing.List = list()
 
     # Append various sections to the message blocks
     blocks.append(create_slack_block(get_greeting(user)))  # Greeting section
-    blocks.append(create_slack_block(get_total_score(selected_answers)))  # Total score section
-    blocks.append(create_slack_block(get_selected_answers(selected_answers)))  # Selected answers section
-    blocks.append(create_slack_block(get_result(selected_answers)))  # Result based on the score
-    blocks.append(create_slack_block(get_task(task_link)))  # Task link section
+    blocks.append(sections.total_score_block)  # Total score section
+    blocks.append(sections.selected_answers_block)  # Selected answers section
+    blocks.append(sections.result_block)  # Result based on the score
+    blocks.append(create_slack_block(get_task(task_link, task_failed)))  # Task link section
 
     # Return the compiled message as a namedtuple
-    return Message(text=text, blocks=blocks)
+    return Message(text=sections.text, blocks=blocks)
 
 
-def generate_response_jira(selected_answers: typing.List[str], user: typing.Dict) -> str:
+def generate_response_jira(score: "Score", user: typing.Dict) -> str:
     """
     Compiles a full response for JIRA based on user answers.
 
     Args:
-        selected_answers (List[str]): A list of selected answers.
+        score (Score): The scored submission.
         user (dict): A dictionary containing user information.
 
     Returns:
         str: A formatted string suitable for JIRA.
     """
 
+    # Retrieve the rendered sections of the answer set
+    sections = render_sections(score)
+
     # Start building the JIRA response as a formatted string
     # The string is assembled using formatted pieces to create a cohesive report
     result = \
         f"""
         {get_jira_heading(user)}  # Include a heading with the user's name indicating they answered questions
 
-        {get_total_score(selected_answers)}  # Add the total score summary
+        {sections.total_score}  # Add the total score summary
 
-        {get_selected_answers(selected_answers)}  # List all the selected answers
+        {sections.selected_answers}  # List all the selected answers
 
-        {get_result(selected_answers)}  # Append the final result based on the answers
+        {sections.result}  # Append the final result based on the answers
         """
 
     # Return the final compiled response
@@ -0,0 +1,235 @@
+"""
+This script implements the scoring engine of the questionnaire. The options selected in the modal are decoded
+with a lookup table straight into a compact integer bitmask (bit N set when question N was answered 'yes'),
+which is scored with per-question weights and matched to a result band through a bisect index over the band
+boundaries. The bands are validated for gaps and overlaps when the engine is built. The outcome is a typed
+`Score` consumed by both the Slack and the JIRA renderers, so a submission is parsed and scored only once.
+An engine is compiled for every questionnaire of the `registry` module; `get_engine` returns the one of the
+default questionnaire.
+"""
+
+import bisect
+import typing
+from collections import namedtuple
+
+from slack_app.questions import view
+
+
+# Weight of every question, in the order of the questions. A 'yes' answer adds the weight to the total score.
+QUESTION_WEIGHTS: typing.List[int] = [1] * len(view.questions)
+
+# Namedtuple 'Band' for a result band, covering the total scores from `min_score` to `max_score` inclusive
+Band = namedtuple("Band", ["min_score", "max_score", "description", "details"])
+
+# Namedtuple 'Score' for a scored submission
+Score = namedtuple(
+    "Score",
+    [
+        "mask",  # Bitmask of the selected questions, bit N set when question N was selected
+        "indices",  # Indices of the selected questions in ascending order
+        "total",  # Weighted total score
+        "band",  # Band matching the total score
+        "answers",  # Formatted selected answers, one line per selected question
+        "key",  # Key of the questionnaire and version the submission was scored for, None for a standalone engine
+        "guidance",  # Guidance text of the questionnaire shown with the result, None if it has none
+    ],
+    defaults=[None, None]
+)
+
+
+class BandIndex:
+    """
+    An index of contiguous result bands, looked up by total score with a binary search.
+    """
+
+    def __init__(self, bands: typing.Sequence[Band], max_score: int):
+        """
+        Validates and indexes the bands.
+
+        Args:
+            bands (Sequence[Band]): The result bands.
+            max_score (int): The highest reachable total score, which the bands must cover.
+
+        Raises:
+            ValueError: If the bands are empty, do not start at zero, have gaps or overlaps, or do not cover the max score.
+        """
+
+        bands = sorted(bands, key=lambda band: band.min_score)
+
+        if not bands:
+            raise ValueError("At least one result band is required.")
+
+        if bands[0].min_score != 0:
+            raise ValueError("The first result band must start at score 0.")
+
+        for band in bands:
+            if band.min_score > band.max_score:
+                raise ValueError(f"Result band '{band.description}' has a minimum above its maximum.")
+
+        for previous, band in zip(bands, bands[1:]):
+            if band.min_score <= previous.max_score:
+                raise ValueError(f"Result bands '{previous.description}' and '{band.description}' overlap.")
+
+            if band.min_score > previous.max_score + 1:
+                raise ValueError(f"There is a gap between result bands '{previous.description}' and '{band.description}'.")
+
+        if bands[-1].max_score < max_score:
+            raise ValueError(f"The result bands do not cover the maximum score {max_score}.")
+
+        self.bands = tuple(bands)
+        self.boundaries = [band.min_score for band in bands]
+
+    def lookup(self, score: int) -> Band:
+        """
+        Finds the band of a total score.
+
+        Args:
+            score (int): The total score.
+
+        Returns:
+            Band: The band covering the score.
+
+        Raises:
+            ValueError: If no band covers the score.
+        """
+
+        idx = bisect.bisect_right(self.boundaries, score) - 1
+
+        if idx < 0 or score > self.bands[idx].max_score:
+            raise ValueError(f"No result band covers score {score}.")
+
+        return self.bands[idx]
+
+
+class ScoringEngine:
+    """
+    Decodes selected options into a bitmask and scores it.
+    """
+
+    def __init__(
+            self,
+            question_list: typing.Sequence[typing.Tuple[str, str]],
+            bands: typing.Sequence[Band],
+            weights: typing.Union[typing.Sequence[int], None] = None,
+            key: typing.Union[str, None] = None,
+            guidance: typing.Union[str, None] = None
+    ):
+        """
+        Builds the lookup tables of the engine.
+
+        Args:
+            question_list (Sequence[Tuple[str, str]]): The questions as tuples of (Question Title, Question Description).
+            bands (Sequence[Band]): The result bands.
+            weights (Sequence[int]): Weight of every question. Every question weighs 1 if None.
+            key (str): Key of the questionnaire and version, telling apart the scores of different questionnaires.
+            guidance (str): Guidance text of the questionnaire shown with the result.
+
+        Raises:
+            ValueError: If the weights do not match the questions or the bands are invalid.
+        """
+
+        weights = list(weights) if weights is not None else [1] * len(question_list)
+
+        if len(weights) != len(question_list):
+            raise ValueError("There must be exactly one weight per question.")
+
+        self.questions = tuple(question_list)
+        self.weights = tuple(weights)
+        self.key = key
+        self.guidance = guidance
+        self.uniform_weight = weights[0] if weights and len(set(weights)) == 1 else None
+
+        # Lookup table of option value to question index, replacing the parsing of 'value-N' strings
+        self.option_values = {f"value-{idx}": idx for idx in range(len(question_list))}
+
+        # Selected answer line of every question, formatted once
+        self.answer_lines = tuple(
+            f"\n{idx + 1}. *{title}:* {description}" for idx, (title, description) in enumerate(question_list)
+        )
+
+        self.band_index = BandIndex(bands, max_score=sum(weights))
+
+    def decode(self, selected_options: typing.List[typing.Dict]) -> int:
+        """
+        Decodes the options selected in the modal into a bitmask.
+
+        Args:
+            selected_options (List[Dict]): The selected options, each with a 'value' key like 'value-N'.
+
+        Returns:
+            int: The bitmask with bit N set when question N was selected.
+
+        Raises:
+            Exception: If an option value is missing or unknown.
+        """
+
+        mask = 0
+
+        for option in selected_options:
+            idx = self.option_values.get(option.get("value"))
+
+            if idx is None:
+                raise Exception("Fail to parse selected option value.")
+
+            mask |= 1 << idx
+
+        return mask
+
+    def score(self, mask: int) -> Score:
+        """
+        Scores a bitmask of selected questions.
+
+        Args:
+            mask (int): The bitmask of the selected questions.
+
+        Returns:
+            Score: The scored submission.
+        """
+
+        if mask >> len(self.questions):
+            raise Exception("Selected option value is higher than total questions number.")
+
+        indices = tuple(idx for idx in range(len(self.questions)) if mask >> idx & 1)
+
+        # With uniform weights the total is a population count of the mask
+        if self.uniform_weight is not None:
+            total = mask.bit_count() * self.uniform_weight
+        else:
+            total = sum(self.weights[idx] for idx in indices)
+
+        return Score(
+            mask=mask,
+            indices=indices,
+            total=total,
+            band=self.band_index.lookup(total),
+            answers=tuple(self.answer_lines[idx] for idx in indices),
+            key=self.key,
+            guidance=self.guidance
+        )
+
+    def score_options(self, selected_options: typing.List[typing.Dict]) -> Score:
+        """
+        Decodes and scores the options selected in the modal.
+
+        Args:
+            selected_options (List[Dict]): The selected options, each with a 'value' key like 'value-N'.
+
+        Returns:
+            Score: The scored submission.
+        """
+
+        return self.score(self.decode(selected_options))
+
+
+def get_engine() -> ScoringEngine:
+    """
+    Retrieves the scoring engine of the default questionnaire, built from the questions and result bands.
+
+    Returns:
+        ScoringEngine: The scoring engine.
+    """
+
+    # Local import, the registry compiles the questionnaires with this module
+    from slack_app.questions import registry
+
+    return registry.get_questionnaire().engine
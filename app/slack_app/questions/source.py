@@ -0,0 +1,233 @@
+"""
+This script fetches the questionnaire definitions of the `registry` module from where they are kept, so their
+content can change without redeploying the bot. A source is revalidated with a conditional fetch: it is given the
+ETag of the content already loaded and only returns the content again when it changed.
+
+- `DirectorySource` reads the JSON or YAML files of a local directory (`BOT_QUESTIONNAIRES_DIR`), one
+  questionnaire per file. Its ETag is derived from the names, sizes and modification times of the files, so an
+  unchanged directory is revalidated without reading any file.
+- `S3Source` reads a bundle of questionnaires, a JSON or YAML list of definitions, from one object of an
+  S3-compatible bucket (`BOT_QUESTIONNAIRES_BUCKET` and `BOT_QUESTIONNAIRES_KEY`). It is revalidated with a
+  `GetObject` request carrying `If-None-Match`, answered with an empty `304 Not Modified` while the object is
+  unchanged. A missing object defines no questionnaire. `BOT_QUESTIONNAIRES_ENDPOINT` points it to a local
+  stand-in like MinIO.
+"""
+
+import hashlib
+import json
+import os
+import typing
+from collections import namedtuple
+
+from common import metrics
+
+
+# Extensions of the definition files
+DEFINITION_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# Default key of the bundle object in the bucket
+DEFAULT_BUNDLE_KEY = "questionnaires.json"
+
+# ETag of a missing bundle object, which defines no questionnaire until it is uploaded
+MISSING_ETAG = "missing"
+
+# Namedtuple 'Snapshot' for the content of a source
+Snapshot = namedtuple(
+    "Snapshot",
+    [
+        "etag",  # ETag of the content, given back to the next fetch
+        "definitions",  # List of tuples of (Origin, Parsed Definition), the origin naming the file or object
+    ]
+)
+
+
+def parse_document(content: typing.Union[str, bytes], name: str) -> typing.Any:
+    """
+    Parses a JSON or YAML document, told apart by the extension of its name.
+
+    Args:
+        content (Union[str, bytes]): The content of the document.
+        name (str): The file name or object key of the document.
+
+    Returns:
+        Any: The parsed document.
+
+    Raises:
+        Exception: If a YAML document is given without PyYAML installed.
+    """
+
+    if name.endswith(".json"):
+        return json.loads(content)
+
+    # Imported lazily, as only the YAML documents need it; PyYAML is part of the requirements of the layer
+    try:
+        import yaml
+    except ImportError:
+        raise Exception(f"PyYAML is required to load the questionnaire definitions '{name}'.")
+
+    return yaml.safe_load(content)
+
+
+class DefinitionSource:
+    """
+    Base class of the sources of questionnaire definitions.
+    """
+
+    def fetch(self, etag: typing.Union[str, None] = None) -> typing.Union[Snapshot, None]:
+        """
+        Fetches the definitions, unless they did not change since the given ETag.
+
+        Args:
+            etag (str): The ETag of the content already loaded. None to always fetch the content.
+
+        Returns:
+            Snapshot: The content of the source, or None if it did not change.
+        """
+
+        raise NotImplementedError
+
+
+class DirectorySource(DefinitionSource):
+    """
+    A source reading one definition per file from a local directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def list_files(self) -> typing.List[str]:
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(DEFINITION_EXTENSIONS))
+
+    def get_etag(self, names: typing.Sequence[str]) -> str:
+        # Any added, removed or rewritten file changes the ETag
+        signature = hashlib.sha256()
+
+        for name in names:
+            stat = os.stat(os.path.join(self.directory, name))
+            signature.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+
+        return signature.hexdigest()
+
+    def fetch(self, etag: typing.Union[str, None] = None) -> typing.Union[Snapshot, None]:
+        names = self.list_files()
+        current = self.get_etag(names)
+
+        if current == etag:
+            return None
+
+        definitions = list()
+
+        for name in names:
+            path = os.path.join(self.directory, name)
+
+            with open(path, encoding="utf-8") as definition_file:
+                definitions.append((path, parse_document(definition_file.read(), name)))
+
+        return Snapshot(current, definitions)
+
+
+class S3Source(DefinitionSource):
+    """
+    A source reading a bundle of definitions from an object of an S3-compatible bucket.
+    """
+
+    def __init__(
+            self,
+            bucket: str,
+            key: str = DEFAULT_BUNDLE_KEY,
+            endpoint_url: typing.Union[str, None] = None,
+            region_name: typing.Union[str, None] = None,
+            client: typing.Any = None
+    ):
+        self.bucket = bucket
+        self.key = key
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.client = client
+
+    def get_client(self) -> typing.Any:
+        # Imported lazily as boto3 is one of the most expensive imports of the cold start
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client("s3", endpoint_url=self.endpoint_url, region_name=self.region_name)
+
+        return self.client
+
+    def fetch(self, etag: typing.Union[str, None] = None) -> typing.Union[Snapshot, None]:
+        request = {"Bucket": self.bucket, "Key": self.key}
+
+        # A conditional request, answered without any content while the object is unchanged
+        if etag and etag != MISSING_ETAG:
+            request["IfNoneMatch"] = etag
+
+        with metrics.timer("QuestionnairesFetch"):
+            try:
+                response = self.get_client().get_object(**request)
+            except Exception as e:
+                if is_not_modified(e):
+                    response = None
+                elif get_error_code(e) == "NoSuchKey":
+                    # Not uploaded yet, the built-in questionnaire is used alone
+                    return None if etag == MISSING_ETAG else Snapshot(MISSING_ETAG, list())
+                else:
+                    raise
+
+        if response is None:
+            metrics.increment("QuestionnairesNotModified")
+            return None
+
+        bundle = parse_document(response["Body"].read(), self.key)
+
+        if not isinstance(bundle, list):
+            raise Exception(f"The questionnaire bundle 's3://{self.bucket}/{self.key}' must be a list of definitions.")
+
+        origin = f"s3://{self.bucket}/{self.key}"
+        return Snapshot(response["ETag"], [(f"{origin}#{idx}", definition) for idx, definition in enumerate(bundle)])
+
+
+def get_error_code(error: Exception) -> typing.Union[str, None]:
+    """
+    Gets the error code of a failed request of boto3, None for other exceptions.
+    """
+
+    return ((getattr(error, "response", None) or dict()).get("Error") or dict()).get("Code")
+
+
+def is_not_modified(error: Exception) -> bool:
+    """
+    Checks if a failed `GetObject` request was answered with '304 Not Modified'.
+    """
+
+    response = getattr(error, "response", None) or dict()
+
+    return (
+        get_error_code(error) in ("304", "NotModified")
+        or (response.get("ResponseMetadata") or dict()).get("HTTPStatusCode") == 304
+    )
+
+
+def create_source() -> typing.Union[DefinitionSource, None]:
+    """
+    Creates the source of the questionnaire definitions from the environment.
+
+    Returns:
+        DefinitionSource: The bucket source if `BOT_QUESTIONNAIRES_BUCKET` is set, the directory source if
+            `BOT_QUESTIONNAIRES_DIR` is set, or None for the built-in questionnaire only.
+    """
+
+    bucket = os.environ.get("BOT_QUESTIONNAIRES_BUCKET")
+
+    if bucket:
+        return S3Source(
+            bucket,
+            os.environ.get("BOT_QUESTIONNAIRES_KEY") or DEFAULT_BUNDLE_KEY,
+            endpoint_url=os.environ.get("BOT_QUESTIONNAIRES_ENDPOINT") or None
+        )
+
+    directory = os.environ.get("BOT_QUESTIONNAIRES_DIR")
+
+    if directory:
+        return DirectorySource(directory)
+
+    return None
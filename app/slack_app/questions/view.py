@@ -2,14 +2,22 @@
 This script defines functionality for creating and managing a modal view in a Slack application.
 It defines a modal template (`VIEW_TEMPLATE`) for a questionnaire about security testing levels,
 populates the modal with a list of predefined questions (`questions`), and provides utility
-functions to generate the modal view (`get_view`), extract a number from a string (`extract_number`),
-and parse selected answers from the modal (`get_selected_answers`). The focus is on creating a
+functions to generate the modal view (`build_view`). The answers selected in the modal are decoded
+and scored by the `scoring` module. A view is compiled (`compile_view`) into an immutable structure
+and a pre-serialized JSON payload with a content hash, which is sent with `views.open` without
+re-encoding it. The template is never mutated, so the view can safely be compiled again, e.g. when the
+questions change. The focus is on creating a
 user-interactive experience within Slack where users can respond to a series of questions
-to determine the security testing requirements for their applications.
+to determine the security testing requirements for their applications. The questions below are the built-in
+default questionnaire; the `registry` module compiles the view of every questionnaire from the same template.
 """
 
-import re
+import copy
+import hashlib
+import json
+import types
 import typing
+from collections import namedtuple
 
 from common import parser
 
@@ -46,8 +54,8 @@ VIEW_TEMPLATE = {
     ]
 }
 
-# Global variable to store the dynamically generated view.
-VIEW = None
+# Namedtuple 'CompiledView' with the read-only view, its serialized JSON payload and the SHA-256 hash of the payload
+CompiledView = namedtuple("CompiledView", ["view", "payload", "digest"])
 
 
 # List of questions to be included in the modal's checkboxes.
@@ -96,110 +104,105 @@ questions = [
 ]
 
 
-def get_view():
-    """
-    Generates and returns the view (modal) for the Slack app.
-    The view is generated only once and stored in the global VIEW variable.
+def build_view(
+        question_list: typing.Sequence[typing.Tuple[str, str]],
+        title: typing.Union[str, None] = None,
+        header: typing.Union[str, None] = None,
+        callback_id: typing.Union[str, None] = None,
+        private_metadata: typing.Union[str, None] = None
+) -> typing.Dict:
     """
+    Builds the view (modal) for the given questions from a copy of the template.
 
-    global VIEW
+    Args:
+        question_list (Sequence[Tuple[str, str]]): The questions as tuples of (Question Title, Question Description).
+        title (str): Title of the modal. The title of the template if None.
+        header (str): Header of the questions. The header of the template if None.
+        callback_id (str): Callback ID of the modal, identifying its questionnaire. The one of the template if None.
+        private_metadata (str): Metadata sent back with the submission, e.g. the version of the questionnaire.
 
-    # Check if the view is already generated
-    if VIEW is None:
+    Returns:
+        dict: The view with one checkbox option per question.
+    """
 
-        # Start with the template
-        VIEW = VIEW_TEMPLATE
+    # Start with a copy of the template so the template itself is never mutated
+    view = copy.deepcopy(VIEW_TEMPLATE)
 
-        # Populate the options in the checkbox based on the questions
-        for idx, question in enumerate(questions):
-            name, description = question
+    # Customize the template for the questionnaire
+    if title is not None:
+        view["title"]["text"] = title
+    if header is not None:
+        view["blocks"][0]["text"]["text"] = header
+    if callback_id is not None:
+        view["callback_id"] = callback_id
+    if private_metadata is not None:
+        view["private_metadata"] = private_metadata
 
-            VIEW_TEMPLATE["blocks"][0]["accessory"]["options"].append({
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*{idx + 1}. {name}*"  # Display name of the question
-                },
-                "description": {
-                    "type": "mrkdwn",
-                    "text": description  # Display description of the question
-                },
-                "value": f"value-{idx}"  # Value associated with the checkbox option
-            })
+    # Populate the options in the checkbox based on the questions
+    for idx, question in enumerate(question_list):
+        name, description = question
 
-    # Return the generated view
-    return VIEW
+        view["blocks"][0]["accessory"]["options"].append({
+            "text": {
+                "type": "mrkdwn",
+                "text": f"*{idx + 1}. {name}*"  # Display name of the question
+            },
+            "description": {
+                "type": "mrkdwn",
+                "text": description  # Display description of the question
+            },
+            "value": f"value-{idx}"  # Value associated with the checkbox option
+        })
 
+    return view
 
-def extract_number(input_string: str) -> int:
+
+def freeze(value: typing.Any) -> typing.Any:
     """
-    Extracts a number from a given string.
+    Converts nested dictionaries and lists into read-only mappings and tuples.
 
     Args:
-        input_string (str): The string to extract the number from.
+        value (Any): The value to convert.
 
     Returns:
-        int: The extracted number.
-
-    Raises:
-        ValueError: If no number is found in the input string.
+        Any: The read-only equivalent of the value.
     """
 
-    match = re.search(r'\d+', input_string)
+    if isinstance(value, dict):
+        return types.MappingProxyType({key: freeze(item) for key, item in value.items()})
 
-    if match:
-        return int(match.group())
-    else:
-        raise ValueError("No number found in the input string.")
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
 
+    return value
 
-def get_selected_answers(selected_options: typing.List[typing.Dict]) -> typing.List[str]:
-    """
-    Parses a list of selected options and retrieves corresponding questions.
 
-    This function takes a list of dictionaries representing selected options. Each option dictionary
-    is expected to contain a 'value' key with a string value in the format "value-N", where N is an
-    integer. It extracts these integer values, uses them to index into a globally defined list
-    'questions', and formats the corresponding question title and description into a readable string.
+def compile_view(
+        question_list: typing.Sequence[typing.Tuple[str, str]],
+        title: typing.Union[str, None] = None,
+        header: typing.Union[str, None] = None,
+        callback_id: typing.Union[str, None] = None,
+        private_metadata: typing.Union[str, None] = None
+) -> CompiledView:
+    """
+    Compiles the view for the given questions into a read-only view and a pre-serialized payload.
 
-    Parameters:
-        selected_options (List[Dict]): A list of dictionaries, where each dictionary represents a
-        selected option with a 'value' key.
+    Args:
+        question_list (Sequence[Tuple[str, str]]): The questions as tuples of (Question Title, Question Description).
+        title (str): Title of the modal. The title of the template if None.
+        header (str): Header of the questions. The header of the template if None.
+        callback_id (str): Callback ID of the modal. The one of the template if None.
+        private_metadata (str): Metadata sent back with the submission. None for none.
 
     Returns:
-        List[str]: A list of strings, each containing the formatted question title and description
-        from the 'questions' list based on the selected options.
-
-    Raises:
-        Exception: If any 'value' key is missing, does not contain a hyphen, or its numeric part is
-        out of range of the 'questions' list.
+        CompiledView: The read-only view, its JSON payload and the hash of the payload.
     """
 
-    # Initialize an empty list to hold the results.
-    results: typing.List[str] = list()
-
-    # Iterate over each option in the selected_options list.
-    for option in selected_options:
-        # Extract the 'value' from the option dictionary.
-        # This value is expected to be a string like "value-0".
-        value = option.get("value")
-
-        # Check if 'value' is valid and contains a hyphen.
-        # If not, raise an exception as the format is not as expected.
-        if not value or value.find("-") == -1:
-            raise Exception("Fail to parse selected option value.")
+    view = build_view(question_list, title, header, callback_id, private_metadata)
+    payload = json.dumps(view, separators=(",", ":"), ensure_ascii=False)
 
-        # Extract the numeric part from the 'value' string.
-        value_int = extract_number(value)
-
-        # Verify that the extracted number does not exceed the number of questions.
-        # Raise an exception if the value is out of range.
-        if value_int >= len(questions):
-            raise Exception("Selected option value is higher than total questions number.")
-
-        # Retrieve the question title and description using the extracted number as an index.
-        title, description = questions[value_int]
-
-        # Format and append the question information to the results list.
-        results.append(f"\n{value_int + 1}. *{title}:* {description}")
-
-    return results
+    return CompiledView(
+        view=freeze(view),
+        payload=payload,
+        digest=hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    )
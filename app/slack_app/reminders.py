@@ -0,0 +1,380 @@
+"""
+This script reminds the members messaged by a broadcast who did not submit its questionnaire. A scheduled sweep,
+the `ReminderSchedule` rule next to the warm-up pings, goes through the open campaigns of the `roster` module:
+
+- The entries appended to the targeted log of the campaign and to the submitted log of its questionnaire since the
+  previous sweep are added to its bitmaps, so a sweep only reads what is new.
+- Once `BOT_REMINDER_INTERVAL` seconds passed since the broadcast or the previous round, a new round of reminders
+  starts, up to `BOT_REMINDER_ROUNDS` rounds, after which the campaign is closed. It is closed early once every
+  member messaged by a finished broadcast, as flagged on the campaign when it ended, submitted the questionnaire.
+- The members to remind, `targeted & ~submitted & ~reminded`, get the message of the broadcast again with its
+  "Start questionnaire" button, at most `BOT_REMINDER_BATCH` per campaign and sweep, from the compact ID the
+  previous reminders stopped at, so every member gets their turn even when a round cannot remind everyone. They
+  are posted like the broadcast does, by a bounded pool of threads shaped to `BOT_BROADCAST_RATE`.
+
+The members of a chunk of messages are saved as reminded before their messages are posted, and the chunks are sized
+to the time left, so a sweep dying, or retried, never reminds anyone twice in a round; the members a sweep had no
+time for are given back to the next one. Every campaign gets its share of the time of the sweep, whose function
+has a timeout long enough for `BOT_REMINDER_BATCH` reminders.
+"""
+
+import concurrent.futures
+import logging
+import math
+import os
+import time
+import typing
+from collections import namedtuple
+
+from slack_sdk import errors
+
+from common import metrics, roster
+from slack_app import broadcast, throttle
+
+
+# Default number of seconds between two rounds of reminders, overridden with `BOT_REMINDER_INTERVAL`
+DEFAULT_INTERVAL = 24 * 60 * 60
+
+# Default number of rounds of reminders of a campaign, overridden with `BOT_REMINDER_ROUNDS`
+DEFAULT_ROUNDS = 2
+
+# Default maximum number of reminders sent per campaign and sweep, overridden with `BOT_REMINDER_BATCH`
+DEFAULT_BATCH = 1000
+
+# Cursor of a campaign with the compact ID the next reminders start from
+REMINDER_CURSOR = "reminder"
+
+# Logger of the sweeps
+LOGGER = logging.getLogger(__name__)
+
+# Namedtuple 'SweepReport' for the outcome of the sweep of a campaign
+SweepReport = namedtuple(
+    "SweepReport",
+    [
+        "campaign_id",  # ID of the campaign, the ID of its broadcast
+        "rounds",  # Number of rounds of reminders started
+        "reminded",  # Number of members reminded by the sweep
+        "failed",  # Number of members whose reminder failed
+        "pending",  # Number of members left to remind in the current round
+        "closed",  # Whether the campaign is over
+    ]
+)
+
+
+def get_interval() -> float:
+    return float(os.environ.get("BOT_REMINDER_INTERVAL") or DEFAULT_INTERVAL)
+
+
+def get_rounds() -> int:
+    return int(os.environ.get("BOT_REMINDER_ROUNDS") or DEFAULT_ROUNDS)
+
+
+def get_batch() -> int:
+    return max(1, int(os.environ.get("BOT_REMINDER_BATCH") or DEFAULT_BATCH))
+
+
+def is_sweep_event(event) -> bool:
+    return isinstance(event, dict) and event.get("reminder_sweep") is True
+
+
+def apply_logs(store: roster.RosterStore, campaign: roster.Campaign, remaining_time: typing.Callable[[], float]):
+    """
+    Adds the targets and the submissions logged since the previous sweep to the bitmaps of a campaign.
+
+    Args:
+        store (RosterStore): The roster store.
+        campaign (Campaign): The campaign, whose cursors move to the last entries read.
+        remaining_time (Callable): Function returning the seconds left to the invocation.
+    """
+
+    logs = (
+        (roster.TARGETED, roster.get_log(roster.TARGETED, campaign.campaign_id)),
+        (roster.SUBMITTED, roster.get_log(roster.SUBMITTED, campaign.questionnaire_id)),
+    )
+
+    for kind, log in logs:
+        while remaining_time() >= broadcast.TIME_MARGIN:
+            since = campaign.cursors.get(kind, 0)
+            # An entry missing at the previous sweep is skipped if it is still missing, its writer died
+            user_keys, cursor, missing = store.read(log, since, campaign.cursors.get(f"{kind}_missing", 0))
+
+            if kind == roster.TARGETED:
+                campaign.targeted |= campaign.to_bitmap(user_keys)
+            else:
+                campaign.submitted |= campaign.to_bitmap(user_keys)
+
+            campaign.cursors[kind] = cursor
+            campaign.cursors[f"{kind}_missing"] = missing
+
+            if missing or cursor - since < roster.MAX_READ:
+                break
+
+
+def next_pending(campaign: roster.Campaign, limit: int) -> typing.List[str]:
+    """
+    Gets the next members to remind, from the compact ID the previous reminders stopped at, wrapping around.
+
+    Args:
+        campaign (Campaign): The campaign.
+        limit (int): Maximum number of members.
+
+    Returns:
+        List[str]: The roster keys of the members.
+    """
+
+    pending = campaign.pending()
+    start = campaign.cursors.get(REMINDER_CURSOR, 0)
+    after = pending >> start << start
+    user_keys = campaign.get_users(after, limit)
+
+    if len(user_keys) < limit:
+        user_keys += campaign.get_users(pending & ~after, limit - len(user_keys))
+
+    return user_keys
+
+
+def advance_round(campaign: roster.Campaign, now: float, interval: float, rounds: int) -> bool:
+    """
+    Starts the next round of reminders once the interval since the broadcast or the previous round passed.
+
+    Args:
+        campaign (Campaign): The campaign.
+        now (float): The current time in seconds since the epoch.
+        interval (float): Number of seconds between two rounds.
+        rounds (int): Number of rounds of the campaign.
+
+    Returns:
+        bool: False if the campaign is over, True otherwise.
+    """
+
+    # Nobody is left to remind once the broadcast messaged everyone, as flagged on the campaign when it ended
+    if not campaign.targeted & ~campaign.submitted and campaign.broadcast_done:
+        return False
+
+    if now - campaign.round_started < interval:
+        return True
+
+    if campaign.rounds >= rounds:
+        return False
+
+    campaign.rounds += 1
+    campaign.reminded = 0
+    campaign.round_started = now
+
+    return True
+
+
+class ReminderSender:
+    """
+    Reminds the pending members of a campaign, until the batch is sent or the invocation runs out of time.
+    """
+
+    def __init__(
+            self,
+            client,
+            campaign: roster.Campaign,
+            remaining_time: typing.Callable[[], float],
+            concurrency: int = broadcast.DEFAULT_CONCURRENCY,
+            rate: float = broadcast.DEFAULT_RATE,
+            sleep: typing.Callable[[float], None] = time.sleep
+    ):
+        """
+        Initializes the sender.
+
+        Args:
+            client: Slack WebClient of the workspace of the campaign.
+            campaign (Campaign): The campaign.
+            remaining_time (Callable): Function returning the seconds left to the invocation.
+            concurrency (int): Number of reminders posted concurrently.
+            rate (float): Number of reminders posted per minute.
+            sleep (Callable): Function waiting for a number of seconds.
+        """
+
+        self.client = client
+        self.campaign = campaign
+        self.remaining_time = remaining_time
+        self.concurrency = concurrency
+        self.rate = rate
+        self.sleep = sleep
+        self.bucket = throttle.TokenBucket(rate, concurrency)
+        self.message = broadcast.build_invitation(broadcast.Broadcast(**campaign.meta), reminder=True)
+
+    def send(self, user_key: str) -> typing.Union[bool, None]:
+        """
+        Reminds a member.
+
+        Args:
+            user_key (str): The roster key of the member.
+
+        Returns:
+            bool: True if the reminder was posted or the member cannot get a message, False if it failed, None if
+                the invocation has no time left to remind them.
+        """
+
+        delay = self.bucket.reserve()
+
+        if delay:
+            self.sleep(delay)
+
+        # A member whose turn comes too late is given back to the next sweep
+        if self.remaining_time() < broadcast.TIME_MARGIN:
+            self.bucket.cancel()
+            return None
+
+        try:
+            with metrics.timer("SlackChatPostMessage"):
+                self.client.chat_postMessage(
+                    channel=user_key.split(":", 1)[1], text=self.message.text, blocks=self.message.blocks
+                )
+        except errors.SlackApiError as e:
+            if e.response.get("error") in broadcast.UNREACHABLE_ERRORS:
+                return True
+
+            LOGGER.warning("Campaign %s could not remind %s: %s", self.campaign.campaign_id, user_key, e)
+            return False
+
+        return True
+
+    def run(self, store: roster.RosterStore, batch: int) -> typing.Tuple[int, int]:
+        """
+        Reminds the pending members, saving them as reminded before every chunk of messages.
+
+        Args:
+            store (RosterStore): The roster store.
+            batch (int): Maximum number of members to remind.
+
+        Returns:
+            Tuple[int, int]: The number of members reminded and the number of failed reminders.
+        """
+
+        reminded, failed = 0, 0
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while reminded + failed < batch:
+                # Chunks of a few rounds of the pool at most, and of the messages the rate allows in the time left
+                chunk_size = int(min(
+                    4 * self.concurrency,
+                    batch - reminded - failed,
+                    (self.remaining_time() - broadcast.TIME_MARGIN) * self.rate / 60
+                ))
+                chunk = next_pending(self.campaign, chunk_size) if chunk_size > 0 else list()
+
+                if not chunk:
+                    break
+
+                # Saved before posting: a sweep dying, or retried, never reminds anyone twice in the round
+                self.campaign.reminded |= self.campaign.to_bitmap(chunk)
+                self.campaign.cursors[REMINDER_CURSOR] = self.campaign.ids[chunk[-1]] + 1
+                store.save(self.campaign)
+
+                outcomes = list(executor.map(self.send, chunk))
+
+                # A failed reminder is not sent again in the round either, the next round retries it
+                reminded += outcomes.count(True)
+                failed += outcomes.count(False)
+
+                deferred = [user_key for user_key, outcome in zip(chunk, outcomes) if outcome is None]
+
+                if deferred:
+                    self.campaign.reminded &= ~self.campaign.to_bitmap(deferred)
+                    self.campaign.cursors[REMINDER_CURSOR] = self.campaign.ids[deferred[0]]
+                    store.save(self.campaign)
+                    break
+
+        return reminded, failed
+
+
+def sweep_campaign(
+        store: roster.RosterStore,
+        campaign_id: str,
+        remaining_time: typing.Callable[[], float],
+        now: typing.Union[float, None] = None
+) -> SweepReport:
+    """
+    Updates a campaign with the latest targets and submissions, and sends the reminders due.
+
+    Args:
+        store (RosterStore): The roster store.
+        campaign_id (str): The ID of the campaign.
+        remaining_time (Callable): Function returning the seconds left to the invocation.
+        now (float): The current time in seconds since the epoch. Now if None.
+
+    Returns:
+        SweepReport: The outcome of the sweep.
+    """
+
+    campaign = store.load(campaign_id)
+
+    if campaign is None:
+        store.set_open(campaign_id, False)
+        return SweepReport(campaign_id, 0, 0, 0, 0, True)
+
+    apply_logs(store, campaign, remaining_time)
+
+    if not advance_round(campaign, time.time() if now is None else now, get_interval(), get_rounds()):
+        store.save(campaign)
+        store.set_open(campaign_id, False)
+        metrics.increment("ReminderCampaignsClosed")
+        return SweepReport(campaign_id, campaign.rounds, 0, 0, 0, True)
+
+    reminded, failed = 0, 0
+
+    # The broadcast itself is the first ask, the reminders start with the first round
+    if campaign.rounds and campaign.pending():
+        sender = ReminderSender(
+            broadcast.get_client(broadcast.Broadcast(**campaign.meta)),
+            campaign,
+            remaining_time,
+            broadcast.get_concurrency(),
+            broadcast.get_rate(),
+        )
+        reminded, failed = sender.run(store, get_batch())
+
+    store.save(campaign)
+    metrics.increment("RemindersSent", reminded)
+
+    return SweepReport(campaign_id, campaign.rounds, reminded, failed, campaign.pending().bit_count(), False)
+
+
+def handle_sweep_event(event: typing.Dict, context) -> typing.Dict:
+    """
+    Sweeps the open campaigns, every campaign getting its share of the time left to the invocation.
+
+    Args:
+        event (dict): The event of the `ReminderSchedule` rule.
+        context: AWS Lambda context object, None outside of AWS Lambda.
+
+    Returns:
+        dict: The reports of the campaigns swept, by campaign ID.
+    """
+
+    reports = dict()
+
+    if not roster.is_enabled():
+        return reports
+
+    store = roster.get_store()
+    remaining_time = broadcast.get_remaining_time(context)
+
+    campaign_ids = store.list_campaigns()
+
+    for idx, campaign_id in enumerate(campaign_ids):
+        left = remaining_time()
+
+        if left < broadcast.TIME_MARGIN:
+            break
+
+        # The time of the campaigns after this one is kept for them, and the time this one does not use goes to them
+        reserved = 0.0
+
+        if math.isfinite(left):
+            reserved = (left - broadcast.TIME_MARGIN) * (len(campaign_ids) - idx - 1) / (len(campaign_ids) - idx)
+
+        try:
+            reports[campaign_id] = sweep_campaign(store, campaign_id, lambda: remaining_time() - reserved)._asdict()
+        except Exception:
+            # A campaign failing, e.g. as its workspace uninstalled the app, does not hold the others back
+            LOGGER.exception("Reminder sweep of campaign %s failed.", campaign_id)
+            metrics.increment("ReminderSweepErrors")
+
+    return reports
@@ -0,0 +1,221 @@
+"""
+This script routes the Slack requests reaching the Lambda function before they are handed to Bolt. Building the
+Slack app needs every secret and a Bolt request runs the whole middleware chain, which trivial and unwanted
+requests do not need. Every request is checked first, with the signing secret kept as a keyed HMAC between
+requests, and the router then:
+
+- rejects the requests without a signature, with a timestamp more than 5 minutes away, or with a wrong signature,
+  with the '401' Bolt gives them;
+- answers the `url_verification` challenges and the `ssl_check` pings of Slack itself;
+- acknowledges right away the retries of Slack (`X-Slack-Retry-Num`) of modal submissions already claimed in the
+  idempotency store, like the `skip_duplicate_submission` middleware would after building the app.
+
+Only the remaining requests, the real work, are dispatched to Bolt, by a request handler created once per Slack
+app and reused by the following requests. The scheduled events, like the warm-up pings, never reach the router as
+`app.lambda_handler` answers them before.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+import typing
+import urllib.parse
+
+from common import idempotency, metrics, secrets
+from slack_app import adapter, bot
+
+
+# Number of seconds the timestamp of a request may be away from now, as checked by Bolt
+MAX_REQUEST_AGE = 5 * 60
+
+# Response of the rejected requests, the one of Bolt's request verification
+REJECTED_RESPONSE = {
+    "statusCode": 401,
+    "body": json.dumps({"error": "invalid request"}),
+    "headers": {"content-type": "application/json;charset=utf-8"},
+}
+
+# Global variable to store the signing secret with its keyed HMAC, set by `get_signer`
+SIGNER: typing.Union[typing.Tuple[str, typing.Any], None] = None
+
+# Global variable to store the Bolt request handler reused by the requests, set by `get_request_handler`
+REQUEST_HANDLER: typing.Any = None
+
+
+def get_header(headers: typing.Dict, name: str) -> typing.Union[str, None]:
+    """
+    Reads a header by its lowercase name, as sent by the payload format v2, or in any case as in v1.
+    """
+
+    value = headers.get(name)
+
+    if value is None:
+        value = next((value for key, value in headers.items() if key.lower() == name), None)
+
+    return value
+
+
+def get_signer() -> typing.Any:
+    """
+    Gets the HMAC keyed with the signing secret, created again when the secret is rotated.
+
+    Returns:
+        The keyed HMAC, copied for every request so the key is only derived once.
+    """
+
+    global SIGNER
+
+    signing_secret = secrets.BotSecrets.get(secrets.BotSecrets.SLACK_SIGNING_SECRET)
+
+    if SIGNER is None or SIGNER[0] != signing_secret:
+        SIGNER = (signing_secret, hmac.new(signing_secret.encode("utf-8"), digestmod=hashlib.sha256))
+
+    return SIGNER[1]
+
+
+def is_signed(body: str, timestamp: str, signature: str) -> bool:
+    """
+    Checks the Slack signature of a request.
+
+    Args:
+        body (str): The raw body of the request.
+        timestamp (str): The `X-Slack-Request-Timestamp` header.
+        signature (str): The `X-Slack-Signature` header.
+
+    Returns:
+        bool: True if the signature matches the body and the timestamp.
+    """
+
+    signer = get_signer().copy()
+    signer.update(f"v0:{timestamp}:{body}".encode("utf-8"))
+
+    return hmac.compare_digest(f"v0={signer.hexdigest()}", signature)
+
+
+def is_stale(timestamp: str, now: typing.Union[float, None] = None) -> bool:
+    """
+    Checks if the timestamp of a request is too far from now to be anything but a replay, or is not a number.
+    """
+
+    try:
+        return abs((time.time() if now is None else now) - int(timestamp)) > MAX_REQUEST_AGE
+    except ValueError:
+        return True
+
+
+def get_submission_key(body: str) -> typing.Union[str, None]:
+    """
+    Builds the idempotency key of a modal submission from the raw body of its request.
+
+    Returns:
+        str: The key, or None if the request is not a modal submission.
+    """
+
+    payload = urllib.parse.parse_qs(body).get("payload")
+
+    try:
+        payload = json.loads(payload[0]) if payload else None
+    except ValueError:
+        return None
+
+    if not isinstance(payload, dict) or payload.get("type") != "view_submission":
+        return None
+
+    return idempotency.submission_key(payload)
+
+
+def route(event: typing.Dict, now: typing.Union[float, None] = None) -> typing.Union[typing.Dict, None]:
+    """
+    Answers the requests which need no listener, and rejects the ones not sent by Slack.
+
+    Args:
+        event (dict): The API Gateway event of a request.
+        now (float): The current time in seconds since the epoch. Now if None.
+
+    Returns:
+        dict: The API Gateway response of the request, or None if it must be dispatched to Bolt.
+    """
+
+    # Other methods are answered by the request handler
+    if adapter.get_method(event) != "POST":
+        return None
+
+    headers = event.get("headers") or dict()
+    timestamp = get_header(headers, "x-slack-request-timestamp")
+    signature = get_header(headers, "x-slack-signature")
+    body = adapter.get_body(event)
+
+    # Reject the unsigned and replayed requests before reading their body
+    if not timestamp or not signature or is_stale(timestamp, now) or not is_signed(body, timestamp, signature):
+        metrics.increment("RouterRejected")
+        return REJECTED_RESPONSE
+
+    # The challenge of the Events API, sent when the request URL is set
+    if body.startswith("{"):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+
+        if isinstance(payload, dict) and payload.get("type") == "url_verification":
+            metrics.increment("RouterAnswered")
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"challenge": payload.get("challenge")}),
+                "headers": {"content-type": "application/json;charset=utf-8"},
+            }
+
+    # The check of the certificate of the request URL
+    if urllib.parse.parse_qs(body).get("ssl_check") == ["1"]:
+        metrics.increment("RouterAnswered")
+        return {"statusCode": 200, "body": "", "headers": {}}
+
+    # A retry of a submission already claimed gets the empty response closing the modal, like its first delivery
+    if get_header(headers, "x-slack-retry-num") is not None:
+        key = get_submission_key(body)
+
+        if key is not None and idempotency.get_store().exists(key):
+            metrics.increment("DuplicateSubmission")
+            return {"statusCode": 200, "body": "", "headers": {}}
+
+    return None
+
+
+def get_request_handler():
+    """
+    Retrieves the request handler of the execution mode selected with `BOT_EXECUTION_MODE`, created once per app.
+
+    Returns:
+        The request handler of the synchronous or asynchronous Slack app.
+    """
+
+    global REQUEST_HANDLER
+
+    if bot.get_execution_mode() == "async":
+        # Imported lazily as the asynchronous Bolt classes import aiohttp
+        from slack_app import async_adapter, async_bot
+
+        app = async_bot.get_async_slack_app()
+
+        # The app is built again when the secrets are rotated, and its handler with it
+        if REQUEST_HANDLER is None or REQUEST_HANDLER.app is not app:
+            REQUEST_HANDLER = async_adapter.AsyncLambdaRequestHandler(app=app)
+
+        return REQUEST_HANDLER
+
+    app = bot.get_slack_app()
+
+    if REQUEST_HANDLER is None or REQUEST_HANDLER.app is not app:
+        REQUEST_HANDLER = adapter.LambdaRequestHandler(app=app)
+
+    return REQUEST_HANDLER
+
+
+def reset_request_handler():
+    """
+    Drops the request handler, so that it is created again on next use.
+    """
+
+    global REQUEST_HANDLER
+    REQUEST_HANDLER = None
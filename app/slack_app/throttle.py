@@ -0,0 +1,429 @@
+"""
+This script shapes the calls of the bot to the Slack Web API to the rate limits of Slack, which are set per
+method and per workspace in tiers of requests per minute, and per channel for posted messages. Every call takes a
+token from the bucket of its method and scope first and waits for its turn when the bucket is empty, so bursts of
+submissions are queued instead of being answered with '429 Too Many Requests'. A call answered with a 429 anyway,
+e.g. as the other containers of the function share the same limits, empties its bucket for the `Retry-After`
+seconds given by Slack and is retried.
+
+A call never waits longer than `BOT_SLACK_MAX_WAIT` seconds in total, kept well below the timeout of the function,
+nor past the remaining time of the invocation given by `set_deadline`, and `views.open` no longer than its trigger
+ID stays valid. A call that would wait longer is sent right away, and a 429 it gets is raised as usual.
+
+`RateLimitedWebClient` is the Web API client of the bot, and the `rate_limit_client` middleware swaps it in for
+the client Bolt creates for every request. The `async_throttle` module provides the same client on the async
+WebClient, sharing the buckets of the container.
+"""
+
+import os
+import threading
+import time
+import typing
+from collections import namedtuple
+
+from slack_sdk import WebClient, errors
+
+from common import cache, metrics
+
+
+# Requests per minute of the rate limit tiers of the Slack Web API
+TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# Requests per minute of the methods called by the bot, Tier 3 for the other ones
+METHOD_RATES = {
+    "auth.test": TIER_RATES[4],
+    "chat.postMessage": 60,  # One message per second and channel, see `CHANNEL_METHODS`
+    "chat.update": TIER_RATES[3],
+    "conversations.open": TIER_RATES[3],
+    "oauth.v2.access": TIER_RATES[4],
+    "users.info": TIER_RATES[4],
+    "users.list": TIER_RATES[2],
+    "views.open": TIER_RATES[4],
+}
+
+# Methods limited per channel rather than per workspace
+CHANNEL_METHODS = ("chat.postMessage",)
+
+# Seconds of calls a full bucket holds, the burst allowed after an idle period
+BURST_SECONDS = 6
+
+# Default of the seconds a call waits at most in total, overridden with `BOT_SLACK_MAX_WAIT`, well below the timeout
+DEFAULT_MAX_WAIT = 3.0
+
+# Seconds of the invocation left to the call itself and to the rest of the work once a call stops waiting
+DEADLINE_MARGIN = 2.0
+
+# Seconds the calls of a method wait at most, below the default, as their arguments expire
+METHOD_MAX_WAITS = {
+    "views.open": 2.0,  # The trigger ID of a modal is valid for 3 seconds
+}
+
+# Maximum number of retries of a call answered with a 429
+MAX_RETRIES = 2
+
+# Seconds waited after a 429 without a `Retry-After` header
+DEFAULT_RETRY_AFTER = 1.0
+
+# Maximum number of buckets kept, one per method and workspace, the least recently used ones being dropped
+MAX_BUCKETS = 10000
+
+# Global variable to store the rate limiter of the container, initialized as None and set by `get_limiter`
+LIMITER: typing.Union["RateLimiter", None] = None
+
+# Namedtuple 'LimiterStats' with the counters of a rate limiter
+LimiterStats = namedtuple(
+    "LimiterStats",
+    [
+        "calls",  # Number of calls given a token
+        "waits",  # Number of calls which waited for their turn or for the end of a 429
+        "wait_seconds",  # Total number of seconds waited
+        "throttled",  # Number of calls answered with a 429 by Slack
+        "overflows",  # Number of calls sent right away as they would have waited too long
+    ]
+)
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket, refilled at the rate of a Slack method.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: typing.Callable[[], float] = time.monotonic):
+        """
+        Initializes a full bucket.
+
+        Args:
+            rate (float): Number of tokens added per minute.
+            capacity (float): Maximum number of tokens in the bucket.
+            clock (Callable): Monotonic clock in seconds.
+        """
+
+        self.rate = rate / 60
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        # Time the tokens were counted at, in the future while the bucket is blocked by a 429
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Takes a token from the bucket, going into debt when it is empty.
+
+        Returns:
+            float: The number of seconds to wait before using the token, 0 if it can be used right away.
+        """
+
+        with self._lock:
+            now = self.clock()
+            self.refill(now)
+            self.tokens -= 1
+
+            # The calls in debt are spaced out by the rate, after the end of any block
+            return max(self.updated - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+
+    def cancel(self):
+        """
+        Gives back a token taken by `reserve` but not used.
+        """
+
+        with self._lock:
+            self.tokens += 1
+
+    def penalize(self, retry_after: float):
+        """
+        Blocks the bucket for the time asked by a 429 of Slack, after which it refills from empty.
+
+        Args:
+            retry_after (float): Number of seconds from the `Retry-After` header.
+        """
+
+        with self._lock:
+            now = self.clock()
+            self.refill(now)
+            self.tokens = min(self.tokens, 1.0)
+            self.updated = max(self.updated, now + retry_after)
+
+
+class RateLimiter:
+    """
+    Keeps a token bucket per Slack method and scope, and counts the calls that waited or were throttled.
+    """
+
+    def __init__(
+            self,
+            max_wait: float = DEFAULT_MAX_WAIT,
+            clock: typing.Callable[[], float] = time.monotonic,
+            sleep: typing.Callable[[float], None] = time.sleep
+    ):
+        """
+        Initializes a rate limiter without any bucket.
+
+        Args:
+            max_wait (float): Number of seconds a call waits at most in total.
+            clock (Callable): Monotonic clock in seconds, shared with the buckets.
+            sleep (Callable): Function waiting for a number of seconds, used by the synchronous client.
+        """
+
+        self.max_wait = max_wait
+        self.clock = clock
+        self.deadline: typing.Union[float, None] = None
+        self.sleep = sleep
+        self.buckets = cache.TTLCache(maxsize=MAX_BUCKETS)
+
+        self.calls = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+        self.overflows = 0
+        self._lock = threading.Lock()
+
+    def get_bucket(self, scope: typing.Hashable, api_method: str) -> TokenBucket:
+        key = (scope, api_method)
+        bucket = self.buckets.get(key)
+
+        if bucket is None:
+            with self._lock:
+                bucket = self.buckets.get(key)
+
+                if bucket is None:
+                    rate = METHOD_RATES.get(api_method, TIER_RATES[3])
+                    bucket = TokenBucket(rate, max(1.0, rate * BURST_SECONDS / 60), self.clock)
+                    self.buckets.set(key, bucket)
+
+        return bucket
+
+    def set_deadline(self, remaining: typing.Union[float, None]):
+        """
+        Stops the waits of the calls before the end of the current invocation.
+
+        Args:
+            remaining (float): Number of seconds left to the invocation, or None to wait without a deadline.
+        """
+
+        self.deadline = None if remaining is None else self.clock() + remaining - DEADLINE_MARGIN
+
+    def get_max_wait(self, api_method: str) -> float:
+        max_wait = min(self.max_wait, METHOD_MAX_WAITS.get(api_method, self.max_wait))
+
+        # Never wait past the deadline of the invocation
+        if self.deadline is not None:
+            max_wait = min(max_wait, max(0.0, self.deadline - self.clock()))
+
+        return max_wait
+
+    def acquire(self, scope: typing.Hashable, api_method: str, waited: float = 0.0) -> float:
+        """
+        Takes the turn of a call.
+
+        Args:
+            scope (Hashable): The scope of the limits of the call, see `get_scope`.
+            api_method (str): The name of the Slack method, e.g. 'chat.postMessage'.
+            waited (float): Number of seconds the call already waited, before its retries.
+
+        Returns:
+            float: The number of seconds to wait before sending the call.
+        """
+
+        bucket = self.get_bucket(scope, api_method)
+        delay = bucket.reserve()
+
+        with self._lock:
+            self.calls += 1
+
+            if delay <= 0:
+                return 0.0
+
+            # A call that would wait too long is sent right away and left to the limits of Slack
+            if waited + delay > self.get_max_wait(api_method):
+                bucket.cancel()
+                self.overflows += 1
+                metrics.increment("SlackThrottleOverflow")
+                return 0.0
+
+            self.waits += 1
+            self.wait_seconds += delay
+
+        return delay
+
+    def throttle(self, scope: typing.Hashable, api_method: str, error: Exception, waited: float = 0.0) -> bool:
+        """
+        Handles a failed call, blocking its bucket if it was refused by the rate limits of Slack.
+
+        Args:
+            scope (Hashable): The scope of the limits of the call.
+            api_method (str): The name of the Slack method.
+            error (Exception): The error raised by the call.
+            waited (float): Number of seconds the call already waited.
+
+        Returns:
+            bool: True if the call is retried once its bucket is unblocked, False if the error is raised.
+        """
+
+        if not is_rate_limited(error):
+            return False
+
+        retry_after = get_retry_after(error)
+        self.get_bucket(scope, api_method).penalize(retry_after)
+
+        with self._lock:
+            self.throttled += 1
+
+        metrics.increment("SlackThrottled")
+
+        return waited + retry_after <= self.get_max_wait(api_method)
+
+    def stats(self) -> LimiterStats:
+        with self._lock:
+            return LimiterStats(self.calls, self.waits, round(self.wait_seconds, 6), self.throttled, self.overflows)
+
+
+class RateLimitedWebClient(WebClient):
+    """
+    A Slack WebClient waiting for the turn of every call in the buckets of the rate limiter.
+    """
+
+    def api_call(self, api_method: str, **kwargs):
+        limiter = get_limiter()
+        scope = get_scope(self.token, api_method, kwargs)
+        waited = 0.0
+
+        for attempt in range(MAX_RETRIES + 1):
+            # Wait for a token of the method, or for the end of the 429 of the previous attempt
+            delay = limiter.acquire(scope, api_method, waited)
+
+            if delay:
+                with metrics.timer("SlackThrottleWait"):
+                    limiter.sleep(delay)
+                waited += delay
+
+            try:
+                return super().api_call(api_method, **kwargs)
+            except errors.SlackApiError as e:
+                if attempt == MAX_RETRIES or not limiter.throttle(scope, api_method, e, waited):
+                    raise
+
+
+def get_scope(token: typing.Union[str, None], api_method: str, kwargs: typing.Dict) -> typing.Hashable:
+    """
+    Gets the scope of the limits of a call: its workspace, which the token of the call belongs to, and its channel
+    for the methods limited per channel.
+    """
+
+    if api_method not in CHANNEL_METHODS:
+        return token
+
+    arguments = kwargs.get("json") or kwargs.get("data") or kwargs.get("params") or dict()
+
+    return token, arguments.get("channel")
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Checks if a failed call was refused by the rate limits of Slack.
+    """
+
+    response = getattr(error, "response", None)
+
+    return response is not None and getattr(response, "status_code", None) == 429
+
+
+def get_retry_after(error: Exception) -> float:
+    """
+    Gets the number of seconds to wait from the `Retry-After` header of a 429 of Slack.
+    """
+
+    headers = getattr(error.response, "headers", None) or dict()
+    value = headers.get("Retry-After", headers.get("retry-after"))
+
+    # The header is a list of values with the async client
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+def get_max_wait() -> float:
+    return float(os.environ.get("BOT_SLACK_MAX_WAIT") or DEFAULT_MAX_WAIT)
+
+
+def get_limiter() -> RateLimiter:
+    """
+    Retrieves or creates the rate limiter of the container.
+
+    Returns:
+        RateLimiter: The rate limiter shared by every client.
+    """
+
+    global LIMITER
+
+    if LIMITER is None:
+        LIMITER = RateLimiter(get_max_wait())
+
+    return LIMITER
+
+
+def set_deadline(context):
+    """
+    Caps the waits of the calls of the container by the remaining time of the invocation of a Lambda context.
+
+    Args:
+        context: AWS Lambda context object, or None outside of Lambda.
+    """
+
+    get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+    get_limiter().set_deadline(None if get_remaining_time is None else get_remaining_time() / 1000)
+
+
+def reset_limiter():
+    """
+    Drops the rate limiter, with its buckets and counters.
+    """
+
+    global LIMITER
+    LIMITER = None
+
+
+def wrap(client: WebClient) -> RateLimitedWebClient:
+    """
+    Creates a rate limited copy of a Slack WebClient, with the same token and connection settings.
+    """
+
+    if isinstance(client, RateLimitedWebClient):
+        return client
+
+    return RateLimitedWebClient(
+        token=client.token,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        ssl=client.ssl,
+        proxy=client.proxy,
+        headers=client.headers,
+        logger=client.logger,
+        retry_handlers=client.retry_handlers.copy(),
+    )
+
+
+def rate_limit_client(context, next):
+    """
+    Middleware replacing the Slack WebClient of a request, created by Bolt with the token of its workspace,
+    by a rate limited one.
+
+    Args:
+        context: The Bolt context of the request.
+        next: Function running the next middleware and the listeners.
+    """
+
+    if context.client is not None:
+        context["client"] = wrap(context.client)
+
+    return next()
+
@@ -0,0 +1,171 @@
+"""
+This script implements the warm-up mode of the Lambda function. The `WarmUpSchedule` EventBridge rule
+defined in template.yaml pings the function every few minutes with `{"source": "aws.events"}`. Instead of
+handing that event to the Slack request handler, the warm-up mode short-circuits before Bolt and eagerly
+primes every lazily initialized global (secrets, Slack app, JIRA client, modal view, rendered responses)
+together with the HTTPS connections to Slack and JIRA, so the first real user request after a warm-up pays no initialization
+cost. Every step is timed and reported back as the result of the invocation, together with the state of the
+JIRA circuit breaker and the fetch counters of the secrets provider. The Slack app of the execution mode selected with `BOT_EXECUTION_MODE` is primed, with
+the request handler and the signing key the `router` module reuses for the requests.
+When the event contains `"prefetch_users": true`, the Slack user profile cache is also
+filled with a bulk `users_list` pass, unless the bot serves several workspaces from an installation store.
+"""
+
+import time
+import typing
+from collections import namedtuple
+
+from common import secrets, users
+from jira_app import client, transport
+from slack_app import bot, installations, router
+from slack_app.questions import registry, results
+
+
+# Event source used by the EventBridge schedule that keeps the function warm
+WARM_UP_EVENT_SOURCE = "aws.events"
+
+# Namedtuple 'WarmUpStep' describing the outcome of a single warm-up step
+WarmUpStep = namedtuple("WarmUpStep", ["name", "duration_ms", "ok", "error"], defaults=[True, None])
+
+
+def is_warm_up_event(event: typing.Any) -> bool:
+    """
+    Checks whether the incoming Lambda event is a scheduled warm-up ping.
+
+    Args:
+        event: AWS Lambda event object.
+
+    Returns:
+        bool: True if the event was sent by the warm-up schedule, False otherwise.
+    """
+
+    return isinstance(event, dict) and event.get("source") == WARM_UP_EVENT_SOURCE
+
+
+def prime_slack_app():
+    """
+    Initializes the Slack app of the execution mode with its request handler, and the signing key of the router.
+    """
+
+    router.get_signer()
+    router.get_request_handler()
+
+
+def prime_slack_connection():
+    """
+    Opens the HTTPS connection to the Slack Web API and validates the bot token, if there is a single one.
+    """
+
+    # Without a single bot token, `api.test` opens the connection without authentication
+    method = "api_test" if installations.is_enabled() else "auth_test"
+
+    if bot.get_execution_mode() == "async":
+        from slack_app import async_bot
+
+        async_bot.run(getattr(async_bot.get_async_slack_app().client, method)())
+    else:
+        getattr(bot.get_slack_app().client, method)()
+
+
+def prime_jira_connection():
+    """
+    Opens a pooled HTTPS connection to the JIRA server.
+    """
+
+    client.get_jira().server_info()
+
+
+def compile_questionnaires():
+    """
+    Loads or revalidates the questionnaire registry and compiles the view and scoring engine of every questionnaire.
+    """
+
+    registry.get_registry().compile()
+
+
+def prewarm_render_cache():
+    """
+    Renders the response sections of every answer combination of the questionnaires that fit in the render cache.
+    """
+
+    questionnaires = registry.get_registry()
+
+    results.prewarm_render_cache(
+        questionnaires.get(questionnaire_id).engine for questionnaire_id in questionnaires.ids()
+    )
+
+
+# Ordered list of warm-up steps, each a tuple of (Step Name, Step Function)
+WARM_UP_STEPS: typing.List[typing.Tuple[str, typing.Callable]] = [
+    ("secrets", secrets.get_secrets),
+    ("slack_app", prime_slack_app),
+    ("jira_client", client.get_jira),
+    ("modal_view", compile_questionnaires),
+    ("render_cache", prewarm_render_cache),
+    ("slack_connection", prime_slack_connection),
+    ("jira_connection", prime_jira_connection),
+]
+
+
+def prefetch_users():
+    """
+    Fills the Slack user profile cache with all workspace members.
+    """
+
+    users.prefetch_users(bot.get_slack_app().client)
+
+
+def run_step(name: str, step: typing.Callable) -> WarmUpStep:
+    """
+    Runs a single warm-up step and measures how long it took.
+
+    A failing step is recorded in the report instead of aborting the whole warm-up,
+    so one unavailable dependency does not prevent the others from being primed.
+
+    Args:
+        name (str): Name of the step used in the report.
+        step (Callable): Function priming the resource.
+
+    Returns:
+        WarmUpStep: The outcome of the step.
+    """
+
+    started = time.perf_counter()
+
+    try:
+        step()
+    except Exception as e:
+        return WarmUpStep(name, round((time.perf_counter() - started) * 1000, 3), False, str(e))
+
+    return WarmUpStep(name, round((time.perf_counter() - started) * 1000, 3))
+
+
+def warm_up(event: typing.Union[typing.Dict, None] = None) -> typing.Dict:
+    """
+    Primes every resource used by the bot and reports what was primed.
+
+    Args:
+        event (dict): The warm-up event, optionally enabling the user profile prefetch.
+
+    Returns:
+        dict: A report with the outcome and duration of every warm-up step.
+    """
+
+    started = time.perf_counter()
+
+    # Run all steps in order, later steps reuse what the earlier ones initialized
+    steps = [run_step(name, step) for name, step in WARM_UP_STEPS]
+
+    # Optionally fill the user profile cache once the Slack app is available
+    if event and event.get("prefetch_users") and not installations.is_enabled():
+        steps.append(run_step("user_profiles", prefetch_users))
+
+    return {
+        "warm_up": True,
+        "ok": all(step.ok for step in steps),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        "steps": [step._asdict() for step in steps],
+        "jira_circuit": transport.get_breaker().snapshot(),
+        # Only the provider in use, a warm-up whose secrets step failed may have none
+        "secrets_provider": secrets.PROVIDER.stats()._asdict() if secrets.PROVIDER is not None else None,
+    }
@@ -0,0 +1,91 @@
+"""
+Unit tests for the questionnaire analytics.
+
+This test module checks that submissions are added to the aggregates of their time buckets, that periods are
+parsed into buckets, and that the DynamoDB store increments the counters of a bucket with a single atomic update.
+"""
+
+import datetime
+import unittest
+from unittest.mock import MagicMock
+
+from common import analytics
+
+
+# 2026-10-17 12:00:00 UTC, in the fourth quarter
+TIMESTAMP = datetime.datetime(2026, 10, 17, 12, tzinfo=datetime.timezone.utc).timestamp()
+
+
+class TestMemoryStore(unittest.TestCase):
+    """
+    Test suite for the in-memory analytics store.
+    """
+
+    def test_add_increments_every_bucket(self):
+        """
+        Test if a submission increments the count, question hits and level of all its buckets.
+        """
+        store = analytics.MemoryStore()
+        buckets = analytics.get_buckets(TIMESTAMP)
+
+        store.add(buckets, 0b101, 1)
+        store.add(buckets, 0b100, 2)
+
+        for bucket in ("all", "2026-Q4", "2026-10"):
+            self.assertEqual(store.get(bucket), analytics.Aggregate(2, {0: 1, 2: 2}, {1: 1, 2: 1}))
+
+        self.assertEqual(store.get("2026-Q3"), analytics.EMPTY_AGGREGATE)
+
+
+class TestPeriods(unittest.TestCase):
+    """
+    Test suite for the time buckets and periods.
+    """
+
+    def test_parse_period(self):
+        """
+        Test if relative and explicit periods are parsed into their buckets.
+        """
+        self.assertEqual(analytics.parse_period(None, TIMESTAMP), "2026-Q4")
+        self.assertEqual(analytics.parse_period("month", TIMESTAMP), "2026-10")
+        self.assertEqual(analytics.parse_period("ALL", TIMESTAMP), "all")
+        self.assertEqual(analytics.parse_period("2025-q1", TIMESTAMP), "2025-Q1")
+        self.assertEqual(analytics.parse_period("2025-07", TIMESTAMP), "2025-07")
+
+        with self.assertRaises(ValueError):
+            analytics.parse_period("yesterday", TIMESTAMP)
+
+    def test_get_indices(self):
+        """
+        Test if the indices of the set bits are listed in ascending order.
+        """
+        self.assertEqual(analytics.get_indices(0b100101), [0, 2, 5])
+        self.assertEqual(analytics.get_indices(0), [])
+
+
+class TestDynamoDBStore(unittest.TestCase):
+    """
+    Test suite for the DynamoDB analytics store.
+    """
+
+    def test_add_and_get(self):
+        """
+        Test if the counters of a bucket are incremented atomically and read back into an aggregate.
+        """
+        client = MagicMock()
+        store = analytics.DynamoDBStore("analytics", client=client)
+
+        store.add(["all"], 0b11, 3)
+
+        kwargs = client.update_item.call_args.kwargs
+        self.assertEqual(kwargs["Key"], {"pk": {"S": "stats:all"}})
+        self.assertEqual(kwargs["UpdateExpression"], "ADD #n :one, #l3 :one, #q0 :one, #q1 :one")
+
+        client.get_item.return_value = {
+            "Item": {"pk": {"S": "stats:all"}, "n": {"N": "4"}, "l3": {"N": "4"}, "q0": {"N": "2"}}
+        }
+        self.assertEqual(store.get("all"), analytics.Aggregate(4, {0: 2}, {3: 4}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Unit tests for the in-memory TTL/LRU cache.
+
+This test module checks expiry, least-recently-used eviction and the hit/miss counters of `TTLCache`.
+"""
+
+import unittest
+
+from common.cache import TTLCache
+
+
+class FakeClock:
+    """
+    A manually advanced clock used to control entry expiry.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    """
+    Test suite for the TTLCache class.
+    """
+
+    def test_get_and_set(self):
+        """
+        Test if stored values are returned and counted as hits, and missing keys as misses.
+        """
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), (1, 1, 0, 1))
+
+    def test_entries_expire(self):
+        """
+        Test if entries are dropped once their time-to-live has passed.
+        """
+        clock = FakeClock()
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 9.9
+        self.assertEqual(cache.get("a"), 1)
+
+        clock.now = 10
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.get("a", "expired"), "expired")
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_is_evicted(self):
+        """
+        Test if the least recently used entry is evicted when the cache is full.
+        """
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.stats().evictions, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
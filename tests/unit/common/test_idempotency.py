@@ -0,0 +1,220 @@
+"""
+Unit tests for the idempotency stores.
+
+This test module checks the claim/begin/complete/release life cycle of a submission in the in-memory store,
+that a forgotten claim can be claimed again, the conditional writes of the DynamoDB store, the checks of the
+submissions seen, which claim nothing, and the keys built from submission bodies.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from common import idempotency
+
+
+class FakeClock:
+    """
+    A manually advanced clock used to control leases and expiry.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ConditionalCheckFailed(Exception):
+    """
+    Stand-in of the botocore error raised when the condition of a DynamoDB write does not hold.
+    """
+
+    response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+
+
+class TestMemoryStore(unittest.TestCase):
+    """
+    Test suite for the MemoryStore class.
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = idempotency.MemoryStore(ttl=3600, lease_timeout=30, clock=self.clock)
+
+    def test_claim_only_once(self):
+        """
+        Test if a submission can be claimed by its first delivery only.
+        """
+        self.assertTrue(self.store.claim("key"))
+        self.assertFalse(self.store.claim("key"))
+
+    def test_begin_once_until_released(self):
+        """
+        Test if a claimed submission is processed by one worker, and again only after a failure.
+        """
+        self.store.claim("key")
+
+        self.assertTrue(self.store.begin("key"))
+        self.assertFalse(self.store.begin("key"))
+
+        self.store.release("key")
+        self.assertTrue(self.store.begin("key"))
+
+    def test_begin_without_claim(self):
+        """
+        Test if a submission claimed in another container is processed.
+        """
+        self.assertTrue(self.store.begin("key"))
+
+    def test_completed_submission_is_not_processed_again(self):
+        """
+        Test if a processed submission is neither claimed nor processed again.
+        """
+        self.store.begin("key")
+        self.store.complete("key")
+
+        self.assertFalse(self.store.claim("key"))
+        self.assertFalse(self.store.begin("key"))
+
+    def test_result_of_completed_submission(self):
+        """
+        Test if the result given on completion is returned for done submissions only.
+        """
+        self.store.begin("key")
+        self.assertIsNone(self.store.get_result("key"))
+
+        self.store.complete("key", "SEC-1")
+        self.assertEqual(self.store.get_result("key"), "SEC-1")
+
+    def test_expired_lease_is_taken_over(self):
+        """
+        Test if the submission of a crashed worker is processed again once its lease expired.
+        """
+        self.store.begin("key")
+
+        self.clock.now += 31
+        self.assertTrue(self.store.begin("key"))
+
+    def test_exists_does_not_claim(self):
+        """
+        Test if checking a submission does not claim it.
+        """
+        self.assertFalse(self.store.exists("key"))
+        self.assertTrue(self.store.claim("key"))
+        self.assertTrue(self.store.exists("key"))
+
+    def test_forgotten_claim_is_claimed_again(self):
+        """
+        Test if a forgotten claim can be claimed again, unlike a submission being processed.
+        """
+        self.store.claim("key")
+        self.store.forget("key")
+        self.assertTrue(self.store.claim("key"))
+
+        self.store.begin("key")
+        self.store.forget("key")
+        self.assertFalse(self.store.claim("key"))
+
+
+class TestDynamoDBStore(unittest.TestCase):
+    """
+    Test suite for the DynamoDBStore class.
+    """
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.store = idempotency.DynamoDBStore("idempotency", ttl=3600, client=self.client, clock=lambda: 1000)
+
+    def test_claim_puts_conditionally(self):
+        """
+        Test if a claim writes the record only if it does not exist.
+        """
+        self.assertTrue(self.store.claim("key"))
+
+        kwargs = self.client.put_item.call_args.kwargs
+        self.assertEqual(kwargs["TableName"], "idempotency")
+        self.assertEqual(kwargs["Item"]["pk"], {"S": "key"})
+        self.assertEqual(kwargs["Item"]["expires_at"], {"N": "4600"})
+        self.assertIn("attribute_not_exists(pk)", kwargs["ConditionExpression"])
+
+    def test_failed_condition_is_a_duplicate(self):
+        """
+        Test if a failed condition reports a duplicate instead of raising.
+        """
+        self.client.put_item.side_effect = ConditionalCheckFailed()
+        self.client.update_item.side_effect = ConditionalCheckFailed()
+
+        self.assertFalse(self.store.claim("key"))
+        self.assertFalse(self.store.begin("key"))
+
+    def test_complete_keeps_result(self):
+        """
+        Test if the result of a completed submission is written with its state and read back consistently.
+        """
+        self.store.complete("key", "SEC-1")
+
+        kwargs = self.client.update_item.call_args.kwargs
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":result"], {"S": "SEC-1"})
+
+        self.client.get_item.return_value = {"Item": {"state": {"S": "done"}, "result": {"S": "SEC-1"}}}
+        self.assertEqual(self.store.get_result("key"), "SEC-1")
+        self.assertTrue(self.client.get_item.call_args.kwargs["ConsistentRead"])
+
+    def test_exists_ignores_expired_records(self):
+        """
+        Test if a record is seen with a consistent read, unless it expired.
+        """
+        self.client.get_item.return_value = {"Item": {"expires_at": {"N": "1000"}}}
+        self.assertTrue(self.store.exists("key"))
+        self.assertTrue(self.client.get_item.call_args.kwargs["ConsistentRead"])
+
+        self.client.get_item.return_value = {"Item": {"expires_at": {"N": "999"}}}
+        self.assertFalse(self.store.exists("key"))
+
+        self.client.get_item.return_value = dict()
+        self.assertFalse(self.store.exists("key"))
+
+    def test_forget_deletes_received_records(self):
+        """
+        Test if forgetting a claim deletes the record only while it is received.
+        """
+        self.store.forget("key")
+
+        kwargs = self.client.delete_item.call_args.kwargs
+        self.assertEqual(kwargs["Key"], {"pk": {"S": "key"}})
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":received"], {"S": "received"})
+
+        self.client.delete_item.side_effect = ConditionalCheckFailed()
+        self.store.forget("key")
+
+    def test_other_errors_are_raised(self):
+        """
+        Test if errors other than a failed condition are raised.
+        """
+        self.client.put_item.side_effect = Exception("Throttled")
+
+        with self.assertRaises(Exception):
+            self.store.claim("key")
+
+
+class TestSubmissionKey(unittest.TestCase):
+    """
+    Test suite for the submission_key function.
+    """
+
+    def test_key_from_view_and_user(self):
+        """
+        Test if the key combines the team, user, view ID and view hash.
+        """
+        body = {"team": {"id": "T1"}, "user": {"id": "U1"}, "view": {"id": "V1", "hash": "h1"}}
+        self.assertEqual(idempotency.submission_key(body), "submission:T1:U1:V1:h1")
+
+    def test_no_key_without_view_id(self):
+        """
+        Test if a body without view ID has no key.
+        """
+        self.assertIsNone(idempotency.submission_key({"user": {"id": "U1"}}))
+
+
+if __name__ == '__main__':
+    unittest.main()
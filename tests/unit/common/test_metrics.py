@@ -0,0 +1,133 @@
+"""
+Unit tests for the per-invocation metrics.
+
+This test module checks the timers, counters and cold-start flag of the metrics module and the EMF log line
+it prints, as well as the no-op behaviour when metrics are disabled.
+"""
+
+import contextlib
+import io
+import json
+import unittest
+
+from common import metrics
+
+
+class FakeClock:
+    """
+    A manually advanced clock used to control the timed durations.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test suite for the metrics module.
+    """
+
+    def setUp(self):
+        metrics.configure(enabled=True, namespace="Test")
+        self.clock = FakeClock()
+        metrics.RECORDER.clock = self.clock
+
+    def tearDown(self):
+        metrics.configure(enabled=False)
+        metrics.COLD_START = True
+
+    def flush(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            line = metrics.flush()
+
+        return line, output.getvalue()
+
+    def test_flush_prints_single_emf_line(self):
+        """
+        Test if timers and counters are flushed as one EMF document declaring every metric.
+        """
+        metrics.start_invocation("request", "bot-function")
+
+        with metrics.timer("JiraCreateIssue"):
+            self.clock.now += 0.25
+        metrics.increment("UserCacheHit")
+        metrics.increment("UserCacheHit")
+
+        line, output = self.flush()
+
+        self.assertEqual(output, line + "\n")
+        document = json.loads(line)
+        declaration = document["_aws"]["CloudWatchMetrics"][0]
+
+        self.assertEqual(declaration["Namespace"], "Test")
+        self.assertEqual(declaration["Dimensions"], [["EventType"]])
+        self.assertIn({"Name": "JiraCreateIssue", "Unit": "Milliseconds"}, declaration["Metrics"])
+        self.assertIn({"Name": "UserCacheHit", "Unit": "Count"}, declaration["Metrics"])
+        self.assertEqual(document["EventType"], "request")
+        self.assertEqual(document["FunctionName"], "bot-function")
+        self.assertEqual(document["JiraCreateIssue"], [250.0])
+        self.assertEqual(document["UserCacheHit"], 2)
+
+    def test_cold_start_flag(self):
+        """
+        Test if only the first invocation of the container is flagged as a cold start.
+        """
+        metrics.start_invocation("request")
+        metrics.increment("Dummy")
+        first = json.loads(self.flush()[0])
+
+        metrics.start_invocation("request")
+        metrics.increment("Dummy")
+        second = json.loads(self.flush()[0])
+
+        self.assertEqual(first["ColdStart"], 1)
+        self.assertEqual(second["ColdStart"], 0)
+
+    def test_timer_counts_errors(self):
+        """
+        Test if a failing timed block is timed and counted as an error.
+        """
+        metrics.start_invocation("lazy")
+
+        with self.assertRaises(ValueError):
+            with metrics.timer("SlackChatPostMessage"):
+                raise ValueError("boom")
+
+        document = json.loads(self.flush()[0])
+
+        self.assertEqual(len(document["SlackChatPostMessage"]), 1)
+        self.assertEqual(document["SlackChatPostMessageErrors"], 1)
+
+    def test_flush_resets_recorder(self):
+        """
+        Test if metrics are not carried over to the next invocation.
+        """
+        metrics.increment("Dummy")
+        self.flush()
+
+        line, output = self.flush()
+
+        self.assertIsNone(line)
+        self.assertEqual(output, "")
+
+    def test_disabled_metrics_are_noop(self):
+        """
+        Test if disabled metrics record and print nothing.
+        """
+        metrics.configure(enabled=False)
+        metrics.start_invocation("request")
+
+        with metrics.timer("JiraCreateIssue"):
+            pass
+        metrics.increment("UserCacheHit")
+
+        self.assertIs(metrics.timer("JiraCreateIssue"), metrics.NULL_TIMER)
+        self.assertEqual(self.flush(), (None, ""))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+"""
+Unit tests for the rosters of the reminder campaigns.
+
+This test module checks that a campaign interns its users to compact IDs and computes the users to remind with
+bitmaps, also at 50k users, that the logs are read incrementally from a cursor, that the DynamoDB store stops at a
+missing log entry and skips it at the next read, that a campaign is saved in chunks of users of which only the new
+ones are written again, and that recording a submission never fails the task that records it.
+"""
+
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from common import roster
+from jira_app import task
+
+
+class FakeDynamoDB:
+    """
+    A DynamoDB client keeping the items of a table with the partition key 'pk' in a dictionary.
+    """
+
+    def __init__(self):
+        self.items = dict()
+        self.puts = list()
+
+    def put_item(self, TableName, Item):
+        self.items[Item["pk"]["S"]] = Item
+        self.puts.append(Item["pk"]["S"])
+
+    def get_item(self, TableName, Key, ConsistentRead=False):
+        item = self.items.get(Key["pk"]["S"])
+        return {"Item": item} if item is not None else dict()
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        item = self.items.setdefault(Key["pk"]["S"], {"pk": Key["pk"]})
+
+        # Only the 'SET #name = :name' and 'SET name = :value' assignments of the store are supported
+        if UpdateExpression.startswith("SET"):
+            names = kwargs.get("ExpressionAttributeNames") or dict()
+            self.puts.append(Key["pk"]["S"])
+
+            for assignment in UpdateExpression[4:].split(", "):
+                name, value = assignment.split(" = ")
+                item[names.get(name, name)] = ExpressionAttributeValues[value]
+            return
+
+        if UpdateExpression.startswith("ADD #seq"):
+            item["seq"] = {"N": str(int(item.get("seq", {"N": "0"})["N"]) + 1)}
+            return {"Attributes": {"seq": item["seq"]}}
+
+        ids = set(item.get("ids", {"SS": []})["SS"])
+        change = set(ExpressionAttributeValues[":ids"]["SS"])
+        item["ids"] = {"SS": sorted(ids | change if UpdateExpression.startswith("ADD") else ids - change)}
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        found = [self.items[key["pk"]["S"]] for key in request["Keys"] if key["pk"]["S"] in self.items]
+        return {"Responses": {table_name: found}}
+
+
+class TestCampaign(unittest.TestCase):
+    """
+    Test suite for the Campaign class.
+    """
+
+    def test_pending_users(self):
+        """
+        Test if the users to remind are the targeted ones who neither submitted nor were reminded, lowest IDs first.
+        """
+        campaign = roster.Campaign("b1", "q1", dict())
+
+        campaign.targeted |= campaign.to_bitmap(["T1:U1", "T1:U2", "T1:U3", "T1:U4"])
+        campaign.submitted |= campaign.to_bitmap(["T1:U2", "T1:U9"])
+        campaign.reminded |= campaign.to_bitmap(["T1:U3"])
+
+        self.assertEqual(campaign.get_users(campaign.pending()), ["T1:U1", "T1:U4"])
+        self.assertEqual(campaign.get_users(campaign.pending(), 1), ["T1:U1"])
+        self.assertEqual(campaign.intern("T1:U9"), 4)
+
+    def test_fifty_thousand_users(self):
+        """
+        Test if the diff of 50k targeted users against 45k submitters is computed in well under a second.
+        """
+        campaign = roster.Campaign("b1", "q1", dict())
+        users = [f"T1:U{idx:06d}" for idx in range(50000)]
+
+        started = time.perf_counter()
+        campaign.targeted |= campaign.to_bitmap(users)
+        campaign.submitted |= campaign.to_bitmap(users[5000:])
+        pending = campaign.pending()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(pending.bit_count(), 5000)
+        self.assertEqual(campaign.get_users(pending, 2), ["T1:U000000", "T1:U000001"])
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(roster.unpack_bitmap(roster.pack_bitmap(pending)), pending)
+
+
+class TestMemoryStore(unittest.TestCase):
+    """
+    Test suite for the in-memory roster store.
+    """
+
+    def test_logs_are_read_from_the_cursor(self):
+        """
+        Test if a read returns the entries appended after the cursor only.
+        """
+        store = roster.MemoryStore()
+        store.append("submitted:q1", ["T1:U1"])
+        store.append("submitted:q1", ["T1:U2", "T1:U3"])
+
+        self.assertEqual(store.read("submitted:q1", 0), (["T1:U1", "T1:U2", "T1:U3"], 2, 0))
+        self.assertEqual(store.read("submitted:q1", 1), (["T1:U2", "T1:U3"], 2, 0))
+        self.assertEqual(store.read("submitted:q1", 2), ([], 2, 0))
+        self.assertEqual(store.head("submitted:q2"), 0)
+
+
+class TestDynamoDBStore(unittest.TestCase):
+    """
+    Test suite for the DynamoDB roster store.
+    """
+
+    def setUp(self):
+        self.client = FakeDynamoDB()
+        self.store = roster.DynamoDBStore("roster", client=self.client, clock=lambda: 1000.0)
+
+    def test_missing_entry_is_skipped_at_the_next_read(self):
+        """
+        Test if a read stops before an entry whose writer has not written it yet, and skips it if it is still missing.
+        """
+        for idx in range(3):
+            self.store.append("targeted:b1", [f"T1:U{idx}"])
+        del self.client.items["log:targeted:b1:2"]
+
+        self.assertEqual(self.store.read("targeted:b1", 0), (["T1:U0"], 1, 2))
+        self.assertEqual(self.store.read("targeted:b1", 1, skip=2), (["T1:U2"], 3, 0))
+        self.assertEqual(self.client.items["log:targeted:b1:1"]["expires_at"], {"N": str(1000 + roster.RETENTION)})
+
+    @patch("common.roster.USERS_CHUNK_SIZE", 2)
+    def test_campaign_is_saved_in_chunks(self):
+        """
+        Test if a campaign is loaded back as saved, and only the chunks of its new users are written again.
+        """
+        campaign = roster.Campaign("b1", "q1", {"channel": "C1"}, cursors={"submitted": 4}, round_started=5.0)
+        campaign.targeted = campaign.to_bitmap(["T1:U1", "T1:U2", "T1:U3"])
+        self.store.save(campaign)
+
+        campaign.submitted = campaign.to_bitmap(["T1:U4"])
+        self.client.puts.clear()
+        self.store.save(campaign)
+
+        self.assertEqual(self.client.puts, ["campaign:b1:users:1", "campaign:b1"])
+        loaded = self.store.load("b1")
+        self.assertEqual(loaded.users, ["T1:U1", "T1:U2", "T1:U3", "T1:U4"])
+        self.assertEqual((loaded.targeted, loaded.submitted, loaded.reminded), (0b0111, 0b1000, 0))
+        self.assertEqual((loaded.meta, loaded.cursors), ({"channel": "C1"}, {"submitted": 4}))
+        self.assertEqual(loaded.round_started, 5.0)
+        self.assertIsNone(self.store.load("b2"))
+
+    def test_broadcast_done_survives_the_saves(self):
+        """
+        Test if the end of the broadcast flagged while a sweep holds the campaign is kept by the save of the sweep.
+        """
+        self.store.save(roster.Campaign("b1", "q1", {"channel": "C1"}))
+        swept = self.store.load("b1")
+
+        self.store.set_broadcast_done("b1")
+        self.store.save(swept)
+
+        self.assertTrue(self.store.load("b1").broadcast_done)
+        self.assertFalse(swept.broadcast_done)
+
+    def test_open_campaigns(self):
+        """
+        Test if campaigns are added to and removed from the set of open campaigns.
+        """
+        self.store.set_open("b1", True)
+        self.store.set_open("b2", True)
+        self.store.set_open("b1", False)
+
+        self.assertEqual(self.store.list_campaigns(), ["b2"])
+
+
+class TestRecordSubmission(unittest.TestCase):
+    """
+    Test suite for the submissions recorded by `task.save_answers`.
+    """
+
+    def tearDown(self):
+        roster.STORE = None
+
+    @patch("jira_app.task.create", return_value="<https://jira/SEC-1|SEC-1>")
+    @patch("common.secrets.BotSecrets.get", return_value="SEC")
+    def test_saved_answers_are_recorded(self, mock_get, mock_create):
+        """
+        Test if a saved task records its user in the submitted log of its questionnaire.
+        """
+        roster.STORE = roster.MemoryStore()
+        user = {"id": "U1", "team_id": "T1", "profile": {"display_name": "Jane", "email": "jane@example.com"}}
+
+        with patch.dict("os.environ", {"BOT_ROSTER_STORE": "memory"}):
+            task.save_answers("*Result: Level 1*", user, questionnaire_id="privacy")
+
+        self.assertEqual(roster.STORE.read("submitted:privacy", 0)[0], ["T1:U1"])
+
+    def test_failure_is_not_raised(self):
+        """
+        Test if a failing store is logged without failing the submission, and nothing is recorded when disabled.
+        """
+        roster.STORE = MagicMock()
+        roster.STORE.append.side_effect = Exception("DynamoDB is down")
+
+        with patch.dict("os.environ", {"BOT_ROSTER_STORE": "dynamodb"}), self.assertLogs(roster.LOGGER):
+            roster.record_submission("privacy", {"id": "U1", "team_id": "T1"})
+
+        with patch.dict("os.environ", {"BOT_ROSTER_STORE": "none"}):
+            roster.record_submission("privacy", {"id": "U1", "team_id": "T1"})
+
+        roster.STORE.append.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
+import json
+import os
+import tempfile
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 import enum
+from common import secrets
 from common.secrets import BotSecrets
 
 
@@ -10,6 +14,8 @@ def mocked_get_secrets():
         BotSecrets.SLACK_BOT_TOKEN.name: "slack_bot_token_value",
         BotSecrets.SLACK_SIGNING_SECRET.name: "slack_signing_secret_value",
         BotSecrets.SLACK_SLASH_COMMAND.name: "slack_slash_command_value",
+        BotSecrets.SLACK_CLIENT_ID.name: "slack_client_id_value",
+        BotSecrets.SLACK_CLIENT_SECRET.name: "slack_client_secret_value",
         BotSecrets.JIRA_API_TOKEN.name: "jira_api_token_value",
         BotSecrets.JIRA_URL.name: "jira_url_value",
         BotSecrets.JIRA_USER.name: "jira_user_value",
@@ -47,5 +53,83 @@ class TestBotSecrets(unittest.TestCase):
         self.assertTrue("Fail to find secret key" in str(context.exception))
 
 
+class TestSecretsProviders(unittest.TestCase):
+    """
+    Unit tests for the secrets providers, TTL refresh and rotation handling.
+    """
+
+    def setUp(self):
+        secrets.SECRET = None
+        secrets.SECRET_FETCHED_AT = None
+        secrets.PROVIDER = None
+
+    def tearDown(self):
+        self.setUp()
+
+    def test_local_provider_reads_file(self):
+        """
+        Test if the local provider reads the secrets from a JSON file.
+        """
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as secrets_file:
+            json.dump(mocked_get_secrets(), secrets_file)
+
+        try:
+            provider = secrets.LocalProvider(secrets_file.name)
+            self.assertEqual(provider.fetch(), mocked_get_secrets())
+            self.assertEqual(provider.stats().fetches, 1)
+        finally:
+            os.unlink(secrets_file.name)
+
+    @patch.dict(os.environ, {"BOT_SECRETS_PROVIDER": "local", "SLACK_BOT_TOKEN": "xoxb-local"})
+    def test_local_provider_reads_environment(self):
+        """
+        Test if the local provider is selected from the environment and reads the secrets from it.
+        """
+        self.assertIsInstance(secrets.get_provider(), secrets.LocalProvider)
+        self.assertEqual(BotSecrets.get(BotSecrets.SLACK_BOT_TOKEN), "xoxb-local")
+
+    def test_region_is_derived_from_arn(self):
+        """
+        Test if the region of the secret is taken from its ARN.
+        """
+        arn = "arn:aws:secretsmanager:us-east-1:123456789012:secret:slack-bot"
+        self.assertEqual(secrets.get_region_name(arn), "us-east-1")
+
+    @patch.dict(os.environ, {"BOT_SECRETS_TTL": "60"})
+    def test_secrets_are_refreshed_after_ttl(self):
+        """
+        Test if the secrets are cached within the TTL, refreshed after it and rotation listeners are called.
+        """
+        provider = MagicMock()
+        provider.fetch.side_effect = [{"SLACK_BOT_TOKEN": "old"}, {"SLACK_BOT_TOKEN": "new"}]
+        secrets.PROVIDER = provider
+        listener = MagicMock()
+
+        with patch.object(secrets, "ROTATION_LISTENERS", [listener]), \
+                patch("common.secrets.time.monotonic", side_effect=[0, 30, 61, 61]):
+            self.assertEqual(secrets.get_secrets()["SLACK_BOT_TOKEN"], "old")
+            self.assertEqual(secrets.get_secrets()["SLACK_BOT_TOKEN"], "old")
+            listener.assert_not_called()
+            self.assertEqual(secrets.get_secrets()["SLACK_BOT_TOKEN"], "new")
+
+        listener.assert_called_once_with()
+        self.assertEqual(provider.fetch.call_count, 2)
+
+    def test_previous_secrets_are_served_when_refresh_fails(self):
+        """
+        Test if a failed refresh keeps the previous secrets, while a failed first fetch raises.
+        """
+        provider = MagicMock()
+        provider.fetch.side_effect = Exception("Fail to get secrets")
+        secrets.PROVIDER = provider
+
+        with self.assertRaises(Exception):
+            secrets.get_secrets()
+
+        secrets.SECRET = {"SLACK_BOT_TOKEN": "old"}
+        secrets.SECRET_FETCHED_AT = -10 ** 6
+        self.assertEqual(secrets.get_secrets()["SLACK_BOT_TOKEN"], "old")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,64 @@
+"""
+Unit tests for the Slack user profile cache.
+
+This test module checks that user profiles are only fetched from Slack on a cache miss and that
+the paginated `users_list` prefetch fills the cache.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from common import users
+
+
+class TestUsers(unittest.TestCase):
+    """
+    Test suite for the user profile cache functions.
+    """
+
+    def setUp(self):
+        users.USER_CACHE.clear()
+
+    def test_get_user_uses_cache(self):
+        """
+        Test if `users_info` is only called for the first lookup of a user.
+        """
+        client = MagicMock()
+        client.users_info.return_value = {"user": {"id": "U1", "name": "jane"}}
+
+        self.assertEqual(users.get_user(client, "U1")["name"], "jane")
+        self.assertEqual(users.get_user(client, "U1")["name"], "jane")
+
+        client.users_info.assert_called_once_with(user="U1")
+        self.assertEqual(users.USER_CACHE.stats().hits, 1)
+
+    def test_get_user_does_not_cache_missing_user(self):
+        """
+        Test if an empty lookup result is not cached.
+        """
+        client = MagicMock()
+        client.users_info.return_value = {}
+
+        self.assertEqual(users.get_user(client, "U1"), {})
+        self.assertNotIn("U1", users.USER_CACHE)
+
+    def test_prefetch_users_follows_pages(self):
+        """
+        Test if every page of `users_list` is read and deleted users are skipped.
+        """
+        client = MagicMock()
+        client.users_list.side_effect = [
+            {"members": [{"id": "U1"}, {"id": "U2", "deleted": True}], "response_metadata": {"next_cursor": "c1"}},
+            {"members": [{"id": "U3"}], "response_metadata": {"next_cursor": ""}},
+        ]
+
+        self.assertEqual(users.prefetch_users(client, page_size=2), 2)
+        self.assertEqual(client.users_list.call_count, 2)
+        self.assertEqual(client.users_list.call_args.kwargs["cursor"], "c1")
+        self.assertIn("U1", users.USER_CACHE)
+        self.assertNotIn("U2", users.USER_CACHE)
+        self.assertIn("U3", users.USER_CACHE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for the batched creation of JIRA tasks.
+
+This test module checks that pending issues are flushed in bulk when the batch is full or has lingered
+too long, and that every result, including per-item failures, is mapped back to its submitter.
+"""
+
+import unittest
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+
+from jira_app import task
+from jira_app.batch import IssueBatcher
+
+
+# Stand-in for the JIRA issue resource with the attributes used to format task links
+Issue = namedtuple("Issue", ["self", "key"])
+
+
+def mocked_create_issues(field_list, prefetch=True):
+    """
+    Creates every issue except those with 'fail' in their summary, like the JIRA bulk endpoint.
+    """
+    results = list()
+
+    for idx, fields in enumerate(field_list):
+        if "fail" in fields["summary"]:
+            results.append({"status": "Error", "error": {"summary": "invalid"}, "issue": None})
+        else:
+            issue = Issue(f"https://jira/rest/api/2/issue/{idx}", f"SEC-{idx}")
+            results.append({"status": "Success", "error": None, "issue": issue})
+
+    return results
+
+
+class TestIssueBatcher(unittest.TestCase):
+    """
+    Test suite for the IssueBatcher class.
+    """
+
+    def setUp(self):
+        self.jira = MagicMock()
+        self.jira.create_issues.side_effect = mocked_create_issues
+        patcher = patch("jira_app.client.get_jira", return_value=self.jira)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_flush_when_full(self):
+        """
+        Test if the batch is flushed with one bulk request once it reaches its maximum size.
+        """
+        batcher = IssueBatcher(max_size=2, max_linger=60)
+
+        self.assertEqual(batcher.add(task.build_issue("first", "", "SEC"), "U1"), [])
+        results = batcher.add(task.build_issue("second", "", "SEC"), "U2")
+
+        self.jira.create_issues.assert_called_once()
+        self.assertEqual([result.ref for result in results], ["U1", "U2"])
+        self.assertEqual(results[1].task_link, "<https://jira/rest/api/2/issue/1|SEC-1>")
+        self.assertEqual(len(batcher), 0)
+
+    def test_flush_after_linger(self):
+        """
+        Test if a batch below its maximum size is flushed once its oldest issue has lingered too long.
+        """
+        now = [0.0]
+        batcher = IssueBatcher(max_size=10, max_linger=1, clock=lambda: now[0])
+        batcher.add(task.build_issue("first", "", "SEC"), "U1")
+
+        self.assertEqual(batcher.flush_if_due(), [])
+
+        now[0] = 1.5
+        self.assertEqual(len(batcher.flush_if_due()), 1)
+
+    def test_failures_are_reported_per_item(self):
+        """
+        Test if a failed issue is reported to its submitter without failing the rest of the batch.
+        """
+        on_result = MagicMock()
+        batcher = IssueBatcher(max_size=10, on_result=on_result)
+        batcher.add(task.build_issue("fail", "", "SEC"), "U1")
+        batcher.add(task.build_issue("ok", "", "SEC"), "U2")
+
+        failed, created = batcher.flush()
+
+        self.assertIsNone(failed.task_link)
+        self.assertIn("invalid", failed.error)
+        self.assertEqual(created.task_link, "<https://jira/rest/api/2/issue/1|SEC-1>")
+        self.assertEqual(on_result.call_count, 2)
+
+    def test_request_failure_fails_every_item(self):
+        """
+        Test if a failure of the bulk request is reported for every issue of the batch.
+        """
+        self.jira.create_issues.side_effect = Exception("JIRA is down")
+        batcher = IssueBatcher(max_size=10)
+        batcher.add(task.build_issue("first", "", "SEC"), "U1")
+        batcher.add(task.build_issue("second", "", "SEC"), "U2")
+
+        results = batcher.flush()
+
+        self.assertEqual([result.error for result in results], ["JIRA is down", "JIRA is down"])
+
+
+if __name__ == '__main__':
+    unittest.main()
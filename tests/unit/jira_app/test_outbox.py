@@ -0,0 +1,234 @@
+"""
+Unit tests for the JIRA outbox.
+
+This test module checks that entries are appended once and leased by one flusher at a time in the SQLite outbox,
+that the flusher creates their tasks in bulk, reports them to their users, never creates a task twice for a
+redelivered entry, even when updating a message fails, delivers the entries whose message was not updated again,
+and retries failed tasks until they are given up, and that SQS batches report their failures.
+"""
+
+import json
+import unittest
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+
+from common import idempotency
+from jira_app import outbox, task
+
+
+# Stand-in for the JIRA issue resource with the attributes used to format task links
+Issue = namedtuple("Issue", ["self", "key"])
+
+
+class FakeClock:
+    """
+    A manually advanced clock used to control leases and backoffs.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def mocked_create_issues(field_list, prefetch=True):
+    """
+    Creates every issue except those with 'fail' in their summary, like the JIRA bulk endpoint.
+    """
+    return [
+        {"status": "Error", "error": {"summary": "invalid"}, "issue": None} if "fail" in fields["summary"] else
+        {"status": "Success", "error": None, "issue": Issue(f"https://jira/{fields['summary']}", fields["summary"])}
+        for fields in field_list
+    ]
+
+
+def make_payload(summary: str) -> dict:
+    return {"issue": task.build_issue(summary, "", "SEC"), "reply": {"channel": "D1", "ts": summary}}
+
+
+class TestSQLiteOutbox(unittest.TestCase):
+    """
+    Test suite for the SQLiteOutbox class.
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.outbox = outbox.SQLiteOutbox(":memory:", lease_timeout=60, clock=self.clock)
+
+    def test_append_once(self):
+        """
+        Test if an entry is appended once, whatever the number of deliveries of its submission.
+        """
+        self.assertTrue(self.outbox.append("key", make_payload("SEC-1")))
+        self.assertFalse(self.outbox.append("key", make_payload("SEC-1")))
+        self.assertEqual(len(self.outbox), 1)
+
+    def test_receive_leases_entries(self):
+        """
+        Test if received entries are hidden until their lease expired, and counted as a new attempt.
+        """
+        self.outbox.append("key", make_payload("SEC-1"))
+
+        entries = self.outbox.receive(10)
+        self.assertEqual([(entry.entry_id, entry.attempts) for entry in entries], [("key", 1)])
+        self.assertEqual(entries[0].payload, make_payload("SEC-1"))
+        self.assertEqual(self.outbox.receive(10), [])
+
+        self.clock.now += 60
+        self.assertEqual(self.outbox.receive(10)[0].attempts, 2)
+
+    def test_retry_complete_and_fail(self):
+        """
+        Test if retried entries come back after their backoff, and completed or failed entries never do.
+        """
+        self.outbox.append("first", make_payload("SEC-1"))
+        self.outbox.append("second", make_payload("SEC-2"))
+        first, second = self.outbox.receive(10)
+
+        self.outbox.retry(first)
+        self.outbox.complete(second)
+
+        self.clock.now += outbox.RETRY_BACKOFF
+        entries = self.outbox.receive(10)
+        self.assertEqual([entry.entry_id for entry in entries], ["first"])
+
+        self.outbox.fail(entries[0])
+        self.clock.now += 3600
+        self.assertEqual(self.outbox.receive(10), [])
+        self.assertEqual(len(self.outbox), 0)
+
+
+class TestOutboxFlusher(unittest.TestCase):
+    """
+    Test suite for the OutboxFlusher class.
+    """
+
+    def setUp(self):
+        self.jira = MagicMock()
+        self.jira.create_issues.side_effect = mocked_create_issues
+        patcher = patch("jira_app.client.get_jira", return_value=self.jira)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.on_result = MagicMock()
+        self.ledger = idempotency.MemoryStore()
+        self.outbox = outbox.SQLiteOutbox(":memory:", clock=FakeClock())
+        self.flusher = outbox.OutboxFlusher(self.on_result, self.ledger, batch_size=2, concurrency=2, max_attempts=2)
+
+    def test_drain_creates_tasks_in_bulk(self):
+        """
+        Test if the tasks are created with one bulk request per batch and reported to their users.
+        """
+        for idx in range(5):
+            self.outbox.append(f"key-{idx}", make_payload(f"SEC-{idx}"))
+
+        report = self.flusher.drain(self.outbox)
+
+        self.assertEqual(len(report.created), 5)
+        self.assertEqual(self.jira.create_issues.call_count, 3)
+        self.assertEqual(len(self.outbox), 0)
+        self.on_result.assert_any_call({"channel": "D1", "ts": "SEC-4"}, "<https://jira/SEC-4|SEC-4>", False)
+        self.assertEqual(self.ledger.get_result(outbox.get_ledger_key("key-4")), "<https://jira/SEC-4|SEC-4>")
+
+    def test_redelivered_entry_is_not_created_again(self):
+        """
+        Test if a redelivered entry gets the recorded task link instead of a second task.
+        """
+        entry = outbox.OutboxEntry("key", make_payload("SEC-1"), 1, "m1")
+
+        self.flusher.process([entry])
+        report = self.flusher.process([entry._replace(attempts=2)])
+
+        self.jira.create_issues.assert_called_once()
+        self.assertEqual(report.created, [entry._replace(attempts=2)])
+        self.assertEqual(self.on_result.call_count, 2)
+
+    def test_failed_update_is_delivered_again(self):
+        """
+        Test if every created task of a bulk result is recorded, and an entry whose message update failed is
+        delivered again until its last attempt, without creating its task again.
+        """
+        self.on_result.side_effect = [Exception("ratelimited"), None, Exception("ratelimited")]
+        entries = [outbox.OutboxEntry(f"key-{idx}", make_payload(f"SEC-{idx}"), 1, f"m{idx}") for idx in range(2)]
+
+        with self.assertLogs(outbox.LOGGER, level="ERROR"):
+            report = self.flusher.process(entries)
+
+        self.assertEqual(report.created, entries[1:])
+        self.assertEqual(report.retried, entries[:1])
+        self.assertEqual(self.on_result.call_count, 2)
+        self.assertEqual(self.ledger.get_result(outbox.get_ledger_key("key-0")), "<https://jira/SEC-0|SEC-0>")
+
+        # The last attempt keeps the entry created even though its message is still not updated
+        with self.assertLogs(outbox.LOGGER, level="ERROR"):
+            report = self.flusher.process([entries[0]._replace(attempts=2)])
+
+        self.assertEqual(report.created, [entries[0]._replace(attempts=2)])
+        self.assertEqual(report.retried, [])
+        self.on_result.assert_called_with({"channel": "D1", "ts": "SEC-0"}, "<https://jira/SEC-0|SEC-0>", False)
+        self.jira.create_issues.assert_called_once()
+
+    def test_failed_task_is_retried_then_given_up(self):
+        """
+        Test if a failed task is retried until its last attempt, then reported as failed to its user.
+        """
+        entry = outbox.OutboxEntry("key", make_payload("fail"), 1, "m1")
+
+        report = self.flusher.process([entry])
+        self.assertEqual(report.retried, [entry])
+        self.on_result.assert_not_called()
+
+        report = self.flusher.process([entry._replace(attempts=2)])
+        self.assertEqual(len(report.failed), 1)
+        self.on_result.assert_called_once_with({"channel": "D1", "ts": "fail"}, None, True)
+
+    def test_handle_sqs_event(self):
+        """
+        Test if only the failed messages of an SQS batch are reported to be delivered again.
+        """
+        event = {
+            "Records": [
+                {
+                    "eventSource": "aws:sqs",
+                    "messageId": f"m{idx}",
+                    "body": json.dumps({"entry_id": f"key-{idx}", "payload": make_payload(summary)}),
+                    "attributes": {"ApproximateReceiveCount": "1"},
+                }
+                for idx, summary in enumerate(["SEC-1", "fail"])
+            ]
+        }
+
+        self.assertTrue(outbox.is_sqs_event(event))
+        self.assertEqual(outbox.handle_sqs_event(event, self.flusher), {"batchItemFailures": [{"itemIdentifier": "m1"}]})
+
+
+class TestSQSOutbox(unittest.TestCase):
+    """
+    Test suite for the SQSOutbox class.
+    """
+
+    def test_append_and_receive(self):
+        """
+        Test if entries are sent as messages and received with their receive count and receipt handle.
+        """
+        client = MagicMock()
+        sqs_outbox = outbox.SQSOutbox("https://sqs/outbox", client=client)
+
+        sqs_outbox.append("key", make_payload("SEC-1"))
+        body = client.send_message.call_args.kwargs["MessageBody"]
+
+        client.receive_message.return_value = {
+            "Messages": [{"Body": body, "ReceiptHandle": "r1", "Attributes": {"ApproximateReceiveCount": "3"}}]
+        }
+        entries = sqs_outbox.receive(50)
+
+        self.assertEqual(client.receive_message.call_args.kwargs["MaxNumberOfMessages"], outbox.SQS_MAX_RECEIVE)
+        self.assertEqual(entries, [outbox.OutboxEntry("key", make_payload("SEC-1"), 3, "r1")])
+
+        sqs_outbox.complete(entries[0])
+        client.delete_message.assert_called_once_with(QueueUrl="https://sqs/outbox", ReceiptHandle="r1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Unit tests for the per-user index of the questionnaire tasks.
+
+This test module checks that created tasks are recorded in the index of their user, that a lookup without a
+complete index backfills it with a paginated JQL search keeping only the tasks of the user, that repeat lookups
+are served from the index until it expires, and that the DynamoDB store shares the recorded tasks between containers.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from jira_app import submissions, task
+
+
+class Fields:
+    """
+    Stand-in for the fields of a JIRA issue returned by the search.
+    """
+
+    def __init__(self, description, created):
+        self.description = description
+        self.created = created
+
+
+class Issue:
+    """
+    Stand-in for a JIRA issue returned by the search.
+    """
+
+    def __init__(self, key, email, level, created="2026-10-01T10:00:00.000+0000"):
+        self.self = f"https://jira/{key}"
+        self.key = key
+        self.fields = Fields(f"*Result: {level}*\n*User Email:* {email}", created)
+
+
+class Page(list):
+    """
+    Stand-in for a page of search results, with the total number of matching issues.
+    """
+
+    def __init__(self, issues, total):
+        super().__init__(issues)
+        self.total = total
+
+
+def make_issue_dict(email: str, level: str = "Level 3") -> dict:
+    return task.build_issue("New user answered Questionnaire - Jane", f"*Result: {level}*\n*User Email:* {email}", "SEC")
+
+
+class TestSubmissionsIndex(unittest.TestCase):
+    """
+    Test suite for the submissions index.
+    """
+
+    def setUp(self):
+        self.now = 0.0
+        submissions.STORE = submissions.MemoryStore(ttl=60, clock=lambda: self.now)
+
+        self.jira = MagicMock()
+        patchers = [
+            patch("jira_app.client.get_jira", return_value=self.jira),
+            patch("common.secrets.BotSecrets.get", return_value="SEC"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        submissions.STORE = None
+
+    def test_backfill_then_served_from_index(self):
+        """
+        Test if the first lookup searches JIRA page by page and repeat lookups are served from the index.
+        """
+        self.jira.search_issues.side_effect = [
+            Page([Issue("SEC-3", "jane@example.com", "Level 2"), Issue("SEC-2", "mary.jane@example.com", "Level 1")], 3),
+            Page([Issue("SEC-1", "Jane@example.com", "Level 4", "2026-09-01T10:00:00.000+0000")], 3),
+        ]
+
+        found = submissions.get_submissions("Jane@Example.com")
+        again = submissions.get_submissions("jane@example.com")
+
+        self.assertEqual(found, [
+            submissions.Submission("<https://jira/SEC-3|SEC-3>", "Level 2", "2026-10-01"),
+            submissions.Submission("<https://jira/SEC-1|SEC-1>", "Level 4", "2026-09-01"),
+        ])
+        self.assertEqual(again, found)
+        self.assertEqual(self.jira.search_issues.call_count, 2)
+
+        kwargs = self.jira.search_issues.call_args.kwargs
+        self.assertEqual((kwargs["startAt"], kwargs["fields"]), (2, submissions.SEARCH_FIELDS))
+
+    def test_recorded_task_is_kept_by_the_backfill(self):
+        """
+        Test if a task recorded before the backfill is listed even if JIRA search does not return it yet.
+        """
+        submissions.record(make_issue_dict("jane@example.com"), "<https://jira/SEC-9|SEC-9>", "2026-10-17")
+        self.jira.search_issues.return_value = Page([Issue("SEC-1", "jane@example.com", "Level 1")], 1)
+
+        found = submissions.get_submissions("jane@example.com")
+
+        self.assertEqual([submission.task_link for submission in found], ["<https://jira/SEC-9|SEC-9>", "<https://jira/SEC-1|SEC-1>"])
+        self.assertEqual(found[0].level, "Level 3")
+
+    def test_index_expires(self):
+        """
+        Test if the index of a user is backfilled again once it expired.
+        """
+        self.jira.search_issues.return_value = Page([], 0)
+
+        submissions.get_submissions("jane@example.com")
+        self.now += 61
+        submissions.get_submissions("jane@example.com")
+
+        self.assertEqual(self.jira.search_issues.call_count, 2)
+
+    def test_shared_index(self):
+        """
+        Test if the DynamoDB store prepends recorded tasks atomically, serves a complete index, and keeps a
+        backfill from overwriting a task recorded during its search.
+        """
+        client = MagicMock()
+        submissions.STORE = submissions.DynamoDBStore("roster", ttl=60, client=client, clock=lambda: 1000)
+        task_json = '["<https://jira/SEC-9|SEC-9>", "Level 3", "2026-10-17"]'
+
+        submissions.record(make_issue_dict("jane@example.com"), "<https://jira/SEC-9|SEC-9>", "2026-10-17")
+
+        kwargs = client.update_item.call_args.kwargs
+        self.assertEqual(kwargs["Key"], {"pk": {"S": "submissions:jane@example.com"}})
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":task"], {"L": [{"S": task_json}]})
+
+        # Recorded by another container into a complete index, listed without searching JIRA
+        client.get_item.return_value = {"Item": {
+            "tasks": {"L": [{"S": task_json}]}, "complete": {"BOOL": True}, "expires_at": {"N": "1060"}
+        }}
+        found = submissions.get_submissions("jane@example.com")
+
+        self.assertEqual([submission.task_link for submission in found], ["<https://jira/SEC-9|SEC-9>"])
+        self.jira.search_issues.assert_not_called()
+
+        # An expired index is backfilled with the tasks recorded since, a task recorded meanwhile wins the write
+        client.get_item.return_value["Item"]["expires_at"] = {"N": "999"}
+        self.jira.search_issues.return_value = Page([Issue("SEC-1", "jane@example.com", "Level 1")], 1)
+        error = Exception("The conditional request failed")
+        error.response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+        client.put_item.side_effect = error
+
+        found = submissions.get_submissions("jane@example.com")
+
+        self.assertEqual(
+            [submission.task_link for submission in found], ["<https://jira/SEC-9|SEC-9>", "<https://jira/SEC-1|SEC-1>"]
+        )
+        self.assertEqual(client.put_item.call_args.kwargs["ExpressionAttributeValues"], {":stored": {"N": "1"}})
+
+    def test_jql_quotes_the_email(self):
+        """
+        Test if the email is searched as a quoted phrase in the questionnaire tasks of the project.
+        """
+        jql = submissions.build_jql("jane@example.com", "SEC")
+
+        self.assertEqual(
+            jql,
+            'project = "SEC" AND summary ~ "\\"answered Questionnaire\\"" '
+            'AND description ~ "\\"jane@example.com\\"" ORDER BY created DESC'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Unit tests for the resilient JIRA transport.
+
+This test module checks the retry policy for rate limiting and server errors, the narrower one of the calls creating
+tasks, the handling of the Retry-After header and the state transitions of the circuit breaker, which lets a single
+trial call through once half-open.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+import requests
+from jira import JIRAError
+from urllib3 import exceptions
+
+from jira_app import transport
+
+
+# Transport settings retrying twice without a failure threshold reached by the tests
+CONFIG = transport.TransportConfig(max_retries=2, backoff_base=0.1, backoff_max=1.0, failure_threshold=10)
+
+
+def jira_error(status_code, headers=None):
+    """
+    Creates a JIRAError as raised for a failed JIRA response.
+    """
+    return JIRAError(status_code=status_code, response=MagicMock(headers=headers or dict()))
+
+
+class TestTransport(unittest.TestCase):
+    """
+    Test suite for the retrying JIRA calls.
+    """
+
+    def setUp(self):
+        self.breaker = transport.CircuitBreaker(failure_threshold=10, reset_timeout=30)
+        self.sleep = MagicMock()
+
+    def call(self, function, idempotent=True):
+        return transport.call(function, config=CONFIG, breaker=self.breaker, sleep=self.sleep, idempotent=idempotent)
+
+    def test_server_errors_are_retried(self):
+        """
+        Test if 5xx responses are retried until the call succeeds.
+        """
+        function = MagicMock(side_effect=[jira_error(503), jira_error(500), "SEC-1"])
+
+        self.assertEqual(self.call(function), "SEC-1")
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertEqual(self.breaker.state, transport.CircuitBreaker.CLOSED)
+
+    def test_retries_are_bounded(self):
+        """
+        Test if the last error is raised once the retries are used up.
+        """
+        function = MagicMock(side_effect=jira_error(502))
+
+        with self.assertRaises(JIRAError):
+            self.call(function)
+
+        self.assertEqual(function.call_count, 3)
+
+    def test_client_errors_are_not_retried(self):
+        """
+        Test if 4xx responses other than 429 fail immediately without counting as a JIRA failure.
+        """
+        function = MagicMock(side_effect=jira_error(400))
+
+        with self.assertRaises(JIRAError):
+            self.call(function)
+
+        function.assert_called_once()
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_read_timeouts_are_not_retried(self):
+        """
+        Test if read timeouts are not retried, as JIRA may have created the task.
+        """
+        function = MagicMock(side_effect=requests.ReadTimeout())
+
+        with self.assertRaises(requests.ReadTimeout):
+            self.call(function)
+
+        function.assert_called_once()
+        self.assertEqual(self.breaker.failures, 1)
+
+    def test_creates_are_retried_only_when_not_processed(self):
+        """
+        Test if a non-idempotent call is retried on 429, 503 and failed connections only, not when JIRA may have
+        processed it.
+        """
+        refused = requests.ConnectionError(exceptions.MaxRetryError(None, "/", exceptions.NewConnectionError(None, "")))
+        errors = [jira_error(429), jira_error(503), refused, requests.ConnectTimeout()]
+        function = MagicMock(side_effect=errors + ["SEC-1"])
+        config = CONFIG._replace(max_retries=4)
+
+        result = transport.call(function, config=config, breaker=self.breaker, sleep=self.sleep, idempotent=False)
+        self.assertEqual(result, "SEC-1")
+
+        reset = requests.ConnectionError(exceptions.ProtocolError("Connection aborted."))
+        for error in (jira_error(502), jira_error(504), jira_error(500), reset):
+            function = MagicMock(side_effect=error)
+
+            with self.assertRaises(type(error)):
+                self.call(function, idempotent=False)
+
+            function.assert_called_once()
+
+    def test_retry_after_is_honored(self):
+        """
+        Test if the delay is at least the Retry-After value, and too long values are not waited for.
+        """
+        function = MagicMock(side_effect=[jira_error(429, {"Retry-After": "0.8"}), "SEC-1"])
+        self.assertEqual(self.call(function), "SEC-1")
+        self.assertGreaterEqual(self.sleep.call_args.args[0], 0.8)
+
+        function = MagicMock(side_effect=jira_error(429, {"Retry-After": "120"}))
+        with self.assertRaises(JIRAError):
+            self.call(function)
+        function.assert_called_once()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test suite for the CircuitBreaker class.
+    """
+
+    def test_circuit_opens_and_recovers(self):
+        """
+        Test if the circuit opens after the failure threshold, rejects calls, and closes after a successful trial.
+        """
+        now = [0.0]
+        breaker = transport.CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, transport.CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, transport.CircuitBreaker.OPEN)
+
+        with self.assertRaises(transport.CircuitOpenError):
+            transport.call(MagicMock(), breaker=breaker)
+
+        now[0] = 30
+        self.assertEqual(breaker.state, transport.CircuitBreaker.HALF_OPEN)
+        self.assertEqual(transport.call(MagicMock(return_value="ok"), breaker=breaker), "ok")
+        self.assertEqual(breaker.snapshot(), {"state": "closed", "failures": 0, "rejected": 1})
+
+    def test_single_trial_call(self):
+        """
+        Test if a half-open circuit lets one trial call through at a time, and another once the trial is overdue.
+        """
+        now = [0.0]
+        breaker = transport.CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+
+        now[0] = 30
+        breaker.before_call()
+
+        with self.assertRaises(transport.CircuitOpenError):
+            breaker.before_call()
+
+        now[0] = 60
+        breaker.before_call()
+        breaker.record_success()
+        breaker.before_call()
+        breaker.before_call()
+        self.assertEqual(breaker.snapshot(), {"state": "closed", "failures": 0, "rejected": 1})
+
+    def test_client_error_ends_trial(self):
+        """
+        Test if a trial call answered with a client error closes the circuit, as JIRA answered.
+        """
+        now = [0.0]
+        breaker = transport.CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 30
+
+        with self.assertRaises(JIRAError):
+            transport.call(MagicMock(side_effect=jira_error(400)), breaker=breaker)
+
+        self.assertEqual(breaker.state, transport.CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens_circuit(self):
+        """
+        Test if a failed call in the half-open state opens the circuit again.
+        """
+        now = [0.0]
+        breaker = transport.CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+
+        now[0] = 31
+        breaker.record_failure()
+        self.assertEqual(breaker.state, transport.CircuitBreaker.OPEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
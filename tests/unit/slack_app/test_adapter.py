@@ -0,0 +1,113 @@
+"""
+Unit tests for the AWS Lambda adapter of the Slack app.
+
+This test module checks the conversion of API Gateway events to Bolt requests, the dispatching of
+events to the Slack app and the asynchronous self-invocation used to run lazy listeners, which does not keep a
+submission claimed when it fails.
+"""
+
+import base64
+import json
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+from common import idempotency
+from slack_app import adapter
+
+
+class TestLambdaAdapter(unittest.TestCase):
+    """
+    Test suite for the Lambda request handler and lazy listener runner.
+    """
+
+    def test_adapter_does_not_import_boto3(self):
+        """
+        Test if importing the adapter does not pull boto3 into the cold start.
+        """
+        code = "import sys; from slack_app import adapter; sys.exit('boto3' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(adapter.__file__)))
+        self.assertEqual(result.returncode, 0)
+
+    def test_sync_mode_does_not_import_aiohttp(self):
+        """
+        Test if the entry point of the synchronous execution mode does not pull aiohttp into the cold start.
+        """
+        code = "import sys; import app; sys.exit('aiohttp' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(adapter.__file__)))
+        self.assertEqual(result.returncode, 0)
+
+    def test_to_bolt_request_decodes_base64_body(self):
+        """
+        Test if a base64 encoded body is decoded and the headers are kept.
+        """
+        event = {
+            "body": base64.b64encode(b"command=%2Fsecurity-test").decode(),
+            "isBase64Encoded": True,
+            "headers": {"content-type": "application/x-www-form-urlencoded"},
+        }
+
+        request = adapter.to_bolt_request(event)
+
+        self.assertEqual(request.raw_body, "command=%2Fsecurity-test")
+        self.assertEqual(request.headers["content-type"], ["application/x-www-form-urlencoded"])
+
+    def test_unknown_method_is_not_found(self):
+        """
+        Test if events without an HTTP method are answered with 404.
+        """
+        handler = adapter.LambdaRequestHandler(MagicMock(), lambda_client=MagicMock())
+        self.assertEqual(handler.handle({}, MagicMock())["statusCode"], 404)
+
+    def test_lazy_listener_invokes_function_asynchronously(self):
+        """
+        Test if a lazy listener is started by an asynchronous invocation of the same function.
+        """
+        lambda_client = MagicMock()
+        runner = adapter.LambdaLazyListenerRunner(MagicMock(), lambda_client)
+        request = MagicMock(lazy_function_name="handle_modal_submission")
+        request.context = {
+            "lambda_request": {"headers": {}, "body": ""},
+            "aws_lambda_invoked_function_arn": "arn:aws:lambda:eu-west-2:1:function:bot",
+        }
+
+        runner.start(MagicMock(), request)
+
+        kwargs = lambda_client.invoke.call_args.kwargs
+        payload = json.loads(kwargs["Payload"])
+        self.assertEqual(kwargs["InvocationType"], "Event")
+        self.assertEqual(kwargs["FunctionName"], "arn:aws:lambda:eu-west-2:1:function:bot")
+        self.assertEqual(payload["headers"]["x-slack-bolt-lazy-only"], "1")
+        self.assertEqual(payload["headers"]["x-slack-bolt-lazy-function-name"], "handle_modal_submission")
+
+
+    def test_failed_lazy_listener_forgets_the_submission(self):
+        """
+        Test if a submission whose lazy listener could not be started can be claimed by the retry of Slack.
+        """
+        idempotency.STORE = idempotency.MemoryStore()
+        self.addCleanup(setattr, idempotency, "STORE", None)
+
+        body = {"type": "view_submission", "team": {"id": "T1"}, "user": {"id": "U1"}, "view": {"id": "V1"}}
+        key = idempotency.submission_key(body)
+        idempotency.get_store().claim(key)
+
+        lambda_client = MagicMock()
+        lambda_client.invoke.side_effect = Exception("TooManyRequestsException")
+        runner = adapter.LambdaLazyListenerRunner(MagicMock(), lambda_client)
+        request = MagicMock(lazy_function_name="handle_modal_submission", body=body)
+        request.context = {
+            "lambda_request": {"headers": {}, "body": ""},
+            "aws_lambda_invoked_function_arn": "arn:aws:lambda:eu-west-2:1:function:bot",
+        }
+
+        with self.assertRaises(Exception):
+            runner.start(MagicMock(), request)
+
+        self.assertTrue(idempotency.get_store().claim(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
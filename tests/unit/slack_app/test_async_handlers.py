@@ -0,0 +1,182 @@
+"""
+Unit tests for the Slack modal handlers of the asynchronous execution mode.
+
+This test module checks that the asynchronous submission handler looks the user up, messages the user while
+the answers are saved in JIRA and updates the message with the task link, once per submission, that a failed
+submission is reported to the user, that the event loop of the container runs coroutines, and that the copies
+of a request for the lazy listeners share its rate limited client.
+"""
+
+import copy
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from slack_bolt.context.async_context import AsyncBoltContext
+from slack_bolt.context.say.async_say import AsyncSay
+from slack_sdk.web.async_client import AsyncWebClient
+
+from common import idempotency, users
+from slack_app import async_bot, async_throttle
+from slack_app.modal import async_handlers
+from slack_app.questions import results
+
+
+# A submission body identifying its view and a view selecting the first and the third question
+BODY = {"type": "view_submission", "team": {"id": "T1"}, "user": {"id": "U123"}, "view": {"id": "V1", "hash": "h1"}}
+VIEW = {
+    "state": {
+        "values": {
+            "section-identifier": {
+                "checkboxes-action": {
+                    "selected_options": [{"value": "value-0"}, {"value": "value-2"}]
+                }
+            }
+        }
+    }
+}
+USER = {"id": "U123", "profile": {"display_name": "Jane", "email": "jane@example.com"}}
+
+
+def make_client() -> AsyncMock:
+    """
+    Creates an async Slack WebClient mock answering the user lookup and the message post.
+    """
+
+    client = AsyncMock()
+    client.users_info.return_value = {"user": USER}
+    client.chat_postMessage.return_value = {"channel": "D123", "ts": "1700000000.000100"}
+    return client
+
+
+class TestAsyncModalHandlers(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the asynchronous modal handlers.
+    """
+
+    def setUp(self):
+        users.USER_CACHE.clear()
+        idempotency.STORE = idempotency.MemoryStore()
+
+    def tearDown(self):
+        idempotency.STORE = None
+
+    @patch("jira_app.task.save_answers", return_value="<https://jira/SEC-1|SEC-1>")
+    async def test_handle_modal_submission(self, mock_save_answers):
+        """
+        Test if the result is sent to the user, updated with the link of the JIRA task, only once.
+        """
+        client = make_client()
+
+        await async_handlers.handle_modal_submission(BODY, VIEW, client)
+        await async_handlers.handle_modal_submission(BODY, VIEW, client)
+
+        client.users_info.assert_awaited_once_with(user="U123")
+        mock_save_answers.assert_called_once()
+        client.chat_postMessage.assert_awaited_once()
+        client.chat_update.assert_awaited_once()
+
+        kwargs = client.chat_postMessage.call_args.kwargs
+        self.assertEqual(kwargs["channel"], "U123")
+        self.assertEqual(kwargs["text"], "Total score: 2")
+        self.assertEqual(kwargs["blocks"][-1]["text"]["text"], results.TASK_PENDING)
+
+        kwargs = client.chat_update.call_args.kwargs
+        self.assertEqual((kwargs["channel"], kwargs["ts"]), ("D123", "1700000000.000100"))
+        self.assertIn("SEC-1", kwargs["blocks"][-1]["text"]["text"])
+
+    @patch("jira_app.task.save_answers", return_value="<https://jira/SEC-1|SEC-1>")
+    async def test_failed_first_message_is_sent_again_in_full(self, mock_save_answers):
+        """
+        Test if the full result is posted again when the first message failed while the task was created.
+        """
+        client = make_client()
+        client.chat_postMessage.side_effect = [Exception("Slack is down"), {"channel": "D123", "ts": "2.0"}]
+
+        await async_handlers.handle_modal_submission(BODY, VIEW, client)
+
+        mock_save_answers.assert_called_once()
+        self.assertEqual(client.chat_postMessage.await_count, 2)
+        self.assertIn("SEC-1", client.chat_postMessage.call_args.kwargs["blocks"][-1]["text"]["text"])
+        client.chat_update.assert_not_awaited()
+
+    @patch("jira_app.task.save_answers", side_effect=Exception("JIRA is down"))
+    async def test_failed_task_is_reported_to_the_user(self, mock_save_answers):
+        """
+        Test if a JIRA failure replaces the placeholder with a retry notice.
+        """
+        client = make_client()
+
+        with self.assertLogs(async_handlers.LOGGER, level="ERROR"):
+            await async_handlers.handle_modal_submission(BODY, VIEW, client)
+
+        self.assertEqual(client.chat_update.call_args.kwargs["blocks"][-1]["text"]["text"], results.TASK_FAILED)
+
+    @patch("jira_app.task.save_answers")
+    async def test_invalid_selection_is_reported(self, mock_save_answers):
+        """
+        Test if a submission without selected options saves nothing and asks the user to submit again, once.
+        """
+        client = make_client()
+
+        with self.assertLogs(async_handlers.LOGGER, level="ERROR"):
+            await async_handlers.handle_modal_submission(BODY, {"state": {"values": {}}}, client)
+        await async_handlers.handle_modal_submission(BODY, {"state": {"values": {}}}, client)
+
+        mock_save_answers.assert_not_called()
+        client.chat_postMessage.assert_awaited_once_with(channel="U123", text=results.SUBMISSION_FAILED)
+
+    async def test_retried_delivery_is_acknowledged_without_listeners(self):
+        """
+        Test if the middleware lets the first delivery through and answers retries right away.
+        """
+        request = MagicMock(headers={})
+        next_ = AsyncMock(return_value="listeners")
+
+        self.assertEqual(await async_handlers.skip_duplicate_submission(BODY, request, next_), "listeners")
+
+        response = await async_handlers.skip_duplicate_submission(BODY, request, next_)
+
+        self.assertEqual(response.status, 200)
+        next_.assert_awaited_once_with()
+
+
+class TestAsyncBot(unittest.TestCase):
+    """
+    Test suite for the event loop of the asynchronous execution mode.
+    """
+
+    def test_run_waits_for_coroutine(self):
+        """
+        Test if coroutines run on the same background event loop across calls.
+        """
+        async def get_loop():
+            import asyncio
+            return asyncio.get_running_loop()
+
+        first = async_bot.run(get_loop())
+        second = async_bot.run(get_loop())
+
+        self.assertIs(first, second)
+        self.assertIs(first, async_bot.get_event_loop())
+
+    def test_lazy_copies_share_the_client(self):
+        """
+        Test if the copy of a request context for the lazy listeners shares the rate limited client and its session.
+        """
+        async def copy_context():
+            client = AsyncWebClient(token="xoxb-test", session=async_bot.get_session())
+            context = AsyncBoltContext(client=client, say=AsyncSay(client=client, channel="C1"))
+            await async_throttle.rate_limit_client(context, AsyncMock())
+            return context, copy.deepcopy(context.to_copyable())
+
+        context, copied = async_bot.run(copy_context())
+        self.addCleanup(lambda: async_bot.run(async_bot.SESSION.close()))
+
+        self.assertIsInstance(context.client, async_throttle.AsyncRateLimitedWebClient)
+        self.assertIs(copied.client, context.client)
+        self.assertIs(copied.say.client, context.client)
+        self.assertIs(copied.client.session, async_bot.SESSION)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+"""
+Unit tests for the broadcast of a questionnaire to the members of a channel.
+
+This test module checks that every member of every page of a channel gets the "Start questionnaire" message once,
+that a broadcast out of time saves its progress and continues in a new invocation, that a runner only claims the
+members it has the time to message, that a broadcast started again from an older checkpoint, as after a timeout,
+messages nobody twice but the members whose message failed, that the members messaged are recorded as the targets
+of the reminders, and that only admins can start a broadcast.
+"""
+
+import itertools
+import unittest
+from unittest.mock import MagicMock, patch
+
+from slack_sdk import errors
+
+from common import idempotency, roster
+from slack_app import broadcast, commands
+from slack_app.modal import handlers
+
+
+# A broadcast of the default questionnaire
+BROADCAST = broadcast.Broadcast("b1", "T1", None, "C1", None, "UADMIN")
+
+
+def make_client(pages) -> MagicMock:
+    """
+    Creates a Slack WebClient mock listing the given pages of members, refusing to message bots.
+    """
+
+    client = MagicMock()
+    client.conversations_members.side_effect = lambda channel, limit, cursor: {
+        "members": pages[int(cursor or 0)],
+        "response_metadata": {"next_cursor": str(int(cursor or 0) + 1) if int(cursor or 0) + 1 < len(pages) else ""},
+    }
+
+    def post(channel, text, blocks):
+        if channel.startswith("B"):
+            raise errors.SlackApiError("cannot_dm_bot", {"ok": False, "error": "cannot_dm_bot"})
+        return {"ok": True}
+
+    client.chat_postMessage.side_effect = post
+    return client
+
+
+def make_runner(client, remaining_time=lambda: float("inf")) -> broadcast.BroadcastRunner:
+    return broadcast.BroadcastRunner(client, BROADCAST, remaining_time, concurrency=1, rate=60000, sleep=lambda _: None)
+
+
+def messaged(client) -> list:
+    return [call.kwargs["channel"] for call in client.chat_postMessage.call_args_list]
+
+
+class TestBroadcastRunner(unittest.TestCase):
+    """
+    Test suite for the BroadcastRunner class.
+    """
+
+    def setUp(self):
+        idempotency.STORE = idempotency.MemoryStore()
+
+    def tearDown(self):
+        idempotency.STORE = None
+
+    def test_every_page_is_messaged(self):
+        """
+        Test if the members of every page get the message with the button, bots being skipped.
+        """
+        client = make_client([["U1", "U2", "B1"], ["U3"]])
+
+        checkpoint = make_runner(client).run(broadcast.Checkpoint())
+
+        self.assertEqual(checkpoint, broadcast.Checkpoint("1", 1, sent=3, skipped=1, failed=0, done=True))
+        self.assertEqual(sorted(messaged(client)), ["B1", "U1", "U2", "U3"])
+        button = client.chat_postMessage.call_args.kwargs["blocks"][1]["elements"][0]
+        self.assertEqual((button["action_id"], button["value"]), (broadcast.START_ACTION_ID, "security-testing"))
+        self.assertEqual(broadcast.load_checkpoint("b1"), checkpoint)
+
+    def test_out_of_time_resumes_from_checkpoint(self):
+        """
+        Test if a runner out of time saves its position in the page and the next one continues from it.
+        """
+        members = [f"U{idx}" for idx in range(10)]
+        client = make_client([members])
+        times = itertools.chain([10.0] * 6, itertools.repeat(0.0))
+
+        first = make_runner(client, lambda: next(times)).run(broadcast.Checkpoint())
+        self.assertEqual((first.offset, first.sent, first.done), (4, 4, False))
+
+        second = make_runner(client).run(broadcast.load_checkpoint("b1"))
+        self.assertEqual((second.sent, second.done), (10, True))
+        self.assertEqual(sorted(messaged(client)), sorted(members))
+
+    def test_chunks_fit_the_time_left(self):
+        """
+        Test if a runner only takes the members its rate allows in the time left, leaving the others unclaimed.
+        """
+        client = make_client([[f"U{idx}" for idx in range(10)]])
+        clock = {"remaining": 6.0}
+        client.chat_postMessage.side_effect = lambda **_: clock.update(remaining=clock["remaining"] - 1)
+        runner = broadcast.BroadcastRunner(client, BROADCAST, lambda: clock["remaining"], 8, 60, lambda _: None)
+
+        checkpoint = runner.run(broadcast.Checkpoint())
+
+        self.assertEqual((checkpoint.offset, checkpoint.sent, checkpoint.done), (3, 3, False))
+        self.assertEqual(sorted(messaged(client)), ["U0", "U1", "U2"])
+        self.assertFalse(idempotency.get_store().exists(broadcast.member_key("b1", "U3")))
+
+    def test_retry_from_older_checkpoint_resends_nothing(self):
+        """
+        Test if members claimed by an invocation that died before its checkpoint are not messaged again.
+        """
+        client = make_client([["U1", "U2"], ["U3"]])
+        make_runner(client).run(broadcast.Checkpoint())
+
+        checkpoint = make_runner(client).run(broadcast.Checkpoint())
+
+        self.assertEqual(len(messaged(client)), 3)
+        self.assertEqual((checkpoint.sent, checkpoint.skipped), (0, 3))
+
+    def test_failed_member_is_not_kept_claimed(self):
+        """
+        Test if a member whose message failed is not kept claimed, so a retried invocation messages them.
+        """
+        client = make_client([["U1", "U2"]])
+        post = client.chat_postMessage.side_effect
+
+        def fail_first(channel, text, blocks):
+            if client.chat_postMessage.call_count == 1:
+                raise errors.SlackApiError("fatal_error", {"ok": False, "error": "fatal_error"})
+            return post(channel, text, blocks)
+
+        client.chat_postMessage.side_effect = fail_first
+
+        with self.assertLogs(broadcast.LOGGER, level="WARNING"):
+            checkpoint = make_runner(client).run(broadcast.Checkpoint())
+
+        self.assertEqual((checkpoint.sent, checkpoint.failed), (1, 1))
+        self.assertFalse(idempotency.get_store().exists(broadcast.member_key("b1", "U1")))
+
+        checkpoint = make_runner(client).run(broadcast.Checkpoint())
+
+        self.assertEqual((checkpoint.sent, checkpoint.skipped), (1, 1))
+        self.assertEqual(messaged(client), ["U1", "U2", "U1"])
+
+    @patch.dict("os.environ", {"BOT_ROSTER_STORE": "memory"})
+    def test_messaged_members_are_targets(self):
+        """
+        Test if the members messaged, and not the bots, are recorded in the targeted log of the broadcast.
+        """
+        roster.STORE = roster.MemoryStore()
+        self.addCleanup(setattr, roster, "STORE", None)
+
+        make_runner(make_client([["U1", "B1", "U2"]])).run(broadcast.Checkpoint())
+
+        self.assertEqual(sorted(roster.STORE.read("targeted:b1", 0)[0]), ["T1:U1", "T1:U2"])
+
+
+class TestBroadcastEvent(unittest.TestCase):
+    """
+    Test suite for the invocations running a broadcast.
+    """
+
+    def setUp(self):
+        idempotency.STORE = idempotency.MemoryStore()
+
+    def tearDown(self):
+        idempotency.STORE = None
+
+    @patch("common.roster.record_broadcast_done")
+    @patch("slack_app.broadcast.start_broadcast")
+    @patch("slack_app.broadcast.get_client")
+    def test_continued_then_summarized(self, mock_get_client, mock_start_broadcast, mock_record_broadcast_done):
+        """
+        Test if a broadcast out of time is continued by a new invocation, and the requester notified at its end.
+        """
+        client = make_client([["U1", "U2"]])
+        mock_get_client.return_value = client
+        event = {"broadcast": BROADCAST._asdict()}
+
+        progress = broadcast.handle_broadcast_event(event, MagicMock(get_remaining_time_in_millis=lambda: 0))
+        self.assertFalse(progress["done"])
+        mock_start_broadcast.assert_called_once_with(BROADCAST)
+        mock_record_broadcast_done.assert_not_called()
+
+        progress = broadcast.handle_broadcast_event(event, None)
+        self.assertTrue(progress["done"])
+        self.assertEqual(messaged(client), ["U1", "U2", "UADMIN"])
+        self.assertIn("2 member(s) messaged", client.chat_postMessage.call_args.kwargs["text"])
+        mock_record_broadcast_done.assert_called_once_with("b1")
+
+
+class TestBroadcastCommand(unittest.TestCase):
+    """
+    Test suite for the broadcast subcommand and the button of the broadcast message.
+    """
+
+    @patch("slack_app.broadcast.start_broadcast")
+    def test_admin_starts_a_broadcast(self, mock_start_broadcast):
+        """
+        Test if an admin starts the broadcast of the escaped channel, answered through the response URL.
+        """
+        body = {"text": "broadcast <#C123|general>", "user_id": "U1", "team_id": "T1", "command": "/security-test"}
+        respond = MagicMock()
+
+        with patch("common.users.get_user", return_value={"id": "U1", "is_admin": True}):
+            commands.answer_deferred_command(body, MagicMock(), respond)
+
+        started = mock_start_broadcast.call_args.args[0]
+        self.assertEqual((started.channel, started.team_id, started.requested_by), ("C123", "T1", "U1"))
+        self.assertIn("<#C123>", respond.call_args.kwargs["text"])
+
+    @patch("slack_app.broadcast.start_broadcast")
+    def test_members_cannot_broadcast(self, mock_start_broadcast):
+        """
+        Test if a member who is not an admin is refused, and an unknown channel answered with the usage.
+        """
+        body = {"text": "broadcast <#C123|general>", "user_id": "U1", "command": "/security-test"}
+        respond = MagicMock()
+
+        with patch("common.users.get_user", return_value={"id": "U1"}):
+            commands.answer_deferred_command(body, MagicMock(), respond)
+        self.assertIn("Only the admins", respond.call_args.kwargs["text"])
+
+        with patch("common.users.get_user", return_value={"id": "U1", "is_owner": True}):
+            commands.answer_deferred_command(dict(body, text="broadcast general"), MagicMock(), respond)
+        self.assertIn("Usage", respond.call_args.kwargs["text"])
+
+        mock_start_broadcast.assert_not_called()
+
+    @patch("slack_app.modal.handlers.open_modal")
+    def test_button_opens_the_questionnaire(self, mock_open_modal):
+        """
+        Test if the button of the broadcast message opens the modal of its questionnaire.
+        """
+        ack, client = MagicMock(), MagicMock()
+
+        handlers.handle_start_button(ack, {"trigger_id": "T1", "actions": [{"value": "privacy"}]}, client)
+
+        ack.assert_called_once_with()
+        mock_open_modal.assert_called_once_with(client, "T1", "privacy")
+
+
+if __name__ == '__main__':
+    unittest.main()
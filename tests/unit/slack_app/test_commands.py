@@ -0,0 +1,155 @@
+"""
+Unit tests for the slash command dispatcher.
+
+This test module checks that the slash command opens the modal without a subcommand, answers the `stats`
+subcommand from the precomputed aggregates with its acknowledgement, acknowledges the deferred subcommands right
+away and answers them through the response URL, and answers unknown subcommands with the usage, in both execution
+modes.
+"""
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from common import analytics, users
+from jira_app import submissions
+from slack_app import commands
+
+
+class TestCommands(unittest.TestCase):
+    """
+    Test suite for the synchronous slash command dispatcher.
+    """
+
+    def setUp(self):
+        analytics.STORE = analytics.MemoryStore()
+
+    def tearDown(self):
+        analytics.STORE = None
+
+    @patch("slack_app.modal.handlers.open_modal")
+    def test_empty_text_opens_modal(self, mock_open_modal):
+        """
+        Test if the slash command without text opens the questionnaire.
+        """
+        ack, client = MagicMock(), MagicMock()
+
+        commands.handle_command(ack, {"text": "", "trigger_id": "T1"}, client)
+
+        ack.assert_called_once_with()
+        mock_open_modal.assert_called_once_with(client, "T1", None)
+
+    def test_stats_are_sent_with_the_acknowledgement(self):
+        """
+        Test if the stats of all time are rendered from the aggregates without any Web API call.
+        """
+        analytics.record(0b101, 3)
+        analytics.record(0b001, 0)
+        ack, client = MagicMock(), MagicMock()
+
+        commands.handle_command(ack, {"text": "stats all"}, client)
+
+        kwargs = ack.call_args.kwargs
+        self.assertEqual(kwargs["text"], "*Questionnaire stats - all time:* 2 submission(s)")
+        self.assertIn("Level 4 - Boutique Security Firm Engagement: 1 (50%)", kwargs["blocks"][1]["text"]["text"])
+        self.assertIn("1. ", kwargs["blocks"][2]["text"]["text"])
+        self.assertIn(": 2 (100%)", kwargs["blocks"][2]["text"]["text"])
+        client.assert_not_called()
+
+    @patch("jira_app.submissions.get_submissions")
+    def test_mine_lists_the_tasks_of_the_caller(self, mock_get_submissions):
+        """
+        Test if the previous tasks of the caller are looked up by the email of their cached profile, and sent
+        through the response URL.
+        """
+        users.USER_CACHE.set("U1", {"id": "U1", "profile": {"display_name": "Jane", "email": "jane@example.com"}})
+        mock_get_submissions.return_value = [submissions.Submission("<https://jira/SEC-1|SEC-1>", "Level 2", "2026-10-17")]
+        respond, client = MagicMock(), MagicMock()
+
+        commands.answer_deferred_command({"text": "mine", "user_id": "U1"}, client, respond)
+
+        mock_get_submissions.assert_called_once_with("jane@example.com")
+        self.assertEqual(respond.call_args.kwargs["blocks"][1]["text"]["text"], "2026-10-17 <https://jira/SEC-1|SEC-1> Level 2")
+        self.assertEqual(respond.call_args.kwargs["response_type"], "ephemeral")
+        client.users_info.assert_not_called()
+        users.USER_CACHE.clear()
+
+    def test_deferred_subcommands_are_acknowledged_right_away(self):
+        """
+        Test if only the deferred subcommands are matched, and acknowledged without any call.
+        """
+        self.assertTrue(commands.is_deferred({"text": "mine"}))
+        self.assertTrue(commands.is_deferred({"text": "Broadcast #general"}))
+        self.assertFalse(commands.is_deferred({"text": "stats"}))
+        self.assertFalse(commands.is_deferred({"text": ""}))
+
+        ack = MagicMock()
+        commands.ack_deferred_command(ack)
+        ack.assert_called_once_with(text=commands.WORKING_TEXT)
+
+    @patch("jira_app.submissions.get_submissions", side_effect=Exception("JIRA is down"))
+    def test_failed_deferred_subcommand_is_reported(self, mock_get_submissions):
+        """
+        Test if a failed deferred subcommand is answered with an apology instead of being raised.
+        """
+        client = MagicMock()
+        client.users_info.return_value = {"user": {"id": "U2", "profile": {"email": "joe@example.com"}}}
+        respond = MagicMock()
+
+        with self.assertLogs(commands.LOGGER, level="ERROR"):
+            commands.answer_deferred_command({"text": "mine", "user_id": "U2"}, client, respond)
+
+        self.assertEqual(respond.call_args.kwargs["text"], commands.FAILED_TEXT)
+        users.USER_CACHE.clear()
+
+    def test_unknown_subcommand_answers_usage(self):
+        """
+        Test if an unknown subcommand or period is answered with a hint instead of an error.
+        """
+        ack = MagicMock()
+
+        commands.handle_command(ack, {"text": "help", "command": "/security-test"}, MagicMock())
+        self.assertIn("`/security-test stats [", ack.call_args.kwargs["text"])
+        self.assertIn("`/security-test mine`", ack.call_args.kwargs["text"])
+
+        commands.handle_command(ack, {"text": "stats yesterday"}, MagicMock())
+        self.assertIn("Unknown period 'yesterday'", ack.call_args.kwargs["text"])
+
+
+class TestAsyncCommands(unittest.IsolatedAsyncioTestCase):
+    """
+    Test suite for the asynchronous slash command dispatcher.
+    """
+
+    def setUp(self):
+        analytics.STORE = analytics.MemoryStore()
+
+    def tearDown(self):
+        analytics.STORE = None
+
+    async def test_stats_are_sent_with_the_acknowledgement(self):
+        """
+        Test if the asynchronous dispatcher answers the stats with the acknowledgement.
+        """
+        ack = AsyncMock()
+
+        await commands.handle_command_async(ack, {"text": "stats quarter"}, AsyncMock())
+
+        self.assertIn("0 submission(s)", ack.call_args.kwargs["text"])
+
+    @patch("jira_app.submissions.get_submissions", return_value=[])
+    async def test_mine_is_answered_through_the_response_url(self, mock_get_submissions):
+        """
+        Test if the asynchronous lazy listener answers a deferred subcommand through the response URL.
+        """
+        client, respond = AsyncMock(), AsyncMock()
+        client.users_info.return_value = {"user": {"id": "U3", "profile": {"email": "ann@example.com"}}}
+
+        self.assertTrue(await commands.is_deferred_async({"text": "mine"}))
+        await commands.answer_deferred_command_async({"text": "mine", "user_id": "U3"}, client, respond)
+
+        self.assertEqual(respond.call_args.kwargs["text"], "You have not submitted the questionnaire yet.")
+        users.USER_CACHE.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
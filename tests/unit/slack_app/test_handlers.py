@@ -0,0 +1,191 @@
+"""
+Unit tests for the Slack modal handlers.
+
+This test module checks that modal submissions are acknowledged without doing any work, that the
+lazily executed submission handler messages the user, saves the answers in JIRA and updates the message
+with the task link, that duplicate deliveries of a submission are skipped, and that a failed submission is
+reported to the user.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from common import analytics, idempotency, users
+from slack_app.modal import handlers
+from slack_app.questions import results
+
+
+# A submission body and view selecting the first and the third question
+BODY = {"user": {"id": "U123"}}
+VIEW = {
+    "state": {
+        "values": {
+            "section-identifier": {
+                "checkboxes-action": {
+                    "selected_options": [{"value": "value-0"}, {"value": "value-2"}]
+                }
+            }
+        }
+    }
+}
+# A submission body identifying its view, as delivered by Slack
+VIEW_BODY = {"type": "view_submission", "team": {"id": "T1"}, "user": {"id": "U123"}, "view": {"id": "V1", "hash": "h1"}}
+USER = {"id": "U123", "profile": {"display_name": "Jane", "email": "jane@example.com"}}
+
+
+def make_client() -> MagicMock:
+    """
+    Creates a Slack WebClient mock answering the user lookup and the message post.
+    """
+
+    client = MagicMock()
+    client.users_info.return_value = {"user": USER}
+    client.chat_postMessage.return_value = {"channel": "D123", "ts": "1700000000.000100"}
+    return client
+
+
+class TestModalHandlers(unittest.TestCase):
+    """
+    Test suite for the modal submission handlers.
+    """
+
+    def setUp(self):
+        users.USER_CACHE.clear()
+        idempotency.STORE = idempotency.MemoryStore()
+        analytics.STORE = analytics.MemoryStore()
+
+    def tearDown(self):
+        idempotency.STORE = None
+        analytics.STORE = None
+
+    def test_ack_modal_submission_only_acknowledges(self):
+        """
+        Test if the acknowledgement listener does nothing but acknowledging the request.
+        """
+        ack = MagicMock()
+        handlers.ack_modal_submission(ack)
+        ack.assert_called_once_with()
+
+    @patch("jira_app.task.save_answers", return_value="<https://jira/SEC-1|SEC-1>")
+    def test_handle_modal_submission(self, mock_save_answers):
+        """
+        Test if the result is sent to the user before the JIRA task exists and updated with its link.
+        """
+        client = make_client()
+
+        handlers.handle_modal_submission(BODY, VIEW, client)
+
+        client.users_info.assert_called_once_with(user="U123")
+        mock_save_answers.assert_called_once()
+        client.chat_postMessage.assert_called_once()
+        client.chat_update.assert_called_once()
+
+        kwargs = client.chat_postMessage.call_args.kwargs
+        self.assertEqual(kwargs["channel"], "U123")
+        self.assertEqual(kwargs["text"], "Total score: 2")
+        self.assertEqual(kwargs["blocks"][-1]["text"]["text"], results.TASK_PENDING)
+
+        kwargs = client.chat_update.call_args.kwargs
+        self.assertEqual((kwargs["channel"], kwargs["ts"]), ("D123", "1700000000.000100"))
+        self.assertIn("SEC-1", kwargs["blocks"][-1]["text"]["text"])
+        self.assertEqual(kwargs["blocks"][:-1], client.chat_postMessage.call_args.kwargs["blocks"][:-1])
+
+    @patch("jira_app.task.save_answers", side_effect=Exception("JIRA is down"))
+    def test_failed_task_is_reported_to_the_user(self, mock_save_answers):
+        """
+        Test if a JIRA failure replaces the placeholder with a retry notice.
+        """
+        client = make_client()
+
+        with self.assertLogs(handlers.LOGGER, level="ERROR"):
+            handlers.handle_modal_submission(VIEW_BODY, VIEW, client)
+
+        self.assertEqual(client.chat_update.call_args.kwargs["blocks"][-1]["text"]["text"], results.TASK_FAILED)
+
+    @patch("jira_app.task.build_answers_issue", return_value={"summary": "answers"})
+    @patch("jira_app.task.save_answers")
+    def test_task_is_handed_over_to_the_outbox(self, mock_save_answers, mock_build_answers_issue):
+        """
+        Test if the task is appended to the outbox instead of being created, and its message updated by the flusher.
+        """
+        client = make_client()
+        mock_outbox = MagicMock()
+
+        with patch.dict("os.environ", {"BOT_JIRA_OUTBOX": "sqs"}), patch("jira_app.outbox.OUTBOX", mock_outbox):
+            handlers.handle_modal_submission(VIEW_BODY, VIEW, client)
+
+        mock_save_answers.assert_not_called()
+        client.chat_update.assert_not_called()
+
+        entry_id, payload = mock_outbox.append.call_args.args
+        self.assertEqual(entry_id, idempotency.submission_key(VIEW_BODY))
+        self.assertEqual(payload["issue"], {"summary": "answers"})
+        self.assertEqual((payload["reply"]["channel"], payload["reply"]["ts"]), ("D123", "1700000000.000100"))
+
+        handlers.update_task_message(client, payload["reply"], "<https://jira/SEC-1|SEC-1>", False)
+
+        kwargs = client.chat_update.call_args.kwargs
+        self.assertIn("SEC-1", kwargs["blocks"][-1]["text"]["text"])
+        self.assertEqual(kwargs["blocks"][:-1], client.chat_postMessage.call_args.kwargs["blocks"][:-1])
+
+    @patch("jira_app.task.save_answers", return_value="<https://jira/SEC-1|SEC-1>")
+    def test_duplicate_submission_is_processed_once(self, mock_save_answers):
+        """
+        Test if a submission delivered twice creates a single JIRA task and message.
+        """
+        client = make_client()
+
+        handlers.handle_modal_submission(VIEW_BODY, VIEW, client)
+        handlers.handle_modal_submission(VIEW_BODY, VIEW, client)
+
+        mock_save_answers.assert_called_once()
+        client.chat_postMessage.assert_called_once()
+        self.assertEqual(analytics.get_store().get(analytics.ALL_TIME).count, 1)
+
+    @patch("jira_app.task.save_answers", return_value="<https://jira/SEC-1|SEC-1>")
+    def test_failed_submission_is_reported(self, mock_save_answers):
+        """
+        Test if a submission failing before its result was sent asks the user to submit again, and is not retried.
+        """
+        client = make_client()
+        client.users_info.side_effect = Exception("Slack is down")
+
+        with self.assertLogs(handlers.LOGGER, level="ERROR"):
+            handlers.handle_modal_submission(VIEW_BODY, VIEW, client)
+        handlers.handle_modal_submission(VIEW_BODY, VIEW, client)
+
+        mock_save_answers.assert_not_called()
+        client.chat_postMessage.assert_called_once_with(channel="U123", text=results.SUBMISSION_FAILED)
+
+    @patch("jira_app.task.save_answers", return_value="<https://jira/SEC-1|SEC-1>")
+    def test_failed_update_is_not_reported(self, mock_save_answers):
+        """
+        Test if a failed update of a result already sent is only logged, without asking the user to submit again.
+        """
+        client = make_client()
+        client.chat_update.side_effect = Exception("Slack is down")
+
+        with self.assertLogs(handlers.LOGGER, level="ERROR"):
+            handlers.handle_modal_submission(VIEW_BODY, VIEW, client)
+
+        client.chat_postMessage.assert_called_once()
+        self.assertEqual(analytics.get_store().get(analytics.ALL_TIME).count, 1)
+
+    def test_retried_delivery_is_acknowledged_without_listeners(self):
+        """
+        Test if the middleware lets the first delivery through and answers retries right away.
+        """
+        request = MagicMock(headers={})
+        next_ = MagicMock(return_value="listeners")
+
+        self.assertEqual(handlers.skip_duplicate_submission(VIEW_BODY, request, next_), "listeners")
+
+        response = handlers.skip_duplicate_submission(VIEW_BODY, request, next_)
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, "")
+        next_.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
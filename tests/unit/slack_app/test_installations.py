@@ -0,0 +1,207 @@
+"""
+Unit tests for the multi-workspace installations.
+
+This test module checks that requests are authorized from the cached installation of their workspace without
+reading the store again, that unknown workspaces are not cached, that the cache is bounded, that uninstalled and
+revoked workspaces are forgotten, and that the OAuth flow, only served with an installation store, checks its signed
+state before saving the installation it exchanged the code for.
+"""
+
+import logging
+import unittest
+from unittest.mock import MagicMock, patch
+
+from common import cache
+from slack_app import installations
+from slack_app.modal import handlers
+
+
+# An installation of a standalone workspace
+INSTALLATION = installations.Installation("T1", None, "xoxb-1", "B1", "U1", 0.0)
+
+
+def mocked_get_secret(secret):
+    return f"{secret.name.lower()}_value"
+
+
+class TestAuthorize(unittest.TestCase):
+    """
+    Test suite for the authorization of requests with the installation store.
+    """
+
+    def setUp(self):
+        self.store = MagicMock(wraps=installations.MemoryStore([INSTALLATION]))
+        installations.STORE = self.store
+        self.addCleanup(setattr, installations, "CACHE", installations.CACHE)
+        installations.CACHE = cache.TTLCache(maxsize=2, ttl=60)
+
+    def tearDown(self):
+        installations.STORE = None
+
+    def test_authorize_from_cache(self):
+        """
+        Test if the store is read once per workspace and the result is built without calling Slack.
+        """
+        logger = logging.getLogger(__name__)
+
+        first = installations.authorize(None, "T1", logger)
+        second = installations.authorize(None, "T1", logger)
+
+        self.store.find.assert_called_once_with(None, "T1")
+        self.assertEqual((second.team_id, second.bot_token, second.bot_user_id), ("T1", "xoxb-1", "U1"))
+        self.assertEqual(first.bot_id, "B1")
+        self.assertEqual(installations.CACHE.stats().hits, 1)
+        self.assertIs(installations.get_client("T1"), installations.get_client("T1"))
+        self.assertEqual(installations.get_client("T1").token, "xoxb-1")
+
+    def test_unknown_workspace_is_not_cached(self):
+        """
+        Test if a workspace without installation is refused and looked up again once installed.
+        """
+        with self.assertLogs(__name__, level="WARNING"):
+            self.assertIsNone(installations.authorize(None, "T2", logging.getLogger(__name__)))
+
+        self.store.save(INSTALLATION._replace(team_id="T2"))
+        self.assertEqual(installations.get_authorization(None, "T2").installation.team_id, "T2")
+
+    def test_cache_is_bounded(self):
+        """
+        Test if the least recently used workspaces are evicted above the size of the cache.
+        """
+        for team_id in ("T2", "T3"):
+            self.store.save(INSTALLATION._replace(team_id=team_id))
+
+        for team_id in ("T1", "T2", "T3"):
+            installations.get_authorization(None, team_id)
+
+        self.assertEqual(installations.CACHE.stats().evictions, 1)
+        self.assertNotIn((None, "T1"), installations.CACHE)
+
+    def test_outbox_reply_uses_the_client_of_its_workspace(self):
+        """
+        Test if the message of an outbox entry is updated by the bot of the workspace of the submission.
+        """
+        team_client = MagicMock()
+        installations.CACHE.set((None, "T1"), installations.Authorization(INSTALLATION, team_client))
+        reply = {"channel": "D1", "ts": "1.0", "user": {"profile": {}}, "mask": 1, "team_id": "T1"}
+
+        with patch.dict("os.environ", {"BOT_INSTALLATION_STORE": "memory"}):
+            handlers.update_task_message(MagicMock(), reply, "<link|SEC-1>", False)
+
+        team_client.chat_update.assert_called_once()
+
+    def test_revoked_workspace_is_forgotten(self):
+        """
+        Test if an uninstalled workspace, or one whose bot token was revoked, is deleted from the store and the cache.
+        """
+        self.store.save(INSTALLATION._replace(team_id="T2"))
+        installations.get_authorization(None, "T1")
+        installations.get_authorization(None, "T2")
+
+        installations.handle_app_uninstalled(MagicMock(enterprise_id=None, team_id="T1"))
+        installations.handle_tokens_revoked({"tokens": {"oauth": ["U9"]}}, MagicMock(enterprise_id=None, team_id="T2"))
+
+        self.assertNotIn((None, "T1"), installations.CACHE)
+        self.assertIsNone(self.store.find(None, "T1"))
+        self.assertIn((None, "T2"), installations.CACHE)
+
+        installations.handle_tokens_revoked({"tokens": {"bot": ["B2"]}}, MagicMock(enterprise_id=None, team_id="T2"))
+
+        self.assertNotIn((None, "T2"), installations.CACHE)
+        self.assertIsNone(self.store.find(None, "T2"))
+
+
+@patch.dict("os.environ", {"BOT_INSTALLATION_STORE": "memory"})
+@patch("common.secrets.BotSecrets.get", side_effect=mocked_get_secret)
+class TestOAuthFlow(unittest.TestCase):
+    """
+    Test suite for the OAuth flow installing the app into a workspace.
+    """
+
+    def setUp(self):
+        installations.STORE = installations.MemoryStore()
+        self.addCleanup(setattr, installations, "CACHE", installations.CACHE)
+        installations.CACHE = cache.TTLCache(maxsize=2, ttl=60)
+
+    def tearDown(self):
+        installations.STORE = None
+
+    def make_event(self, path: str, params=None) -> dict:
+        return {
+            "rawPath": path,
+            "queryStringParameters": params,
+            "requestContext": {"domainName": "bot.example.com", "http": {"method": "GET"}},
+        }
+
+    def test_state_is_signed_and_expires(self, mock_get):
+        """
+        Test if only fresh states issued by the app are accepted.
+        """
+        state = installations.create_state(now=1000)
+
+        self.assertTrue(installations.verify_state(state, now=1000 + installations.STATE_TTL))
+        self.assertFalse(installations.verify_state(state, now=1001 + installations.STATE_TTL))
+        self.assertFalse(installations.verify_state("1000." + "0" * 64, now=1000))
+        self.assertFalse(installations.verify_state(None))
+
+    def test_install_redirects_to_slack(self, mock_get):
+        """
+        Test if the install route redirects to the consent page with the redirect route next to it.
+        """
+        event = self.make_event("/dev/slack-bot-app/install")
+
+        response = installations.handle_oauth_event(event)
+
+        self.assertEqual(installations.get_route(event), "install")
+        self.assertEqual(response["statusCode"], 302)
+        self.assertIn("client_id=slack_client_id_value", response["headers"]["Location"])
+        self.assertIn("bot.example.com%2Fdev%2Fslack-bot-app%2Foauth_redirect", response["headers"]["Location"])
+
+    @patch("slack_app.installations.create_client")
+    def test_redirect_saves_the_installation(self, mock_create_client, mock_get):
+        """
+        Test if the code is exchanged for the bot token of the workspace, which is saved and authorizes requests.
+        """
+        mock_create_client.return_value.oauth_v2_access.return_value = {
+            "access_token": "xoxb-2", "bot_user_id": "U2", "team": {"id": "T2"}, "enterprise": None,
+        }
+        event = self.make_event(
+            "/dev/slack-bot-app/oauth_redirect", {"code": "c1", "state": installations.create_state()}
+        )
+
+        response = installations.handle_oauth_event(event)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(installations.get_store().find(None, "T2").bot_token, "xoxb-2")
+        self.assertEqual(
+            mock_create_client.return_value.oauth_v2_access.call_args.kwargs["redirect_uri"],
+            "https://bot.example.com/dev/slack-bot-app/oauth_redirect"
+        )
+
+    def test_redirect_refuses_a_forged_state(self, mock_get):
+        """
+        Test if a redirect without a valid state is refused before exchanging the code.
+        """
+        event = self.make_event("/dev/slack-bot-app/oauth_redirect", {"code": "c1", "state": "1.forged"})
+
+        self.assertEqual(installations.handle_oauth_event(event)["statusCode"], 400)
+        self.assertIsNone(installations.get_store().find(None, "T2"))
+
+    @patch("slack_app.installations.create_client")
+    def test_routes_need_an_installation_store(self, mock_create_client, mock_get):
+        """
+        Test if both routes answer 404 without an installation store, before exchanging any code.
+        """
+        event = self.make_event(
+            "/dev/slack-bot-app/oauth_redirect", {"code": "c1", "state": installations.create_state()}
+        )
+
+        with patch.dict("os.environ", {"BOT_INSTALLATION_STORE": "none"}):
+            self.assertEqual(installations.handle_oauth_event(event)["statusCode"], 404)
+            self.assertEqual(installations.handle_oauth_event(self.make_event("/install"))["statusCode"], 404)
+
+        mock_create_client.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
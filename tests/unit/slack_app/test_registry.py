@@ -0,0 +1,171 @@
+"""
+Unit tests for the questionnaire registry.
+
+This test module checks that the built-in questionnaire compiles to the historical modal, that questionnaires
+are loaded from JSON and YAML definition files, validated, boolean weights being refused, versioned and compiled
+once, that submissions are resolved to their questionnaire by the callback ID of their modal, in the version it was
+opened with, and that the slash command opens a questionnaire by its ID.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from common import parser
+from slack_app import commands
+from slack_app.questions import registry, view
+
+
+# A valid questionnaire definition with weighted questions
+PRIVACY = {
+    "id": "privacy",
+    "title": "Privacy Review",
+    "guidance": "Contact the privacy team.",
+    "questions": [
+        {"title": "Personal Data", "description": "Do you process personal data?", "weight": 2},
+        {"title": "Transfers", "description": "Is data sent abroad?"},
+    ],
+    "bands": [
+        {"min_score": 0, "max_score": 1, "description": "Low", "details": ["Self-assessment."]},
+        {"min_score": 2, "max_score": 3, "description": "High", "details": ["Privacy review."]},
+    ],
+}
+
+
+class TestRegistry(unittest.TestCase):
+    """
+    Test suite for the questionnaire registry.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def tearDown(self):
+        registry.reset_registry()
+
+    def write(self, name: str, content: str):
+        with open(os.path.join(self.directory.name, name), "w", encoding="utf-8") as definition_file:
+            definition_file.write(content)
+
+    def test_builtin_questionnaire_keeps_the_historical_modal(self):
+        """
+        Test if the default questionnaire compiles to the same modal and callback ID as before the registry.
+        """
+        questionnaire = registry.QuestionnaireRegistry([]).get()
+
+        self.assertEqual(questionnaire.callback_id, parser.SLACK_MODAL_WINDOW_ID)
+        self.assertEqual(
+            questionnaire.view.payload,
+            view.compile_view(view.questions, private_metadata=questionnaire.version).payload
+        )
+        self.assertEqual(len(questionnaire.engine.questions), len(view.questions))
+
+    def test_definitions_are_loaded_and_compiled_once(self):
+        """
+        Test if JSON and YAML definitions are loaded in file name order and compiled once on first use.
+        """
+        self.write("a-privacy.json", json.dumps(PRIVACY))
+        self.write("b-vendor.yaml", "id: vendor\nquestions:\n  - title: Vendor\n    description: A vendor?\n"
+                                    "bands:\n  - {min_score: 0, max_score: 1, description: Any}\n")
+        self.write("notes.txt", "ignored")
+
+        questionnaires = registry.QuestionnaireRegistry(registry.load_definitions(self.directory.name))
+        self.assertEqual(questionnaires.ids(), [registry.DEFAULT_QUESTIONNAIRE, "privacy", "vendor"])
+
+        privacy = questionnaires.get("privacy")
+        self.assertIs(questionnaires.get("privacy"), privacy)
+        self.assertEqual(privacy.callback_id, f"{parser.SLACK_MODAL_WINDOW_ID}:privacy")
+        self.assertEqual(privacy.view.view["title"]["text"], "Privacy Review")
+        self.assertEqual(privacy.view.view["callback_id"], privacy.callback_id)
+
+        score = privacy.engine.score(0b01)
+        self.assertEqual((score.total, score.band.description), (2, "High"))
+        self.assertEqual(score.key, f"privacy@{privacy.version}")
+        self.assertEqual(score.guidance, "Contact the privacy team.")
+
+        with self.assertRaises(Exception):
+            questionnaires.get("unknown")
+
+    def test_invalid_definition_names_its_file(self):
+        """
+        Test if an invalid definition fails the loading with the path of its file.
+        """
+        self.write("broken.json", json.dumps(dict(PRIVACY, bands=PRIVACY["bands"][:1])))
+
+        with self.assertRaises(Exception) as context:
+            registry.load_definitions(self.directory.name)
+
+        self.assertIn("broken.json", str(context.exception))
+        self.assertIn("maximum score 3", str(context.exception))
+
+    def test_boolean_weight_is_rejected(self):
+        """
+        Test if a boolean weight is refused although Python counts booleans as integers.
+        """
+        questions = [dict(PRIVACY["questions"][0], weight=True), PRIVACY["questions"][1]]
+
+        with self.assertRaises(ValueError) as context:
+            registry.validate_definition(dict(PRIVACY, questions=questions))
+
+        self.assertIn("non-negative integer", str(context.exception))
+
+    def test_version_follows_the_content(self):
+        """
+        Test if the derived version changes with the definition and an explicit version is kept.
+        """
+        first = registry.validate_definition(PRIVACY)["version"]
+        second = registry.validate_definition(dict(PRIVACY, title="Privacy"))["version"]
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(registry.validate_definition(dict(PRIVACY, version="7"))["version"], "7")
+
+    def test_resolve_callback_id(self):
+        """
+        Test if submissions are resolved by the callback ID of their modal, the default one included.
+        """
+        questionnaires = registry.QuestionnaireRegistry([registry.validate_definition(PRIVACY)])
+
+        self.assertEqual(questionnaires.resolve_callback_id(f"{parser.SLACK_MODAL_WINDOW_ID}:privacy").id, "privacy")
+        self.assertEqual(questionnaires.resolve_callback_id(parser.SLACK_MODAL_WINDOW_ID).id, "security-testing")
+        self.assertTrue(registry.CALLBACK_ID_PATTERN.match(f"{parser.SLACK_MODAL_WINDOW_ID}:privacy"))
+
+    def test_previous_versions_are_resolved(self):
+        """
+        Test if a modal opened before a reload is resolved to its version, and an unknown version refused.
+        """
+        first = registry.QuestionnaireRegistry([registry.validate_definition(PRIVACY)]).compile()
+        changed = dict(PRIVACY, questions=list(reversed(PRIVACY["questions"])))
+        second = registry.QuestionnaireRegistry([registry.validate_definition(changed)], previous=first).compile()
+
+        old, new = first.get("privacy"), second.get("privacy")
+        callback_id = f"{parser.SLACK_MODAL_WINDOW_ID}:privacy"
+
+        self.assertEqual(old.view.view["private_metadata"], old.version)
+        self.assertIs(second.resolve_callback_id(callback_id, old.version), old)
+        self.assertIs(second.resolve_callback_id(callback_id, new.version), new)
+        self.assertIs(second.resolve_callback_id(callback_id), new)
+        self.assertEqual(old.engine.score(0b01).total, 2)
+        self.assertEqual(new.engine.score(0b01).total, 1)
+
+        with self.assertRaises(Exception):
+            second.get("privacy", "unknown")
+
+    @patch("slack_app.modal.handlers.open_modal")
+    def test_slash_command_opens_a_questionnaire(self, mock_open_modal):
+        """
+        Test if the ID of a questionnaire after the slash command opens it.
+        """
+        self.write("privacy.json", json.dumps(PRIVACY))
+        ack, client = MagicMock(), MagicMock()
+
+        with patch.dict(os.environ, {"BOT_QUESTIONNAIRES_DIR": self.directory.name}):
+            commands.handle_command(ack, {"text": "Privacy", "trigger_id": "T1"}, client)
+
+        mock_open_modal.assert_called_once_with(client, "T1", "privacy")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Unit tests for the reminder sweeps of the broadcasts.
+
+This test module checks that the members messaged by a broadcast who did not submit its questionnaire are reminded
+once per round after the interval, that the submissions and targets logged between two sweeps are picked up
+incrementally, that a sweep sends at most its batch and the next one continues, that the members are saved as reminded
+before their messages are posted and the ones a sweep has no time for are left to the next one, that every campaign
+gets its share of the time of a sweep, that a campaign is closed after its last round or once everyone answered, and
+that the event of the schedule is told apart from the warm-up pings.
+"""
+
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import warmup
+from common import idempotency, roster
+from slack_app import broadcast, reminders
+
+
+# A broadcast of the default questionnaire
+BROADCAST = broadcast.Broadcast("b1", "T1", None, "C1", "security-testing", "UADMIN")
+
+
+def reminded(client) -> list:
+    return [call.kwargs["channel"] for call in client.chat_postMessage.call_args_list]
+
+
+class TestReminderSweep(unittest.TestCase):
+    """
+    Test suite for the sweeps of the reminder campaigns.
+    """
+
+    def setUp(self):
+        idempotency.STORE = idempotency.MemoryStore()
+        roster.STORE = roster.MemoryStore()
+        self.store = roster.STORE
+
+        self.client = MagicMock()
+        patchers = [
+            patch.dict(os.environ, {"BOT_ROSTER_STORE": "memory", "BOT_REMINDER_INTERVAL": "100"}),
+            patch("slack_app.broadcast.get_client", return_value=self.client),
+            patch("slack_app.broadcast.get_rate", return_value=60000),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        roster.open_campaign("b1", "security-testing", BROADCAST._asdict(), now=0.0)
+        roster.record_targets("b1", "T1", ["U1", "U2", "U3"])
+
+    def tearDown(self):
+        idempotency.STORE = None
+        roster.STORE = None
+
+    def sweep(self, now: float) -> reminders.SweepReport:
+        return reminders.sweep_campaign(self.store, "b1", lambda: float("inf"), now=now)
+
+    def test_pending_members_are_reminded_once_per_round(self):
+        """
+        Test if only the members who did not submit are reminded, once per round, and the campaign closed at the end.
+        """
+        roster.record_submission("security-testing", {"id": "U2", "team_id": "T1"})
+
+        self.assertEqual(self.sweep(50).reminded, 0)
+
+        report = self.sweep(100)
+        self.assertEqual((report.rounds, report.reminded, report.pending), (1, 2, 0))
+        self.assertEqual(reminded(self.client), ["U1", "U3"])
+        self.assertIn("Reminder", self.client.chat_postMessage.call_args.kwargs["text"])
+
+        self.assertEqual(self.sweep(150).reminded, 0)
+
+        # U3 answers between two rounds, a member messaged late by the broadcast joins the next one
+        roster.record_submission("security-testing", {"id": "U3", "team_id": "T1"})
+        roster.record_targets("b1", "T1", ["U4"])
+        self.client.reset_mock()
+
+        # The second round starts where the first one stopped, so the members with high compact IDs are not starved
+        self.assertEqual(self.sweep(200).rounds, 2)
+        self.assertEqual(reminded(self.client), ["U4", "U1"])
+
+        self.assertTrue(self.sweep(300).closed)
+        self.assertEqual(self.store.list_campaigns(), [])
+
+    def test_batch_is_continued_by_the_next_sweep(self):
+        """
+        Test if a sweep reminds at most its batch of members and the next sweep reminds the rest.
+        """
+        with patch.dict(os.environ, {"BOT_REMINDER_BATCH": "2"}):
+            first = self.sweep(100)
+            second = self.sweep(110)
+
+        self.assertEqual((first.reminded, first.pending, second.reminded, second.pending), (2, 1, 1, 0))
+        self.assertEqual(reminded(self.client), ["U1", "U2", "U3"])
+
+    def test_reminded_members_are_saved_before_posting(self):
+        """
+        Test if the members of a sweep dying while posting are saved as reminded, so no sweep reminds them again.
+        """
+        self.client.chat_postMessage.side_effect = Exception("Timed out")
+
+        with self.assertRaises(Exception):
+            self.sweep(100)
+
+        self.client.chat_postMessage.side_effect = None
+        report = self.sweep(110)
+
+        self.assertEqual((report.reminded, report.pending), (0, 0))
+
+    @patch("slack_app.broadcast.get_concurrency", return_value=1)
+    def test_members_out_of_time_are_given_back(self, mock_get_concurrency):
+        """
+        Test if the members whose turn comes too late stay pending, and are reminded by the next sweep.
+        """
+        clock = {"remaining": broadcast.TIME_MARGIN + 0.5}
+        self.client.chat_postMessage.side_effect = lambda **_: clock.update(remaining=clock["remaining"] - 1)
+
+        report = reminders.sweep_campaign(self.store, "b1", lambda: clock["remaining"], now=100)
+        self.assertEqual((report.reminded, report.pending), (1, 2))
+
+        self.assertEqual(self.sweep(110).reminded, 2)
+        self.assertEqual(reminded(self.client), ["U1", "U2", "U3"])
+
+    @patch("slack_app.broadcast.get_concurrency", return_value=1)
+    def test_every_campaign_gets_its_share(self, mock_get_concurrency):
+        """
+        Test if a campaign with many members leaves its share of the time of the sweep to the next campaign.
+        """
+        roster.record_targets("b1", "T1", ["U4", "U5", "U6"])
+        roster.open_campaign("b2", "security-testing", BROADCAST._replace(broadcast_id="b2")._asdict(), now=0.0)
+        roster.record_targets("b2", "T1", ["U7", "U8"])
+
+        clock = {"remaining": broadcast.TIME_MARGIN + 4}
+        self.client.chat_postMessage.side_effect = lambda **_: clock.update(remaining=clock["remaining"] - 1)
+        context = MagicMock(get_remaining_time_in_millis=lambda: clock["remaining"] * 1000)
+
+        reports = reminders.handle_sweep_event({"reminder_sweep": True}, context)
+
+        self.assertEqual((reports["b1"]["reminded"], reports["b2"]["reminded"]), (3, 2))
+        self.assertEqual(reminded(self.client), ["U1", "U2", "U3", "U7", "U8"])
+
+    def test_closed_once_everyone_answered(self):
+        """
+        Test if the campaign of a finished broadcast is closed once every member messaged submitted, even after the
+        checkpoint of the broadcast expired.
+        """
+        for user_id in ("U1", "U2", "U3"):
+            roster.record_submission("security-testing", {"id": user_id, "team_id": "T1"})
+
+        self.assertFalse(self.sweep(10).closed)
+
+        roster.record_broadcast_done("b1")
+        idempotency.STORE = idempotency.MemoryStore()
+        report = reminders.handle_sweep_event({"reminder_sweep": True}, None)
+
+        self.assertTrue(report["b1"]["closed"])
+        self.client.chat_postMessage.assert_not_called()
+
+    def test_sweep_event(self):
+        """
+        Test if the event of the reminder schedule is told apart from the warm-up pings.
+        """
+        self.assertTrue(reminders.is_sweep_event({"reminder_sweep": True}))
+        self.assertFalse(reminders.is_sweep_event({"source": "aws.events"}))
+        self.assertFalse(warmup.is_warm_up_event({"reminder_sweep": True}))
+        self.assertFalse(reminders.is_sweep_event(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
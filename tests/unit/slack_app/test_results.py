@@ -0,0 +1,107 @@
+"""
+Unit tests for the Slack and JIRA responses of the questionnaire.
+
+This test module checks that the responses contain the rendered score, answers and result,
+that the answer-dependent sections are served from the render cache for repeated answer sets, and that
+pre-warming fills the cache within its shared capacity without counting lookups.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from common import cache
+from slack_app.questions import results, scoring
+
+
+# A user answering the questionnaire
+USER = {"profile": {"display_name": "Jane", "email": "jane@example.com"}}
+
+
+class TestResults(unittest.TestCase):
+    """
+    Test suite for the response renderers and the render cache.
+    """
+
+    def setUp(self):
+        results.RENDER_CACHE.clear()
+
+    def test_generate_response_slack(self):
+        """
+        Test if the Slack response contains the greeting, sections and task link.
+        """
+        score = scoring.get_engine().score(0b111)
+        message = results.generate_response_slack(score, USER, "<https://jira/SEC-1|SEC-1>")
+
+        self.assertEqual(message.text, "Total score: 3")
+        self.assertEqual(message.blocks[0]["text"]["text"], "Hi *Jane*,")
+        self.assertEqual(message.blocks[1]["text"]["text"], "*Total score:* 3")
+        self.assertIn(results.RESULTS[1][2], message.blocks[3]["text"]["text"])
+        self.assertEqual(message.blocks[4]["text"]["text"], "*Task created:* <https://jira/SEC-1|SEC-1>")
+
+    def test_generate_response_slack_task_placeholders(self):
+        """
+        Test if the task section shows a placeholder until the task exists and a notice if it failed.
+        """
+        score = scoring.get_engine().score(0b111)
+
+        pending = results.generate_response_slack(score, USER)
+        failed = results.generate_response_slack(score, USER, task_failed=True)
+
+        self.assertEqual(pending.blocks[4]["text"]["text"], results.TASK_PENDING)
+        self.assertEqual(failed.blocks[4]["text"]["text"], results.TASK_FAILED)
+        self.assertEqual(pending.blocks[:4], failed.blocks[:4])
+
+    def test_generate_response_jira(self):
+        """
+        Test if the JIRA response contains the heading, score, answers and result.
+        """
+        score = scoring.get_engine().score(0b1)
+        response = results.generate_response_jira(score, USER)
+
+        self.assertIn("*Jane* answered questions.", response)
+        self.assertIn("*Total score:* 1", response)
+        self.assertIn(results.get_selected_answers(score), response)
+        self.assertIn(results.get_result(score), response)
+
+    def test_sections_are_cached_per_answer_set(self):
+        """
+        Test if the sections of an answer set are rendered once and shared between the responses.
+        """
+        score = scoring.get_engine().score(0b11)
+
+        results.generate_response_slack(score, USER, "link")
+        results.generate_response_jira(score, USER)
+        results.generate_response_slack(score, {"name": "john"}, "other link")
+
+        stats = results.get_render_cache_stats()
+        self.assertEqual((stats.hits, stats.misses, stats.size), (2, 1, 1))
+
+    def test_prewarm_render_cache(self):
+        """
+        Test if pre-warming renders every answer combination so later lookups are hits.
+        """
+        engine = scoring.get_engine()
+
+        self.assertEqual(results.prewarm_render_cache([engine]), 1 << len(engine.questions))
+        self.assertEqual(results.prewarm_render_cache([engine]), 1 << len(engine.questions))
+
+        stats = results.get_render_cache_stats()
+        self.assertEqual((stats.hits, stats.misses, stats.size), (0, 0, 1 << len(engine.questions)))
+
+        results.render_sections(engine.score(0b1010))
+        self.assertEqual(results.get_render_cache_stats().hits, 1)
+
+    def test_prewarm_fits_the_shared_cache(self):
+        """
+        Test if pre-warming skips the questionnaires whose combinations no longer fit in the shared cache.
+        """
+        engine = scoring.get_engine()
+        combinations = 1 << len(engine.questions)
+
+        with patch.object(results, "RENDER_CACHE", cache.TTLCache(maxsize=combinations + 1)):
+            self.assertEqual(results.prewarm_render_cache([engine, engine]), combinations)
+            self.assertEqual(results.get_render_cache_stats().evictions, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit tests for the router of the Slack requests.
+
+This test module checks that the requests without a signature, signed too long ago or with a wrong signature are
+rejected, that the `url_verification` challenges and `ssl_check` pings are answered without Bolt, that a retry of a
+modal submission already claimed is acknowledged while its first delivery and the real work are dispatched to Bolt,
+and that the request handler is reused until the Slack app is built again.
+"""
+
+import hashlib
+import hmac
+import json
+import unittest
+import urllib.parse
+from unittest.mock import MagicMock, patch
+
+from common import idempotency
+from slack_app import router
+
+
+# The signing secret of the requests, and the time they are received at
+SIGNING_SECRET = "secret"
+NOW = 1700000000
+
+
+def make_event(body: str, timestamp: int = NOW, headers: dict = None, signature: str = None) -> dict:
+    """
+    Creates an API Gateway event of a POST request signed with the signing secret.
+    """
+
+    if signature is None:
+        digest = hmac.new(SIGNING_SECRET.encode(), f"v0:{timestamp}:{body}".encode(), hashlib.sha256).hexdigest()
+        signature = f"v0={digest}"
+
+    return {
+        "requestContext": {"http": {"method": "POST"}},
+        "headers": {"X-Slack-Request-Timestamp": str(timestamp), "X-Slack-Signature": signature, **(headers or {})},
+        "body": body,
+    }
+
+
+def submission_body() -> str:
+    payload = {"type": "view_submission", "team": {"id": "T1"}, "user": {"id": "U1"}, "view": {"id": "V1", "hash": "h"}}
+    return urllib.parse.urlencode({"payload": json.dumps(payload)})
+
+
+@patch("common.secrets.BotSecrets.get", return_value=SIGNING_SECRET)
+class TestRoute(unittest.TestCase):
+    """
+    Test suite for the `route` function.
+    """
+
+    def setUp(self):
+        idempotency.STORE = idempotency.MemoryStore()
+
+    def tearDown(self):
+        idempotency.STORE = None
+        router.SIGNER = None
+
+    def test_unsigned_and_replayed_requests_are_rejected(self, mock_get):
+        """
+        Test if the requests without a signature, signed more than 5 minutes ago or wrongly are rejected with a 401.
+        """
+        body = "command=%2Fsecurity-test"
+        unsigned = make_event(body)
+        del unsigned["headers"]["X-Slack-Signature"]
+
+        self.assertEqual(router.route(unsigned, now=NOW), router.REJECTED_RESPONSE)
+        self.assertEqual(router.route(make_event(body, timestamp=NOW - 301), now=NOW), router.REJECTED_RESPONSE)
+        self.assertEqual(router.route(make_event(body, signature="v0=0"), now=NOW), router.REJECTED_RESPONSE)
+        self.assertEqual(router.route(make_event(body, timestamp="now"), now=NOW), router.REJECTED_RESPONSE)
+
+    def test_slack_checks_are_answered(self, mock_get):
+        """
+        Test if the challenges of the Events API and the certificate checks are answered.
+        """
+        challenge = router.route(make_event(json.dumps({"type": "url_verification", "challenge": "c1"})), now=NOW)
+        self.assertEqual((challenge["statusCode"], json.loads(challenge["body"])), (200, {"challenge": "c1"}))
+
+        ssl_check = router.route(make_event("ssl_check=1&token=t"), now=NOW)
+        self.assertEqual((ssl_check["statusCode"], ssl_check["body"]), (200, ""))
+
+    def test_retry_of_claimed_submission_is_acknowledged(self, mock_get):
+        """
+        Test if a retry of a claimed submission is acknowledged, and its first delivery and unclaimed retries are not.
+        """
+        body = submission_body()
+        retry = make_event(body, headers={"x-slack-retry-num": "1"})
+
+        self.assertIsNone(router.route(retry, now=NOW))
+
+        idempotency.get_store().claim("submission:T1:U1:V1:h")
+
+        self.assertIsNone(router.route(make_event(body), now=NOW))
+        self.assertEqual(router.route(retry, now=NOW), {"statusCode": 200, "body": "", "headers": {}})
+
+    def test_real_work_is_dispatched(self, mock_get):
+        """
+        Test if the signed requests with listeners, and the requests other than POST, are left to Bolt.
+        """
+        self.assertIsNone(router.route(make_event("command=%2Fsecurity-test&text=stats"), now=NOW))
+        self.assertIsNone(router.route({"requestContext": {"http": {"method": "GET"}}, "headers": {}}))
+
+    def test_rotated_secret(self, mock_get):
+        """
+        Test if the keyed HMAC is created again when the signing secret is rotated.
+        """
+        event = make_event("command=%2Fsecurity-test")
+        self.assertIsNone(router.route(event, now=NOW))
+
+        mock_get.return_value = "rotated"
+        self.assertEqual(router.route(event, now=NOW), router.REJECTED_RESPONSE)
+
+
+class TestRequestHandler(unittest.TestCase):
+    """
+    Test suite for the `get_request_handler` function.
+    """
+
+    def tearDown(self):
+        router.reset_request_handler()
+
+    @patch("slack_app.bot.get_slack_app")
+    def test_handler_is_reused_per_app(self, mock_get_slack_app):
+        """
+        Test if the request handler is reused while the Slack app is, and created again with a new app.
+        """
+        mock_get_slack_app.return_value = MagicMock()
+        handler = router.get_request_handler()
+
+        self.assertIs(router.get_request_handler(), handler)
+
+        mock_get_slack_app.return_value = MagicMock()
+        self.assertIsNot(router.get_request_handler(), handler)
+        self.assertIs(router.get_request_handler().app, mock_get_slack_app.return_value)
+
+
+if __name__ == '__main__':
+    unittest.main()
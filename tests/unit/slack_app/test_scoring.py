@@ -0,0 +1,92 @@
+"""
+Unit tests for the scoring engine of the questionnaire.
+
+This test module checks the decoding of selected options into a bitmask, weighted scoring,
+the validation of the result bands and the lookup of the band matching a score.
+"""
+
+import unittest
+
+from slack_app.questions import results, scoring, view
+from slack_app.questions.scoring import Band, BandIndex, ScoringEngine
+
+
+# Three questions with two bands for the weighted engine tests
+QUESTIONS = [("First", "First?"), ("Second", "Second?"), ("Third", "Third?")]
+BANDS = [Band(0, 2, "Low", ["low"]), Band(3, 5, "High", ["high"])]
+
+
+class TestScoringEngine(unittest.TestCase):
+    """
+    Test suite for the ScoringEngine class.
+    """
+
+    def test_decode_selected_options(self):
+        """
+        Test if selected options are decoded into a bitmask and scored once per question.
+        """
+        engine = scoring.get_engine()
+        score = engine.score_options([{"value": "value-0"}, {"value": "value-2"}, {"value": "value-2"}])
+
+        self.assertEqual(score.mask, 0b101)
+        self.assertEqual(score.indices, (0, 2))
+        self.assertEqual(score.total, 2)
+        self.assertEqual(score.band.description, results.RESULTS[0][2])
+        self.assertTrue(score.answers[1].startswith(f"\n3. *{view.questions[2][0]}:*"))
+
+    def test_decode_unknown_option(self):
+        """
+        Test if an unknown option value is rejected.
+        """
+        with self.assertRaises(Exception):
+            scoring.get_engine().decode([{"value": "value-99"}])
+
+        with self.assertRaises(Exception):
+            scoring.get_engine().decode([{}])
+
+    def test_every_score_matches_its_band(self):
+        """
+        Test if every reachable score matches the band found by a linear scan of the results.
+        """
+        engine = scoring.get_engine()
+
+        for total in range(len(view.questions) + 1):
+            with self.subTest(total=total):
+                expected = next(result for result in results.RESULTS if total <= result[1])
+                self.assertEqual(engine.score((1 << total) - 1).band.description, expected[2])
+
+    def test_weighted_questions(self):
+        """
+        Test if the weights of the selected questions are added up.
+        """
+        engine = ScoringEngine(QUESTIONS, BANDS, weights=[1, 3, 1])
+
+        self.assertEqual(engine.score(0b010).total, 3)
+        self.assertEqual(engine.score(0b010).band.description, "High")
+        self.assertEqual(engine.score(0b101).total, 2)
+
+
+class TestBandIndex(unittest.TestCase):
+    """
+    Test suite for the validation of the result bands.
+    """
+
+    def test_gap_is_rejected(self):
+        with self.assertRaises(ValueError):
+            BandIndex([Band(0, 1, "Low", []), Band(3, 5, "High", [])], max_score=5)
+
+    def test_overlap_is_rejected(self):
+        with self.assertRaises(ValueError):
+            BandIndex([Band(0, 3, "Low", []), Band(3, 5, "High", [])], max_score=5)
+
+    def test_uncovered_max_score_is_rejected(self):
+        with self.assertRaises(ValueError):
+            BandIndex(BANDS, max_score=6)
+
+    def test_bands_not_starting_at_zero_are_rejected(self):
+        with self.assertRaises(ValueError):
+            BandIndex([Band(1, 5, "All", [])], max_score=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Unit tests for the sources of the questionnaire definitions and the revalidation of the registry.
+
+This test module checks that unchanged definitions are revalidated without fetching their content again, from a
+directory or with a conditional request to a bucket, and that the registry is revalidated at most once per
+interval, swaps in changed definitions at once and keeps the previous ones when the new ones are invalid.
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+from slack_app.questions import registry, source
+
+
+# A valid questionnaire definition
+PRIVACY = {
+    "id": "privacy",
+    "title": "Privacy Review",
+    "questions": [{"title": "Personal Data", "description": "Do you process personal data?"}],
+    "bands": [{"min_score": 0, "max_score": 1, "description": "Any"}],
+}
+
+
+class StaticSource(source.DefinitionSource):
+    """
+    A source serving definitions set by the test, with the content version as ETag.
+    """
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self.version = 1
+        self.fetches = 0
+
+    def fetch(self, etag=None):
+        self.fetches += 1
+
+        if etag == str(self.version):
+            return None
+
+        return source.Snapshot(str(self.version), [("static", definition) for definition in self.definitions])
+
+
+class TestDirectorySource(unittest.TestCase):
+    """
+    Test suite for the DirectorySource class.
+    """
+
+    def test_unchanged_directory_is_not_read(self):
+        """
+        Test if an unchanged directory returns nothing and a rewritten file returns the new content.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "privacy.json")
+            with open(path, "w", encoding="utf-8") as definition_file:
+                json.dump(PRIVACY, definition_file)
+
+            directory_source = source.DirectorySource(directory)
+            snapshot = directory_source.fetch()
+            self.assertEqual(snapshot.definitions, [(path, PRIVACY)])
+            self.assertIsNone(directory_source.fetch(snapshot.etag))
+
+            with open(path, "w", encoding="utf-8") as definition_file:
+                json.dump(dict(PRIVACY, title="Privacy"), definition_file)
+            os.utime(path, ns=(0, 0))
+
+            self.assertEqual(directory_source.fetch(snapshot.etag).definitions[0][1]["title"], "Privacy")
+
+
+class TestS3Source(unittest.TestCase):
+    """
+    Test suite for the S3Source class.
+    """
+
+    def test_conditional_fetch(self):
+        """
+        Test if the ETag is sent with If-None-Match and a '304 Not Modified' answer returns nothing.
+        """
+        client = MagicMock()
+        client.get_object.return_value = {"ETag": '"e1"', "Body": io.BytesIO(json.dumps([PRIVACY]).encode("utf-8"))}
+        bucket_source = source.S3Source("bucket", "questionnaires.json", client=client)
+
+        snapshot = bucket_source.fetch()
+        self.assertEqual(snapshot, source.Snapshot('"e1"', [("s3://bucket/questionnaires.json#0", PRIVACY)]))
+
+        client.get_object.side_effect = ClientError(
+            {"Error": {"Code": "304", "Message": "Not Modified"}, "ResponseMetadata": {"HTTPStatusCode": 304}},
+            "GetObject"
+        )
+        self.assertIsNone(bucket_source.fetch(snapshot.etag))
+        client.get_object.assert_called_with(Bucket="bucket", Key="questionnaires.json", IfNoneMatch='"e1"')
+
+    def test_missing_bundle_and_errors(self):
+        """
+        Test if a missing bundle defines no questionnaire once, and other failed requests are raised.
+        """
+        client = MagicMock()
+        client.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        bucket_source = source.S3Source("bucket", client=client)
+
+        self.assertEqual(bucket_source.fetch(), source.Snapshot(source.MISSING_ETAG, []))
+        self.assertIsNone(bucket_source.fetch(source.MISSING_ETAG))
+
+        client.get_object.side_effect = ClientError({"Error": {"Code": "AccessDenied"}}, "GetObject")
+        with self.assertRaises(ClientError):
+            bucket_source.fetch('"e1"')
+
+
+class TestRegistryReload(unittest.TestCase):
+    """
+    Test suite for the revalidation of the global registry.
+    """
+
+    def setUp(self):
+        self.source = StaticSource([PRIVACY])
+        registry.reset_registry()
+        registry.SOURCE = self.source
+
+    def tearDown(self):
+        registry.reset_registry()
+
+    def test_revalidated_once_per_interval(self):
+        """
+        Test if the source is revalidated once the interval elapsed, keeping the registry while unchanged.
+        """
+        with patch.dict(os.environ, {"BOT_QUESTIONNAIRES_TTL": "3600"}):
+            first = registry.get_registry()
+            self.assertIs(registry.get_registry(), first)
+            self.assertEqual(self.source.fetches, 1)
+
+        with patch.dict(os.environ, {"BOT_QUESTIONNAIRES_TTL": "0"}):
+            self.assertIs(registry.get_registry(), first)
+            self.assertEqual(self.source.fetches, 2)
+
+    def test_changed_definitions_replace_the_registry(self):
+        """
+        Test if changed definitions are compiled into a new registry with a new version.
+        """
+        with patch.dict(os.environ, {"BOT_QUESTIONNAIRES_TTL": "0"}):
+            previous = registry.get_questionnaire("privacy")
+
+            self.source.definitions = [dict(PRIVACY, title="Privacy")]
+            self.source.version = 2
+            current = registry.get_questionnaire("privacy")
+
+        self.assertEqual(current.view.view["title"]["text"], "Privacy")
+        self.assertNotEqual(current.engine.key, previous.engine.key)
+        self.assertEqual(registry.REGISTRY.compiled["privacy"], current)
+        self.assertIs(registry.get_questionnaire("privacy", previous.version), previous)
+
+    def test_invalid_definitions_keep_the_registry(self):
+        """
+        Test if invalid definitions are logged and the previous registry is kept.
+        """
+        with patch.dict(os.environ, {"BOT_QUESTIONNAIRES_TTL": "0"}):
+            first = registry.get_registry()
+
+            self.source.definitions = [dict(PRIVACY, questions=[])]
+            self.source.version = 2
+
+            with self.assertLogs(registry.LOGGER):
+                self.assertIs(registry.get_registry(), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
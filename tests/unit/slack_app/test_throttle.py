@@ -0,0 +1,207 @@
+"""
+Unit tests for the rate limited Slack WebClients.
+
+This test module checks that the token buckets let bursts through and space out the calls beyond them, that a
+'429 Too Many Requests' of the fake Slack server blocks the bucket of its method for the `Retry-After` seconds
+before the call is retried, that calls give up once they would wait longer than their method allows, and that
+the middlewares swap the client of a request for a rate limited one.
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+from slack_bolt import BoltContext
+from slack_sdk import WebClient, errors
+
+from slack_app import async_throttle, throttle
+
+# The fake Slack server of the benchmark suite
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "tools", "bench"))
+
+import fakes  # noqa: E402
+
+
+class FakeClock:
+    """
+    A clock only moving forward when the limiter sleeps.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    """
+    Test suite for the TokenBucket class.
+    """
+
+    def test_burst_then_shaped(self):
+        """
+        Test if a full bucket lets a burst through and spaces out the calls beyond it at its rate.
+        """
+        clock = FakeClock()
+        bucket = throttle.TokenBucket(60, 2, clock)
+
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 1.0, 2.0])
+
+        clock.sleep(3)
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_penalize(self):
+        """
+        Test if a 429 blocks the bucket for its Retry-After seconds, after which the calls are spaced out again.
+        """
+        clock = FakeClock()
+        bucket = throttle.TokenBucket(60, 5, clock)
+
+        bucket.penalize(5)
+
+        self.assertEqual([bucket.reserve(), bucket.reserve()], [5.0, 6.0])
+
+
+class TestRateLimitedWebClient(unittest.TestCase):
+    """
+    Test suite for the RateLimitedWebClient class against the fake Slack server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.slack = fakes.FakeSlack().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.slack.stop()
+
+    def setUp(self):
+        self.slack.reset()
+        self.slack.rate_limits.clear()
+        self.clock = FakeClock()
+        throttle.LIMITER = throttle.RateLimiter(10.0, self.clock, self.clock.sleep)
+        self.client = throttle.RateLimitedWebClient(token="xoxb-1", base_url=f"{self.slack.url}/api/")
+
+    def tearDown(self):
+        throttle.reset_limiter()
+
+    def test_burst_is_queued(self):
+        """
+        Test if the calls beyond the burst of a method wait for their turn instead of being sent.
+        """
+        for idx in range(12):
+            self.client.users_info(user=f"U{idx}")
+
+        stats = throttle.get_limiter().stats()
+        self.assertEqual((stats.calls, stats.waits, stats.throttled), (12, 2, 0))
+        self.assertAlmostEqual(self.clock.now, 1.2)
+
+    def test_retry_after_is_honored(self):
+        """
+        Test if a call answered with a 429 is retried once the Retry-After seconds elapsed.
+        """
+        self.slack.inject_rate_limit("chat.postMessage", count=1, retry_after=2)
+
+        response = self.client.chat_postMessage(channel="D1", text="Hello")
+
+        self.assertTrue(response["ok"])
+        self.assertEqual(self.slack.rate_limits["chat.postMessage"][0], 0)
+        self.assertEqual(self.clock.now, 2.0)
+        self.assertEqual(throttle.get_limiter().stats(), throttle.LimiterStats(2, 1, 2.0, 1, 0))
+
+    def test_expiring_call_gives_up(self):
+        """
+        Test if a 429 asking to wait longer than a trigger ID is valid is raised without retrying.
+        """
+        self.slack.inject_rate_limit("views.open", count=3, retry_after=5)
+
+        with self.assertRaises(errors.SlackApiError) as context:
+            self.client.views_open(trigger_id="T1", view={"type": "modal"})
+
+        self.assertEqual(context.exception.response.status_code, 429)
+        self.assertEqual(self.slack.rate_limits["views.open"][0], 2)
+        self.assertEqual(throttle.get_limiter().stats().throttled, 1)
+
+    def test_deadline_stops_waits(self):
+        """
+        Test if a 429 asking to wait past the deadline of the invocation is raised without retrying.
+        """
+        self.slack.inject_rate_limit("chat.postMessage", count=1, retry_after=2)
+        throttle.set_deadline(MagicMock(get_remaining_time_in_millis=lambda: 3500))
+
+        with self.assertRaises(errors.SlackApiError):
+            self.client.chat_postMessage(channel="D1", text="Hello")
+
+        self.assertEqual(self.clock.now, 0.0)
+
+        throttle.set_deadline(None)
+        self.assertTrue(self.client.chat_postMessage(channel="D1", text="Hello")["ok"])
+
+    def test_other_workspaces_are_not_delayed(self):
+        """
+        Test if the buckets are kept per workspace, so a busy workspace does not delay the others.
+        """
+        self.slack.inject_rate_limit("chat.update", count=1, retry_after=3)
+        self.client.chat_update(channel="D1", ts="1.0", text="Hello")
+        self.clock.now = 0.0
+
+        other = throttle.RateLimitedWebClient(token="xoxb-2", base_url=f"{self.slack.url}/api/")
+        other.chat_update(channel="D2", ts="1.0", text="Hello")
+
+        self.assertEqual(self.clock.now, 0.0)
+
+    def test_messages_are_limited_per_channel(self):
+        """
+        Test if the messages of different channels, like the direct messages of a broadcast, do not share a bucket.
+        """
+        for idx in range(12):
+            self.client.chat_postMessage(channel=f"D{idx}", text="Hello")
+
+        self.assertEqual(throttle.get_limiter().stats().waits, 0)
+        self.assertEqual(throttle.get_scope("xoxb-1", "chat.postMessage", {"json": {"channel": "D1"}}), ("xoxb-1", "D1"))
+        self.assertEqual(throttle.get_scope("xoxb-1", "users.info", {"params": {"user": "U1"}}), "xoxb-1")
+
+    def test_async_client_retries(self):
+        """
+        Test if the async client waits for the Retry-After seconds without blocking and retries.
+        """
+        self.slack.inject_rate_limit("users.info", count=1, retry_after=0.01)
+        throttle.LIMITER = throttle.RateLimiter(10.0)
+
+        async def call():
+            client = async_throttle.AsyncRateLimitedWebClient(token="xoxb-1", base_url=f"{self.slack.url}/api/")
+            return await client.users_info(user="U1")
+
+        self.assertTrue(asyncio.run(call())["ok"])
+        self.assertEqual(throttle.get_limiter().stats().throttled, 1)
+
+
+class TestMiddleware(unittest.TestCase):
+    """
+    Test suite for the middlewares swapping in the rate limited clients.
+    """
+
+    def test_client_of_the_request_is_wrapped(self):
+        """
+        Test if the client created by Bolt is replaced by a rate limited one with the same token and URL.
+        """
+        client = WebClient(token="xoxb-1", base_url="http://127.0.0.1/api/")
+        context = BoltContext({"client": client})
+        next_middleware = MagicMock()
+
+        throttle.rate_limit_client(context, next_middleware)
+
+        self.assertIsInstance(context.client, throttle.RateLimitedWebClient)
+        self.assertEqual((context.client.token, context.client.base_url), ("xoxb-1", "http://127.0.0.1/api/"))
+        self.assertIs(throttle.wrap(context.client), context.client)
+        next_middleware.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
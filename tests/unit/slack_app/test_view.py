@@ -0,0 +1,68 @@
+"""
+Unit tests for the modal view of the questionnaire.
+
+This test module checks that the view is compiled without mutating the template, that the compiled
+view is read-only and matches its pre-serialized payload, and that compiling again picks up new questions.
+"""
+
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from slack_app.modal import handlers
+from slack_app.questions import registry, view
+
+
+class TestView(unittest.TestCase):
+    """
+    Test suite for the compiled modal view.
+    """
+
+    def test_build_view_does_not_mutate_template(self):
+        """
+        Test if building the view twice leaves the template untouched and does not duplicate options.
+        """
+        view.build_view(view.questions)
+        built = view.build_view(view.questions)
+
+        self.assertEqual(view.VIEW_TEMPLATE["blocks"][0]["accessory"]["options"], [])
+        self.assertEqual(len(built["blocks"][0]["accessory"]["options"]), len(view.questions))
+
+    def test_compiled_view_matches_payload(self):
+        """
+        Test if the payload is the serialized view and the compiled view is read-only.
+        """
+        compiled = view.compile_view(view.questions)
+
+        self.assertEqual(json.loads(compiled.payload), view.build_view(view.questions))
+        self.assertEqual(len(compiled.digest), 64)
+
+        with self.assertRaises(TypeError):
+            compiled.view["callback_id"] = "changed"
+
+    def test_compiling_again_picks_up_new_questions(self):
+        """
+        Test if compiling the view with changed questions produces a new payload and hash.
+        """
+        compiled = view.compile_view(view.questions)
+        recompiled = view.compile_view(view.questions + [("New Question", "Is this new?")])
+
+        self.assertNotEqual(recompiled.digest, compiled.digest)
+        self.assertIn("New Question", recompiled.payload)
+
+    def test_open_modal_sends_payload(self):
+        """
+        Test if the modal is opened with the pre-serialized payload.
+        """
+        client = MagicMock()
+
+        handlers.open_modal(client, "trigger-1")
+
+        client.api_call.assert_called_once_with(
+            "views.open",
+            data={"trigger_id": "trigger-1", "view": registry.get_questionnaire().view.payload}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Unit tests for the warm-up mode of the Lambda function.
+
+This test module checks that scheduled warm-up pings are detected, that every warm-up step
+is run and reported, that a failing step does not prevent the remaining ones from running, and that
+the fetches of the secrets provider are reported.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import warmup
+from common import secrets
+
+
+class TestWarmUp(unittest.TestCase):
+    """
+    Test suite for the warm-up functions.
+    """
+
+    def test_is_warm_up_event(self):
+        """
+        Test if the scheduler event is recognized and Slack requests are not.
+        """
+        self.assertTrue(warmup.is_warm_up_event({"source": "aws.events"}))
+        self.assertFalse(warmup.is_warm_up_event({"headers": {}, "body": ""}))
+        self.assertFalse(warmup.is_warm_up_event(None))
+
+    def test_warm_up_runs_every_step(self):
+        """
+        Test if every step is run in order and reported with its duration.
+        """
+        first, second = MagicMock(), MagicMock()
+
+        with patch.object(warmup, "WARM_UP_STEPS", [("first", first), ("second", second)]):
+            report = warmup.warm_up()
+
+        first.assert_called_once_with()
+        second.assert_called_once_with()
+        self.assertTrue(report["ok"])
+        self.assertEqual([step["name"] for step in report["steps"]], ["first", "second"])
+        self.assertTrue(all(step["duration_ms"] >= 0 for step in report["steps"]))
+
+    def test_warm_up_reports_failed_step(self):
+        """
+        Test if a failing step is reported and the following steps are still run.
+        """
+        failing = MagicMock(side_effect=Exception("Fail to get secrets"))
+        following = MagicMock()
+
+        with patch.object(warmup, "WARM_UP_STEPS", [("secrets", failing), ("modal_view", following)]):
+            report = warmup.warm_up()
+
+        following.assert_called_once_with()
+        self.assertFalse(report["ok"])
+        self.assertFalse(report["steps"][0]["ok"])
+        self.assertEqual(report["steps"][0]["error"], "Fail to get secrets")
+        self.assertTrue(report["steps"][1]["ok"])
+
+
+    def test_warm_up_reports_secrets_provider(self):
+        """
+        Test if the fetch counters of the secrets provider in use are reported.
+        """
+        provider = secrets.LocalProvider()
+        provider.fetch()
+
+        with patch.object(warmup, "WARM_UP_STEPS", []), patch.object(secrets, "PROVIDER", provider):
+            report = warmup.warm_up()
+
+        self.assertEqual(report["secrets_provider"]["provider"], "local")
+        self.assertEqual((report["secrets_provider"]["fetches"], report["secrets_provider"]["errors"]), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
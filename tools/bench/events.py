@@ -0,0 +1,159 @@
+"""
+This script builds the Lambda events sent by the benchmark suite: API Gateway (HTTP API, payload format 2.0)
+events carrying signed Slack requests for the slash command, the modal submission and the URL verification
+challenge, and the scheduled warm-up ping. Requests are signed with the signing secret like Slack does, so they pass Bolt's verification.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+import typing
+import urllib.parse
+import uuid
+from collections import namedtuple
+
+
+# Signing secret and slash command configured in the secrets of the benchmarked function
+SIGNING_SECRET = "bench-signing-secret"
+SLASH_COMMAND = "/security-test"
+
+# Namedtuple 'LambdaContext' with the attributes of the AWS Lambda context used by the function
+LambdaContext = namedtuple(
+    "LambdaContext",
+    ["function_name", "invoked_function_arn", "aws_request_id", "memory_limit_in_mb"],
+    defaults=["slack-bot-bench", "arn:aws:lambda:eu-west-2:000000000000:function:slack-bot-bench", "bench", 128]
+)
+
+
+def sign(body: str, timestamp: int, signing_secret: str = SIGNING_SECRET) -> str:
+    """
+    Computes the Slack request signature of a body.
+    """
+
+    base = f"v0:{timestamp}:{body}".encode("utf-8")
+    return "v0=" + hmac.new(signing_secret.encode("utf-8"), base, hashlib.sha256).hexdigest()
+
+
+def http_event(
+        body: str,
+        content_type: str,
+        extra_headers: typing.Union[typing.Dict, None] = None,
+        timestamp: typing.Union[int, None] = None
+) -> typing.Dict:
+    """
+    Wraps a signed Slack request body into an API Gateway event, signed now unless a timestamp is given.
+    """
+
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    headers = {
+        "content-type": content_type,
+        "x-slack-request-timestamp": str(timestamp),
+        "x-slack-signature": sign(body, timestamp),
+    }
+    headers.update(extra_headers or dict())
+
+    return {
+        "version": "2.0",
+        "routeKey": "POST /slack-bot-app",
+        "rawPath": "/slack-bot-app",
+        "headers": headers,
+        "requestContext": {"http": {"method": "POST", "path": "/slack-bot-app"}},
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+def slash_command(user_id: str = "U0001", team_id: str = "T0001", text: str = "") -> typing.Dict:
+    """
+    Builds the event of the slash command opening the modal.
+    """
+
+    body = urllib.parse.urlencode({
+        "token": "legacy",
+        "team_id": team_id,
+        "channel_id": "C0001",
+        "user_id": user_id,
+        "command": SLASH_COMMAND,
+        "text": text,
+        "trigger_id": f"trigger-{uuid.uuid4().hex}",
+        "api_app_id": "A0001",
+    })
+
+    return http_event(body, "application/x-www-form-urlencoded")
+
+
+def view_submission(
+        selected: typing.Sequence[int] = (0, 2, 5),
+        user_id: str = "U0001",
+        team_id: str = "T0001",
+        view_id: typing.Union[str, None] = None,
+        retry_num: typing.Union[int, None] = None
+) -> typing.Dict:
+    """
+    Builds the event of a modal submission selecting the given questions.
+    """
+
+    payload = {
+        "type": "view_submission",
+        "team": {"id": team_id, "domain": "bench"},
+        "user": {"id": user_id, "team_id": team_id},
+        "api_app_id": "A0001",
+        "view": {
+            "id": view_id or f"V{uuid.uuid4().hex[:10].upper()}",
+            "hash": uuid.uuid4().hex,
+            "type": "modal",
+            "callback_id": "id-modal-window",
+            "team_id": team_id,
+            "state": {
+                "values": {
+                    "section-identifier": {
+                        "checkboxes-action": {
+                            "type": "checkboxes",
+                            "selected_options": [{"value": f"value-{idx}"} for idx in selected],
+                        }
+                    }
+                }
+            },
+        },
+    }
+
+    headers = dict()
+    if retry_num is not None:
+        headers = {"x-slack-retry-num": str(retry_num), "x-slack-retry-reason": "http_timeout"}
+
+    return http_event(urllib.parse.urlencode({"payload": json.dumps(payload)}), "application/x-www-form-urlencoded", headers)
+
+
+def url_verification() -> typing.Dict:
+    """
+    Builds the challenge of the Events API sent when the request URL is set.
+    """
+
+    body = json.dumps({"token": "legacy", "challenge": uuid.uuid4().hex, "type": "url_verification"})
+
+    return http_event(body, "application/json")
+
+
+def stale_slash_command() -> typing.Dict:
+    """
+    Builds a slash command signed 10 minutes ago, like a replayed request.
+    """
+
+    return http_event(slash_command()["body"], "application/x-www-form-urlencoded", timestamp=int(time.time()) - 600)
+
+
+def warm_up() -> typing.Dict:
+    """
+    Builds the scheduled warm-up ping.
+    """
+
+    return {"source": "aws.events"}
+
+
+# Mapping of event type to the function building its event
+EVENT_BUILDERS: typing.Dict[str, typing.Callable[[], typing.Dict]] = {
+    "slash_command": slash_command,
+    "view_submission": view_submission,
+    "warm_up": warm_up,
+}
@@ -0,0 +1,239 @@
+"""
+This script provides in-process stand-ins of the Slack Web API and the JIRA REST API for the benchmark suite.
+Both servers run on localhost in a background thread, answer with realistic payloads after a configurable
+latency and record every call with its server-side duration, so the benchmark can drive `lambda_handler`
+end to end without network access to Slack or JIRA.
+"""
+
+import json
+import threading
+import time
+import typing
+import urllib.parse
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Namedtuple 'Call' for a request received by a fake server
+Call = namedtuple("Call", ["name", "duration_ms"])
+
+
+class FakeServer:
+    """
+    Base class of the fake servers, running a threaded HTTP server on a free localhost port.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Initializes the server.
+
+        Args:
+            latency (float): Seconds every response is delayed by, emulating the network and server time.
+        """
+
+        self.latency = latency
+        self.calls: typing.List[Call] = list()
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, Nagle's algorithm would delay the body
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.handle(self, "GET")
+
+            def do_POST(self):
+                server.handle(self, "POST")
+
+            def do_PUT(self):
+                server.handle(self, "PUT")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> "FakeServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.calls = list()
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str):
+        """
+        Reads a request, waits for the configured latency and writes the response.
+        """
+
+        started = time.perf_counter()
+
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length).decode("utf-8") if length else ""
+        path = urllib.parse.urlsplit(request.path).path
+
+        name, status, payload, headers = self.respond(method, path, body, request.headers)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        data = json.dumps(payload).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        for header, value in headers.items():
+            request.send_header(header, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+        with self._lock:
+            self.calls.append(Call(name, (time.perf_counter() - started) * 1000))
+
+    def respond(self, method: str, path: str, body: str, headers) -> typing.Tuple[str, int, typing.Any, typing.Dict]:
+        """
+        Builds the response of a request.
+
+        Returns:
+            Tuple: A tuple of (Call Name, HTTP Status, JSON Payload, Extra Headers).
+        """
+
+        raise NotImplementedError
+
+
+class FakeSlack(FakeServer):
+    """
+    A stand-in of the Slack Web API, answering every method with a successful response, unless rate limits
+    were injected.
+    """
+
+    def __init__(self, latency: float = 0.0, members: int = 100):
+        super().__init__(latency)
+        self.members = members
+        self.ts = 0
+        # Mapping of method to a list of [Number of 429 Left, Retry-After Seconds]
+        self.rate_limits: typing.Dict[str, typing.List] = dict()
+
+    def inject_rate_limit(self, api_method: str, count: int = 1, retry_after: float = 1):
+        """
+        Answers the next calls of a method with '429 Too Many Requests', like Slack above its rate limits.
+
+        Args:
+            api_method (str): The name of the method, e.g. 'chat.postMessage'.
+            count (int): Number of calls refused.
+            retry_after (float): Seconds sent in the `Retry-After` header.
+        """
+
+        with self._lock:
+            self.rate_limits[api_method] = [count, retry_after]
+
+    def respond(self, method, path, body, headers):
+        api_method = path.rsplit("/", 1)[-1]
+        params = parse_params(body, headers)
+        payload: typing.Dict = {"ok": True}
+
+        with self._lock:
+            rate_limit = self.rate_limits.get(api_method)
+
+            if rate_limit and rate_limit[0] > 0:
+                rate_limit[0] -= 1
+                return api_method, 429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(rate_limit[1])}
+
+        if api_method == "auth.test":
+            payload.update({"user_id": "UBOT", "bot_id": "BBOT", "team_id": "T0001", "url": "https://bench.slack.com/"})
+
+        elif api_method == "users.info":
+            payload["user"] = make_user(params.get("user", "U0001"))
+
+        elif api_method == "users.list":
+            payload["members"] = [make_user(f"U{idx:06d}") for idx in range(self.members)]
+            payload["response_metadata"] = {"next_cursor": ""}
+
+        elif api_method in ("chat.postMessage", "chat.update"):
+            with self._lock:
+                self.ts += 1
+                payload.update({"channel": params.get("channel", "D0001"), "ts": f"{int(time.time())}.{self.ts:06d}"})
+
+        elif api_method == "conversations.open":
+            payload["channel"] = {"id": "D" + str(params.get("users", "U0001"))[1:]}
+
+        return api_method, 200, payload, dict()
+
+
+class FakeJira(FakeServer):
+    """
+    A stand-in of the JIRA REST API, creating issues with increasing keys.
+    """
+
+    def __init__(self, latency: float = 0.0, project_key: str = "SEC"):
+        super().__init__(latency)
+        self.project_key = project_key
+        self.issues = 0
+
+    def next_issue(self) -> typing.Dict:
+        with self._lock:
+            self.issues += 1
+            number = self.issues
+
+        return {
+            "id": str(10000 + number),
+            "key": f"{self.project_key}-{number}",
+            "self": f"{self.url}/rest/api/2/issue/{10000 + number}",
+        }
+
+    def respond(self, method, path, body, headers):
+        if path.endswith("/serverInfo"):
+            return "serverInfo", 200, {"baseUrl": self.url, "version": "9.4.0", "versionNumbers": [9, 4, 0],
+                                       "deploymentType": "Server", "serverTitle": "Bench"}, dict()
+
+        if method == "POST" and path.endswith("/issue/bulk"):
+            issues = [self.next_issue() for _ in json.loads(body).get("issueUpdates", [])]
+            return "issue/bulk", 201, {"issues": issues, "errors": []}, dict()
+
+        if method == "POST" and path.endswith("/issue"):
+            return "issue", 201, self.next_issue(), dict()
+
+        if path.endswith("/search"):
+            return "search", 200, {"startAt": 0, "maxResults": 50, "total": 0, "issues": []}, dict()
+
+        return path, 404, {"errorMessages": [f"Unknown resource {path}"]}, dict()
+
+
+def parse_params(body: str, headers) -> typing.Dict:
+    """
+    Parses the parameters of a Slack Web API call, sent either as JSON or form-encoded.
+    """
+
+    if not body:
+        return dict()
+
+    if "json" in (headers.get("Content-Type") or ""):
+        return json.loads(body)
+
+    return {key: values[0] for key, values in urllib.parse.parse_qs(body).items()}
+
+
+def make_user(user_id: str) -> typing.Dict:
+    """
+    Builds the profile of a fake Slack user.
+    """
+
+    return {
+        "id": user_id,
+        "name": f"user-{user_id.lower()}",
+        "real_name": f"Bench User {user_id}",
+        "profile": {"display_name": f"Bench {user_id}", "real_name": f"Bench User {user_id}",
+                    "email": f"{user_id.lower()}@example.com"},
+    }
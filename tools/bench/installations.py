@@ -0,0 +1,140 @@
+"""
+This script benchmarks the authorization of requests with the installation store of the `installations` module.
+Thousands of workspaces are installed into a memory store which sleeps for a configurable latency on every read,
+like a DynamoDB `GetItem`, and requests are drawn from a Zipf distribution over the workspaces, as a few large
+workspaces send most of the traffic. Every request is authorized twice: through the cache of the installations,
+and straight from the store as without the cache.
+
+The p50/p95/p99 latencies of both are reported together with the hit rate and the evictions of the cache, which
+shows the cache size needed for a number of workspaces.
+
+Usage:
+    python tools/bench/installations.py [--teams 5000] [--requests 20000] [--cache-size 5000]
+                                        [--store-latency 0.005] [--zipf 1.1] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import typing
+
+# Directory holding the code of the Lambda function
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "app")
+
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from common import cache  # noqa: E402
+from slack_app import installations  # noqa: E402
+
+
+# Percentiles reported for both modes
+PERCENTILES = (50, 95, 99)
+
+
+class SlowStore(installations.MemoryStore):
+    """
+    A memory installation store with the latency of a remote store on every read.
+    """
+
+    def __init__(self, latency: float, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+        self.reads = 0
+
+    def find(self, enterprise_id, team_id):
+        self.reads += 1
+        time.sleep(self.latency)
+        return super().find(enterprise_id, team_id)
+
+
+def summarize(values: typing.List[float]) -> typing.Dict[str, float]:
+    """
+    Summarizes latencies in milliseconds into their percentiles.
+    """
+
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    summary = {f"p{percentile}": round(quantiles[percentile - 1], 4) for percentile in PERCENTILES}
+    summary["mean"] = round(statistics.fmean(values), 4)
+
+    return summary
+
+
+def run(teams: int, requests: int, cache_size: int, store_latency: float, zipf: float) -> typing.Dict:
+    """
+    Authorizes the same random requests with and without the cache.
+
+    Returns:
+        dict: The latencies of both modes and the counters of the cache and the store.
+    """
+
+    store = SlowStore(store_latency, [
+        installations.Installation(f"T{idx}", None, f"xoxb-{idx}", f"B{idx}", f"U{idx}", 0.0) for idx in range(teams)
+    ])
+    installations.STORE = store
+    installations.CACHE = cache.TTLCache(maxsize=cache_size, ttl=installations.DEFAULT_CACHE_TTL)
+
+    weights = [1 / (rank + 1) ** zipf for rank in range(teams)]
+    team_ids = [f"T{idx}" for idx in random.Random(0).choices(range(teams), weights=weights, k=requests)]
+    logger = logging.getLogger(__name__)
+
+    cached = list()
+    for team_id in team_ids:
+        started = time.perf_counter()
+        installations.authorize(None, team_id, logger)
+        cached.append((time.perf_counter() - started) * 1000)
+
+    stats = installations.CACHE.stats()
+    cached_reads = store.reads
+
+    uncached = list()
+    for team_id in team_ids:
+        started = time.perf_counter()
+        installations.build_authorize_result(store.find(None, team_id))
+        uncached.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "cached": summarize(cached),
+        "uncached": summarize(uncached),
+        "hit_rate": round(stats.hits / max(stats.hits + stats.misses, 1), 4),
+        "evictions": stats.evictions,
+        "store_reads": {"cached": cached_reads, "uncached": store.reads - cached_reads},
+        "distinct_teams": len(set(team_ids)),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark of the authorization with the installation store.")
+    parser.add_argument("--teams", type=int, default=5000, help="Number of installed workspaces.")
+    parser.add_argument("--requests", type=int, default=20000, help="Number of authorized requests.")
+    parser.add_argument("--cache-size", type=int, default=installations.DEFAULT_CACHE_SIZE, help="Size of the cache.")
+    parser.add_argument("--store-latency", type=float, default=0.005, help="Seconds added to every store read.")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Exponent of the Zipf distribution of the requests.")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    args = parser.parse_args()
+
+    results = run(args.teams, args.requests, args.cache_size, args.store_latency, args.zipf)
+    results["meta"] = vars(args)
+
+    print(f"{'mode':<9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'reads':>7}")
+    for mode in ("cached", "uncached"):
+        summary = results[mode]
+        print(f"{mode:<9} {summary['p50']:>9.4f} {summary['p95']:>9.4f} {summary['p99']:>9.4f} "
+              f"{summary['mean']:>9.4f} {results['store_reads'][mode]:>7}")
+    print(f"hit rate {results['hit_rate']:.2%}, {results['evictions']} evictions, "
+          f"{results['distinct_teams']} distinct workspaces")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+This script benchmarks the `router` module against the previous request path of the function, which built the
+Slack app and a new request handler for every request and left every check to Bolt. The same events are sent
+through both paths, against the in-process stand-ins of the Slack and JIRA APIs of `fakes`:
+
+- url_verification: the challenge of the Events API, answered by the router;
+- duplicate_retry: a retry of Slack of a modal submission already claimed, acknowledged by the router;
+- stale_request: a slash command signed 10 minutes ago, rejected by the router;
+- slash_command: real work, dispatched to Bolt by both paths.
+
+Every case is measured cold, in a fresh interpreter from the import of the function code, and warm, repeated in
+one interpreter. Both paths must give the same status code; their p50/p95/p99 latencies are reported per case.
+
+Usage:
+    python tools/bench/router.py [--iterations 500] [--cold-runs 10] [--slack-latency 0.02]
+                                 [--cases url_verification,duplicate_retry,stale_request,slash_command]
+                                 [--output results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import typing
+
+import events
+import fakes
+import run
+
+
+# Paths compared: through the router, or straight to a new request handler of the Slack app
+PATHS = ("routed", "direct")
+
+
+def duplicate_retry() -> typing.Dict:
+    """
+    Builds a retry of a modal submission whose first delivery was claimed.
+    """
+
+    from common import idempotency
+    from slack_app import router
+
+    event = events.view_submission(retry_num=1)
+    idempotency.get_store().claim(router.get_submission_key(event["body"]))
+
+    return event
+
+
+# Mapping of case to the function building its event
+CASES: typing.Dict[str, typing.Callable[[], typing.Dict]] = {
+    "url_verification": events.url_verification,
+    "duplicate_retry": duplicate_retry,
+    "stale_request": events.stale_slash_command,
+    "slash_command": events.slash_command,
+}
+
+
+def send(path: str, event: typing.Dict) -> typing.Dict:
+    """
+    Sends an event through one of the paths.
+
+    Returns:
+        dict: The API Gateway response.
+    """
+
+    from slack_app import adapter, bot, router
+
+    if path == "routed":
+        return router.route(event) or router.get_request_handler().handle(event, events.LambdaContext())
+
+    return adapter.LambdaRequestHandler(app=bot.get_slack_app()).handle(event, events.LambdaContext())
+
+
+def measure(path: str, case: str) -> typing.Tuple[float, int]:
+    """
+    Sends the event of a case through a path.
+
+    Returns:
+        Tuple[float, int]: The duration in milliseconds and the status code of the response.
+    """
+
+    event = CASES[case]()
+
+    # Bolt logs the rejected requests, which is not part of the benchmark results
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        started = time.perf_counter()
+        response = send(path, event)
+        duration = (time.perf_counter() - started) * 1000
+
+    return duration, response["statusCode"]
+
+
+def cold_worker(path: str, case: str):
+    """
+    Runs a single cold request in this fresh interpreter and prints its duration and status as JSON.
+    """
+
+    started = time.perf_counter()
+    run.load_function()
+    import_ms = (time.perf_counter() - started) * 1000
+
+    duration, status = measure(path, case)
+    print(json.dumps({"import": import_ms, "request": duration, "status": status}))
+
+
+def run_cold(path: str, case: str, runs: int, environment: typing.Dict[str, str]) -> typing.Tuple[typing.Dict, int]:
+    """
+    Measures cold requests, each one in a fresh interpreter.
+    """
+
+    samples = list()
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cold-worker", f"{path}:{case}"],
+            env={**os.environ, **environment},
+            capture_output=True,
+            text=True
+        )
+
+        if result.returncode != 0:
+            raise Exception(f"Cold {path} {case} run failed:\n{result.stderr}")
+
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return run.summarize([sample["request"] for sample in samples]), samples[-1]["status"]
+
+
+def run_warm(path: str, case: str, iterations: int) -> typing.Tuple[typing.Dict, int]:
+    """
+    Measures warm requests in this interpreter, after one untimed request.
+    """
+
+    _, status = measure(path, case)
+    durations = [measure(path, case)[0] for _ in range(iterations)]
+
+    return run.summarize(durations), status
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark of the request router against the direct Bolt path.")
+    parser.add_argument("--iterations", type=int, default=500, help="Number of warm requests per case and path.")
+    parser.add_argument("--cold-runs", type=int, default=10, help="Number of cold requests per case and path.")
+    parser.add_argument("--slack-latency", type=float, default=0.02, help="Seconds added to every Slack call.")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma separated cases.")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    parser.add_argument("--cold-worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_worker:
+        cold_worker(*args.cold_worker.split(":"))
+        return 0
+
+    slack = fakes.FakeSlack(latency=args.slack_latency).start()
+    jira = fakes.FakeJira().start()
+    results = {"meta": {key: value for key, value in vars(args).items() if key != "cold_worker"}, "results": dict()}
+
+    try:
+        environment = run.get_environment(slack, jira)
+        os.environ.update(environment)
+        cases = [case for case in args.cases.split(",") if case]
+
+        # Cold requests first, each one in a fresh interpreter
+        for case in cases:
+            results["results"][case] = {
+                path: {"cold": run_cold(path, case, args.cold_runs, environment)} for path in PATHS
+            }
+
+        # Warm requests then, in this interpreter
+        run.load_function()
+
+        for case in cases:
+            for path in PATHS:
+                results["results"][case][path]["warm"] = run_warm(path, case, args.iterations)
+    finally:
+        slack.stop()
+        jira.stop()
+
+    print(f"{'case':<17} {'path':<7} {'mode':<5} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    for case, paths in results["results"].items():
+        statuses = set()
+
+        for path, modes in paths.items():
+            for mode in ("cold", "warm"):
+                summary, status = modes[mode]
+                statuses.add(status)
+                print(f"{case:<17} {path:<7} {mode:<5} {status:>6} "
+                      f"{summary['p50']:>9.3f} {summary['p95']:>9.3f} {summary['p99']:>9.3f}")
+
+        # The router must answer like Bolt does
+        if len(statuses) > 1:
+            print(f"MISMATCH: {case} answered with {sorted(statuses)}")
+            return 1
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
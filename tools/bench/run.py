@@ -0,0 +1,377 @@
+"""
+This script is the end-to-end latency benchmark of the Lambda function. It sends signed API Gateway events
+(slash command, view submission and warm-up ping) through `app.lambda_handler` against in-process stand-ins
+of the Slack Web API and JIRA REST API with configurable latency. Lazy listeners are run by an in-process
+Lambda client in a background thread, like the asynchronous self-invocation in AWS.
+
+Every event type is measured in two modes:
+- cold: a fresh interpreter per run, measuring the import of the function code and the first invocation;
+- warm: repeated invocations in one interpreter, like a warm container.
+
+For each phase (import, ack = response of lambda_handler, lazy = lazy listener) the p50/p95/p99 latencies
+are reported, together with the memory allocated per warm invocation. The results can be saved as JSON
+and compared against a previous run to catch performance regressions of `handlers`, `task` or `secrets`.
+
+Usage:
+    python tools/bench/run.py [--iterations 200] [--cold-runs 10] [--slack-latency 0.02] [--jira-latency 0.15]
+                              [--events slash_command,view_submission,warm_up] [--output results.json]
+                              [--baseline baseline.json] [--threshold-pct 10] [--execution-mode sync|async]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+
+import events
+import fakes
+
+
+# Directory holding the code of the Lambda function
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "app")
+
+# Percentiles reported for every phase
+PERCENTILES = (50, 95, 99)
+
+
+class InProcessLambdaClient:
+    """
+    Emulates the asynchronous Lambda invocations used to run lazy listeners, in a background thread.
+    """
+
+    def __init__(self, handler: typing.Callable, context: events.LambdaContext):
+        self.handler = handler
+        self.context = context
+        self.durations: typing.List[float] = list()
+        self.errors: typing.List[str] = list()
+        self.threads: typing.List[threading.Thread] = list()
+        self._lock = threading.Lock()
+
+    def invoke(self, FunctionName: str, InvocationType: str = "Event", Payload: str = "{}") -> typing.Dict:
+        thread = threading.Thread(target=self.run, args=(json.loads(Payload),), daemon=True)
+        self.threads.append(thread)
+        thread.start()
+        return {"StatusCode": 202}
+
+    def run(self, event: typing.Dict):
+        started = time.perf_counter()
+
+        try:
+            self.handler(event, self.context)
+        except Exception as e:
+            with self._lock:
+                self.errors.append(repr(e))
+
+        with self._lock:
+            self.durations.append((time.perf_counter() - started) * 1000)
+
+    def join(self) -> typing.List[float]:
+        """
+        Waits for all pending lazy invocations and returns their durations in milliseconds.
+        """
+
+        for thread in self.threads:
+            thread.join()
+
+        durations, self.durations, self.threads = self.durations, list(), list()
+        return durations
+
+
+def get_environment(slack: fakes.FakeSlack, jira: fakes.FakeJira, execution_mode: str = "sync") -> typing.Dict[str, str]:
+    """
+    Returns the environment variables configuring the function against the fake servers.
+    """
+
+    return {
+        "BOT_EXECUTION_MODE": execution_mode,
+        "BOT_SECRETS_PROVIDER": "local",
+        "SLACK_BOT_TOKEN": "xoxb-bench",
+        "SLACK_SIGNING_SECRET": events.SIGNING_SECRET,
+        "SLACK_SLASH_COMMAND": events.SLASH_COMMAND,
+        "JIRA_API_TOKEN": "bench-token",
+        "JIRA_URL": jira.url,
+        "JIRA_USER": "bench@example.com",
+        "JIRA_PROJECT_KEY": jira.project_key,
+        "SLACK_API_URL": f"{slack.url}/api/",
+        # The single bench workspace sends far more requests than Slack allows, measure them without waiting
+        "BOT_SLACK_MAX_WAIT": "0",
+    }
+
+
+def load_function() -> typing.Tuple[typing.Any, InProcessLambdaClient, float]:
+    """
+    Imports the function code and installs the in-process Lambda client.
+
+    Returns:
+        Tuple: A tuple of (App Module, Lambda Client, Import Milliseconds).
+    """
+
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+
+    started = time.perf_counter()
+    import app
+    import_ms = (time.perf_counter() - started) * 1000
+
+    from slack_app import adapter
+
+    lambda_client = InProcessLambdaClient(app.lambda_handler, events.LambdaContext())
+    adapter.LAMBDA_CLIENT = lambda_client
+
+    return app, lambda_client, import_ms
+
+
+def invoke(app, lambda_client: InProcessLambdaClient, event_type: str) -> typing.Dict[str, float]:
+    """
+    Sends one event through the function and waits for its lazy listeners.
+
+    Returns:
+        dict: The duration in milliseconds of every phase of the invocation.
+    """
+
+    event = events.EVENT_BUILDERS[event_type]()
+
+    # The output of the function, like the printed warm-up report, is not part of the benchmark results
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        response = app.lambda_handler(event, events.LambdaContext())
+        phases = {"ack": (time.perf_counter() - started) * 1000}
+
+        lazy = lambda_client.join()
+
+    # The warm-up report is returned as is, Slack requests must be answered with 200
+    if isinstance(response, dict) and response.get("statusCode", 200) != 200:
+        raise Exception(f"{event_type} failed with {response}")
+
+    if lambda_client.errors:
+        raise Exception(f"{event_type} lazy listener failed: {lambda_client.errors}")
+
+    if lazy:
+        phases["lazy"] = sum(lazy)
+
+    return phases
+
+
+def cold_worker(event_type: str):
+    """
+    Runs a single cold invocation in this fresh interpreter and prints its phases as JSON.
+    """
+
+    app, lambda_client, import_ms = load_function()
+    phases = invoke(app, lambda_client, event_type)
+    phases["import"] = import_ms
+    print(json.dumps(phases))
+
+
+def summarize(values: typing.List[float]) -> typing.Dict[str, float]:
+    """
+    Summarizes the durations of a phase.
+    """
+
+    ordered = sorted(values)
+    summary = {"n": len(ordered), "mean": round(statistics.fmean(ordered), 3)}
+
+    # Nearest-rank percentiles, exact for the sample sizes used here
+    for percentile in PERCENTILES:
+        rank = max(0, min(len(ordered) - 1, int(round(percentile / 100 * len(ordered) + 0.5)) - 1))
+        summary[f"p{percentile}"] = round(ordered[rank], 3)
+
+    summary["max"] = round(ordered[-1], 3)
+    return summary
+
+
+def collect(samples: typing.List[typing.Dict[str, float]]) -> typing.Dict[str, typing.Dict]:
+    """
+    Groups the phases of several invocations and summarizes every phase.
+    """
+
+    phases: typing.Dict[str, typing.List[float]] = dict()
+
+    for sample in samples:
+        for phase, duration in sample.items():
+            phases.setdefault(phase, list()).append(duration)
+
+    return {phase: summarize(values) for phase, values in phases.items()}
+
+
+def run_cold(event_type: str, runs: int, environment: typing.Dict[str, str]) -> typing.Dict:
+    """
+    Measures cold invocations, each one in a fresh interpreter.
+    """
+
+    samples = list()
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cold-worker", event_type],
+            env={**os.environ, **environment},
+            capture_output=True,
+            text=True
+        )
+
+        if result.returncode != 0:
+            raise Exception(f"Cold {event_type} run failed:\n{result.stderr}")
+
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return collect(samples)
+
+
+def run_warm(app, lambda_client: InProcessLambdaClient, event_type: str, iterations: int) -> typing.Dict:
+    """
+    Measures warm invocations in this interpreter, after one untimed invocation.
+    """
+
+    invoke(app, lambda_client, event_type)
+    return collect([invoke(app, lambda_client, event_type) for _ in range(iterations)])
+
+
+def run_allocations(app, lambda_client: InProcessLambdaClient, event_type: str, iterations: int) -> typing.Dict:
+    """
+    Measures the memory allocated per warm invocation, including its lazy listeners.
+    """
+
+    allocated, peaks = list(), list()
+
+    for _ in range(iterations):
+        tracemalloc.start()
+        invoke(app, lambda_client, event_type)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        allocated.append(current / 1024)
+        peaks.append(peak / 1024)
+
+    return {"retained_kib": round(statistics.fmean(allocated), 3), "peak_kib": round(statistics.fmean(peaks), 3)}
+
+
+def compare(results: typing.Dict, baseline: typing.Dict, threshold_pct: float) -> typing.List[str]:
+    """
+    Compares the p50 and p95 latencies of every phase against a baseline.
+
+    Returns:
+        List[str]: A description of every regression, empty if there is none.
+    """
+
+    regressions = list()
+
+    for event_type, modes in results["results"].items():
+        for mode in ("cold", "warm"):
+            for phase, summary in modes.get(mode, dict()).items():
+                previous = baseline.get("results", dict()).get(event_type, dict()).get(mode, dict()).get(phase)
+
+                if previous is None:
+                    continue
+
+                for stat in ("p50", "p95"):
+                    if previous[stat] and summary[stat] > previous[stat] * (1 + threshold_pct / 100):
+                        regressions.append(
+                            f"{event_type} {mode} {phase} {stat}: {previous[stat]:.1f} ms -> {summary[stat]:.1f} ms"
+                        )
+
+    return regressions
+
+
+def print_results(results: typing.Dict):
+    """
+    Prints the results as a table.
+    """
+
+    print(f"{'event':<16} {'mode':<5} {'phase':<7} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    for event_type, modes in results["results"].items():
+        for mode in ("cold", "warm"):
+            for phase, summary in modes.get(mode, dict()).items():
+                print(f"{event_type:<16} {mode:<5} {phase:<7} {summary['n']:>5} "
+                      f"{summary['p50']:>9.2f} {summary['p95']:>9.2f} {summary['p99']:>9.2f}")
+
+        if "allocations" in modes:
+            allocations = modes["allocations"]
+            print(f"{event_type:<16} alloc retained {allocations['retained_kib']:.1f} KiB, "
+                  f"peak {allocations['peak_kib']:.1f} KiB per warm invocation")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark of the Lambda function.")
+    parser.add_argument("--iterations", type=int, default=200, help="Number of warm invocations per event type.")
+    parser.add_argument("--cold-runs", type=int, default=10, help="Number of cold invocations per event type.")
+    parser.add_argument("--allocation-runs", type=int, default=20, help="Number of traced warm invocations.")
+    parser.add_argument("--slack-latency", type=float, default=0.02, help="Seconds added to every Slack call.")
+    parser.add_argument("--jira-latency", type=float, default=0.15, help="Seconds added to every JIRA call.")
+    parser.add_argument("--events", default=",".join(events.EVENT_BUILDERS), help="Comma separated event types.")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    parser.add_argument("--baseline", help="Path of saved results to compare against.")
+    parser.add_argument("--threshold-pct", type=float, default=10.0, help="Slowdown ignored as noise, in percent.")
+    parser.add_argument("--execution-mode", choices=("sync", "async"), default="sync", help="Execution mode of the bot.")
+    parser.add_argument("--cold-worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_worker:
+        cold_worker(args.cold_worker)
+        return 0
+
+    slack = fakes.FakeSlack(latency=args.slack_latency).start()
+    jira = fakes.FakeJira(latency=args.jira_latency).start()
+
+    try:
+        environment = get_environment(slack, jira, args.execution_mode)
+        os.environ.update(environment)
+
+        event_types = [event_type for event_type in args.events.split(",") if event_type]
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": int(time.time()),
+                "iterations": args.iterations,
+                "cold_runs": args.cold_runs,
+                "slack_latency": args.slack_latency,
+                "jira_latency": args.jira_latency,
+                "execution_mode": args.execution_mode,
+            },
+            "results": dict(),
+        }
+
+        for event_type in event_types:
+            results["results"][event_type] = {"cold": run_cold(event_type, args.cold_runs, environment)}
+
+        app, lambda_client, _ = load_function()
+
+        for event_type in event_types:
+            results["results"][event_type]["warm"] = run_warm(app, lambda_client, event_type, args.iterations)
+            results["results"][event_type]["allocations"] = run_allocations(
+                app, lambda_client, event_type, args.allocation_runs
+            )
+    finally:
+        slack.stop()
+        jira.stop()
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold_pct)
+
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
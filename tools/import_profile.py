@@ -0,0 +1,192 @@
+"""
+This script produces an offline import-time report of the Lambda function code, so regressions of the
+cold-start time are visible in review. It imports the given module (the Lambda entry point `app` by default)
+in fresh interpreters with `python -X importtime`, takes the median timings over several runs and reports the
+self and cumulative import cost of every module and the total cost per top-level package. The report can be
+saved as JSON and compared against a previously saved baseline, failing when the import cost grew.
+
+Usage:
+    python tools/import_profile.py [--module app] [--runs 5] [--top 25] [--output report.json]
+                                   [--baseline baseline.json] [--threshold-ms 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import typing
+
+
+# Directory holding the code of the Lambda function, used as the working directory of the profiled imports
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+
+def parse_importtime(output: str) -> typing.Dict[str, typing.Tuple[int, int]]:
+    """
+    Parses the output of `python -X importtime`.
+
+    Args:
+        output (str): The stderr output of the interpreter.
+
+    Returns:
+        dict: A mapping of module name to a tuple of (Self Microseconds, Cumulative Microseconds).
+    """
+
+    timings = dict()
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        timings[module.strip()] = (int(self_us), int(cumulative_us))
+
+    return timings
+
+
+def profile(module: str, runs: int) -> typing.Dict[str, typing.Tuple[float, float]]:
+    """
+    Imports a module in fresh interpreters and returns the median import timings of every module.
+
+    Args:
+        module (str): Name of the module to import.
+        runs (int): Number of interpreters to start.
+
+    Returns:
+        dict: A mapping of module name to a tuple of (Self Milliseconds, Cumulative Milliseconds).
+    """
+
+    samples: typing.Dict[str, typing.List[typing.Tuple[int, int]]] = dict()
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=APP_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+
+        for name, timing in parse_importtime(result.stderr).items():
+            samples.setdefault(name, list()).append(timing)
+
+    return {
+        name: (
+            statistics.median(self_us for self_us, _ in timings) / 1000,
+            statistics.median(cumulative_us for _, cumulative_us in timings) / 1000
+        )
+        for name, timings in samples.items()
+    }
+
+
+def build_report(module: str, timings: typing.Dict[str, typing.Tuple[float, float]]) -> typing.Dict:
+    """
+    Builds the import-time report.
+
+    Args:
+        module (str): Name of the profiled module.
+        timings (dict): The import timings of every module, as returned by `profile`.
+
+    Returns:
+        dict: The total import time, the timings per module and the total self time per top-level package.
+    """
+
+    packages: typing.Dict[str, float] = dict()
+
+    for name, (self_ms, _) in timings.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + self_ms
+
+    return {
+        "module": module,
+        "total_ms": round(timings.get(module, (0.0, 0.0))[1], 3),
+        "modules": {name: {"self_ms": round(s, 3), "cumulative_ms": round(c, 3)} for name, (s, c) in timings.items()},
+        "packages": {name: round(total, 3) for name, total in sorted(packages.items(), key=lambda i: -i[1])},
+    }
+
+
+def compare(report: typing.Dict, baseline: typing.Dict, threshold_ms: float) -> typing.List[str]:
+    """
+    Compares a report with a baseline report.
+
+    Args:
+        report (dict): The current report.
+        baseline (dict): The baseline report.
+        threshold_ms (float): Growth in milliseconds below which a change is considered noise.
+
+    Returns:
+        List[str]: A description of every regression, empty if there is none.
+    """
+
+    regressions = list()
+
+    total_growth = report["total_ms"] - baseline["total_ms"]
+    if total_growth > threshold_ms:
+        regressions.append(f"total import time grew by {total_growth:.1f} ms to {report['total_ms']:.1f} ms")
+
+    # New packages on the import path are the most common cause of cold-start regressions
+    for package, total in report["packages"].items():
+        previous = baseline["packages"].get(package)
+
+        if previous is None and total > threshold_ms:
+            regressions.append(f"package '{package}' is newly imported ({total:.1f} ms)")
+        elif previous is not None and total - previous > threshold_ms:
+            regressions.append(f"package '{package}' grew by {total - previous:.1f} ms to {total:.1f} ms")
+
+    return regressions
+
+
+def print_report(report: typing.Dict, top: int):
+    """
+    Prints the most expensive modules and packages of a report.
+
+    Args:
+        report (dict): The report.
+        top (int): Number of modules and packages to print.
+    """
+
+    print(f"Import of '{report['module']}': {report['total_ms']:.1f} ms\n")
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    modules = sorted(report["modules"].items(), key=lambda i: -i[1]["cumulative_ms"])
+    for name, timing in modules[:top]:
+        print(f"{timing['cumulative_ms']:>14.1f} {timing['self_ms']:>9.1f}  {name}")
+
+    print(f"\n{'total ms':>14}  package")
+    for name, total in list(report["packages"].items())[:top]:
+        print(f"{total:>14.1f}  {name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Report the import-time cost of the Lambda function code.")
+    parser.add_argument("--module", default="app", help="Module to import, relative to the app directory.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to take the median of.")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules and packages to print.")
+    parser.add_argument("--output", help="Path of the JSON file to save the report to.")
+    parser.add_argument("--baseline", help="Path of a saved report to compare against.")
+    parser.add_argument("--threshold-ms", type=float, default=5.0, help="Growth ignored as noise.")
+    args = parser.parse_args()
+
+    report = build_report(args.module, profile(args.module, args.runs))
+    print_report(report, args.top)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.threshold_ms)
+
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
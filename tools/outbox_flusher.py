@@ -0,0 +1,56 @@
+"""
+This script drains the JIRA outbox outside of AWS Lambda, e.g. the SQLite outbox of a local run or an SQS queue
+of a local SQS-compatible stand-in. It creates the pending tasks in JIRA in batches with the outbox flusher and
+updates the messages of their users with the task links, then waits for new entries until it is interrupted.
+The outbox, JIRA and Slack are configured with the same environment variables as the Lambda function.
+
+Usage:
+    BOT_JIRA_OUTBOX=sqlite python tools/outbox_flusher.py [--interval 2] [--once]
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+
+
+# Directory holding the code of the Lambda function, imported by the flusher
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Drain the JIRA outbox of the Slack bot.")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds to wait when the outbox is empty.")
+    parser.add_argument("--once", action="store_true", help="Exit once the outbox is drained.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+
+    from jira_app import outbox
+    from slack_app import bot
+    from slack_app.modal import handlers
+
+    if not outbox.is_enabled():
+        print("The JIRA outbox is disabled, set BOT_JIRA_OUTBOX to 'sqlite' or 'sqs'.")
+        return 1
+
+    flusher = outbox.create_flusher(functools.partial(handlers.update_task_message, bot.get_slack_app().client))
+
+    try:
+        while True:
+            report = flusher.drain(outbox.get_outbox())
+
+            if report.created or report.retried or report.failed:
+                print(f"created={len(report.created)} retried={len(report.retried)} failed={len(report.failed)}")
+
+            if args.once:
+                return 0
+
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())